@@ -16,9 +16,13 @@ export const createR2Client = () =>
     },
   });
 
+// {domain}-{timestamp}-thumb.webp keys are never rewritten, so the CDN may keep them for good
+export const IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable";
+
 export interface UploadOptions {
   data: Buffer | string;
   contentType: string;
+  cacheControl?: string;
   path?: string;
   key: string;
 }
@@ -30,6 +34,7 @@ export interface UploadResult {
 export const serverUploadFile = async ({
   data,
   contentType,
+  cacheControl,
   path = "",
   key,
 }: UploadOptions): Promise<UploadResult> => {
@@ -51,6 +56,7 @@ export const serverUploadFile = async ({
         Key: finalKey,
         Body: fileBuffer,
         ContentType: contentType,
+        CacheControl: cacheControl,
       }),
     );
 
@@ -0,0 +1,94 @@
+import fs from "fs";
+import path from "path";
+import { ensureDefaultCategory, insertBatch } from "./import-sites";
+import type { PreScoredSite, ScoredBatchManifest } from "./types";
+
+interface ScoredImportOptions {
+  scoredDir: string; // Output directory of scripts/preprocess-sites.py
+  batchSize?: number;
+  dryRun?: boolean;
+}
+
+/**
+ * Import sites already scored, ranked and given a status by scripts/preprocess-sites.py.
+ * Only one batch file is held in memory at a time, so the dump's size doesn't matter here.
+ */
+export async function importScoredSites(options: ScoredImportOptions) {
+  const { scoredDir, batchSize = 50, dryRun = false } = options;
+
+  console.log("📖 Reading scored batches from:", scoredDir);
+
+  const manifest: ScoredBatchManifest = JSON.parse(
+    fs.readFileSync(path.join(scoredDir, "manifest.json"), "utf-8"),
+  );
+  const liveCount = manifest.live;
+  const pendingCount = manifest.pending;
+
+  console.log(`✓ Loaded ${manifest.loaded} sites (scored ${manifest.generatedAt})`);
+  console.log(`✓ ${manifest.sites} successful scrapes in ${manifest.batches.length} batch files`);
+
+  console.log(`\n📈 Import Summary:`);
+  console.log(`   Total sites: ${manifest.sites}`);
+  console.log(`   Live: ${liveCount}`);
+  console.log(`   Pending: ${pendingCount}`);
+  console.log(`   Average score: ${manifest.averageScore.toFixed(1)}`);
+
+  const readBatch = (file: string): PreScoredSite[] =>
+    JSON.parse(fs.readFileSync(path.join(scoredDir, file), "utf-8"));
+
+  if (dryRun) {
+    console.log("\n🏃 Dry run mode - no data will be inserted");
+    console.log("\nTop 10 sites:");
+    const first = manifest.batches.length > 0 ? readBatch(manifest.batches[0].file) : [];
+    first.slice(0, 10).forEach((s) => {
+      console.log(`${s.rank}. ${s.site.domain} (score: ${s.quality.score}, status: ${s.status})`);
+    });
+    return { success: true, imported: 0, liveCount: 0, pendingCount: 0 };
+  }
+
+  const categoryToUse = await ensureDefaultCategory();
+
+  console.log(`\n🚀 Starting import (${batchSize} per batch)...`);
+  let imported = 0;
+  let failed = 0;
+  let batchNumber = 0;
+
+  for (const { file } of manifest.batches) {
+    const sites = readBatch(file);
+
+    for (let i = 0; i < sites.length; i += batchSize) {
+      const batch = sites.slice(i, i + batchSize);
+      batchNumber++;
+
+      try {
+        const inserted = await insertBatch(batch, categoryToUse.id);
+
+        if (inserted === 0) {
+          console.log(
+            `   ⏭️  Skipped batch ${batchNumber} (all ${batch.length} sites already exist)`,
+          );
+          continue;
+        }
+
+        imported += inserted;
+        const skipped = batch.length - inserted;
+        console.log(
+          `   ✓ Imported batch ${batchNumber} (${inserted} new, ${skipped} duplicates, total: ${imported}/${manifest.sites})`,
+        );
+      } catch (error) {
+        console.error(`   ✗ Failed batch ${batchNumber}:`, error);
+        failed += batch.length;
+      }
+    }
+  }
+
+  console.log(`\n✅ Import complete! ${imported} sites imported, ${failed} failed.`);
+
+  return {
+    success: true,
+    imported,
+    failed,
+    liveCount,
+    pendingCount,
+  };
+}
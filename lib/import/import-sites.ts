@@ -76,13 +76,58 @@ export async function importSites(options: ImportOptions) {
   }
 
   // 6. Get default category ID
+  const categoryToUse = await ensureDefaultCategory();
+
+  // 7. Import in batches
+  console.log(`\n🚀 Starting import (${batchSize} per batch)...`);
+  let imported = 0;
+  let failed = 0;
+
+  for (let i = 0; i < sitesToImport.length; i += batchSize) {
+    const batch = sitesToImport.slice(i, i + batchSize);
+    const batchNumber = Math.floor(i / batchSize) + 1;
+
+    try {
+      const inserted = await insertBatch(batch, categoryToUse.id);
+
+      if (inserted === 0) {
+        console.log(
+          `   ⏭️  Skipped batch ${batchNumber} (all ${batch.length} sites already exist)`,
+        );
+        continue;
+      }
+
+      imported += inserted;
+      const skipped = batch.length - inserted;
+      console.log(
+        `   ✓ Imported batch ${batchNumber} (${inserted} new, ${skipped} duplicates, total: ${imported}/${sitesToImport.length})`,
+      );
+    } catch (error) {
+      console.error(`   ✗ Failed batch ${batchNumber}:`, error);
+      failed += batch.length;
+    }
+  }
+
+  console.log(`\n✅ Import complete! ${imported} sites imported, ${failed} failed.`);
+
+  return {
+    success: true,
+    imported,
+    failed,
+    liveCount,
+    pendingCount,
+  };
+}
+
+// Shared with import-scored-sites.ts
+export async function ensureDefaultCategory() {
   const defaultCategory = await db.query.categories.findFirst({
     where: eq(categories.slug, "guest-posts"),
   });
 
   if (!defaultCategory) {
     console.warn('\n⚠️  Default category "guest-posts" not found. Creating it...');
-    const [newCategory] = await db
+    await db
       .insert(categories)
       .values({
         name: "Guest Posts",
@@ -103,158 +148,137 @@ export async function importSites(options: ImportOptions) {
   if (!categoryToUse) {
     throw new Error("Failed to create or find default category");
   }
+  return categoryToUse;
+}
 
-  // 7. Import in batches
-  console.log(`\n🚀 Starting import (${batchSize} per batch)...`);
-  let imported = 0;
-  let failed = 0;
-
-  for (let i = 0; i < sitesToImport.length; i += batchSize) {
-    const batch = sitesToImport.slice(i, i + batchSize);
-
-    const productData = batch.map(({ site, quality, status }) => {
-      const priceRange = formatPriceRange(site.data);
-
-      return {
-        userId: null as any, // System-created, will need a system user
-        name: cleanDomainName(site.domain),
-        slug: slugify(site.domain, { lower: true, strict: true }),
-        url: `https://${site.domain}`,
-        tagline: generateTagline(site),
-        description: generateDescription(site),
-        logoUrl: `https://www.google.com/s2/favicons?domain=${site.domain}&sz=128`,
-
-        // Guest post fields
-        niche: inferNiche(site.domain, site.data.description),
-        da: parseInt(site.data.mozDA || "0"),
-        dr: parseInt(site.data.ahrefsDR || "0"),
-        traffic: null, // Will be enriched later
-        linkType: site.data.linkAttributionType?.toLowerCase().includes("dofollow")
-          ? "dofollow"
-          : "nofollow",
-        priceRange,
-        turnaroundTime: site.data.tat || null,
-        contactEmail: null,
-        spamScore: parseInt(site.data.spamScore?.replace("%", "") || "0"),
-        googleNews: site.data.googleNews?.toLowerCase() === "yes",
-        maxLinks: parseInt(site.data.maxLinks || "1"),
-        requiredContentSize: parseInt(site.data.requiredContentSize || "0"),
-        sampleUrls: site.data.sampleUrls || [],
-
-        // Additional scraper fields
-        ahrefsOrganicTraffic: parseNumber(site.data.ahrefsOrganicTraffic),
-        referralDomains: parseNumber(site.data.referralDomains),
-        semrushAS: parseInt(site.data.semrushAS || "0") || null,
-        semrushTotalTraffic: parseNumber(site.data.semrushTotalTraffic),
-        similarwebTrafficScraper: parseNumber(site.data.similarwebTraffic),
-        language: site.data.language || null,
-        completionRate: site.data.completionRate || null,
-        avgLifetimeOfLinks: site.data.avgLifetimeOfLinks || null,
-        approvedDate: site.data.approvedDate || null,
-        contentPlacementPrice: site.data.contentPlacementPrice
-          ? String(parseFloat(site.data.contentPlacementPrice))
-          : null,
-        writingPlacementPrice: site.data.writingPlacementPrice
-          ? String(parseFloat(site.data.writingPlacementPrice))
-          : null,
-        specialTopicPrice: site.data.specialTopicPrice
-          ? String(parseFloat(site.data.specialTopicPrice))
-          : null,
-
-        // Status
-        status,
-        isFeatured: false,
-        isVerified: false,
-
-        // Enrichment
-        enrichmentStatus: "pending" as const,
-        enrichedAt: null,
-        monthlyVisits: null,
-        globalRank: null,
-        countryRank: null,
-        bounceRate: null,
-        pagesPerVisit: null,
-        avgVisitDuration: null,
-        trafficSources: null,
-        similarwebData: null,
-
-        // Metadata
-        appImages: [],
-        linkRel: null,
-        submittedAt: new Date(),
-        lastRenewedAt: null,
-        createdAt: new Date(),
-        updatedAt: new Date(),
-      };
-    });
-
-    try {
-      // Need to get a system user first
-      const systemUser = await db.query.user.findFirst({
-        where: eq(user.email, "system@dobacklinks.com"),
-      });
+/**
+ * Insert the batch's new products (existing slugs are left alone) and link them to the category.
+ * Returns the number inserted.
+ */
+export async function insertBatch(
+  batch: { site: ScrapedSite; status: "live" | "pending_review" }[],
+  categoryId: string,
+): Promise<number> {
+  const productData = batch.map(({ site, status }) => toProductData(site, status));
+
+  // Need to get a system user first
+  const systemUser = await db.query.user.findFirst({
+    where: eq(user.email, "system@dobacklinks.com"),
+  });
 
-      if (!systemUser) {
-        throw new Error("System user not found. Please create system@dobacklinks.com user first.");
-      }
+  if (!systemUser) {
+    throw new Error("System user not found. Please create system@dobacklinks.com user first.");
+  }
 
-      // Check for existing products in this batch
-      const slugsInBatch = batch.map(({ site }) =>
-        slugify(site.domain, { lower: true, strict: true }),
-      );
+  // Check for existing products in this batch
+  const slugsInBatch = productData.map((p) => p.slug);
 
-      const existingProducts = await db.query.products.findMany({
-        where: (products, { inArray }) => inArray(products.slug, slugsInBatch),
-        columns: { slug: true },
-      });
+  const existingProducts = await db.query.products.findMany({
+    where: (products, { inArray }) => inArray(products.slug, slugsInBatch),
+    columns: { slug: true },
+  });
 
-      const existingSlugs = new Set(existingProducts.map((p) => p.slug));
+  const existingSlugs = new Set(existingProducts.map((p) => p.slug));
 
-      // Filter out existing products
-      const newProductData = productData.filter((p) => !existingSlugs.has(p.slug));
+  // Filter out existing products
+  const newProductData = productData.filter((p) => !existingSlugs.has(p.slug));
 
-      if (newProductData.length === 0) {
-        console.log(
-          `   ⏭️  Skipped batch ${Math.floor(i / batchSize) + 1} (all ${batch.length} sites already exist)`,
-        );
-        continue;
-      }
+  if (newProductData.length === 0) {
+    return 0;
+  }
 
-      // Set userId for all products
-      const productsWithUserId = newProductData.map((p) => ({
-        ...p,
-        userId: systemUser.id,
-      }));
+  // Set userId for all products
+  const productsWithUserId = newProductData.map((p) => ({
+    ...p,
+    userId: systemUser.id,
+  }));
 
-      // Insert products
-      const insertedProducts = await db.insert(products).values(productsWithUserId).returning();
+  // Insert products
+  const insertedProducts = await db.insert(products).values(productsWithUserId).returning();
 
-      // Link to default category
-      const categoryLinks = insertedProducts.map((p) => ({
-        productId: p.id,
-        categoryId: categoryToUse.id,
-      }));
-      await db.insert(productCategories).values(categoryLinks);
+  // Link to default category
+  const categoryLinks = insertedProducts.map((p) => ({
+    productId: p.id,
+    categoryId,
+  }));
+  await db.insert(productCategories).values(categoryLinks);
 
-      imported += insertedProducts.length;
-      const skipped = batch.length - insertedProducts.length;
-      console.log(
-        `   ✓ Imported batch ${Math.floor(i / batchSize) + 1} (${insertedProducts.length} new, ${skipped} duplicates, total: ${imported}/${sitesToImport.length})`,
-      );
-    } catch (error) {
-      console.error(`   ✗ Failed batch ${Math.floor(i / batchSize) + 1}:`, error);
-      failed += batch.length;
-    }
-  }
+  return insertedProducts.length;
+}
 
-  console.log(`\n✅ Import complete! ${imported} sites imported, ${failed} failed.`);
+function toProductData(site: ScrapedSite, status: "live" | "pending_review") {
+  const priceRange = formatPriceRange(site.data);
 
   return {
-    success: true,
-    imported,
-    failed,
-    liveCount,
-    pendingCount,
+    userId: null as any, // System-created, will need a system user
+    name: cleanDomainName(site.domain),
+    slug: slugify(site.domain, { lower: true, strict: true }),
+    url: `https://${site.domain}`,
+    tagline: generateTagline(site),
+    description: generateDescription(site),
+    logoUrl: `https://www.google.com/s2/favicons?domain=${site.domain}&sz=128`,
+
+    // Guest post fields
+    niche: inferNiche(site.domain, site.data.description),
+    da: parseInt(site.data.mozDA || "0"),
+    dr: parseInt(site.data.ahrefsDR || "0"),
+    traffic: null, // Will be enriched later
+    linkType: site.data.linkAttributionType?.toLowerCase().includes("dofollow")
+      ? "dofollow"
+      : "nofollow",
+    priceRange,
+    turnaroundTime: site.data.tat || null,
+    contactEmail: null,
+    spamScore: parseInt(site.data.spamScore?.replace("%", "") || "0"),
+    googleNews: site.data.googleNews?.toLowerCase() === "yes",
+    maxLinks: parseInt(site.data.maxLinks || "1"),
+    requiredContentSize: parseInt(site.data.requiredContentSize || "0"),
+    sampleUrls: site.data.sampleUrls || [],
+
+    // Additional scraper fields
+    ahrefsOrganicTraffic: parseNumber(site.data.ahrefsOrganicTraffic),
+    referralDomains: parseNumber(site.data.referralDomains),
+    semrushAS: parseInt(site.data.semrushAS || "0") || null,
+    semrushTotalTraffic: parseNumber(site.data.semrushTotalTraffic),
+    similarwebTrafficScraper: parseNumber(site.data.similarwebTraffic),
+    language: site.data.language || null,
+    completionRate: site.data.completionRate || null,
+    avgLifetimeOfLinks: site.data.avgLifetimeOfLinks || null,
+    approvedDate: site.data.approvedDate || null,
+    contentPlacementPrice: site.data.contentPlacementPrice
+      ? String(parseFloat(site.data.contentPlacementPrice))
+      : null,
+    writingPlacementPrice: site.data.writingPlacementPrice
+      ? String(parseFloat(site.data.writingPlacementPrice))
+      : null,
+    specialTopicPrice: site.data.specialTopicPrice
+      ? String(parseFloat(site.data.specialTopicPrice))
+      : null,
+
+    // Status
+    status,
+    isFeatured: false,
+    isVerified: false,
+
+    // Enrichment
+    enrichmentStatus: "pending" as const,
+    enrichedAt: null,
+    monthlyVisits: null,
+    globalRank: null,
+    countryRank: null,
+    bounceRate: null,
+    pagesPerVisit: null,
+    avgVisitDuration: null,
+    trafficSources: null,
+    similarwebData: null,
+
+    // Metadata
+    appImages: [],
+    linkRel: null,
+    submittedAt: new Date(),
+    lastRenewedAt: null,
+    createdAt: new Date(),
+    updatedAt: new Date(),
   };
 }
 
@@ -50,3 +50,24 @@ export interface ScoredSite {
   status: "live" | "pending_review";
   rank: number;
 }
+
+// One record of a batch file from scripts/preprocess-sites.py (scored, ranked and given a status)
+export interface PreScoredSite {
+  site: ScrapedSite;
+  quality: Omit<QualityScore, "reasons">;
+  status: "live" | "pending_review";
+  rank: number;
+}
+
+export interface ScoredBatchManifest {
+  generatedAt: string;
+  source: string;
+  loaded: number;
+  sites: number;
+  live: number;
+  pending: number;
+  averageScore: number;
+  liveThreshold: number;
+  topLiveCount: number;
+  batches: { file: string; sites: number; firstRank: number; maxScore: number; minScore: number }[];
+}
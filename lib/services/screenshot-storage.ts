@@ -7,7 +7,7 @@
 
 import sharp from "sharp";
 import { env } from "@/lib/env";
-import { serverUploadFile } from "@/lib/cloudflare/r2";
+import { IMMUTABLE_CACHE_CONTROL, serverUploadFile } from "@/lib/cloudflare/r2";
 
 // ============================================================================
 // Types
@@ -69,6 +69,7 @@ export class ScreenshotStorage {
         const uploadResult = await serverUploadFile({
           data: thumbnail,
           contentType: this.format === "webp" ? "image/webp" : `image/${this.format}`,
+          cacheControl: IMMUTABLE_CACHE_CONTROL,
           path: r2Path,
           key: thumbFileName,
         });
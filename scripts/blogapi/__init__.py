@@ -0,0 +1,3 @@
+"""
+Client tools for the HMAC-authenticated /api/blog endpoint.
+"""
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Make `blogapi` and `r2sync` importable the same way the scripts do (scripts/ on sys.path)
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
@@ -0,0 +1,92 @@
+import json
+
+import pytest
+
+from blogapi.hmac_auth import generate_hmac_signature, signed_headers, verify_hmac_signature
+from blogapi.loadgen import EXPIRED, FUTURE, INVALID_SIGNATURE, OK, Histogram, make_body, run_load
+from blogapi.standin import BlogStandin, BlogStandinThread, parse_int
+
+SECRET = "test-secret"
+NOW_MS = 1_700_000_000_000
+
+
+def sign(timestamp, body="{}"):
+    return generate_hmac_signature("POST", "/api/blog", timestamp, body, SECRET)
+
+
+def test_verify_matches_hmac_auth_ts():
+    assert verify_hmac_signature(sign(NOW_MS), "POST", "/api/blog", NOW_MS, "{}", SECRET, now_ms=NOW_MS) == (True, None)
+    # Within the window on both sides
+    assert verify_hmac_signature(sign(NOW_MS - 300_000), "POST", "/api/blog", NOW_MS - 300_000, "{}", SECRET,
+                                 now_ms=NOW_MS)[0]
+    assert verify_hmac_signature(sign(NOW_MS + 60_000), "POST", "/api/blog", NOW_MS + 60_000, "{}", SECRET,
+                                 now_ms=NOW_MS)[0]
+
+    old = NOW_MS - 301_000
+    assert verify_hmac_signature(sign(old), "POST", "/api/blog", old, "{}", SECRET, now_ms=NOW_MS) == (
+        False, "Request expired. Age: 301s, Max: 300s")
+    ahead = NOW_MS + 61_000
+    assert verify_hmac_signature(sign(ahead), "POST", "/api/blog", ahead, "{}", SECRET, now_ms=NOW_MS) == (
+        False, "Request timestamp is too far in the future")
+    assert verify_hmac_signature(sign(NOW_MS), "POST", "/api/blog", NOW_MS, '{"x":1}', SECRET, now_ms=NOW_MS) == (
+        False, "Invalid signature")
+    # crypto.timingSafeEqual throws on buffers of different length
+    with pytest.raises(ValueError):
+        verify_hmac_signature("abc", "POST", "/api/blog", NOW_MS, "{}", SECRET, now_ms=NOW_MS)
+
+
+def test_standin_responses_mirror_route():
+    standin = BlogStandin(SECRET)
+    body = make_body(0, 512, "t")
+
+    def post(headers, payload=body):
+        status, data = standin.handle("POST", "/api/blog", {k.lower(): v for k, v in headers.items()}, payload)
+        return status, data.get("code")
+
+    good = signed_headers("POST", "/api/blog", body, SECRET)
+    assert post(good) == (201, None)
+    assert post(signed_headers("POST", "/api/blog", body, SECRET)) == (409, "VALIDATION_DUPLICATE")
+    assert post({"X-Timestamp": good["X-Timestamp"]}) == (401, "HMAC_REQUIRED")
+    assert post({"Authorization": "Bearer x", "X-Timestamp": good["X-Timestamp"]}) == (401, "HMAC_REQUIRED")
+    assert post({"Authorization": good["Authorization"], "X-Timestamp": "abc"}) == (401, "TIMESTAMP_REQUIRED")
+    assert post({**good, "Authorization": "HMAC short"}) == (500, "INTERNAL_ERROR")
+    assert post(signed_headers("POST", "/api/blog", body, "wrong")) == (401, "HMAC_INVALID")
+    assert post(signed_headers("POST", "/api/blog", "{", SECRET), "{") == (400, "JSON_PARSE_FAILED")
+    invalid = json.dumps({"title": "x", "slug": "y"})
+    assert post(signed_headers("POST", "/api/blog", invalid, SECRET), invalid) == (400, "VALIDATION_FAILED")
+    assert parse_int("1700000000000abc") == 1700000000000 and parse_int("") is None
+
+
+def test_make_body_sizes():
+    for size in (600, 2048, 65536):
+        body = make_body(7, size, "run")
+        assert len(body) == size
+        assert json.loads(body)["slug"] == "load-run-7"
+
+
+def test_histogram_buckets():
+    histogram = Histogram()
+    for ms in (0.5, 1, 3, 40, 20000):
+        histogram.observe(ms / 1000)
+    data = histogram.to_dict()
+    assert data["count"] == 5
+    assert data["buckets"]["1"] == 2 and data["buckets"]["5"] == 1 and data["buckets"]["50"] == 1
+    assert data["buckets"]["+Inf"] == 1
+    assert data["p50_ms"] == pytest.approx(3)
+
+
+@pytest.mark.parametrize("offset,expected", [(0, OK), (-301, EXPIRED), (61, FUTURE)])
+def test_load_run_against_standin(offset, expected):
+    with BlogStandinThread(secret=SECRET) as standin:
+        result = run_load(standin.url, SECRET, count=30, rate=500, payload_sizes=[1024, 8192],
+                          max_in_flight=8, timestamp_offset=offset)
+    assert result.classes == {expected: 30}
+    assert result.latency.to_dict()["count"] == 30
+    assert result.to_dict()["expired_rejections"] == (30 if expected == EXPIRED else 0)
+    assert standin.connections <= 8
+
+
+def test_load_run_wrong_secret():
+    with BlogStandinThread(secret=SECRET) as standin:
+        result = run_load(standin.url, "other", count=5, rate=0)
+    assert result.classes == {INVALID_SIGNATURE: 5}
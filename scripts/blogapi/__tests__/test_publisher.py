@@ -0,0 +1,168 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from blogapi import publisher
+from blogapi.hmac_auth import generate_hmac_signature
+from blogapi.posts import load_post, load_posts, parse_front_matter
+from blogapi.publisher import CREATED, EXISTS, FAILED, INVALID, RateLimiter, publish_posts
+
+SECRET = "test-secret"
+TAG_ID = "0b4c3f0e-1d2a-4c5b-9e8f-7a6b5c4d3e2f"
+
+
+@pytest.fixture(autouse=True)
+def short_backoff(monkeypatch):
+    monkeypatch.setattr(publisher, "backoff_delay", lambda attempt: 0.01)
+
+
+@pytest.fixture
+def blog_api():
+    """Minimal /api/blog that checks signatures like lib/security/hmac-auth.ts"""
+    state = {"slugs": set(), "ages": [], "connections": set(), "fail_once": {"flaky-post"},
+             "lost_reply": {"lost-reply"}}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            state["connections"].add(self.client_address)
+            body = self.rfile.read(int(self.headers["Content-Length"])).decode()
+            timestamp = int(self.headers["X-Timestamp"])
+            expected = hmac.new(SECRET.encode(), f"POST|{self.path}|{timestamp}|{body}".encode(),
+                                hashlib.sha256).hexdigest()
+            age = time.time() * 1000 - timestamp
+            state["ages"].append(age)
+            slug = json.loads(body)["slug"]
+            if not hmac.compare_digest(self.headers["Authorization"], f"HMAC {expected}") or age > 300_000:
+                self.reply(401, {"success": False, "error": "Authentication failed", "code": "HMAC_INVALID"})
+            elif slug in state["fail_once"]:
+                state["fail_once"].discard(slug)
+                self.reply(503, {"success": False, "error": "Service unavailable"})
+            elif slug in state["lost_reply"]:
+                # Stored, but the reply is lost on the way back (a proxy timing out)
+                state["lost_reply"].discard(slug)
+                state["slugs"].add(slug)
+                self.reply(504, {"success": False, "error": "Gateway timeout"})
+            elif slug in state["slugs"]:
+                self.reply(409, {"success": False, "error": f"Slug '{slug}' already exists", "code": "CONFLICT"})
+            else:
+                state["slugs"].add(slug)
+                self.reply(201, {"success": True, "data": {"postId": f"id-{slug}", "slug": slug}})
+
+        def reply(self, status, data):
+            payload = json.dumps(data).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    state["url"] = f"http://127.0.0.1:{server.server_port}"
+    yield state
+    server.shutdown()
+    server.server_close()
+
+
+def write_posts(root, count):
+    root.mkdir()
+    for i in range(count):
+        (root / f"{i:02d}.md").write_text(f"---\ntitle: Post number {i}\nslug: post-{i}\n---\n\n# Post {i}\n\nBody {i}\n")
+    return root
+
+
+def test_front_matter_matches_blogs_format():
+    meta, body = parse_front_matter(
+        "---\ntitle: demo\nslug: /demo\ntags: nextjs,i18n\nisPinned: false\n"
+        "# status: draft/archived/published\nlist:\n  - a\n  - \"b\"\n---\n\n## Intro\n")
+    assert meta == {"title": "demo", "slug": "/demo", "tags": "nextjs,i18n", "isPinned": False, "list": ["a", "b"]}
+    assert body == "## Intro\n"
+
+
+def test_payload_falls_back_like_the_ts_publisher(tmp_path):
+    path = tmp_path / "guide.md"
+    path.write_text(f"---\ntags: [{TAG_ID}, seo]\n---\n# The DR70 Guide!\n\nFirst paragraph.\n")
+
+    post = load_post(path)
+
+    assert post.valid
+    assert post.payload["title"] == "The DR70 Guide!"
+    assert post.payload["slug"] == "the-dr70-guide"
+    assert post.payload["description"] == "First paragraph."
+    assert post.payload["status"] == "published"
+    assert post.payload["tags"] == [{"id": TAG_ID, "name": ""}]
+    assert "seo" in post.warnings[0]
+
+
+def test_rate_limiter_spaces_calls():
+    async def run():
+        limiter = RateLimiter(50)
+        start = time.monotonic()
+        await asyncio.gather(*(limiter.acquire() for _ in range(11)))
+        return time.monotonic() - start
+
+    # 11 calls at 50/s: the last starts 10 intervals after the first
+    assert asyncio.run(run()) >= 0.19
+
+
+def test_bulk_publish_signs_at_send_time(blog_api, tmp_path):
+    root = write_posts(tmp_path / "posts", 12)
+    (root / "bad.md").write_text("---\ntitle: x\n---\n")
+    (root / "flaky.md").write_text("---\ntitle: Flaky post\nslug: flaky-post\n---\nbody\n")
+    (root / "lost.md").write_text("---\ntitle: Lost reply\nslug: lost-reply\n---\nbody\n")
+    blog_api["slugs"].add("post-3")
+
+    start = time.monotonic()
+    results = publish_posts(load_posts(root), blog_api["url"], SECRET, concurrency=4, rate=20)
+    elapsed = time.monotonic() - start
+
+    by_file = {result.file.rsplit("/", 1)[-1]: result for result in results}
+    assert len(results) == 15
+    assert by_file["bad.md"].status == INVALID
+    assert by_file["03.md"].status == EXISTS
+    assert by_file["flaky.md"].status == CREATED and by_file["flaky.md"].attempts == 2
+    # Created by the attempt whose reply was lost; the retry's 409 is not "already existed"
+    assert by_file["lost.md"].status == CREATED and by_file["lost.md"].http_status == 409
+    assert sum(result.status == CREATED for result in results) == 13
+    assert by_file["00.md"].post_id == "id-post-0"
+    # 16 sends paced at 20/s take ~0.75s, yet every signature was minted just before its send
+    assert elapsed >= 0.6
+    assert max(blog_api["ages"]) < 100
+    assert len(blog_api["connections"]) <= 4
+
+
+def test_wrong_secret_is_reported_not_retried(blog_api, tmp_path):
+    root = write_posts(tmp_path / "posts", 3)
+
+    results = publish_posts(load_posts(root), blog_api["url"], "wrong", concurrency=2, rate=0)
+
+    assert {result.status for result in results} == {"unauthorized"}
+    assert all(result.attempts == 1 for result in results)
+    assert "HMAC_INVALID" in results[0].error
+
+
+def test_unreachable_api_fails_after_retries(tmp_path):
+    root = write_posts(tmp_path / "posts", 1)
+
+    results = publish_posts(load_posts(root), "http://127.0.0.1:9", SECRET, rate=0, retries=2)
+
+    assert results[0].status == FAILED
+    assert results[0].attempts == 3
+
+
+def test_signature_matches_hmac_auth_ts():
+    # node -e 'crypto.createHmac("sha256", "secret").update("POST|/api/blog|1700000000000|{}").digest("hex")'
+    expected = "8e6f2ea551fdd25b10a8a4e1b5f4ee71848ad832a22f351782e28aba0bc73457"
+    assert generate_hmac_signature("post", "/api/blog", 1700000000000, "{}", "secret") == expected
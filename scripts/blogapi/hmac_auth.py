@@ -0,0 +1,65 @@
+"""
+HMAC request signing for /api/blog, matching lib/security/hmac-auth.ts.
+
+Canonical string: METHOD|PATH|TIMESTAMP|BODY, signed with HMAC-SHA256 using
+CRON_SECRET, sent as `Authorization: HMAC <hex>` plus `X-Timestamp` (ms).
+"""
+import hashlib
+import hmac
+import time
+from typing import Optional, Tuple
+
+# /api/blog rejects requests older than this (verifyHMACSignature maxAgeSeconds)
+MAX_AGE_SECONDS = 300
+# ...and timestamps further than this in the future (clock skew allowance)
+MAX_SKEW_SECONDS = 60
+
+
+def generate_hmac_signature(method: str, path: str, timestamp: int, body: str, secret: str) -> str:
+    """
+    Generate HMAC signature for API request
+    """
+    canonical_string = f"{method.upper()}|{path}|{timestamp}|{body}"
+    return hmac.new(secret.encode("utf-8"), canonical_string.encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+def signed_headers(method: str, path: str, body: str, secret: str, timestamp: int = None) -> dict:
+    """Request headers for one call; the timestamp defaults to now, so sign right before sending"""
+    timestamp = timestamp if timestamp is not None else int(time.time() * 1000)
+    return {
+        "Content-Type": "application/json",
+        "Authorization": f"HMAC {generate_hmac_signature(method, path, timestamp, body, secret)}",
+        "X-Timestamp": str(timestamp),
+    }
+
+
+def verify_hmac_signature(signature: str, method: str, path: str, timestamp: int, body: str, secret: str,
+                          max_age_seconds: int = MAX_AGE_SECONDS,
+                          now_ms: Optional[float] = None) -> Tuple[bool, Optional[str]]:
+    """
+    verifyHMACSignature from hmac-auth.ts: (valid, error message).
+    Raises ValueError where crypto.timingSafeEqual would throw (signatures of different length).
+    """
+    now_ms = time.time() * 1000 if now_ms is None else now_ms
+    request_age = (now_ms - timestamp) / 1000
+    if request_age > max_age_seconds:
+        return False, f"Request expired. Age: {request_age:.0f}s, Max: {max_age_seconds}s"
+    if request_age < -MAX_SKEW_SECONDS:
+        return False, "Request timestamp is too far in the future"
+
+    expected = generate_hmac_signature(method, path, timestamp, body, secret)
+    if len(signature.encode("utf-8")) != len(expected):
+        raise ValueError("Input buffers must have the same byte length")
+    if not hmac.compare_digest(signature.encode("utf-8"), expected.encode("utf-8")):
+        return False, "Invalid signature"
+    return True, None
+
+
+def extract_hmac_signature(auth_header: Optional[str]) -> Optional[str]:
+    """extractHMACSignature: the signature from `HMAC <signature>`, else None"""
+    if not auth_header:
+        return None
+    parts = auth_header.split(" ")
+    if len(parts) != 2 or parts[0] != "HMAC":
+        return None
+    return parts[1]
@@ -0,0 +1,237 @@
+"""
+Load generation against /api/blog.
+
+Requests are started on an open-loop schedule, one every 1/rate seconds,
+whether or not earlier ones have answered, so a slow server shows up as
+latency instead of as a silently lower request rate. Each request is
+signed with generate_hmac_signature() just before it is sent. Bodies are
+valid posts with unique slugs, padded to the configured payload sizes.
+
+Per run it records:
+  - a latency histogram (log buckets) with p50/p95/p99
+  - how far sends fell behind the schedule (client or pool saturation)
+  - responses by error class, with expired/future timestamp rejections
+    counted apart from bad signatures
+  - time spent signing on the client
+
+--timestamp-offset signs with a shifted clock. -301 makes every request
+expire; +61 makes every request too far in the future.
+"""
+import asyncio
+import bisect
+import json
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import List, Optional, Sequence
+from urllib.parse import urlsplit
+
+from toolkit.httpclient import ConnectionPool, HTTPError
+from toolkit.stats import percentile
+
+from .hmac_auth import generate_hmac_signature
+from .publisher import API_PATH
+
+# Histogram bucket upper bounds, milliseconds
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, float("inf"))
+
+# Error classes
+OK = "ok"
+EXPIRED = "expired"  # 401: timestamp older than maxAgeSeconds
+FUTURE = "future"  # 401: timestamp more than 60s ahead
+INVALID_SIGNATURE = "invalid_signature"  # 401 HMAC_INVALID, or 500 from a wrong-length signature
+UNAUTHORIZED = "unauthorized"  # 401: header missing or malformed
+CONFLICT = "conflict"  # 409: slug exists
+VALIDATION = "validation"  # 400
+RATE_LIMITED = "rate_limited"  # 429
+SERVER = "server"  # other 5xx
+NETWORK = "network"
+TIMEOUT = "timeout"
+OTHER = "other"
+
+
+class Histogram:
+    """Latency histogram over BUCKETS_MS, keeping samples for exact percentiles"""
+
+    def __init__(self, bounds: Sequence[float] = BUCKETS_MS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * len(self.bounds)
+        self.samples: List[float] = []
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(self.bounds, seconds * 1000)] += 1
+        self.samples.append(seconds)
+
+    def percentile(self, q: float) -> float:
+        return percentile(self.samples, q)
+
+    def to_dict(self) -> dict:
+        return {
+            "count": len(self.samples),
+            "p50_ms": round(self.percentile(50) * 1000, 3),
+            "p95_ms": round(self.percentile(95) * 1000, 3),
+            "p99_ms": round(self.percentile(99) * 1000, 3),
+            "max_ms": round(max(self.samples, default=0.0) * 1000, 3),
+            "buckets": {("+Inf" if bound == float("inf") else f"{bound:g}"): count
+                        for bound, count in zip(self.bounds, self.counts)},
+        }
+
+
+def classify(status: int, body: bytes) -> str:
+    if 200 <= status < 300:
+        return OK
+    try:
+        data = json.loads(body)
+        code, error = data.get("code", ""), data.get("error", "")
+    except (ValueError, AttributeError):
+        code, error = "", ""
+    if status == 401:
+        if "expired" in error:
+            return EXPIRED
+        if "future" in error:
+            return FUTURE
+        return INVALID_SIGNATURE if code == "HMAC_INVALID" else UNAUTHORIZED
+    if status == 409:
+        return CONFLICT
+    if status == 400:
+        return VALIDATION
+    if status == 429:
+        return RATE_LIMITED
+    if status >= 500:
+        # timingSafeEqual throws on a signature of the wrong length
+        return INVALID_SIGNATURE if code == "INTERNAL_ERROR" else SERVER
+    return OTHER
+
+
+def make_body(index: int, size: int, run_id: str) -> str:
+    """A valid post whose JSON body is about `size` bytes"""
+    payload = {
+        "title": f"Load test post {index}",
+        "slug": f"load-{run_id}-{index}",
+        "description": "Generated by the /api/blog load generator.",
+        "status": "draft",
+        "visibility": "public",
+        "isPinned": False,
+        "featuredImageUrl": "",
+        "tags": [],
+        "content": "",
+    }
+    padding = max(0, size - len(json.dumps(payload)))
+    payload["content"] = ("Lorem ipsum dolor sit amet. " * (padding // 28 + 1))[:padding]
+    return json.dumps(payload)
+
+
+@dataclass
+class LoadResult:
+    requests: int = 0
+    elapsed: float = 0.0
+    classes: Counter = field(default_factory=Counter)
+    statuses: Counter = field(default_factory=Counter)
+    latency: Histogram = field(default_factory=Histogram)
+    lag: Histogram = field(default_factory=Histogram)
+    signing_seconds: float = 0.0
+    bytes_sent: int = 0
+
+    @property
+    def achieved_rate(self) -> float:
+        return self.requests / self.elapsed if self.elapsed else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "requests": self.requests,
+            "elapsed_s": round(self.elapsed, 3),
+            "achieved_rps": round(self.achieved_rate, 2),
+            "mb_sent": round(self.bytes_sent / 1024 / 1024, 3),
+            "classes": dict(self.classes),
+            "expired_rejections": self.classes.get(EXPIRED, 0),
+            "statuses": {str(status): count for status, count in sorted(self.statuses.items())},
+            "latency": self.latency.to_dict(),
+            "schedule_lag": self.lag.to_dict(),
+            "signing_us_mean": round(self.signing_seconds / self.requests * 1e6, 2) if self.requests else 0.0,
+        }
+
+
+class LoadGenerator:
+    def __init__(self, api_url: str, secret: str, rate: float = 50.0, payload_sizes: Sequence[int] = (2048,),
+                 max_in_flight: int = 64, timestamp_offset: float = 0.0, path: str = API_PATH,
+                 timeout: float = 30.0):
+        self.api_url = api_url.rstrip("/")
+        self.path = (urlsplit(self.api_url).path.rstrip("/") + path) or path
+        self.secret = secret
+        self.rate = rate
+        self.payload_sizes = list(payload_sizes) or [2048]
+        self.max_in_flight = max_in_flight
+        self.timestamp_offset = timestamp_offset
+        self.timeout = timeout
+        self.run_id = uuid.uuid4().hex[:8]
+
+    async def _send(self, pool: ConnectionPool, index: int, scheduled: float, result: LoadResult):
+        body = make_body(index, self.payload_sizes[index % len(self.payload_sizes)], self.run_id)
+        result.lag.observe(max(0.0, time.monotonic() - scheduled))
+        sign_start = time.perf_counter()
+        timestamp = int((time.time() + self.timestamp_offset) * 1000)
+        signature = generate_hmac_signature("POST", self.path, timestamp, body, self.secret)
+        result.signing_seconds += time.perf_counter() - sign_start
+
+        data = body.encode("utf-8")
+        headers = {"Content-Type": "application/json", "Authorization": f"HMAC {signature}",
+                   "X-Timestamp": str(timestamp)}
+        start = time.monotonic()
+        try:
+            response = await asyncio.wait_for(pool.request("POST", self.path, headers, data), self.timeout)
+        except asyncio.TimeoutError:
+            error_class, status = TIMEOUT, 0
+        except (ConnectionError, asyncio.IncompleteReadError, HTTPError, OSError):
+            error_class, status = NETWORK, 0
+        else:
+            error_class, status = classify(response.status, response.body), response.status
+        result.latency.observe(time.monotonic() - start)
+        result.classes[error_class] += 1
+        result.statuses[status] += 1
+        result.bytes_sent += len(data)
+
+    async def run(self, duration: float = 10.0, count: Optional[int] = None) -> LoadResult:
+        """Send for `duration` seconds, or exactly `count` requests when given"""
+        total = count if count is not None else max(1, int(duration * self.rate))
+        result = LoadResult(requests=total)
+        pool = ConnectionPool(self.api_url, max_size=self.max_in_flight, timeout=self.timeout)
+        slots = asyncio.Semaphore(self.max_in_flight)
+        tasks = []
+
+        async def bounded(index: int, scheduled: float):
+            async with slots:
+                await self._send(pool, index, scheduled, result)
+
+        start = time.monotonic()
+        try:
+            for index in range(total):
+                scheduled = start + index / self.rate if self.rate > 0 else time.monotonic()
+                delay = scheduled - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                tasks.append(asyncio.ensure_future(bounded(index, scheduled)))
+            await asyncio.gather(*tasks)
+        finally:
+            result.elapsed = time.monotonic() - start
+            await pool.close()
+        return result
+
+
+def run_load(api_url: str, secret: str, duration: float = 10.0, count: Optional[int] = None,
+             **kwargs) -> LoadResult:
+    """Synchronous entry point for the scripts"""
+    return asyncio.run(LoadGenerator(api_url, secret, **kwargs).run(duration, count))
+
+
+def signing_ceiling(secret: str, payload_size: int = 2048, seconds: float = 1.0) -> float:
+    """Signatures per second one core can produce for bodies of payload_size bytes"""
+    body = make_body(0, payload_size, "ceiling")
+    signed = 0
+    deadline = time.perf_counter() + seconds
+    start = time.perf_counter()
+    while time.perf_counter() < deadline:
+        for _ in range(100):
+            generate_hmac_signature("POST", API_PATH, 1700000000000, body, secret)
+        signed += 100
+    return signed / (time.perf_counter() - start)
@@ -0,0 +1,193 @@
+"""
+Markdown posts with front matter, as payloads for /api/blog.
+
+    ---
+    title: demo
+    description: it is a description
+    slug: /demo
+    tags: nextjs,i18n,mdx
+    status: draft
+    isPinned: false
+    ---
+    ## Markdown body...
+
+Front matter is the format of blogs/*.mdx. Only the flat subset of YAML that
+posts use is understood: scalars, quoted strings, booleans, and lists
+written inline (`[a, b]`, `a,b`) or as `- item` lines. Missing fields fall
+back the way publish-blog-posts.ts derives them: the title from the first
+heading, the description from the first paragraph, and the slug from the
+title. Payloads are checked against postActionSchema's rules
+(app/(protected)/dashboard/(admin)/blog/schema.ts) before anything is sent.
+"""
+import json
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Tuple
+
+STATUSES = ("draft", "published", "archived")
+VISIBILITIES = ("public", "logged_in")
+SUFFIXES = (".md", ".mdx", ".markdown")
+DEFAULT_DESCRIPTION = "High-quality guest posting insights and strategies."
+
+# Front matter key -> API field
+FIELDS = {
+    "title": "title",
+    "slug": "slug",
+    "description": "description",
+    "status": "status",
+    "visibility": "visibility",
+    "isPinned": "isPinned",
+    "pinned": "isPinned",
+    "featuredImageUrl": "featuredImageUrl",
+    "image": "featuredImageUrl",
+    "tags": "tags",
+}
+UUID_PATTERN = re.compile(r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$", re.I)
+
+
+def _scalar(value: str):
+    value = value.strip()
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+        return value[1:-1]
+    if value.lower() in ("true", "yes"):
+        return True
+    if value.lower() in ("false", "no"):
+        return False
+    if value.startswith("[") and value.endswith("]"):
+        inner = value[1:-1].strip()
+        return [_scalar(item) for item in inner.split(",")] if inner else []
+    return value
+
+
+def parse_front_matter(text: str) -> Tuple[dict, str]:
+    """Split `---` front matter from the body; text without front matter is all body"""
+    lines = text.splitlines(keepends=True)
+    if not lines or lines[0].strip() != "---":
+        return {}, text
+    meta = {}
+    current = None
+    for index, line in enumerate(lines[1:], start=1):
+        stripped = line.strip()
+        if stripped == "---":
+            return meta, "".join(lines[index + 1:]).lstrip("\n")
+        if not stripped or stripped.startswith("#"):
+            continue
+        if stripped.startswith("- ") and current is not None:
+            if not isinstance(meta[current], list):
+                meta[current] = []
+            meta[current].append(_scalar(stripped[2:]))
+            continue
+        key, sep, value = line.partition(":")
+        if not sep:
+            raise ValueError(f"line {index + 1}: expected `key: value`")
+        current = key.strip()
+        meta[current] = _scalar(value) if value.strip() else []
+    raise ValueError("front matter is not closed with `---`")
+
+
+def generate_slug(title: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", title.lower()).strip("-")[:100]
+
+
+def extract_title(content: str) -> str:
+    match = re.search(r"^#\s+(.+)$", content, re.M)
+    return match[1].strip() if match else "Untitled Post"
+
+
+def extract_description(content: str) -> str:
+    """First paragraph line after the first heading, up to 160 characters"""
+    found_title = False
+    for line in content.splitlines():
+        if line.startswith("#"):
+            found_title = True
+            continue
+        if found_title and line.strip():
+            return line.strip()[:160]
+    return DEFAULT_DESCRIPTION
+
+
+@dataclass
+class Post:
+    path: Path
+    payload: dict = field(default_factory=dict)
+    errors: List[str] = field(default_factory=list)
+    warnings: List[str] = field(default_factory=list)
+
+    @property
+    def slug(self) -> str:
+        return self.payload.get("slug", "")
+
+    @property
+    def valid(self) -> bool:
+        return not self.errors
+
+    def body(self) -> str:
+        """JSON body exactly as signed and sent"""
+        return json.dumps(self.payload)
+
+
+def validate(payload: dict) -> List[str]:
+    """Client-side copy of postActionSchema's rules"""
+    errors = []
+    if len(payload.get("title", "")) < 3:
+        errors.append("title must be at least 3 characters")
+    if len(payload.get("slug", "")) < 3:
+        errors.append("slug must be at least 3 characters")
+    if payload.get("status") not in STATUSES:
+        errors.append(f"status must be one of {', '.join(STATUSES)}")
+    if payload.get("visibility") not in VISIBILITIES:
+        errors.append(f"visibility must be one of {', '.join(VISIBILITIES)}")
+    image = payload.get("featuredImageUrl", "")
+    if image and not re.match(r"^https?://", image):
+        errors.append("featuredImageUrl must be a valid URL if provided")
+    return errors
+
+
+def load_post(path: Path, status: str = None, visibility: str = "public") -> Post:
+    """Build the API payload for one file; `status` overrides the front matter"""
+    post = Post(Path(path))
+    try:
+        meta, body = parse_front_matter(post.path.read_text(encoding="utf-8"))
+    except (OSError, UnicodeDecodeError, ValueError) as e:
+        post.errors.append(str(e))
+        return post
+
+    payload = {FIELDS[key]: value for key, value in meta.items() if key in FIELDS}
+    for key in ("title", "slug", "description", "featuredImageUrl", "status", "visibility"):
+        if key in payload and not isinstance(payload[key], str):
+            payload[key] = str(payload[key])
+    payload.setdefault("title", extract_title(body))
+    payload["slug"] = payload.get("slug", "").strip("/") or generate_slug(payload["title"])
+    payload.setdefault("description", extract_description(body))
+    # blogs/*.mdx: "published is default"
+    payload["status"] = status or payload.get("status", "published")
+    payload.setdefault("visibility", visibility)
+    payload["isPinned"] = payload.get("isPinned", False) is True
+    payload.setdefault("featuredImageUrl", "")
+    payload["content"] = body
+
+    tags = payload.pop("tags", [])
+    if isinstance(tags, str):
+        tags = tags.split(",")
+    tags = [str(tag).strip() for tag in tags if str(tag).strip()]
+    # The API associates existing tags by id; names cannot be resolved from here
+    payload["tags"] = [{"id": tag, "name": ""} for tag in tags if UUID_PATTERN.match(tag)]
+    names = [tag for tag in tags if not UUID_PATTERN.match(tag)]
+    if names:
+        post.warnings.append(f"tags skipped, the API takes tag ids: {', '.join(names)}")
+
+    post.payload = payload
+    post.errors = validate(payload)
+    return post
+
+
+def load_posts(directory, status: str = None, visibility: str = "public") -> List[Post]:
+    paths = sorted(p for p in Path(directory).rglob("*") if p.suffix in SUFFIXES and p.is_file())
+    posts = [load_post(path, status, visibility) for path in paths]
+    seen = {}
+    for post in posts:
+        if post.slug and post.slug in seen:
+            post.errors.append(f"duplicate slug (also used by {seen[post.slug].name})")
+        seen.setdefault(post.slug, post.path)
+    return posts
@@ -0,0 +1,200 @@
+"""
+Concurrent bulk publishing to /api/blog.
+
+Posts are sent by a fixed set of workers over one keep-alive connection pool
+(toolkit.httpclient), paced by a rate limiter. Each request is signed after
+it has cleared the rate limiter and just before it goes on the wire, so a
+post that waits in the queue never reaches the server with a stale
+timestamp, however long the batch is.
+
+429, 5xx and network errors are retried with backoff and a fresh
+signature. Every post ends in exactly one result, collected into a report.
+
+A timeout, dropped connection or 5xx can come after the server has already
+stored the post, so a 409 on a retry means an earlier attempt created it: it
+is reported as created, not as a slug that already existed.
+"""
+import asyncio
+import json
+import time
+from dataclasses import asdict, dataclass
+from typing import Callable, List, Optional
+from urllib.parse import urlsplit
+
+from toolkit.backoff import backoff_delay
+from toolkit.httpclient import ConnectionPool, HTTPError
+
+from .hmac_auth import signed_headers
+from .posts import Post
+
+API_PATH = "/api/blog"
+
+# Result statuses
+CREATED = "created"
+EXISTS = "exists"  # 409: slug already taken
+REJECTED = "rejected"  # 400: failed server-side validation
+UNAUTHORIZED = "unauthorized"  # 401: bad secret, clock skew or expired timestamp
+INVALID = "invalid"  # failed local validation, never sent
+FAILED = "failed"  # retries exhausted
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+TRANSPORT_ERRORS = (ConnectionError, asyncio.IncompleteReadError, asyncio.TimeoutError, HTTPError, OSError)
+
+
+class RateLimiter:
+    """Spaces calls at least 1/rate seconds apart (rate <= 0 means unlimited)"""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+
+@dataclass
+class PostResult:
+    file: str
+    slug: str
+    status: str
+    http_status: int = 0
+    post_id: str = ""
+    error: str = ""
+    attempts: int = 0
+    latency: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.status == CREATED
+
+
+def _classify(status: int) -> str:
+    if 200 <= status < 300:
+        return CREATED
+    if status == 409:
+        return EXISTS
+    if status == 401:
+        return UNAUTHORIZED
+    if status in RETRYABLE_STATUS:
+        return FAILED
+    return REJECTED
+
+
+def _error_message(body: bytes) -> str:
+    try:
+        data = json.loads(body)
+        return f"{data.get('code', '')}: {data.get('error', '')}".strip(": ")
+    except (ValueError, AttributeError):
+        return body[:200].decode("utf-8", "replace")
+
+
+class Publisher:
+    def __init__(self, api_url: str, secret: str, concurrency: int = 8, rate: float = 5.0,
+                 retries: int = 3, path: str = API_PATH, timeout: float = 60.0,
+                 on_result: Optional[Callable[[PostResult], None]] = None):
+        self.api_url = api_url.rstrip("/")
+        # Signed path must equal the pathname the server sees
+        self.path = (urlsplit(self.api_url).path.rstrip("/") + path) or path
+        self.secret = secret
+        self.concurrency = concurrency
+        self.limiter = RateLimiter(rate)
+        self.retries = retries
+        self.timeout = timeout
+        self.on_result = on_result
+
+    async def publish_one(self, pool: ConnectionPool, post: Post) -> PostResult:
+        result = PostResult(str(post.path), post.slug, FAILED)
+        body = post.body()
+        data = body.encode("utf-8")
+        maybe_created = False  # an earlier attempt may have reached the server
+        while True:
+            result.attempts += 1
+            await self.limiter.acquire()
+            # Signed at send time: the timestamp is never older than this request
+            headers = signed_headers("POST", self.path, body, self.secret)
+            start = time.monotonic()
+            try:
+                response = await pool.request("POST", self.path, headers, data)
+                result.latency = time.monotonic() - start
+            except TRANSPORT_ERRORS as e:
+                result.latency = time.monotonic() - start
+                result.error = f"{type(e).__name__}: {e}"
+                result.http_status = 0
+                status = FAILED
+            else:
+                result.http_status = response.status
+                status = _classify(response.status)
+                if status == EXISTS and maybe_created:
+                    status = CREATED
+                    result.error = ""
+                elif status == CREATED:
+                    try:
+                        result.post_id = json.loads(response.body)["data"]["postId"]
+                    except (ValueError, KeyError, TypeError):
+                        pass
+                    result.error = ""
+                else:
+                    result.error = _error_message(response.body)
+            # A 429 or 503 is refused up front; these can come after the post was stored
+            maybe_created = maybe_created or result.http_status in (0, 500, 502, 504)
+            if status == FAILED and result.attempts <= self.retries:
+                await asyncio.sleep(backoff_delay(result.attempts))
+                continue
+            result.status = status
+            return result
+
+    async def run(self, posts: List[Post]) -> List[PostResult]:
+        results = []
+        queue = asyncio.Queue()
+        for post in posts:
+            if post.valid:
+                queue.put_nowait(post)
+            else:
+                results.append(PostResult(str(post.path), post.slug, INVALID, error="; ".join(post.errors)))
+        for result in results:
+            if self.on_result:
+                self.on_result(result)
+
+        pool = ConnectionPool(self.api_url, max_size=self.concurrency, timeout=self.timeout)
+
+        async def worker():
+            while not queue.empty():
+                result = await self.publish_one(pool, queue.get_nowait())
+                results.append(result)
+                if self.on_result:
+                    self.on_result(result)
+
+        try:
+            await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+        finally:
+            await pool.close()
+        return results
+
+
+def publish_posts(posts: List[Post], api_url: str, secret: str, concurrency: int = 8, rate: float = 5.0,
+                  retries: int = 3, path: str = API_PATH, on_result=None) -> List[PostResult]:
+    """Synchronous entry point for the scripts"""
+    publisher = Publisher(api_url, secret, concurrency, rate, retries, path, on_result=on_result)
+    return asyncio.run(publisher.run(posts))
+
+
+def write_report(results: List[PostResult], path: str):
+    counts = {}
+    for result in results:
+        counts[result.status] = counts.get(result.status, 0) + 1
+    document = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "counts": counts,
+        "posts": [asdict(result) for result in sorted(results, key=lambda r: r.file)],
+    }
+    with open(path, "w") as f:
+        json.dump(document, f, indent=2)
+        f.write("\n")
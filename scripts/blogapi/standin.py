@@ -0,0 +1,174 @@
+"""
+Local stand-in for POST /api/blog.
+
+Authenticates exactly like app/api/blog/route.ts with
+lib/security/hmac-auth.ts:
+
+  - `Authorization: HMAC <sig>` is required (401 HMAC_REQUIRED)
+  - X-Timestamp is parsed like parseInt(); missing or 0 is 401 TIMESTAMP_REQUIRED
+  - older than 300s or more than 60s in the future is 401 HMAC_INVALID
+  - signatures are compared in constant time. Like crypto.timingSafeEqual,
+    a signature of the wrong length throws, and the API answers 500
+
+Then it checks the body against postActionSchema's rules and answers 201,
+or 409 for a slug it has already seen. Nothing touches a database, so
+signing cost and client throughput ceilings can be measured offline.
+
+  python3 -m blogapi.standin --port 3100 --secret test-secret
+  API_URL=http://127.0.0.1:3100 CRON_SECRET=test-secret python3 scripts/test-blog-api.py
+"""
+import argparse
+import asyncio
+import json
+import re
+import threading
+import uuid
+from collections import Counter
+from urllib.parse import urlsplit
+
+from .hmac_auth import MAX_AGE_SECONDS, extract_hmac_signature, verify_hmac_signature
+from .posts import validate
+
+API_PATH = "/api/blog"
+SECRET = "standin-secret"
+REASONS = {201: "Created", 400: "Bad Request", 401: "Unauthorized", 404: "Not Found",
+           405: "Method Not Allowed", 409: "Conflict", 500: "Internal Server Error"}
+
+
+def parse_int(value: str):
+    """JavaScript parseInt(value, 10): leading integer, or None for NaN"""
+    match = re.match(r"\s*([+-]?\d+)", value or "")
+    return int(match[1]) if match else None
+
+
+class BlogStandin:
+    def __init__(self, secret: str = SECRET, latency: float = 0.0, path: str = API_PATH):
+        self.secret = secret
+        self.latency = latency
+        self.path = path
+        self.slugs = {}  # slug -> post id
+        self.responses = Counter()  # (status, code) -> count
+        self.connections = 0
+        self._server = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0):
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+        self.host, self.port = self._server.sockets[0].getsockname()[:2]
+        return self
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                method, target, _ = line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                status, data = self.handle(method, urlsplit(target).path, headers, body.decode("utf-8", "replace"))
+                self.responses[(status, data.get("code", ""))] += 1
+                payload = json.dumps(data).encode()
+                writer.write((f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                              f"Content-Type: application/json\r\nContent-Length: {len(payload)}\r\n\r\n")
+                             .encode("latin-1") + payload)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    def handle(self, method: str, path: str, headers: dict, body: str):
+        """(status, JSON response) for one request, as the route would answer it"""
+        if path != self.path:
+            return 404, {"success": False, "error": "Not Found", "code": "NOT_FOUND"}
+        if method != "POST":
+            return 405, {"success": False, "error": "Method Not Allowed", "code": "METHOD_NOT_ALLOWED"}
+
+        signature = extract_hmac_signature(headers.get("authorization"))
+        if not signature:
+            return 401, {"success": False, "code": "HMAC_REQUIRED",
+                         "error": 'Missing or invalid Authorization header. Expected: "HMAC <signature>"'}
+        timestamp = parse_int(headers.get("x-timestamp"))
+        if not timestamp:
+            return 401, {"success": False, "error": "Missing or invalid X-Timestamp header",
+                         "code": "TIMESTAMP_REQUIRED"}
+        try:
+            valid, error = verify_hmac_signature(signature, "POST", path, timestamp, body, self.secret,
+                                                 max_age_seconds=MAX_AGE_SECONDS)
+        except ValueError:
+            return 500, {"success": False, "error": "An unexpected error occurred. Please try again.",
+                         "code": "INTERNAL_ERROR"}
+        if not valid:
+            return 401, {"success": False, "error": f"Authentication failed: {error}", "code": "HMAC_INVALID"}
+
+        try:
+            data = json.loads(body)
+        except ValueError:
+            return 400, {"success": False, "error": "Invalid JSON in request body", "code": "JSON_PARSE_FAILED"}
+        if not isinstance(data, dict) or validate(data):
+            return 400, {"success": False, "error": "Invalid input data", "code": "VALIDATION_FAILED"}
+        if data["slug"] in self.slugs:
+            return 409, {"success": False, "error": f"Slug '{data['slug']}' already exists",
+                         "code": "VALIDATION_DUPLICATE"}
+        post_id = str(uuid.uuid4())
+        self.slugs[data["slug"]] = post_id
+        return 201, {"success": True, "data": {"postId": post_id, "slug": data["slug"]}}
+
+
+class BlogStandinThread:
+    """Run a BlogStandin on a background event loop; usable as a context manager"""
+
+    def __init__(self, **kwargs):
+        self.server = BlogStandin(**kwargs)
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+
+    def __enter__(self) -> BlogStandin:
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self.server.start(), self._loop).result()
+        return self.server
+
+    def __exit__(self, *exc):
+        asyncio.run_coroutine_threadsafe(self.server.stop(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local HMAC-verifying stand-in for /api/blog")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=3100)
+    parser.add_argument("--secret", default=SECRET, help=f"CRON_SECRET to verify with (default: {SECRET})")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds of latency added per request")
+    args = parser.parse_args()
+
+    async def serve():
+        server = await BlogStandin(args.secret, args.latency).start(args.host, args.port)
+        print(f"📝 /api/blog stand-in listening on {server.url}{API_PATH}")
+        print(f"   API_URL={server.url} CRON_SECRET={args.secret}")
+        await asyncio.Event().wait()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,7 @@
 const { execSync } = require("child_process");
 const fs = require("fs");
 const path = require("path");
+const { cacheControlFlag } = require("./r2-cache-control");
 
 const BUCKET = "dobacklinks";
 const PARALLEL = 5; // Upload 5 files at a time
@@ -36,7 +37,7 @@ async function uploadFile(filePath) {
   const key = filePath.replace("public/", "");
   try {
     execSync(
-      `npx wrangler r2 object put ${BUCKET}/${key} --file=${filePath} --content-type=image/webp --remote`,
+      `npx wrangler r2 object put ${BUCKET}/${key} --file=${filePath} --content-type=image/webp${cacheControlFlag(key)} --remote`,
       { stdio: "pipe" },
     );
     return { success: true, key };
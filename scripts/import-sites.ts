@@ -5,6 +5,7 @@ loadEnvConfig(process.cwd());
 // Now dynamically import the rest
 async function main() {
   const { importSites } = await import("../lib/import/import-sites");
+  const { importScoredSites } = await import("../lib/import/import-scored-sites");
 
   const sourcePath =
     process.env.SOURCE_PATH ||
@@ -15,14 +16,19 @@ async function main() {
 
   console.log("🚀 Guest Post Sites Import\n");
 
+  // SCORED_DIR: batches pre-scored by scripts/preprocess-sites.py (for dumps too big to JSON.parse)
+  const scoredDir = process.env.SCORED_DIR;
+
   try {
-    const result = await importSites({
-      sourcePath,
-      batchSize,
-      dryRun,
-      liveThreshold: 70,
-      topLiveCount: 500,
-    });
+    const result = scoredDir
+      ? await importScoredSites({ scoredDir, batchSize, dryRun })
+      : await importSites({
+          sourcePath,
+          batchSize,
+          dryRun,
+          liveThreshold: 70,
+          topLiveCount: 500,
+        });
 
     console.log("\n✅ Import completed successfully!");
     console.log(`   Imported: ${result.imported}`);
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Load test /api/blog at a target request rate (HMAC-signed, open loop)
+Usage: python3 scripts/load-test-blog-api.py [--standin] [--rate 50] [--duration 10] [--payload-kb 2,16,64]
+
+Environment:
+    CRON_SECRET - Required unless --standin: HMAC secret key
+    API_URL - Optional: API endpoint URL (default: http://localhost:3000)
+
+Every request creates a draft post with a unique slug, so only point this
+at a development server or at the local stand-in (--standin), which
+verifies signatures exactly like lib/security/hmac-auth.ts without a
+database behind it.
+"""
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from blogapi.loadgen import BUCKETS_MS, run_load, signing_ceiling
+from blogapi.publisher import API_PATH
+from blogapi.standin import SECRET, BlogStandinThread
+
+
+parser = argparse.ArgumentParser(description="Drive /api/blog at a target request rate")
+parser.add_argument("--standin", action="store_true", help="Run against an in-process stand-in server")
+parser.add_argument("--standin-latency", type=float, default=0.0, help="Seconds the stand-in adds per request")
+parser.add_argument("--rate", type=float, default=50.0, help="Requests per second (default: 50, 0 = as fast as possible)")
+parser.add_argument("--duration", type=float, default=10.0, help="Seconds to run (default: 10)")
+parser.add_argument("--count", type=int, help="Send exactly this many requests instead")
+parser.add_argument("--payload-kb", default="2", help="Comma-separated body sizes in KB, cycled (default: 2)")
+parser.add_argument("--max-in-flight", type=int, default=64, help="Concurrent requests (default: 64)")
+parser.add_argument("--timestamp-offset", type=float, default=0.0,
+                    help="Shift the signing clock by N seconds (-301 expires every request)")
+parser.add_argument("--path", default=API_PATH, help=f"API path (default: {API_PATH})")
+parser.add_argument("--output", help="Write the results as JSON to this path")
+args = parser.parse_args()
+
+sizes = [int(float(kb) * 1024) for kb in args.payload_kb.split(",") if kb.strip()]
+options = dict(rate=args.rate, payload_sizes=sizes, max_in_flight=args.max_in_flight,
+               timestamp_offset=args.timestamp_offset, path=args.path)
+
+
+def run(api_url: str, secret: str):
+    print(f"🔐 Target: {api_url}{args.path}, {f'{args.rate:g}/s' if args.rate > 0 else 'unpaced'}, "
+          f"payloads {args.payload_kb} KB, {args.max_in_flight} in flight")
+    return run_load(api_url, secret, args.duration, args.count, **options)
+
+
+if args.standin:
+    secret = os.getenv("CRON_SECRET", SECRET)
+    with BlogStandinThread(secret=secret, latency=args.standin_latency) as standin:
+        result = run(standin.url, secret)
+else:
+    secret = os.getenv("CRON_SECRET")
+    if not secret:
+        print("❌ Error: CRON_SECRET environment variable is required (or use --standin)")
+        sys.exit(1)
+    result = run(os.getenv("API_URL", "http://localhost:3000"), secret)
+
+report = result.to_dict()
+report["signing_ceiling_per_s"] = {f"{size // 1024}KB": round(signing_ceiling(secret, size, 0.25))
+                                   for size in sizes}
+latency = report["latency"]
+
+print()
+print("📊 Load test report")
+print(f"   Requests: {result.requests} in {result.elapsed:.1f}s ({result.achieved_rate:.1f}/s achieved)")
+print(f"   Latency: p50 {latency['p50_ms']:.1f}ms, p95 {latency['p95_ms']:.1f}ms, "
+      f"p99 {latency['p99_ms']:.1f}ms, max {latency['max_ms']:.1f}ms")
+print(f"   Schedule lag p99: {report['schedule_lag']['p99_ms']:.1f}ms")
+print(f"   Signing: {report['signing_us_mean']:.1f}µs per request; ceiling "
+      + ", ".join(f"{rate}/s @ {size}" for size, rate in report["signing_ceiling_per_s"].items()))
+for error_class, count in sorted(result.classes.items()):
+    print(f"   {error_class}: {count}")
+print("   Histogram:")
+peak = max(result.latency.counts) or 1
+last = max((i for i, count in enumerate(result.latency.counts) if count), default=0)
+for bound, count in list(zip(BUCKETS_MS, result.latency.counts))[:last + 1]:
+    label = "+Inf" if bound == float("inf") else f"≤{bound:g}ms"
+    print(f"     {label:>9} {count:6d} {'█' * round(count / peak * 40)}")
+
+if args.output:
+    Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+        f.write("\n")
+    print(f"📝 Results written to {args.output}")
+
+sys.exit(0 if result.classes.get("ok", 0) == result.requests or args.timestamp_offset else 1)
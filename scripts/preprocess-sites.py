@@ -0,0 +1,17 @@
+#!/usr/bin/env python3
+"""
+Score and rank a scraper dump for import, streaming
+Usage: python3 scripts/preprocess-sites.py [SOURCE] [--out DIR] [--batch-size N] [--scorer {auto,numpy,python}]
+
+Writes ranked batch files plus manifest.json to .import/scored-sites; import
+them with `SCORED_DIR=.import/scored-sites pnpm db:import-sites`.
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from siteimport.preprocess import main
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Bulk publish markdown posts through /api/blog (HMAC-signed, concurrent)
+Usage: python3 scripts/publish-blog-posts.py <posts-dir> [--rate 5] [--concurrency 8] [--dry-run]
+
+Environment:
+    CRON_SECRET - Required: HMAC secret key
+    API_URL - Optional: API endpoint URL (default: http://localhost:3000)
+
+Each .md/.mdx file is one post; front matter supplies title, slug,
+description, status, visibility, isPinned, featuredImageUrl and tags (ids).
+"""
+import argparse
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from blogapi.posts import STATUSES, load_posts
+from blogapi.publisher import API_PATH, CREATED, EXISTS, INVALID, publish_posts, write_report
+
+
+parser = argparse.ArgumentParser(description="Publish a directory of markdown posts via /api/blog")
+parser.add_argument("directory", help="Directory of .md/.mdx files with front matter")
+parser.add_argument("--status", choices=STATUSES, help="Override the status of every post")
+parser.add_argument("--concurrency", type=int, default=8, help="Parallel requests (default: 8)")
+parser.add_argument("--rate", type=float, default=5.0, help="Max posts per second (default: 5, 0 = unlimited)")
+parser.add_argument("--retries", type=int, default=3, help="Retries for 429/5xx/network errors (default: 3)")
+parser.add_argument("--path", default=API_PATH, help=f"API path (default: {API_PATH})")
+parser.add_argument("--dry-run", action="store_true", help="Validate posts without sending them")
+parser.add_argument("--report", help="Write the per-post results as JSON to this path")
+args = parser.parse_args()
+
+API_URL = os.getenv("API_URL", "http://localhost:3000")
+CRON_SECRET = os.getenv("CRON_SECRET")
+
+if not CRON_SECRET and not args.dry_run:
+    print("❌ Error: CRON_SECRET environment variable is required")
+    print("💡 Set it in .env.local or run: CRON_SECRET=your_secret python3 scripts/publish-blog-posts.py <dir>")
+    sys.exit(1)
+
+posts = load_posts(args.directory, status=args.status)
+valid = [post for post in posts if post.valid]
+
+print(f"📝 {len(posts)} posts in {args.directory} ({len(posts) - len(valid)} invalid)")
+print(f"🔐 Target: {API_URL}{args.path}, {args.concurrency} parallel, "
+      f"{f'{args.rate:g}/s' if args.rate > 0 else 'no rate limit'}")
+print()
+
+if args.dry_run:
+    for post in posts:
+        mark = "✅" if post.valid else "❌"
+        detail = post.payload.get("status", "") if post.valid else "; ".join(post.errors)
+        print(f"  {mark} {post.path.name} → {post.slug or '?'} ({detail})")
+        for warning in post.warnings:
+            print(f"     ⚠️  {warning}")
+    sys.exit(0 if len(valid) == len(posts) else 1)
+
+
+def report(result):
+    icon = {"created": "✅", "exists": "⏭️", "invalid": "⚠️"}.get(result.status, "❌")
+    detail = f"id {result.post_id}" if result.ok else result.error[:100]
+    print(f"  {icon} {result.slug or Path(result.file).name}: {result.status} {detail}")
+
+
+results = publish_posts(posts, API_URL, CRON_SECRET, args.concurrency, args.rate, args.retries,
+                        args.path, on_result=report)
+
+counts = {}
+for result in results:
+    counts[result.status] = counts.get(result.status, 0) + 1
+sent = [result for result in results if result.status != INVALID]
+latencies = sorted(result.latency for result in sent)
+
+print()
+print("📊 Publish report")
+for status, count in sorted(counts.items()):
+    print(f"   {status}: {count}")
+if latencies:
+    print(f"   Latency: median {latencies[len(latencies) // 2] * 1000:.0f}ms, "
+          f"max {latencies[-1] * 1000:.0f}ms, {sum(r.attempts for r in sent) - len(sent)} retries")
+if args.report:
+    write_report(results, args.report)
+    print(f"📝 Report written to {args.report}")
+
+# Re-running a batch is safe: posts whose slug already exists are not failures
+sys.exit(0 if counts.get(CREATED, 0) + counts.get(EXISTS, 0) == len(results) else 1)
@@ -0,0 +1,16 @@
+/**
+ * Cache-Control for the wrangler upload scripts (r2sync: config.CACHE_CONTROL)
+ */
+
+// {domain}-{timestamp}-thumb.webp keys are never rewritten, so the CDN may keep them for good
+const IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable";
+const TIMESTAMPED_THUMBNAIL = /-\d{13}-thumb\.webp$/;
+
+/**
+ * wrangler flag for a key: only timestamped thumbnails are marked immutable
+ */
+function cacheControlFlag(key) {
+  return TIMESTAMPED_THUMBNAIL.test(key) ? ` --cache-control="${IMMUTABLE_CACHE_CONTROL}"` : "";
+}
+
+module.exports = { IMMUTABLE_CACHE_CONTROL, cacheControlFlag };
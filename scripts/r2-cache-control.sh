@@ -0,0 +1,4 @@
+# Cache-Control for the wrangler upload scripts; sourced (r2sync: config.CACHE_CONTROL)
+
+# {domain}-{timestamp}-thumb.webp keys are never rewritten, so the CDN may keep them for good
+IMMUTABLE_CACHE_CONTROL="public, max-age=31536000, immutable"
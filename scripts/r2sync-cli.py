@@ -0,0 +1,19 @@
+#!/usr/bin/env python3
+"""
+Screenshot upload tooling for Cloudflare R2
+Usage: python3 scripts/r2sync-cli.py {upload,sync,plan,retry,verify,dedup,gc,fanout,merge-runs,warm,
+                                      screen,variants,watch,reconcile,headers,snapshot,restore} [options]
+
+Requires R2_ACCESS_KEY_ID, R2_SECRET_ACCESS_KEY and R2_ACCOUNT_ID
+(or R2_ENDPOINT_URL for a local S3-compatible endpoint) for anything that
+talks to R2. `--help`, `upload --dry-run` and `retry --dry-run` do not.
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from r2sync.cli import main
+
+if __name__ == "__main__":
+    sys.exit(main())
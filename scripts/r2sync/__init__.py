@@ -0,0 +1,12 @@
+"""
+Shared R2 upload engine for the screenshot scripts.
+
+Everything runs in-process on asyncio over a keep-alive connection pool to the
+R2 S3 endpoint, so a run costs one TLS handshake per pooled connection instead
+of one Node/wrangler or curl process per file.
+
+Usage (from the repository root):
+    python3 scripts/r2sync-cli.py upload   (or: sync, plan, retry, verify, dedup, gc, fanout, merge-runs,
+                                            warm, screen, variants, watch, reconcile, headers, snapshot,
+                                            restore)
+"""
@@ -0,0 +1,31 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# Make `r2sync` importable the same way the scripts do (scripts/ on sys.path)
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from r2sync.standin import StandinThread  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def _workdir(tmp_path, monkeypatch):
+    """Keep default local state (.r2sync/runs etc.) out of the checkout"""
+    monkeypatch.chdir(tmp_path)
+
+
+@pytest.fixture
+def standin():
+    with StandinThread() as server:
+        yield server
+
+
+@pytest.fixture
+def thumbnails(tmp_path):
+    """A small thumbnail tree shaped like public/screenshots/thumbnails"""
+    root = tmp_path / "thumbnails"
+    root.mkdir()
+    for i in range(40):
+        (root / f"site-{i}-1700000000000-thumb.webp").write_bytes(b"RIFF" + bytes([i]) * (100 + i))
+    return root
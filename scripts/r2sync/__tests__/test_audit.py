@@ -0,0 +1,76 @@
+import hashlib
+import json
+
+from r2sync.audit import ParallelHasher, compare, file_digest
+from r2sync.cli import main
+from r2sync.listing import SHARD_CHARS
+from r2sync.planner import scan_local
+from r2sync.s3 import ObjectInfo
+from r2sync.standin import StoredObject
+
+PREFIX = "screenshots/thumbnails/"
+
+
+def test_file_digest_matches_single_and_multipart_etags(tmp_path):
+    data = bytes(range(256)) * 10_000  # 2.56 MB
+    path = tmp_path / "big.webp"
+    path.write_bytes(data)
+    assert file_digest(path).md5 == hashlib.md5(data).hexdigest()
+    assert file_digest(path).multipart_etag == ""
+
+    part = 1024 * 1024 + 7  # not a multiple of the read buffer
+    digest = file_digest(path, part_size=part, multipart_threshold=1)
+    parts = [hashlib.md5(data[i:i + part]).digest() for i in range(0, len(data), part)]
+    assert digest.multipart_etag == f"{hashlib.md5(b''.join(parts)).hexdigest()}-3"
+    assert digest.size == len(data)
+
+
+def test_parallel_hasher_reports_unreadable_files(thumbnails):
+    paths = sorted(str(p) for p in thumbnails.iterdir()) + [str(thumbnails / "gone.webp")]
+    results = ParallelHasher(paths, workers=2, files_per_task=8).results()
+    assert len(results) == 41
+    assert results[paths[0]][0].md5 == hashlib.md5(open(paths[0], "rb").read()).hexdigest()
+    digest, error = results[str(thumbnails / "gone.webp")]
+    assert digest is None and error.startswith("FileNotFoundError")
+
+
+def test_compare_sorts_every_key(thumbnails):
+    files = scan_local(thumbnails)[:5]
+    digests = ParallelHasher([f.path for f in files], workers=1).results()
+    a, b, c, d, e = files
+    md5 = {f.key: digests[str(f.path)][0].md5 for f in files}
+    remote = [
+        ObjectInfo(a.key, a.size, md5[a.key]),
+        ObjectInfo(b.key, b.size + 1, md5[b.key]),
+        ObjectInfo(c.key, c.size, "0" * 32),
+        ObjectInfo(d.key, d.size, "abc-2"),
+        ObjectInfo(PREFIX + "orphan-1700000000000-thumb.webp", 1, "etag"),
+    ]
+    report = compare(files, digests, remote)
+    assert report.matched == [a.key] and report.size_only == [d.key] and report.missing == [e.key]
+    assert [key for key, _ in report.mismatched] == [b.key, c.key]
+    assert report.extra == [PREFIX + "orphan-1700000000000-thumb.webp"]
+    assert not report.ok
+
+
+def test_verify_command(standin, thumbnails, tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv("R2_ACCESS_KEY_ID", standin.config().access_key_id)
+    monkeypatch.setenv("R2_SECRET_ACCESS_KEY", standin.config().secret_access_key)
+    monkeypatch.setenv("R2_ENDPOINT_URL", standin.url)
+    args = ["--source", str(thumbnails), "--manifest", str(tmp_path / "m.sqlite")]
+    assert main(["sync", *args]) == 0
+    assert main(["verify", *args, "--workers", "2"]) == 0
+
+    objects = standin.objects()
+    objects[PREFIX + "site-3-1700000000000-thumb.webp"] = StoredObject(b"corrupt", "etag")
+    objects[PREFIX + "old-1600000000000-thumb.webp"] = StoredObject(b"x", "etag")
+    requests = dict(standin.requests)
+    report = tmp_path / "audit.json"
+    assert main(["verify", *args, "--report", str(report)]) == 1
+    # One listing page per range; no per-object GET or HEAD
+    assert standin.requests["HEAD"] == requests.get("HEAD", 0)
+    assert standin.requests["GET"] - requests["GET"] == len(SHARD_CHARS)
+    summary = json.loads(report.read_text())
+    assert (summary["matched"], summary["mismatched"], summary["extra"]) == (39, 1, 1)
+    assert summary["extra_keys"] == [PREFIX + "old-1600000000000-thumb.webp"]
+    assert "mismatched: screenshots/thumbnails/site-3-1700000000000-thumb.webp (size" in capsys.readouterr().out
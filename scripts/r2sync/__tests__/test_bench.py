@@ -0,0 +1,38 @@
+import random
+import shutil
+
+import pytest
+
+from r2sync.bench import compare, make_corpus, run_case, synthetic_webp
+
+
+def test_synthetic_webp_is_a_riff_container():
+    data = synthetic_webp(1000, random.Random(1))
+    assert len(data) == 1000
+    assert data[:4] == b"RIFF" and data[8:16] == b"WEBP" + b"VP8 "
+    assert int.from_bytes(data[4:8], "little") == len(data) - 8
+
+
+@pytest.mark.parametrize("transport", ["r2sync", "curl"])
+def test_case_reports_throughput_and_latency(standin, tmp_path, transport):
+    if transport == "curl" and not shutil.which("curl"):
+        pytest.skip("curl not installed")
+    corpus = make_corpus(tmp_path / "corpus", 20, 2048)
+
+    row = run_case(transport, corpus, standin.config(), concurrency=4)
+
+    assert row["ok"] == 20 and row["failed"] == 0
+    assert row["files_per_s"] > 0 and row["mb_per_s"] > 0
+    assert 0 < row["p50_ms"] <= row["p95_ms"] <= row["p99_ms"]
+    assert row["peak_rss_mb"] > 0
+    assert len(standin.objects()) == 20
+
+
+def test_compare_flags_slower_cases():
+    baseline = [{"transport": "r2sync", "concurrency": 8, "files_per_s": 1000.0},
+                {"transport": "curl", "concurrency": 8, "files_per_s": 90.0},
+                {"transport": "boto3", "skipped": "boto3 not installed"}]
+    rows = [{"transport": "r2sync", "concurrency": 8, "files_per_s": 950.0},
+            {"transport": "curl", "concurrency": 8, "files_per_s": 60.0}]
+
+    assert compare(rows, baseline) == [("curl", 8, 90.0, 60.0)]
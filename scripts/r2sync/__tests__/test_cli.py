@@ -0,0 +1,86 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from r2sync.cli import main
+
+SCRIPTS = Path(__file__).resolve().parents[2]
+HEAVY = ("asyncio", "ssl", "concurrent.futures", "toolkit.httpclient", "r2sync.uploader", "PIL", "boto3")
+
+
+def loaded_modules(argv, env=None):
+    """Run the CLI in a fresh interpreter; return (exit code, heavy modules it imported)"""
+    code = (
+        "import json, sys\n"
+        f"sys.path.insert(0, {str(SCRIPTS)!r})\n"
+        "from r2sync.cli import main\n"
+        "try:\n"
+        f"    status = main({argv!r})\n"
+        "except SystemExit as e:\n"
+        "    status = e.code\n"
+        f"print(json.dumps([status, [m for m in {HEAVY!r} if m in sys.modules]]))\n"
+    )
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                         env={**os.environ, **(env or {})})
+    return json.loads(out.stdout.splitlines()[-1])
+
+
+@pytest.fixture
+def r2_env(standin, monkeypatch):
+    env = {"R2_ACCESS_KEY_ID": standin.config().access_key_id,
+           "R2_SECRET_ACCESS_KEY": standin.config().secret_access_key,
+           "R2_ENDPOINT_URL": standin.url}
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    return env
+
+
+def test_help_and_dry_run_do_not_load_the_network_stack(thumbnails, tmp_path):
+    assert loaded_modules(["--help"]) == [0, []]
+    assert loaded_modules(["upload", "--help"]) == [0, []]
+    journal = str(tmp_path / "journal.sqlite")
+    assert loaded_modules(["upload", "--dry-run", "--source", str(thumbnails), "--journal", journal]) == [0, []]
+    assert loaded_modules(["retry", "--dry-run", "--journal", journal]) == [0, []]
+
+
+def test_sync_plan_verify(r2_env, standin, thumbnails, tmp_path, capsys):
+    manifest = str(tmp_path / "manifest.sqlite")
+    args = ["--source", str(thumbnails), "--manifest", manifest]
+    assert main(["sync", *args, "--concurrency", "4"]) == 0
+    assert len(standin.objects()) == 40
+    assert "Uploaded: 40" in capsys.readouterr().out
+
+    # Everything is confirmed by the manifest: planning never opens a connection
+    assert loaded_modules(["plan", *args], env=r2_env) == [0, []]
+
+    assert main(["verify", *args]) == 0
+    del standin.objects()["screenshots/thumbnails/site-7-1700000000000-thumb.webp"]
+    assert main(["verify", *args]) == 1
+    assert "missing: screenshots/thumbnails/site-7-1700000000000-thumb.webp" in capsys.readouterr().out
+
+
+def test_upload_then_retry(r2_env, standin, thumbnails, tmp_path, capsys):
+    journal = str(tmp_path / "journal.sqlite")
+    assert main(["upload", "--source", str(thumbnails), "--journal", journal, "--concurrency", "4"]) == 0
+    assert len(standin.objects()) == 40
+    assert main(["upload", "--source", str(thumbnails), "--journal", journal]) == 0
+    assert "Nothing to upload" in capsys.readouterr().out
+    assert main(["retry", "--journal", journal]) == 0
+    assert "Nothing to retry" in capsys.readouterr().out
+
+
+def test_upload_fails_when_any_upload_failed(r2_env, standin, thumbnails, tmp_path, capsys):
+    journal = str(tmp_path / "journal.sqlite")
+    standin.fault = lambda request: 403 if "site-3-" in request.path else None
+    assert main(["upload", "--source", str(thumbnails), "--journal", journal, "--no-metrics"]) == 1
+    assert "Failed: 1/40" in capsys.readouterr().out
+    standin.fault = None
+    assert main(["retry", "--journal", journal, "--no-metrics"]) == 0
+
+
+def test_upload_missing_directory(tmp_path):
+    assert main(["upload", "--source", str(tmp_path / "nope"), "--journal", str(tmp_path / "j.sqlite")]) == 1
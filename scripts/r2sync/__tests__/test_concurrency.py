@@ -0,0 +1,105 @@
+import asyncio
+import random
+
+import pytest
+
+from r2sync import uploader
+from r2sync.concurrency import AIMDController
+from r2sync.standin import StandinThread
+from r2sync.uploader import UploadJob, upload_files
+
+
+@pytest.fixture(autouse=True)
+def short_backoff(monkeypatch):
+    monkeypatch.setattr(uploader, "backoff_delay", lambda attempt: 0.01)
+
+
+def test_controller_grows_then_backs_off_at_the_backend_ceiling(tmp_path):
+    blob = tmp_path / "blob.webp"
+    blob.write_bytes(b"RIFF" + b"x" * 256)
+    jobs = [UploadJob(blob, f"screenshots/thumbnails/site-{i}-thumb.webp") for i in range(400)]
+    ceiling = 8
+    messages = []
+
+    with StandinThread(latency=0.02) as server:
+        server.fault = lambda request: 503 if server.active > ceiling else None
+        controller = AIMDController(initial=2, maximum=32, cooldown=0.05, log=messages.append)
+        stats = upload_files(jobs, server.config(), retries=8, controller=controller)
+
+    assert stats.uploaded == 400
+    reasons = [reason for _, _, _, reason in controller.history]
+    assert "window ok" in reasons
+    assert "throttled" in reasons
+    assert controller.throttled > 0
+    # AIMD saw-tooths just above the ceiling instead of running at the maximum
+    assert controller.peak <= ceiling + 2
+    assert any("concurrency" in message for message in messages)
+
+
+def test_slots_never_exceed_limit():
+    async def run():
+        controller = AIMDController(initial=3, maximum=3, log=None)
+        running = peak = 0
+
+        async def task():
+            nonlocal running, peak
+            async with controller.slot():
+                running += 1
+                peak = max(peak, running)
+                await asyncio.sleep(0.001)
+                running -= 1
+
+        await asyncio.gather(*(task() for _ in range(30)))
+        return peak
+
+    assert asyncio.run(run()) == 3
+
+
+def test_multiplicative_decrease_respects_cooldown():
+    async def run():
+        controller = AIMDController(initial=16, minimum=2, cooldown=60, log=None)
+        for _ in range(5):
+            controller.on_throttle()
+        return controller.limit
+
+    assert asyncio.run(run()) == 8
+
+
+def test_jitter_without_throttling_does_not_collapse_the_limit():
+    async def run():
+        rng = random.Random(1)
+        controller = AIMDController(initial=8, maximum=64, cooldown=0, log=None)
+        for _ in range(5000):
+            controller.on_success(rng.lognormvariate(-3, 1.0), 20_000)
+            controller.on_success(rng.lognormvariate(-1, 1.0), 8 * 1024 * 1024)
+        return controller
+
+    controller = asyncio.run(run())
+    assert controller.limit == 64
+    assert "latency rising" not in [reason for _, _, _, reason in controller.history]
+
+
+def test_sustained_latency_rise_backs_off():
+    async def run():
+        controller = AIMDController(initial=32, maximum=32, cooldown=0, log=None)
+        for _ in range(200):
+            controller.on_success(0.05, 20_000)
+        for _ in range(32):
+            controller.on_success(0.5, 20_000)
+        return controller
+
+    controller = asyncio.run(run())
+    assert controller.limit < 32
+    assert controller.history[-1][3] == "latency rising"
+
+
+def test_multipart_parts_feed_the_controller(tmp_path):
+    big = tmp_path / "og.png"
+    big.write_bytes(b"p" * (4 * 1024 + 100))
+    controller = AIMDController(initial=2, maximum=4, log=None)
+    with StandinThread() as server:
+        stats = upload_files([UploadJob(big, "og/og.png")], server.config(), controller=controller,
+                             multipart_threshold=1024, part_size=1024)
+
+    assert stats.uploaded == 1
+    assert set(controller._buckets) == {(1024).bit_length() // 2, (100).bit_length() // 2}  # Full parts and the tail
@@ -0,0 +1,76 @@
+import hashlib
+
+from r2sync.cli import main
+from r2sync.dedup import BLOB_PREFIX, blob_key, build_dedup_plan, build_mapping, scan_thumbnails
+from r2sync.scan import parse_thumbnail_name
+from r2sync.uploader import upload_files
+
+PARKED = b"RIFF" + b"parked" * 50
+
+
+def make_tree(root):
+    root.mkdir()
+    for i in range(10):
+        (root / f"parked-{i}-com-1700000000000-thumb.webp").write_bytes(PARKED)
+    for i in range(5):
+        (root / f"site-{i}-com-1700000000000-thumb.webp").write_bytes(b"RIFF" + bytes([i]) * 200)
+    # A newer capture of site-0 replaces the older one in the mapping
+    (root / "site-0-com-1800000000000-thumb.webp").write_bytes(PARKED)
+    return root
+
+
+def test_parse_thumbnail_name():
+    assert parse_thumbnail_name("screenshots/thumbnails/example-com-1700000000000-thumb.webp") == \
+        ("example-com", 1700000000000)
+    assert parse_thumbnail_name("logo.webp") is None
+
+
+def test_identical_thumbnails_upload_once(standin, tmp_path):
+    thumbs = scan_thumbnails(make_tree(tmp_path / "thumbnails"))
+    plan = build_dedup_plan(thumbs, standin.config(), workers=2)
+
+    assert len(plan.files) == 16
+    assert len(plan.blobs) == 6
+    assert plan.duplicates == 10
+    assert plan.requests_saved == 10
+    assert plan.bytes_saved == 10 * len(PARKED)
+
+    stats = upload_files(plan.jobs(), standin.config(), concurrency=2)
+    assert stats.uploaded == 6
+    parked_key = blob_key(hashlib.sha256(PARKED).hexdigest(), ".webp")
+    assert standin.objects()[parked_key].data == PARKED
+
+    # Blobs already stored are not uploaded again
+    again = build_dedup_plan(scan_thumbnails(tmp_path / "thumbnails"), standin.config(), workers=1)
+    assert again.upload == []
+    assert again.requests_saved == 16
+
+
+def test_mapping_points_domains_at_newest_blob(tmp_path):
+    thumbs = scan_thumbnails(make_tree(tmp_path / "thumbnails"))
+    build_dedup_plan(thumbs, None, workers=1)
+    digest = hashlib.sha256(b"RIFF" + bytes([1]) * 200).hexdigest()
+
+    mapping = build_mapping(thumbs, "https://cdn.dobacklinks.com", failed={digest})
+
+    domains = mapping["domains"]
+    assert len(domains) == 14  # 10 parked + site-0, 2, 3, 4; site-1 failed to upload
+    assert "site-1-com" not in domains
+    assert domains["site-0-com"]["capturedAt"] == 1800000000000
+    assert domains["site-0-com"]["key"] == domains["parked-3-com"]["key"]
+    assert domains["site-0-com"]["url"] == "https://cdn.dobacklinks.com/" + domains["site-0-com"]["key"]
+    assert domains["site-2-com"]["key"].startswith(BLOB_PREFIX)
+
+
+def test_dedup_command_fails_when_a_blob_upload_failed(standin, tmp_path, monkeypatch):
+    monkeypatch.setenv("R2_ACCESS_KEY_ID", standin.config().access_key_id)
+    monkeypatch.setenv("R2_SECRET_ACCESS_KEY", standin.config().secret_access_key)
+    monkeypatch.setenv("R2_ENDPOINT_URL", standin.url)
+    args = ["dedup", "--source", str(make_tree(tmp_path / "thumbnails")), "--mapping", str(tmp_path / "map.json"),
+            "--workers", "1", "--no-metrics"]
+    parked = blob_key(hashlib.sha256(PARKED).hexdigest(), ".webp")
+
+    standin.fault = lambda request: 403 if request.path.endswith(parked) else None
+    assert main(args) == 1
+    standin.fault = None
+    assert main(args) == 0
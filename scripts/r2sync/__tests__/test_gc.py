@@ -0,0 +1,101 @@
+import asyncio
+import json
+
+from r2sync.cli import main
+from r2sync.gc import key_from_reference, plan_gc
+from r2sync.planner import Manifest
+from r2sync.s3 import ObjectInfo, S3Client
+from r2sync.standin import StoredObject
+
+PREFIX = "screenshots/thumbnails/"
+
+
+def thumb(domain, ts, size=10):
+    return ObjectInfo(f"{PREFIX}{domain}-{1700000000000 + ts}-thumb.webp", size, "etag")
+
+
+def test_plan_keeps_newest_and_referenced_versions():
+    objects = [thumb("a-com", 1), thumb("a-com", 3), thumb("a-com", 2),
+               thumb("b-io", 5), thumb("b-io", 9),
+               thumb("c-org", 7),
+               ObjectInfo(PREFIX + "notes.txt", 1, "etag")]
+    plan = plan_gc(objects, referenced={thumb("b-io", 5).key})
+    assert [obj.key for obj in plan.delete] == [thumb("a-com", 1).key, thumb("a-com", 2).key]
+    assert plan.delete_bytes == 20
+    assert plan.domains == 3 and plan.referenced_kept == 1 and plan.unmatched == 1
+    assert {obj.key for obj in plan.keep} == {thumb("a-com", 3).key, thumb("b-io", 5).key, thumb("b-io", 9).key,
+                                              thumb("c-org", 7).key, PREFIX + "notes.txt"}
+
+
+def test_key_from_reference():
+    key = PREFIX + "a-com-1-thumb.webp"
+    assert key_from_reference(key) == key
+    assert key_from_reference(f"https://cdn.dobacklinks.com/{key}\n") == key
+    assert key_from_reference(f"/{key}") == key
+    assert key_from_reference("https://cdn.dobacklinks.com/other/x.webp") is None
+    assert key_from_reference("") is None
+
+
+def test_delete_objects_batches(standin):
+    for i in range(5):
+        standin.objects()[f"k{i}"] = StoredObject(b"x", "etag")
+
+    async def run():
+        async with S3Client(standin.config()) as client:
+            return await client.delete_objects(["k0", "k1", "k3", "missing"])
+
+    assert asyncio.run(run()) == []
+    assert sorted(standin.objects()) == ["k2", "k4"]
+
+
+def test_gc_command(standin, thumbnails, tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv("R2_ACCESS_KEY_ID", standin.config().access_key_id)
+    monkeypatch.setenv("R2_SECRET_ACCESS_KEY", standin.config().secret_access_key)
+    monkeypatch.setenv("R2_ENDPOINT_URL", standin.url)
+    objects = standin.objects()
+    for domain in ("alpha-com", "beta-net"):
+        for ts in range(1700000000000, 1700000000005):
+            objects[f"{PREFIX}{domain}-{ts}-thumb.webp"] = StoredObject(b"x" * 100, "etag")
+    local = thumbnails / "alpha-com-1700000000000-thumb.webp"
+    local.write_bytes(b"old")
+    referenced = tmp_path / "referenced.txt"
+    referenced.write_text(f"https://cdn.dobacklinks.com/{PREFIX}beta-net-1700000000001-thumb.webp\n")
+    manifest = str(tmp_path / "manifest.sqlite")
+    cached = Manifest(manifest)
+    cached.record_uploaded([(f"{PREFIX}alpha-com-1700000000000-thumb.webp", 100, "etag"),
+                            (f"{PREFIX}alpha-com-1700000000004-thumb.webp", 100, "etag")])
+    cached.close()
+    args = ["gc", "--source", str(thumbnails), "--manifest", manifest, "--referenced", str(referenced)]
+
+    report = tmp_path / "dry.json"
+    assert main([*args, "--dry-run", "--report", str(report)]) == 0
+    assert len(objects) == 10
+    summary = json.loads(report.read_text())
+    assert summary["delete"] == 7 and summary["delete_bytes"] == 700 and summary["referenced_kept"] == 1
+    assert summary["local_copies"] == 1
+
+    assert main([*args, "--batch-size", "3", "--prune-local"]) == 0
+    assert sorted(objects) == [f"{PREFIX}alpha-com-1700000000004-thumb.webp",
+                               f"{PREFIX}beta-net-1700000000001-thumb.webp",
+                               f"{PREFIX}beta-net-1700000000004-thumb.webp"]
+    assert standin.requests["DeleteObjects"] == 3
+    assert not local.exists()
+    assert "Deleted: 7" in capsys.readouterr().out
+    assert list(Manifest(manifest).remote_state()) == [f"{PREFIX}alpha-com-1700000000004-thumb.webp"]
+
+
+def test_gc_without_references_is_a_dry_run_unless_newest_only(standin, thumbnails, tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv("R2_ACCESS_KEY_ID", standin.config().access_key_id)
+    monkeypatch.setenv("R2_SECRET_ACCESS_KEY", standin.config().secret_access_key)
+    monkeypatch.setenv("R2_ENDPOINT_URL", standin.url)
+    objects = standin.objects()
+    for ts in range(1700000000000, 1700000000003):
+        objects[f"{PREFIX}alpha-com-{ts}-thumb.webp"] = StoredObject(b"x" * 100, "etag")
+    args = ["gc", "--source", str(thumbnails), "--manifest", str(tmp_path / "manifest.sqlite")]
+
+    assert main(args) == 0
+    assert len(objects) == 3 and not standin.requests["DeleteObjects"]
+    assert "pass --newest-only" in capsys.readouterr().out
+
+    assert main([*args, "--newest-only"]) == 0
+    assert list(objects) == [f"{PREFIX}alpha-com-1700000000002-thumb.webp"]
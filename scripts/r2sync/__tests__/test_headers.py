@@ -0,0 +1,103 @@
+import asyncio
+
+from r2sync.cli import main
+from r2sync.config import CACHE_CONTROL
+from r2sync.gc import list_objects
+from r2sync.headers import CHANGED, DONE, RewriteState, RewriteStats, pending_objects, rewrite_headers
+from r2sync.jobs import UploadJob
+from r2sync.multipart import upload_multipart
+from r2sync.s3 import S3Client
+from r2sync.standin import StoredObject
+from r2sync.uploader import upload_files
+
+PREFIX = "screenshots/thumbnails/"
+
+
+def _env(monkeypatch, standin):
+    monkeypatch.setenv("R2_ACCESS_KEY_ID", standin.config().access_key_id)
+    monkeypatch.setenv("R2_SECRET_ACCESS_KEY", standin.config().secret_access_key)
+    monkeypatch.setenv("R2_ENDPOINT_URL", standin.url)
+
+
+def _legacy(standin, count=5):
+    """Objects as the old scripts stored them: a content type at best, no Cache-Control"""
+    objects = standin.objects()
+    for i in range(count):
+        objects[f"{PREFIX}old-{i}-1600000000000-thumb.webp"] = StoredObject(f"RIFF {i}".encode(), f"etag{i}",
+                                                                             "application/octet-stream")
+    return objects
+
+
+def test_uploads_are_immutable_by_default(standin, thumbnails, tmp_path):
+    jobs = [UploadJob(path, PREFIX + path.name) for path in sorted(thumbnails.iterdir())[:3]]
+    upload_files(jobs, standin.config(), 2)
+    big = tmp_path / "big.webp"
+    big.write_bytes(b"x" * (6 * 1024 * 1024))
+
+    async def multipart():
+        async with S3Client(standin.config()) as client:
+            await upload_multipart(client, big, PREFIX + "big.webp", "image/webp", part_size=5 * 1024 * 1024,
+                                   extra_headers={"Cache-Control": CACHE_CONTROL})
+
+    asyncio.run(multipart())
+    stored = standin.objects()
+    assert all(obj.metadata["cache-control"] == CACHE_CONTROL for obj in stored.values())
+    upload_files([UploadJob(big, PREFIX + "plain.webp")], standin.config(), 1, cache_control=None)
+    assert "cache-control" not in standin.objects()[PREFIX + "plain.webp"].metadata
+
+
+def test_rewrite_copies_in_place_and_resumes(standin, tmp_path):
+    objects = _legacy(standin)
+    state = RewriteState(str(tmp_path / "headers.sqlite"))
+    listing = list_objects(standin.config())
+    before = {key: obj.data for key, obj in objects.items()}
+
+    # Interrupted after two keys
+    stats = rewrite_headers(standin.config(), listing[:2], state, concurrency=2)
+    assert stats.rewritten == 2 and standin.copies == 2
+    assert standin.requests["PUT"] == 2  # copies only: no bytes went up again
+
+    stats = RewriteStats()
+    todo = list(pending_objects(list_objects(standin.config()), state, CACHE_CONTROL, stats=stats))
+    assert stats.skipped == 2 and len(todo) == 3
+    rewrite_headers(standin.config(), todo, state, concurrency=2, stats=stats)
+    assert state.counts() == {DONE: 5}
+    for key, obj in standin.objects().items():
+        assert obj.data == before[key]
+        assert obj.content_type == "image/webp" and obj.metadata == {"cache-control": CACHE_CONTROL}
+    # A different policy is a new rewrite
+    assert len(list(pending_objects(list_objects(standin.config()), state, "public, max-age=60"))) == 5
+    state.close()
+
+
+def test_objects_replaced_after_the_listing_are_left_alone(standin, tmp_path):
+    objects = _legacy(standin, 2)
+    listing = list_objects(standin.config())
+    key = PREFIX + "old-0-1600000000000-thumb.webp"
+    objects[key] = StoredObject(b"RIFF recaptured", "fresh", "image/webp", {"cache-control": "no-cache"})
+    state = RewriteState(str(tmp_path / "headers.sqlite"))
+
+    stats = rewrite_headers(standin.config(), listing, state)
+    assert (stats.rewritten, stats.changed) == (1, 1)
+    assert standin.objects()[key].metadata == {"cache-control": "no-cache"}
+    assert state.counts() == {DONE: 1, CHANGED: 1}
+    # The next listing has the new ETag, so the next run picks it up
+    assert [obj.key for obj in pending_objects(list_objects(standin.config()), state, CACHE_CONTROL)] == [key]
+    state.close()
+
+
+def test_headers_command(standin, tmp_path, monkeypatch, capsys):
+    _env(monkeypatch, standin)
+    _legacy(standin, 3)
+    args = ["headers", "--state", str(tmp_path / "headers.sqlite"), "--no-metrics"]
+
+    assert main([*args, "--dry-run"]) == 0
+    assert "To rewrite: 3" in capsys.readouterr().out and standin.copies == 0
+    assert main([*args, "--modified-before", "2000-01-01"]) == 0
+    assert "To rewrite: 0" in capsys.readouterr().out
+    assert main(args) == 0
+    assert "Rewritten: 3" in capsys.readouterr().out
+    assert main(args) == 0
+    assert "Already done: 3  To rewrite: 0" in capsys.readouterr().out
+    assert main([*args, "--fresh", "--cache-control", "public, max-age=86400"]) == 0
+    assert all(obj.metadata["cache-control"] == "public, max-age=86400" for obj in standin.objects().values())
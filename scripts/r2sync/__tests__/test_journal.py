@@ -0,0 +1,83 @@
+from collections import Counter
+
+import pytest
+
+from r2sync import uploader
+from r2sync.journal import DONE, FAILED, PENDING, Journal
+from r2sync.retry import SERVER, THROTTLED, backoff_delay, classify_error
+from r2sync.s3 import S3Error
+from r2sync.scan import iter_jobs
+from r2sync.uploader import upload_files
+
+
+@pytest.fixture(autouse=True)
+def no_backoff_sleep(monkeypatch):
+    monkeypatch.setattr(uploader, "backoff_delay", lambda attempt: 0)
+
+
+def test_transient_throttling_is_retried(standin, thumbnails):
+    seen = Counter()
+
+    def fail_first_put(request):
+        if request.method == "PUT":
+            seen[request.path] += 1
+            return 503 if seen[request.path] == 1 else None
+
+    standin.fault = fail_first_put
+    stats = upload_files(iter_jobs(thumbnails), standin.config(), concurrency=4, retries=2)
+
+    assert stats.uploaded == 40
+    assert standin.requests["PUT"] == 80
+
+
+def test_failures_are_journaled_and_retry_failed_redrives_only_them(standin, thumbnails, tmp_path):
+    journal = Journal(str(tmp_path / "journal.sqlite"))
+    standin.fault = lambda request: 500 if "site-1" in request.path else None
+
+    stats = upload_files(iter_jobs(thumbnails), standin.config(), concurrency=4, retries=1, journal=journal)
+
+    # site-1 and site-10..19
+    assert stats.failed == 11
+    assert journal.counts() == {DONE: 29, FAILED: 11}
+    assert journal.failure_classes() == {SERVER: 11}
+
+    standin.fault = None
+    puts_before = standin.requests["PUT"]
+    rerun = upload_files(journal.failed_jobs(), standin.config(), concurrency=4, journal=journal)
+    assert rerun.uploaded == 11
+    assert standin.requests["PUT"] - puts_before == 11
+
+    journal.close()
+    journal = Journal(str(tmp_path / "journal.sqlite"))
+    assert list(journal.failed_jobs()) == []
+    assert journal.counts() == {DONE: 40}
+    # A plain re-run now skips everything
+    assert list(journal.skip_done(iter_jobs(thumbnails))) == []
+    assert journal.skipped == 40
+
+
+def test_interrupted_uploads_are_resumed(thumbnails, tmp_path):
+    path = str(tmp_path / "journal.sqlite")
+    journal = Journal(path)
+    jobs = list(iter_jobs(thumbnails))
+    for job in jobs[:5]:
+        journal.start(job)
+    journal.flush()
+    # Simulate a crash: no finish() calls, connection dropped
+    journal.db.close()
+
+    resumed = Journal(path)
+    assert resumed.recovered == 5
+    assert resumed.counts() == {PENDING: 5}
+    assert len(list(resumed.skip_done(jobs))) == 40
+
+
+def test_error_classes_and_backoff_bounds():
+    assert classify_error(S3Error(429)) == THROTTLED
+    assert classify_error(S3Error(503, "SlowDown")) == THROTTLED
+    assert classify_error(S3Error(502)) == SERVER
+    assert classify_error(S3Error(403)) == "auth"
+    assert classify_error(FileNotFoundError()) == "local"
+    assert classify_error(ConnectionResetError()) == "network"
+    for attempt in range(1, 10):
+        assert 0 <= backoff_delay(attempt) <= min(30.0, 0.5 * 2 ** (attempt - 1))
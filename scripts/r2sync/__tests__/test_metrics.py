@@ -0,0 +1,84 @@
+import hashlib
+import json
+import time
+
+from r2sync.cli import main
+from r2sync.metrics import Histogram, PhaseTimers, RunMetrics, SamplingProfiler, categorize
+
+
+def read_events(run_dir):
+    return [json.loads(line) for line in (run_dir / "events.jsonl").read_text().splitlines()]
+
+
+def test_histogram_is_cumulative():
+    histogram = Histogram(buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value)
+    assert histogram.lines("latency", 'status="ok"') == [
+        'latency_bucket{status="ok",le="0.1"} 2',
+        'latency_bucket{status="ok",le="1"} 3',
+        'latency_bucket{status="ok",le="+Inf"} 4',
+        'latency_sum{status="ok"} 3.650000',
+        'latency_count{status="ok"} 4',
+    ]
+
+
+def test_timed_iterator_counts_only_production_time():
+    def slow():
+        for i in range(3):
+            time.sleep(0.01)
+            yield i
+
+    timers = PhaseTimers()
+    for _ in timers.timed(slow(), "scan"):
+        time.sleep(0.02)
+    assert 0.03 <= timers.wall["scan"] < 0.06
+
+
+def test_profiler_attributes_samples():
+    assert categorize([("/x/uploader.py", "run"), ("/x/r2sync/sigv4.py", "sign")]) == "signing"
+    assert categorize([("/x/planner.py", "md5_file")]) == "hashing"
+    assert categorize([("/x/base_events.py", "run_forever"), ("/usr/selectors.py", "select")]) == "idle"
+
+    profiler = SamplingProfiler(interval=0.001).start()
+    deadline = time.perf_counter() + 0.2
+    while time.perf_counter() < deadline:
+        hashlib.sha256(b"x" * 65536).digest()
+    profiler.stop()
+    assert profiler.samples > 0
+    assert sum(profiler.categories.values()) == profiler.samples
+
+
+def test_sync_writes_events_and_prometheus_summary(standin, thumbnails, tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv("R2_ACCESS_KEY_ID", standin.config().access_key_id)
+    monkeypatch.setenv("R2_SECRET_ACCESS_KEY", standin.config().secret_access_key)
+    monkeypatch.setenv("R2_ENDPOINT_URL", standin.url)
+    runs = tmp_path / "runs"
+    assert main(["sync", "--source", str(thumbnails), "--manifest", str(tmp_path / "m.sqlite"),
+                 "--metrics-dir", str(runs), "--profile"]) == 0
+    assert "🔬 Profile:" in capsys.readouterr().out
+    (run_dir,) = runs.iterdir()
+
+    events = read_events(run_dir)
+    assert events[0]["event"] == "run_start" and events[-1]["event"] == "run_end"
+    uploads = [e for e in events if e["event"] == "upload"]
+    assert len(uploads) == 40
+    assert {e["status"] for e in uploads} == {"ok"} and {e["attempt"] for e in uploads} == {1}
+    assert sum(e["bytes"] for e in uploads) == sum(p.stat().st_size for p in thumbnails.iterdir())
+    assert {e["phase"] for e in events if e["event"] == "phase"} == {"scan", "hash", "list", "plan", "upload"}
+
+    prom = (run_dir / "metrics.prom").read_text()
+    assert 'r2sync_upload_latency_seconds_bucket{status="ok",le="+Inf"} 40' in prom
+    assert 'r2sync_uploads_total{status="ok"} 40' in prom
+    assert 'r2sync_phase_seconds{phase="upload"}' in prom
+    assert (run_dir / "profile.folded").exists()
+
+
+def test_run_metrics_without_uploads_and_no_metrics(tmp_path):
+    metrics = RunMetrics(tmp_path / "run", "plan")
+    with metrics.phase("plan"):
+        pass
+    metrics.close()
+    assert "r2sync_uploads_total" in (tmp_path / "run" / "metrics.prom").read_text()
+    assert main(["retry", "--dry-run", "--journal", str(tmp_path / "j.sqlite"), "--no-metrics"]) == 0
+    assert not (tmp_path / ".r2sync" / "runs").exists()
@@ -0,0 +1,94 @@
+import asyncio
+import hashlib
+
+import pytest
+
+from r2sync import multipart
+from r2sync.multipart import part_ranges, upload_multipart
+from r2sync.s3 import S3Client, S3Error
+from r2sync.uploader import UploadJob, upload_files
+
+PART = 64 * 1024
+
+
+@pytest.fixture(autouse=True)
+def short_backoff(monkeypatch):
+    monkeypatch.setattr(multipart, "backoff_delay", lambda attempt: 0.01)
+
+
+@pytest.fixture
+def large_file(tmp_path):
+    path = tmp_path / "bundle.bin"
+    path.write_bytes(bytes(range(256)) * 1024 + b"tail")  # 5 parts, the last one short
+    return path
+
+
+def test_part_ranges_cover_the_file():
+    assert part_ranges(10, 4) == [(1, 0, 4), (2, 4, 4), (3, 8, 2)]
+    assert part_ranges(8, 4) == [(1, 0, 4), (2, 4, 4)]
+
+
+def test_multipart_round_trip(standin, large_file):
+    async def run():
+        async with S3Client(standin.config()) as client:
+            return await upload_multipart(client, large_file, "archives/bundle.bin",
+                                          "application/octet-stream", part_size=PART)
+
+    etag = asyncio.run(run())
+
+    data = large_file.read_bytes()
+    digests = b"".join(hashlib.md5(data[o:o + n]).digest() for _, o, n in part_ranges(len(data), PART))
+    assert etag == f"{hashlib.md5(digests).hexdigest()}-5"
+    assert standin.objects()["archives/bundle.bin"].data == data
+    assert standin.multipart == {}
+
+
+def test_failed_part_is_retried_on_its_own(standin, large_file):
+    failed = []
+
+    def fault(request):
+        if request.query.get("partNumber") == "3" and not failed:
+            failed.append(request)
+            return 503
+        return None
+
+    standin.fault = fault
+
+    async def run():
+        async with S3Client(standin.config()) as client:
+            await upload_multipart(client, large_file, "archives/bundle.bin",
+                                   "application/octet-stream", part_size=PART)
+
+    asyncio.run(run())
+
+    assert len(failed) == 1
+    assert standin.requests["PUT"] == 6  # five parts plus one retry
+    assert standin.objects()["archives/bundle.bin"].data == large_file.read_bytes()
+
+
+def test_persistent_failure_aborts_the_upload(standin, large_file):
+    standin.fault = lambda request: 500 if request.query.get("partNumber") == "2" else None
+
+    async def run():
+        async with S3Client(standin.config()) as client:
+            await upload_multipart(client, large_file, "archives/bundle.bin",
+                                   "application/octet-stream", part_size=PART, retries=2)
+
+    with pytest.raises(S3Error):
+        asyncio.run(run())
+
+    assert standin.multipart == {}
+    assert "archives/bundle.bin" not in standin.objects()
+
+
+def test_uploader_switches_to_multipart_above_threshold(standin, thumbnails, large_file):
+    jobs = [UploadJob(large_file, "archives/bundle.bin"),
+            UploadJob(thumbnails / "site-1-1700000000000-thumb.webp", "screenshots/thumbnails/site-1.webp")]
+
+    stats = upload_files(jobs, standin.config(), concurrency=2, multipart_threshold=PART * 2, part_size=PART)
+
+    assert stats.uploaded == 2
+    assert stats.bytes == large_file.stat().st_size + 105
+    objects = standin.objects()
+    assert objects["archives/bundle.bin"].etag.endswith("-5")
+    assert "-" not in objects["screenshots/thumbnails/site-1.webp"].etag
@@ -0,0 +1,71 @@
+import asyncio
+
+from r2sync.listing import list_prefix, shard_boundaries, shard_of
+from r2sync.planner import Manifest, build_plan, scan_local
+from r2sync.s3 import S3Client
+from r2sync.standin import StoredObject
+from r2sync.uploader import upload_files
+
+PREFIX = "screenshots/thumbnails/"
+
+
+def test_parallel_listing_covers_every_key_once(standin):
+    names = ["0", "1", "1a", "a", "a-b", "m", "z", "zz", "~odd", "-dash"]
+    for name in names + [f"bulk-{i:04d}" for i in range(2500)]:
+        standin.objects()[PREFIX + name] = StoredObject(b"x", "etag")
+    standin.objects()["other/ignored"] = StoredObject(b"x", "etag")
+
+    async def run():
+        async with S3Client(standin.config()) as client:
+            return await list_prefix(client, PREFIX)
+
+    shards = asyncio.run(run())
+    keys = [obj.key for objects in shards.values() for obj in objects]
+    assert len(keys) == len(set(keys)) == len(names) + 2500
+    assert set(keys) == {k for k in standin.objects() if k.startswith(PREFIX)}
+
+    boundaries = shard_boundaries(PREFIX)
+    for index, objects in shards.items():
+        assert all(shard_of(obj.key, boundaries) == index for obj in objects)
+
+
+def test_plan_skips_matching_objects_and_uploads_the_rest(standin, thumbnails, tmp_path):
+    jobs = build_plan(scan_local(thumbnails), standin.config(), Manifest(":memory:")).jobs()
+    upload_files([job for job in jobs if "site-3" not in job.key or job.key.startswith(PREFIX + "site-3-")],
+                 standin.config(), concurrency=4)
+    # One object present but stale
+    key = PREFIX + "site-3-1700000000000-thumb.webp"
+    standin.objects()[key] = StoredObject(b"stale", "0" * 32)
+
+    manifest = Manifest(str(tmp_path / "manifest.sqlite"))
+    plan = build_plan(scan_local(thumbnails), standin.config(), manifest)
+
+    reasons = {entry.file.key: entry.reason for entry in plan.upload}
+    assert len(plan.skip) == 29
+    assert len(plan.upload) == 11
+    assert reasons[key] == "changed"
+    assert list(reasons.values()).count("missing") == 10
+    assert plan.upload_bytes == sum(e.file.size for e in plan.upload)
+    assert standin.requests["GET"] >= plan.listed_shards
+    assert standin.requests["HEAD"] == 0
+
+
+def test_manifest_lets_rerun_skip_listing(standin, thumbnails, tmp_path):
+    manifest = Manifest(str(tmp_path / "manifest.sqlite"))
+    plan = build_plan(scan_local(thumbnails), standin.config(), manifest)
+    stats = upload_files(plan.jobs(), standin.config(), concurrency=4,
+                         on_result=lambda r, s: manifest.record_uploaded([(r.job.key, r.size, r.etag)]))
+    assert stats.uploaded == 40
+
+    lists_before = standin.requests["GET"]
+    again = build_plan(scan_local(thumbnails), standin.config(), manifest)
+    assert again.upload == []
+    assert again.cached_skips == 40
+    assert again.listed_shards == 0
+    assert standin.requests["GET"] == lists_before
+
+    # A new capture only re-lists the range it falls into
+    (thumbnails / "zzz-new-1700000000001-thumb.webp").write_bytes(b"new")
+    third = build_plan(scan_local(thumbnails), standin.config(), manifest)
+    assert [e.file.key for e in third.upload] == [PREFIX + "zzz-new-1700000000001-thumb.webp"]
+    assert third.listed_shards == 1
@@ -0,0 +1,76 @@
+import json
+
+import pytest
+
+from r2sync.cli import main
+from r2sync.jobs import UploadJob
+from r2sync.priority import load_priorities, prioritize, priority_class
+from siteimport.preprocess import preprocess
+
+PREFIX = "screenshots/thumbnails/"
+
+
+def _thumbs(root, sizes):
+    root.mkdir(exist_ok=True)
+    jobs = []
+    for domain, size in sizes.items():
+        path = root / f"{domain}-1700000000000-thumb.webp"
+        path.write_bytes(b"R" * size)
+        jobs.append(UploadJob(path, PREFIX + path.name))
+    return jobs
+
+
+def test_feeds_map_urls_and_domains_to_thumbnail_names(tmp_path):
+    (tmp_path / "feed.json").write_text(json.dumps({
+        "https://www.alpha.com/": "live", "beta.io": 55, "gamma.net": {"score": 20, "status": "pending_review"},
+        "alpha.com": 10,
+    }))
+    (tmp_path / "feed.csv").write_text("url,status\nhttps://delta.org,live\nhttps://www.epsilon.dev/x,pending_review\n")
+
+    assert load_priorities(tmp_path / "feed.json") == {
+        "alpha-com": ("live", 10), "beta-io": (None, 55), "gamma-net": ("pending_review", 20)}
+    assert load_priorities(tmp_path / "feed.csv") == {
+        "delta-org": ("live", None), "epsilon-dev": ("pending_review", None)}
+
+
+def test_live_then_tiers_then_unknown_smallest_first(tmp_path):
+    jobs = _thumbs(tmp_path / "thumbs", {"stray-xyz": 10, "low-com": 10, "premium-big-com": 900,
+                                         "premium-small-com": 100, "high-com": 50, "live-com": 5000,
+                                         "unscored-com": 1})
+    priorities = {"live-com": ("live", 20), "premium-big-com": (None, 90), "premium-small-com": ("pending_review", 75),
+                  "high-com": (None, 60), "low-com": (None, 3), "unscored-com": ("pending_review", None)}
+
+    ordered, counts = prioritize(jobs, priorities)
+    assert [job.key[len(PREFIX):].split("-1700")[0] for job in ordered] == [
+        "live-com", "premium-small-com", "premium-big-com", "high-com", "low-com", "unscored-com", "stray-xyz"]
+    assert counts == {"live": 1, "premium": 2, "high": 1, "low": 1, "unscored": 1, "unknown": 1}
+
+
+def test_upload_follows_the_preprocess_ranking(standin, tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv("R2_ACCESS_KEY_ID", standin.config().access_key_id)
+    monkeypatch.setenv("R2_SECRET_ACCESS_KEY", standin.config().secret_access_key)
+    monkeypatch.setenv("R2_ENDPOINT_URL", standin.url)
+    sites = [{"domain": f"site{i}.com", "success": True, "data": {"ahrefsDR": str(i * 10), "spamScore": "1%",
+                                                                   "googleNews": "Yes" if i > 5 else "No"}}
+             for i in range(10)]
+    (tmp_path / "dump.json").write_text(json.dumps(sites))
+    preprocess(str(tmp_path / "dump.json"), str(tmp_path / "scored"), batch_size=4, live_threshold=50,
+               top_live_count=2, vectorized=False)
+    records = [r for name in sorted((tmp_path / "scored").glob("batch-*.json")) for r in json.loads(name.read_text())]
+    assert [r["status"] for r in records[:3]] == ["live", "live", "pending_review"]
+    # Same-size files: by class (live, then tier), then by name
+    ranked = [domain for _, domain in sorted((priority_class(r["status"], r["quality"]["score"]),
+                                              r["site"]["domain"].replace(".", "-")) for r in records)]
+    thumbs = tmp_path / "thumbs"
+    _thumbs(thumbs, {domain: 100 for domain in ranked[::-1]})
+    _thumbs(thumbs, {"unlisted-com": 1})
+
+    assert main(["upload", "--source", str(thumbs), "--journal", str(tmp_path / "journal.sqlite"),
+                 "--priority", str(tmp_path / "scored"), "--concurrency", "1", "--no-metrics"]) == 0
+    assert "🎯 Priority order (10 domains" in capsys.readouterr().out
+    uploaded = [key[len(PREFIX):].split("-1700")[0] for key in standin.objects()]
+    assert uploaded == [*ranked, "unlisted-com"]
+
+    with pytest.raises(SystemExit):
+        main(["upload", "--source", str(thumbs), "--priority", str(tmp_path / "missing.json"), "--dry-run",
+              "--no-metrics"])
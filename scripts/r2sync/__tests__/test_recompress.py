@@ -0,0 +1,60 @@
+import os
+import random
+
+import pytest
+
+from r2sync.journal import Journal
+from r2sync.recompress import RecompressStats, TARGET_HEIGHT, TARGET_WIDTH, pillow_available, recompress_jobs
+from r2sync.scan import iter_jobs
+from r2sync.uploader import UploadJob, upload_files
+
+
+def test_journal_records_the_original_of_a_derived_file(standin, tmp_path):
+    original = tmp_path / "site-1700000000000-thumb.webp"
+    original.write_bytes(b"RIFF" + b"o" * 500)
+    derived = tmp_path / "derived.webp"
+    derived.write_bytes(b"RIFF" + b"d" * 100)
+    job = UploadJob(derived, "screenshots/thumbnails/site-1700000000000-thumb.webp", source=original)
+    journal = Journal(str(tmp_path / "journal.sqlite"))
+
+    upload_files([job], standin.config(), concurrency=1, journal=journal)
+
+    assert standin.objects()[job.key].data == derived.read_bytes()
+    st = os.stat(original)
+    assert journal.is_done(job.key, st.st_size, st.st_mtime_ns)
+    assert list(journal.skip_done([UploadJob(original, job.key)])) == []
+    journal.close()
+
+
+def test_oversized_thumbnails_are_recompressed_when_smaller(standin, tmp_path):
+    Image = pytest.importorskip("PIL.Image")
+    if not pillow_available():
+        pytest.skip("Pillow built without webp")
+
+    root = tmp_path / "thumbnails"
+    root.mkdir()
+    rng = random.Random(0)
+    # A full-page capture saved losslessly: far larger than a 400x300 q70 thumbnail
+    noisy = Image.frombytes("RGB", (1280, 2400), rng.randbytes(1280 * 2400 * 3))
+    noisy.save(root / "big-com-1700000000000-thumb.webp", "WEBP", lossless=True)
+    # Already a small flat thumbnail: re-encoding will not beat it
+    Image.new("RGB", (TARGET_WIDTH, TARGET_HEIGHT), "white").save(
+        root / "flat-com-1700000000000-thumb.webp", "WEBP", quality=10)
+    (root / "broken-com-1700000000000-thumb.webp").write_bytes(b"not an image")
+
+    stats = RecompressStats()
+    out = tmp_path / "recompressed"
+    jobs = list(recompress_jobs(iter_jobs(root), stats, out_dir=str(out), workers=2))
+
+    assert stats.files == 3
+    assert stats.recompressed == 1 and stats.kept_original == 1 and stats.failed == 1
+    assert stats.bytes_saved > 0
+    big = next(job for job in jobs if "big-com" in job.key)
+    assert big.source == root / "big-com-1700000000000-thumb.webp"
+    with Image.open(big.path) as image:
+        assert image.size == (TARGET_WIDTH, TARGET_HEIGHT)
+    assert next(job for job in jobs if "flat-com" in job.key).source is None
+
+    result = upload_files(jobs, standin.config(), concurrency=2)
+    assert result.uploaded == 3
+    assert standin.objects()[big.key].data == big.path.read_bytes()
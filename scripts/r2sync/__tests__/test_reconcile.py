@@ -0,0 +1,134 @@
+import csv
+import json
+import os
+import uuid
+
+import pytest
+
+from r2sync.cli import main
+from r2sync.reconcile import (ATTACH, RECAPTURE, REPOINT, ProductRow, apply_fixes, query_products, reconcile,
+                              thumbnail_domain)
+from r2sync.s3 import ObjectInfo
+from r2sync.standin import StoredObject
+
+PREFIX = "screenshots/thumbnails/"
+CDN = "https://cdn.example.com"
+
+
+def _objects(*names):
+    return [ObjectInfo(PREFIX + name, 10, "etag") for name in names]
+
+
+def _rows():
+    return [
+        ProductRow("1", "https://www.alpha.com", PREFIX + "alpha-com-1700000000000-thumb.webp",
+                   f"{CDN}/{PREFIX}alpha-com-1700000000000-thumb.webp"),
+        # Points at a version gc removed; a newer capture exists
+        ProductRow("2", "https://beta.io/blog", PREFIX + "beta-io-1600000000000-thumb.webp",
+                   f"{CDN}/{PREFIX}beta-io-1600000000000-thumb.webp"),
+        # Points at nothing, and nothing exists for the domain
+        ProductRow("3", "https://gamma.net", None, f"/{PREFIX}gamma-net-1700000000000-thumb.webp"),
+        ProductRow("4", "https://delta.org"),  # never linked, but captured
+        ProductRow("5", "https://epsilon.dev"),  # never captured
+        ProductRow("6", "https://zeta.app", None, "https://www.google.com/s2/favicons?domain=zeta.app"),
+    ]
+
+
+def test_thumbnail_domain_matches_screenshot_storage():
+    assert thumbnail_domain("https://www.Example.com/path?q=1") == "example-com"
+    assert thumbnail_domain("http://blog.foo.co.uk") == "blog-foo-co-uk"
+    assert thumbnail_domain("example.com/x") == "example-com"
+    assert thumbnail_domain("https://shop.www.site.com") == "shop-site-com"  # JS replace("www.", "") hits once
+
+
+def test_join_reports_and_plans_fixes():
+    objects = _objects("alpha-com-1700000000000-thumb.webp", "alpha-com-1600000000000-thumb.webp",
+                       "beta-io-1700000000000-thumb.webp", "beta-io-1750000000000-thumb.webp",
+                       "delta-org-1700000000000-thumb.webp", "stray-xyz-1700000000000-thumb.webp")
+
+    report = reconcile(_rows(), objects)
+
+    assert (report.rows, report.objects, report.ok, report.external) == (6, 6, 1, 1)
+    assert report.missing == [("2", PREFIX + "beta-io-1600000000000-thumb.webp"),
+                              ("3", PREFIX + "gamma-net-1700000000000-thumb.webp")]
+    assert report.without == ["4", "5"]
+    assert [(f.product_id, f.action, f.key) for f in report.fixes] == [
+        ("2", REPOINT, PREFIX + "beta-io-1750000000000-thumb.webp"),
+        ("3", RECAPTURE, None),
+        ("4", ATTACH, PREFIX + "delta-org-1700000000000-thumb.webp"),
+    ]
+    # beta's older capture and alpha's previous version belong to known domains: superseded, not orphaned
+    assert report.orphans == [PREFIX + "stray-xyz-1700000000000-thumb.webp"] and report.superseded == 2
+
+
+def test_reconcile_command_from_a_csv_export(standin, tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv("R2_ACCESS_KEY_ID", standin.config().access_key_id)
+    monkeypatch.setenv("R2_SECRET_ACCESS_KEY", standin.config().secret_access_key)
+    monkeypatch.setenv("R2_ENDPOINT_URL", standin.url)
+    objects = standin.objects()
+    for name in ("alpha-com-1700000000000-thumb.webp", "beta-io-1750000000000-thumb.webp"):
+        objects[PREFIX + name] = StoredObject(b"RIFF", "etag")
+    rows = tmp_path / "products.csv"
+    with rows.open("w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "url", "screenshot_r2_key", "screenshot_thumbnail_url", "screenshot_full_url",
+                         "screenshot_status"])
+        for row in _rows():
+            writer.writerow([row.id, row.url, row.r2_key or "", row.thumbnail_url or "", "", "captured"])
+
+    assert main(["reconcile", "--rows", str(rows), "--report", str(tmp_path / "report.json"), "--no-metrics"]) == 1
+    out = capsys.readouterr().out
+    assert "References to missing objects: 2" in out and "1 repoint" in out
+    report = json.loads((tmp_path / "report.json").read_text())
+    assert report["fixes"] == {"repoint": 1, "attach": 0, "recapture": 1}
+    assert report["withoutScreenshot"] == ["4", "5"]
+    assert main(["reconcile", "--rows", str(rows), "--fix"]) == 1  # --fix needs the database
+
+
+@pytest.fixture
+def database_url():
+    """A scratch schema in the Postgres at R2SYNC_TEST_DATABASE_URL (e.g. a local docker postgres)"""
+    url = os.environ.get("R2SYNC_TEST_DATABASE_URL")
+    if not url:
+        pytest.skip("set R2SYNC_TEST_DATABASE_URL to run against a local Postgres")
+    psycopg = pytest.importorskip("psycopg")
+    schema = f"r2sync_test_{uuid.uuid4().hex[:8]}"
+    with psycopg.connect(url, autocommit=True) as connection:
+        connection.execute(f"CREATE SCHEMA {schema}")
+        connection.execute(f"""
+            CREATE TABLE {schema}.products (
+                id uuid PRIMARY KEY, url text NOT NULL, screenshot_r2_key text, screenshot_thumbnail_url text,
+                screenshot_full_url text, screenshot_status text, screenshot_next_capture_at timestamptz,
+                updated_at timestamptz)
+        """)
+    separator = "&" if "?" in url else "?"
+    yield f"{url}{separator}options=-csearch_path%3D{schema}"
+    with psycopg.connect(url, autocommit=True) as connection:
+        connection.execute(f"DROP SCHEMA {schema} CASCADE")
+
+
+def test_streams_products_and_writes_fixes_back_in_batches(database_url):
+    import psycopg
+
+    ids = {row.id: str(uuid.uuid4()) for row in _rows()}
+    with psycopg.connect(database_url) as connection:
+        for row in _rows():
+            connection.execute(
+                "INSERT INTO products (id, url, screenshot_r2_key, screenshot_thumbnail_url) VALUES (%s, %s, %s, %s)",
+                (ids[row.id], row.url, row.r2_key, row.thumbnail_url))
+    objects = _objects("alpha-com-1700000000000-thumb.webp", "beta-io-1750000000000-thumb.webp",
+                       "delta-org-1700000000000-thumb.webp")
+
+    report = reconcile(query_products(database_url, page=2), objects)
+    assert len(report.fixes) == 3
+    # A capture lands for gamma between the read and the write: its fix must not clobber it
+    with psycopg.connect(database_url) as connection:
+        connection.execute("UPDATE products SET screenshot_thumbnail_url = 'new' WHERE id = %s", (ids["3"],))
+
+    assert apply_fixes(database_url, report.fixes, CDN, batch_size=2) == 2
+    with psycopg.connect(database_url) as connection:
+        rows = dict(connection.execute(
+            "SELECT id::text, screenshot_thumbnail_url FROM products WHERE id = ANY(%s::uuid[])",
+            ([ids["2"], ids["3"], ids["4"]],)).fetchall())
+    assert rows == {ids["2"]: f"{CDN}/{PREFIX}beta-io-1750000000000-thumb.webp", ids["3"]: "new",
+                    ids["4"]: f"{CDN}/{PREFIX}delta-org-1700000000000-thumb.webp"}
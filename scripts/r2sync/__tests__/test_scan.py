@@ -0,0 +1,46 @@
+from r2sync.scan import iter_files, iter_jobs
+from r2sync.uploader import UploadJob, upload_files
+
+
+def test_iter_jobs_walks_nested_directories(tmp_path):
+    (tmp_path / "a" / "b").mkdir(parents=True)
+    (tmp_path / "top-thumb.webp").write_bytes(b"1")
+    (tmp_path / "a" / "b" / "deep-thumb.webp").write_bytes(b"2")
+    (tmp_path / "a" / "notes.txt").write_bytes(b"3")
+
+    keys = sorted(job.key for job in iter_jobs(tmp_path))
+
+    assert keys == [
+        "screenshots/thumbnails/a/b/deep-thumb.webp",
+        "screenshots/thumbnails/top-thumb.webp",
+    ]
+    assert len(list(iter_files(tmp_path, (".txt",)))) == 1
+
+
+def test_uploads_start_before_the_scan_finishes_and_buffer_stays_bounded(standin, tmp_path):
+    blob = tmp_path / "blob.webp"
+    blob.write_bytes(b"RIFF" + b"x" * 64)
+    concurrency = 4
+    produced = 0
+    max_ahead = 0
+    completed_when_scan_ended = None
+    stats_ref = {"completed": 0}
+
+    def jobs():
+        nonlocal produced, completed_when_scan_ended
+        for i in range(1000):
+            produced += 1
+            yield UploadJob(blob, f"screenshots/thumbnails/site-{i}-thumb.webp")
+        completed_when_scan_ended = stats_ref["completed"]
+
+    def on_result(result, stats):
+        nonlocal max_ahead
+        stats_ref["completed"] = stats.completed
+        max_ahead = max(max_ahead, produced - stats.completed)
+
+    stats = upload_files(jobs(), standin.config(), concurrency=concurrency, on_result=on_result)
+
+    assert stats.uploaded == 1000
+    assert completed_when_scan_ended > 0
+    # queue (2 * concurrency) + in flight (concurrency) + the one being put
+    assert max_ahead <= 3 * concurrency + 1
@@ -0,0 +1,97 @@
+import json
+import os
+
+import pytest
+
+from r2sync.cli import main
+from r2sync.jobs import UploadJob
+from r2sync.planner import scan_local
+from r2sync.screening import FlaggedFilter, load_flagged
+
+
+def _flag(path, keys_and_paths):
+    flagged = {}
+    for key, file in keys_and_paths:
+        st = os.stat(file)
+        flagged[key] = {"path": str(file), "size": st.st_size, "mtimeNs": st.st_mtime_ns, "domain": "x",
+                        "reason": "blank"}
+    path.write_text(json.dumps({"flagged": flagged}))
+
+
+def test_flagged_files_stay_out_until_they_change(thumbnails, tmp_path):
+    files = scan_local(thumbnails)
+    flagged_path = tmp_path / "flagged.json"
+    _flag(flagged_path, [(f.key, f.path) for f in files[:3]])
+
+    keep = FlaggedFilter(load_flagged(str(flagged_path)))
+    assert len(list(keep(files))) == 37 and keep.dropped == 3
+
+    # A re-capture written over the same name is no longer flagged
+    files[0].path.write_bytes(b"RIFF new capture")
+    jobs = [UploadJob(f.path, f.key) for f in files]
+    keep = FlaggedFilter(load_flagged(str(flagged_path)))
+    assert len(list(keep(jobs))) == 38 and keep.dropped == 2
+    assert load_flagged(str(tmp_path / "never-screened.json")) == {}
+
+
+def test_upload_leaves_flagged_thumbnails_out(thumbnails, tmp_path, capsys):
+    files = scan_local(thumbnails)
+    flagged_path = tmp_path / "flagged.json"
+    _flag(flagged_path, [(f.key, f.path) for f in files[:5]])
+    args = ["upload", "--dry-run", "--source", str(thumbnails), "--journal", str(tmp_path / "journal.sqlite"),
+            "--flagged", str(flagged_path)]
+
+    assert main(args) == 0
+    out = capsys.readouterr().out
+    assert "35 files" in out and "Left out 5 flagged" in out
+    assert main([*args, "--include-flagged"]) == 0
+    assert "40 files" in capsys.readouterr().out
+
+
+def test_hashes_and_distances_are_vectorised():
+    np = pytest.importorskip("numpy")
+    from r2sync.screening import ahash, classify, dhash, dominant_colours, features, grey_levels, hamming
+
+    rng = np.random.default_rng(0)
+    gradient = np.tile(np.linspace(0, 255, 32, dtype=np.uint8)[None, :, None], (24, 1, 3))
+    rgb = np.stack([gradient, gradient[:, ::-1], np.full((24, 32, 3), 250, np.uint8),
+                    rng.integers(0, 256, (24, 32, 3), dtype=np.uint8)])
+    grey = grey_levels(rgb)
+
+    d = dhash(grey)
+    assert d.dtype == np.uint64 and d.shape == (4,)
+    assert int(d[0]) == 0xFFFFFFFFFFFFFFFF and int(d[1]) == 0  # brighter to the right / to the left
+    assert int(ahash(grey)[0]) == int(ahash(grey)[1]) ^ 0xFFFFFFFFFFFFFFFF
+    assert hamming(d[:2], d[:2]).tolist() == [[0, 64], [64, 0]]
+    colour, share = dominant_colours(rgb)
+    assert share[2] == 1.0 and colour[2].tolist() == [240, 240, 240]
+
+    feats = {"path": ["a", "b", "c", "d"], "ok": np.array([True, True, True, False]), **features(rgb)}
+    from r2sync.screening import Template
+
+    templates = [Template("left-to-right", int(d[0]), int(ahash(grey)[0]))]
+    assert classify(feats, templates) == ["template:left-to-right", "", "blank", "undecodable"]
+
+
+def test_screen_flags_blank_and_template_captures(thumbnails, tmp_path):
+    pytest.importorskip("numpy")
+    Image = pytest.importorskip("PIL.Image")
+    from r2sync.screening import load_cache, screen, template_from_image
+
+    root = tmp_path / "shots"
+    root.mkdir()
+    challenge = Image.effect_mandelbrot((400, 300), (-2, -1.2, 1, 1.2), 50).convert("RGB")
+    challenge.save(root / "example-com-1700000000000-thumb.webp", "WEBP", quality=90)
+    challenge.save(root / "other-net-1700000000000-thumb.webp", "WEBP", quality=60)
+    Image.new("RGB", (400, 300), "white").save(root / "blank-org-1700000000000-thumb.webp", "WEBP")
+    Image.radial_gradient("L").resize((400, 300)).convert("RGB").save(root / "fine-io-1700000000000-thumb.webp")
+    files = scan_local(root)
+    templates = [template_from_image(root / "example-com-1700000000000-thumb.webp", "challenge")]
+
+    report = screen(files, templates, workers=1, cache_path=str(tmp_path / "hashes.npz"))
+
+    assert {entry["domain"]: entry["reason"] for entry in report.flagged.values()} == {
+        "example-com": "template:challenge", "other-net": "template:challenge", "blank-org": "blank"}
+    assert report.decoded == 4
+    assert len(load_cache(str(tmp_path / "hashes.npz"))["path"]) == 4
+    assert screen(files, templates, workers=1, cache_path=str(tmp_path / "hashes.npz")).decoded == 0
@@ -0,0 +1,104 @@
+import argparse
+import json
+import sqlite3
+from collections import Counter
+
+import pytest
+
+from r2sync.cli import main
+from r2sync.journal import IN_FLIGHT, PENDING, Journal
+from r2sync.metrics import Histogram, merge_summaries
+from r2sync.shard import Shard, ShardBusy, ShardLock, parse_shard, shard_index
+
+KEYS = [f"screenshots/thumbnails/site-{i}-1700000000000-thumb.webp" for i in range(4000)]
+
+
+@pytest.fixture
+def r2_env(standin, monkeypatch):
+    monkeypatch.setenv("R2_ACCESS_KEY_ID", standin.config().access_key_id)
+    monkeypatch.setenv("R2_SECRET_ACCESS_KEY", standin.config().secret_access_key)
+    monkeypatch.setenv("R2_ENDPOINT_URL", standin.url)
+
+
+def test_partition_is_balanced_and_consistent():
+    four = [shard_index(key, 4) for key in KEYS]
+    assert all(900 < n < 1100 for n in Counter(four).values())
+    # Growing to five shards only moves keys into the new shard
+    five = [shard_index(key, 5) for key in KEYS]
+    moved = [(a, b) for a, b in zip(four, five) if a != b]
+    assert {b for _, b in moved} == {4} and 600 < len(moved) < 1000
+    assert sum(Shard(i, 4).owns(KEYS[0]) for i in range(4)) == 1
+
+
+def test_parse_shard():
+    assert parse_shard("2/4") == Shard(1, 4) and str(Shard(1, 4)) == "2/4"
+    for bad in ("0/4", "5/4", "x", "1-4"):
+        with pytest.raises(argparse.ArgumentTypeError):
+            parse_shard(bad)
+
+
+def test_shard_lock_is_exclusive(tmp_path):
+    journal = str(tmp_path / "journal.sqlite")
+    with ShardLock(journal, Shard(0, 2)):
+        with pytest.raises(ShardBusy, match="pid"):
+            ShardLock(journal, Shard(0, 2)).acquire()
+        with ShardLock(journal, Shard(1, 2)):
+            pass
+    ShardLock(journal, Shard(0, 2)).acquire().release()
+
+
+def test_journal_recovers_only_its_own_shard(tmp_path):
+    path = str(tmp_path / "journal.sqlite")
+    journal = Journal(path)
+    journal.db.executemany("INSERT INTO uploads (key, path, state) VALUES (?, ?, ?)",
+                           [(key, "x", IN_FLIGHT) for key in KEYS[:100]])
+    journal.db.commit()
+    journal.close()
+    shard = Shard(0, 2)
+    mine = sum(shard.owns(key) for key in KEYS[:100])
+    assert Journal(path, shard).recovered == mine
+    states = dict(sqlite3.connect(path).execute("SELECT key, state FROM uploads").fetchall())
+    assert all(states[key] == (PENDING if shard.owns(key) else IN_FLIGHT) for key in KEYS[:100])
+
+
+def test_sharded_upload_covers_every_key_once(r2_env, standin, thumbnails, tmp_path):
+    journal = str(tmp_path / "journal.sqlite")
+    for i in (1, 2, 3):
+        assert main(["upload", "--source", str(thumbnails), "--journal", journal, "--shard", f"{i}/3"]) == 0
+    assert len(standin.objects()) == 40
+    assert standin.requests["PUT"] == 40
+    assert Journal(journal).counts() == {"done": 40}
+
+
+def test_merge_summaries_adds_histograms():
+    def summary(latencies, seconds):
+        histogram = Histogram()
+        for value in latencies:
+            histogram.observe(value)
+        return {"command": "upload", "runs": 1, "seconds": seconds, "uploads": {"ok": len(latencies), "failed": 0},
+                "error_classes": {}, "bytes": 10 * len(latencies), "attempts": len(latencies),
+                "latency": {"ok": histogram.to_dict()}, "phases": {"upload": seconds}, "phase_cpu": {}}
+
+    merged = merge_summaries([summary([0.01, 0.2], 3.0), summary([0.3], 5.0)])
+    assert merged["runs"] == 2 and merged["seconds"] == 5.0 and merged["uploads"] == {"ok": 3, "failed": 0}
+    assert merged["latency"]["ok"]["count"] == 3 and merged["phases"] == {"upload": 8.0}
+
+
+def test_fanout_runs_workers_and_merges(r2_env, standin, thumbnails, tmp_path, capsys):
+    runs = tmp_path / "runs"
+    assert main(["fanout", "--workers", "3", "--metrics-dir", str(runs), "sync",
+                 "--source", str(thumbnails), "--manifest", str(tmp_path / "m.sqlite"), "--full"]) == 0
+    assert len(standin.objects()) == 40 and standin.requests["PUT"] == 40
+    # Every site-* key is in one listing range: listed once for the three workers, not once each
+    assert standin.requests["GET"] == 1
+    assert "✅ Uploaded: 40" in capsys.readouterr().out
+    (run_dir,) = runs.iterdir()
+    merged = json.loads((run_dir / "merged" / "summary.json").read_text())
+    assert merged["runs"] == 3 and merged["uploads"]["ok"] == 40
+    assert 'r2sync_uploads_total{status="ok"} 40' in (run_dir / "merged" / "metrics.prom").read_text()
+    shards = {json.loads(line)["shard"] for line in open(run_dir / "merged" / "events.jsonl")
+              if '"run_start"' in line}
+    assert shards == {"1/3", "2/3", "3/3"}
+
+    assert main(["merge-runs", str(run_dir / "workers"), "--out", str(tmp_path / "again")]) == 0
+    assert json.loads((tmp_path / "again" / "summary.json").read_text())["uploads"]["ok"] == 40
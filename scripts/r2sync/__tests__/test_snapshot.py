@@ -0,0 +1,94 @@
+import json
+import os
+
+import pytest
+
+from r2sync.cli import main
+from r2sync.config import SNAPSHOT_PREFIX
+from r2sync.snapshot import SnapshotError, export_snapshot, load_index, plan_shards, restore_snapshot
+from r2sync.standin import StoredObject
+
+
+def _tree(thumbnails):
+    nested = thumbnails / "2024" / "legacy-1600000000000-thumb.png"
+    nested.parent.mkdir()
+    nested.write_bytes(os.urandom(3000))  # Incompressible, and spans several ranged reads
+    return {path.relative_to(thumbnails).as_posix(): path.read_bytes()
+            for path in thumbnails.rglob("*") if path.is_file()}
+
+
+def _export(standin, thumbnails, tmp_path):
+    return export_snapshot(standin.config(), thumbnails, shard_size=1500, work_dir=str(tmp_path / "work"),
+                           snapshot="20261017T000000Z", multipart_threshold=1024, part_size=1024)
+
+
+def test_shards_are_planned_by_size_in_name_order(thumbnails):
+    shards = plan_shards(thumbnails, shard_size=1000)
+    names = [name for shard in shards for name in shard]
+    assert names == sorted(names) and len(names) == 40
+    assert all(len(shard) <= 9 for shard in shards)  # 104..143 bytes each
+
+
+def test_export_then_streaming_restore(standin, thumbnails, tmp_path):
+    files = _tree(thumbnails)
+    index, stats = _export(standin, thumbnails, tmp_path)
+
+    assert stats.files == index["files"] == 41 and stats.shards == len(index["shards"]) > 3
+    assert not (tmp_path / "work" / index["id"]).exists()  # No shard left behind
+    objects = standin.objects()
+    assert json.loads(objects[SNAPSHOT_PREFIX + "latest.json"].data) == {"id": "20261017T000000Z"}
+    assert objects[SNAPSHOT_PREFIX + "latest.json"].metadata["cache-control"] == "no-cache"
+    assert any("-" in objects[shard["key"]].etag for shard in index["shards"])  # Went up in parts
+
+    dest = tmp_path / "restored"
+    stats = restore_snapshot(standin.config(), load_index(standin.config()), dest, concurrency=2,
+                             range_size=256, prefetch=3)
+    assert not stats.failed and (stats.files, stats.shards) == (41, len(index["shards"]))
+    assert {p.relative_to(dest).as_posix(): p.read_bytes() for p in dest.rglob("*") if p.is_file()} == files
+    assert all(os.stat(dest / name).st_mtime == int(os.stat(thumbnails / name).st_mtime) for name in files)
+
+    # Only the shard holding a lost file is fetched again
+    (dest / "site-7-1700000000000-thumb.webp").unlink()
+    gets = standin.requests["GET"]
+    stats = restore_snapshot(standin.config(), index, dest)
+    assert (stats.files, stats.shards, stats.skipped_shards) == (1, 1, len(index["shards"]) - 1)
+    assert standin.requests["GET"] - gets == 1  # Shards fit in one range
+    assert (dest / "site-7-1700000000000-thumb.webp").read_bytes() == files["site-7-1700000000000-thumb.webp"]
+
+
+def test_corrupt_shards_fail_without_leaving_files(standin, thumbnails, tmp_path):
+    index, _ = _export(standin, thumbnails, tmp_path)
+    shard = index["shards"][1]
+    stored = standin.objects()[shard["key"]]
+    standin.objects()[shard["key"]] = StoredObject(stored.data[:len(stored.data) // 2], stored.etag)
+
+    dest = tmp_path / "restored"
+    stats = restore_snapshot(standin.config(), index, dest, range_size=128)
+    assert [key for key, _ in stats.failed] == [shard["key"]]
+    assert stats.files == 40 - shard["files"]
+    assert not list(dest.glob("*.part"))
+
+
+def test_unsafe_index_paths_are_refused(standin):
+    standin.objects()[SNAPSHOT_PREFIX + "evil/index.json"] = StoredObject(
+        json.dumps({"entries": [["../../.bashrc", 0, 512, 1, 0, 0]], "shards": []}).encode(), "etag")
+    with pytest.raises(SnapshotError, match="unsafe path"):
+        load_index(standin.config(), "evil")
+    with pytest.raises(SnapshotError, match="no snapshot latest"):
+        load_index(standin.config())
+
+
+def test_snapshot_and_restore_commands(standin, thumbnails, tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv("R2_ACCESS_KEY_ID", standin.config().access_key_id)
+    monkeypatch.setenv("R2_SECRET_ACCESS_KEY", standin.config().secret_access_key)
+    monkeypatch.setenv("R2_ENDPOINT_URL", standin.url)
+
+    assert main(["snapshot", "--source", str(thumbnails), "--dry-run"]) == 0
+    assert "40 files" in capsys.readouterr().out and not standin.objects()
+    assert main(["snapshot", "--source", str(thumbnails), "--no-metrics"]) == 0
+    assert "Snapshot" in capsys.readouterr().out
+    dest = tmp_path / "restored"
+    assert main(["restore", "--dest", str(dest), "--no-metrics"]) == 0
+    assert "Restored: 40 files" in capsys.readouterr().out
+    assert sorted(p.name for p in dest.iterdir()) == sorted(p.name for p in thumbnails.iterdir())
+    assert main(["restore", "--dest", str(dest), "--snapshot", "missing", "--no-metrics"]) == 1
@@ -0,0 +1,58 @@
+import asyncio
+import hashlib
+
+from r2sync.config import R2Config
+from r2sync.s3 import S3Client, S3Error
+from r2sync.scan import iter_jobs
+from r2sync.uploader import UploadJob, upload_files
+
+
+def test_uploads_tree_over_pooled_connections(standin, thumbnails):
+    jobs = iter_jobs(thumbnails)
+    stats = upload_files(jobs, standin.config(), concurrency=4)
+
+    assert stats.uploaded == 40
+    assert stats.failed == 0
+    assert standin.connections <= 4
+
+    objects = standin.objects()
+    stored = objects["screenshots/thumbnails/site-7-1700000000000-thumb.webp"]
+    local = (thumbnails / "site-7-1700000000000-thumb.webp").read_bytes()
+    assert stored.data == local
+    assert stored.etag == hashlib.md5(local).hexdigest()
+    assert stored.content_type == "image/webp"
+
+
+def test_bad_credentials_are_reported_as_failures(standin, thumbnails):
+    good = standin.config()
+    bad = R2Config(good.access_key_id, "wrong-secret", good.endpoint_url, good.bucket)
+
+    stats = upload_files(iter_jobs(thumbnails), bad, concurrency=2)
+
+    assert stats.uploaded == 0
+    assert stats.failed == 40
+    assert "SignatureDoesNotMatch" in stats.failures[0][1]
+
+
+def test_missing_file_fails_without_stopping_the_run(standin, thumbnails):
+    missing = UploadJob(thumbnails / "gone.webp", "screenshots/thumbnails/gone.webp")
+
+    stats = upload_files([missing, *iter_jobs(thumbnails)], standin.config(), concurrency=2)
+
+    assert stats.uploaded == 40
+    assert stats.failed == 1
+
+
+def test_client_round_trip_with_keys_needing_encoding(standin):
+    async def run():
+        async with S3Client(standin.config()) as client:
+            await client.put_object("screenshots/a b+c.webp", b"data", "image/webp")
+            assert await client.get_object("screenshots/a b+c.webp") == b"data"
+            await client.delete_object("screenshots/a b+c.webp")
+            assert await client.head_object("screenshots/a b+c.webp") is None
+            try:
+                await client.get_object("screenshots/a b+c.webp")
+            except S3Error as e:
+                return e.status
+
+    assert asyncio.run(run()) == 404
@@ -0,0 +1,125 @@
+import os
+
+import pytest
+
+from r2sync.cli import main
+from r2sync.variants import (VariantState, VariantStats, available_formats, build_variant_manifest,
+                             generate_variants, plan_variants, scan_sources, variant_key)
+
+
+def _rendered(state, sources, widths, formats, out_dir, quality=None):
+    """Record every planned variant as rendered, as a worker would"""
+    quality = quality or {"webp": 70, "avif": 50}
+    for source in sources:
+        entry = state.entry(source)
+        entry["width"] = 400
+        for fmt in formats:
+            for width in widths:
+                key = variant_key(source.key, width, fmt)
+                path = os.path.join(out_dir, key)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, "wb") as f:
+                    f.write(b"x" * width)
+                entry["variants"][f"{fmt}/{width}"] = {"quality": quality[fmt], "bytes": width}
+
+
+def test_variant_keys_sit_beside_the_thumbnail_name():
+    key = "screenshots/thumbnails/example-com-1700000000000-thumb.webp"
+    assert variant_key(key, 240, "avif") == "screenshots/variants/example-com-1700000000000-thumb-240w.avif"
+
+
+def test_only_missing_or_stale_variants_are_planned(thumbnails, tmp_path):
+    out = str(tmp_path / "variants")
+    sources = scan_sources(thumbnails)[:3]
+    state = VariantState(str(tmp_path / "state.json"))
+    plan = plan_variants(sources, state, (160, 320), ("webp",), out_dir=out)
+    assert plan.variants_to_render == 6 and plan.fresh == 0
+
+    _rendered(state, sources, (160, 320), ("webp",), out)
+    state.save()
+    state = VariantState(str(tmp_path / "state.json"))
+    assert plan_variants(sources, state, (160, 320), ("webp",), out_dir=out).variants_to_render == 0
+
+    # A new width renders just that width; widths past the source's own are never planned
+    plan = plan_variants(sources, state, (160, 240, 320, 800), ("webp",), out_dir=out)
+    assert plan.variants_to_render == 3 and plan.fresh == 6
+    assert {width for _, outputs in plan.render for _, width, _ in outputs} == {240}
+
+    # A changed quality, a deleted output or a re-captured source makes a variant stale
+    assert plan_variants(sources, state, (160,), ("webp",), {"webp": 80}, out).variants_to_render == 3
+    os.remove(os.path.join(out, variant_key(sources[0].key, 160, "webp")))
+    os.utime(sources[1].path, ns=(1, 1))
+    sources = scan_sources(thumbnails)[:3]
+    plan = plan_variants(sources, state, (160, 320), ("webp",), out_dir=out)
+    assert sorted((source.path.name, width) for source, outputs in plan.render for _, width, _ in outputs) == sorted(
+        [(sources[0].path.name, 160), (sources[1].path.name, 160), (sources[1].path.name, 320)])
+
+
+def test_manifest_has_srcsets_for_the_newest_capture_without_failed_uploads(tmp_path):
+    root = tmp_path / "thumbs"
+    root.mkdir()
+    for name in ("a-com-1700000000000-thumb.webp", "a-com-1800000000000-thumb.webp", "b-com-1700000000000-thumb.webp"):
+        (root / name).write_bytes(b"RIFF")
+    out = str(tmp_path / "variants")
+    sources = scan_sources(root)
+    state = VariantState(str(tmp_path / "state.json"))
+    _rendered(state, sources, (160, 320), ("webp", "avif"), out)
+    b_key = next(s.key for s in sources if s.domain == "b-com")
+    failed = {variant_key(b_key, 320, "avif")}
+
+    manifest = build_variant_manifest(sources, state, "https://cdn.example/", failed)
+
+    a = manifest["domains"]["a-com"]
+    assert a["capturedAt"] == 1800000000000
+    assert list(a["formats"]) == ["avif", "webp"]
+    assert a["formats"]["webp"]["srcset"] == (
+        "https://cdn.example/screenshots/variants/a-com-1800000000000-thumb-160w.webp 160w, "
+        "https://cdn.example/screenshots/variants/a-com-1800000000000-thumb-320w.webp 320w")
+    assert a["formats"]["webp"]["variants"][0] == {
+        "width": 160, "height": 120, "key": "screenshots/variants/a-com-1800000000000-thumb-160w.webp", "size": 160}
+    assert [v["width"] for v in manifest["domains"]["b-com"]["formats"]["avif"]["variants"]] == [160]
+    assert "generatedAt" in manifest
+
+
+def test_variants_are_rendered_once_and_uploaded(standin, tmp_path):
+    Image = pytest.importorskip("PIL.Image")
+    if "webp" not in available_formats(("webp",)):
+        pytest.skip("Pillow built without webp")
+    from r2sync.journal import Journal
+    from r2sync.uploader import upload_files
+
+    root = tmp_path / "thumbnails"
+    root.mkdir()
+    Image.new("RGB", (400, 300), "red").save(root / "big-com-1700000000000-thumb.webp", "WEBP")
+    Image.new("RGB", (200, 150), "blue").save(root / "small-com-1700000000000-thumb.webp", "WEBP")
+    (root / "broken-com-1700000000000-thumb.webp").write_bytes(b"not an image")
+    out = str(tmp_path / "variants")
+    state = VariantState(str(tmp_path / "state.json"))
+    journal = Journal(str(tmp_path / "journal.sqlite"))
+    sources = scan_sources(root)
+
+    stats = VariantStats()
+    jobs = generate_variants(sources, state, stats, (160, 320), ("webp",), out_dir=out, workers=2)
+    result = upload_files(journal.skip_done(jobs), standin.config(), concurrency=2, journal=journal)
+
+    # 320w is wider than the small source, so it gets only 160w
+    assert stats.rendered == 3 and len(stats.failed_sources) == 1
+    assert result.uploaded == 3
+    key = variant_key(next(s.key for s in sources if s.domain == "big-com"), 160, "webp")
+    with Image.open(os.path.join(out, key)) as image:
+        assert image.size == (160, 120)
+    assert standin.objects()[key].data == open(os.path.join(out, key), "rb").read()
+
+    stats = VariantStats()
+    state = VariantState(str(tmp_path / "state.json"))
+    again = list(journal.skip_done(generate_variants(sources, state, stats, (160, 320), ("webp",), out_dir=out)))
+    assert stats.rendered == 0 and stats.reused == 3 and again == []
+    journal.close()
+
+
+@pytest.mark.parametrize("formats", ["png,webp", "jpeg", ","])
+def test_formats_outside_the_srcset_set_are_rejected(tmp_path, capsys, formats):
+    with pytest.raises(SystemExit) as exit_info:
+        main(["variants", "--source", str(tmp_path), "--formats", formats, "--no-upload"])
+    assert exit_info.value.code == 2
+    assert "expected a comma-separated subset of avif,webp" in capsys.readouterr().err
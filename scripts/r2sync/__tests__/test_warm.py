@@ -0,0 +1,62 @@
+import pytest
+
+from r2sync.cli import main
+from r2sync.standin import StandinCDN, StandinThread, StoredObject
+from r2sync.warm import cache_status, warm_keys
+
+PREFIX = "screenshots/thumbnails/"
+
+
+@pytest.fixture
+def cdn(standin):
+    with StandinThread(StandinCDN(standin, origin_latency=0.02)) as server:
+        yield server
+
+
+def test_cache_status_headers():
+    assert cache_status({"cf-cache-status": "HIT"}) == "HIT"
+    assert cache_status({"x-cache": "Miss from cloudfront"}) == "MISS"
+    assert cache_status({"x-cache": "HIT, MISS"}) == "HIT"
+    assert cache_status({}) == "NONE"
+
+
+def test_warm_reports_misses_then_hits(standin, cdn):
+    keys = [f"{PREFIX}site-{i}-1700000000000-thumb.webp" for i in range(30)]
+    for key in keys:
+        standin.objects()[key] = StoredObject(b"RIFF" * 10, "etag", "image/webp")
+
+    first = warm_keys(cdn.url, keys + [PREFIX + "missing.webp"], concurrency=8)
+    summary = first.summary()
+    assert summary["requests"] == 31 and summary["ok"] == 30 and summary["cache"] == {"MISS": 30}
+    assert summary["statuses"] == {200: 30, 404: 1} and summary["bytes"] == 30 * 40
+    assert summary["latency_ms"]["p50"] >= 20  # origin fetch
+    assert [r.key for r in first.failures()] == [PREFIX + "missing.webp"]
+    assert cdn.connections <= 8
+
+    second = warm_keys(cdn.url, keys, concurrency=8, method="HEAD")
+    assert second.summary()["cache"] == {"HIT": 30}
+    assert cdn.requests["HEAD"] == 30
+
+
+def test_sync_warms_exactly_the_uploaded_keys(standin, cdn, thumbnails, tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv("R2_ACCESS_KEY_ID", standin.config().access_key_id)
+    monkeypatch.setenv("R2_SECRET_ACCESS_KEY", standin.config().secret_access_key)
+    monkeypatch.setenv("R2_ENDPOINT_URL", standin.url)
+    monkeypatch.setenv("R2_PUBLIC_URL", cdn.url)
+    manifest = str(tmp_path / "m.sqlite")
+    (thumbnails / "site-0-1700000000000-thumb.webp").unlink()
+    assert main(["sync", "--source", str(thumbnails), "--manifest", manifest, "--warm"]) == 0
+    assert cdn.cache_status == {"MISS": 39}
+    assert "Cache: MISS 39" in capsys.readouterr().out
+
+    # Only the new file is uploaded and warmed on the next sync
+    (thumbnails / "site-0-1700000000000-thumb.webp").write_bytes(b"RIFFnew")
+    runs = tmp_path / "runs"
+    assert main(["sync", "--source", str(thumbnails), "--manifest", manifest, "--warm",
+                 "--metrics-dir", str(runs)]) == 0
+    assert cdn.cache_status == {"MISS": 40}
+
+    # Re-warm a previous run from its events
+    assert main(["warm", "--events", str(next(runs.iterdir())), "--confirm", "--no-metrics"]) == 0
+    assert cdn.cache_status == {"MISS": 40, "HIT": 2}
+    assert "Confirm (HEAD): 1/1 ok" in capsys.readouterr().out
@@ -0,0 +1,135 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+from r2sync.cli import main
+from r2sync.journal import Journal
+from r2sync.watch import CHANGED, REMOVED, Debouncer, PollingWatcher, WatchDaemon, load_watermark, run_watch
+
+linux_only = pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify is Linux-only")
+
+
+def _env(monkeypatch, standin):
+    monkeypatch.setenv("R2_ACCESS_KEY_ID", standin.config().access_key_id)
+    monkeypatch.setenv("R2_SECRET_ACCESS_KEY", standin.config().secret_access_key)
+    monkeypatch.setenv("R2_ENDPOINT_URL", standin.url)
+
+
+def _wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.02)
+
+
+def test_debouncer_releases_files_once_writes_stop():
+    now = [0.0]
+    debouncer = Debouncer(settle=1.0, clock=lambda: now[0])
+    debouncer.touch("a")
+    now[0] = 0.6
+    debouncer.touch("b")
+    debouncer.touch("a")  # Still being written
+    assert debouncer.ready() == [] and debouncer.next_due() == pytest.approx(1.0)
+    now[0] = 1.6
+    assert debouncer.ready() == ["a", "b"] and len(debouncer) == 0
+    debouncer.touch("c")
+    debouncer.discard("c")  # Deleted before it settled
+    now[0] = 5.0
+    assert debouncer.ready() == [] and debouncer.next_due() is None
+
+
+def test_polling_watcher_reports_changes_and_removals(thumbnails):
+    watcher = PollingWatcher(thumbnails, interval=0.0)
+    new = thumbnails / "sub" / "new-1700000000001-thumb.webp"
+    new.parent.mkdir()
+    new.write_bytes(b"RIFF")
+    (thumbnails / "site-0-1700000000000-thumb.webp").unlink()
+    (thumbnails / "notes.txt").write_text("ignored")
+
+    assert sorted(watcher.read(0.0)) == [(CHANGED, str(new)),
+                                          (REMOVED, str(thumbnails / "site-0-1700000000000-thumb.webp"))]
+    assert watcher.read(0.0) == []
+
+
+@linux_only
+def test_inotify_watcher_follows_new_directories(tmp_path):
+    from r2sync.watch import InotifyWatcher
+
+    root = tmp_path / "thumbs"
+    root.mkdir()
+    watcher = InotifyWatcher(root)
+    try:
+        (root / "a-1700000000000-thumb.webp").write_bytes(b"RIFF")
+        (root / "nested").mkdir()
+        events = watcher.read(1.0)
+        (root / "nested" / "b-1700000000000-thumb.webp").write_bytes(b"RIFF")
+        (root / "a-1700000000000-thumb.webp").unlink()
+        time.sleep(0.05)
+        events += watcher.read(1.0)
+    finally:
+        watcher.close()
+    assert (CHANGED, str(root / "a-1700000000000-thumb.webp")) in events
+    assert (CHANGED, str(root / "nested" / "b-1700000000000-thumb.webp")) in events
+    assert events[-1] == (REMOVED, str(root / "a-1700000000000-thumb.webp"))
+
+
+def test_daemon_uploads_new_files_in_batches_and_resumes_from_the_watermark(standin, thumbnails, tmp_path):
+    journal_path, state = str(tmp_path / "journal.sqlite"), str(tmp_path / "watch.json")
+    journal = Journal(journal_path)
+    daemon = WatchDaemon(thumbnails, journal, PollingWatcher(thumbnails, interval=0.05), state_path=state,
+                         settle=0.1, batch_wait=0.05)
+    runner = threading.Thread(target=run_watch, args=(daemon, standin.config(), 4))
+    runner.start()
+    try:
+        _wait_for(lambda: len(standin.objects()) == 40)  # First start: catch-up of the whole tree
+        (thumbnails / "fresh-1700000000001-thumb.webp").write_bytes(b"RIFF fresh")
+        (thumbnails / "site-3-1700000000000-thumb.webp").write_bytes(b"RIFF re-captured")
+        _wait_for(lambda: len(standin.objects()) == 41)
+        _wait_for(lambda: standin.objects()["screenshots/thumbnails/site-3-1700000000000-thumb.webp"].data
+                  == b"RIFF re-captured")
+    finally:
+        daemon.stop()
+        runner.join(10)
+    assert not runner.is_alive()
+    assert journal.counts() == {"done": 41}
+    journal.close()
+    watermark = load_watermark(state)
+    assert watermark is not None and watermark <= time.time_ns()
+
+    # While stopped: one new capture, and everything else older than the watermark
+    old = time.time() - 60
+    for path in thumbnails.iterdir():
+        os.utime(path, (old, old))
+    (thumbnails / "offline-1700000000002-thumb.webp").write_bytes(b"RIFF offline")
+    journal = Journal(journal_path)
+    daemon = WatchDaemon(thumbnails, journal, None, state_path=state)
+    stats = run_watch(daemon, standin.config(), 4, once=True)
+    assert stats.uploaded == 1 and "screenshots/thumbnails/offline-1700000000002-thumb.webp" in standin.objects()
+    journal.close()
+
+
+def test_watch_once_re_drives_failures_and_skips_done(standin, thumbnails, tmp_path, monkeypatch, capsys):
+    _env(monkeypatch, standin)
+    args = ["watch", "--once", "--source", str(thumbnails), "--journal", str(tmp_path / "journal.sqlite"),
+            "--state", str(tmp_path / "watch.json"), "--concurrency", "4", "--no-metrics"]
+
+    assert main(args) == 0
+    assert "40 files changed since the last run" in capsys.readouterr().out
+    assert len(standin.objects()) == 40
+
+    journal = Journal(str(tmp_path / "journal.sqlite"))
+    journal.db.execute("UPDATE uploads SET state = 'failed' WHERE key LIKE '%site-7-%'")
+    journal.db.commit()
+    journal.close()
+    assert main(args) == 0
+    out = capsys.readouterr().out
+    assert "1 failed or interrupted uploads from the journal" in out and "Uploaded: 1 in 1 batches" in out
+
+    # A catch-up run that could not upload everything exits non-zero
+    (thumbnails / "late-com-1800000000000-thumb.webp").write_bytes(b"RIFF late")
+    standin.fault = lambda request: 403 if "late-com" in request.path else None
+    assert main(args) == 1
+    assert "Failed: 1" in capsys.readouterr().out
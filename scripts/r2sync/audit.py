@@ -0,0 +1,201 @@
+"""
+Integrity audit: local thumbnails against R2 ETags, without downloading.
+
+The local tree is hashed in a process pool while the prefix is listed (ranges
+in parallel, see listing.py), so the audit costs local CPU plus one listing
+pass, and never a GET or HEAD per object. Each worker reads through a single
+reusable buffer (readinto + memoryview), so no per-chunk or whole-file copies
+are made.
+
+A single-PUT object's ETag is the MD5 of its body. Objects uploaded in parts
+(multipart.py) carry "<md5 of the part MD5s>-<parts>". For files at or above
+MULTIPART_THRESHOLD the worker also computes that form for PART_SIZE parts.
+An object whose part count does not match that layout can only be checked by
+size, and is reported as size-only.
+
+Every local file falls into one of: matched, missing (no object), mismatched
+(size or ETag differs) or size-only. Objects under the prefix with no local
+file are reported as extra.
+"""
+import hashlib
+import os
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .config import R2_PREFIX
+from .multipart import MULTIPART_THRESHOLD, PART_SIZE
+from .planner import LocalFile
+
+READ_BUFFER = 1024 * 1024
+FILES_PER_TASK = 256
+
+
+@dataclass
+class FileDigest:
+    md5: str
+    size: int
+    multipart_etag: str = ""  # only for files at or above the multipart threshold
+
+
+def file_digest(path, part_size: int = PART_SIZE, multipart_threshold: int = MULTIPART_THRESHOLD) -> FileDigest:
+    """MD5 (and the multipart ETag for large files) from chunked reads into one buffer"""
+    view = memoryview(bytearray(READ_BUFFER))
+    whole = hashlib.md5()
+    parts: List[bytes] = []
+    part = hashlib.md5()
+    in_part = size = 0
+    with open(path, "rb", buffering=0) as f:
+        multipart = os.fstat(f.fileno()).st_size >= multipart_threshold
+        while True:
+            # Reads never cross a part boundary, so each chunk feeds exactly one part digest
+            want = min(READ_BUFFER, part_size - in_part) if multipart else READ_BUFFER
+            n = f.readinto(view[:want])
+            if not n:
+                break
+            chunk = view[:n]
+            whole.update(chunk)
+            size += n
+            if multipart:
+                part.update(chunk)
+                in_part += n
+                if in_part == part_size:
+                    parts.append(part.digest())
+                    part, in_part = hashlib.md5(), 0
+    etag = ""
+    if multipart:
+        if in_part or not parts:
+            parts.append(part.digest())
+        etag = f"{hashlib.md5(b''.join(parts)).hexdigest()}-{len(parts)}"
+    return FileDigest(whole.hexdigest(), size, etag)
+
+
+def _digest_many(paths: List[str], part_size: int,
+                 multipart_threshold: int) -> List[Tuple[str, Optional[FileDigest], str]]:
+    """Worker task: [(path, digest or None, error)] for a batch of paths"""
+    out = []
+    for path in paths:
+        try:
+            out.append((path, file_digest(path, part_size, multipart_threshold), ""))
+        except OSError as e:
+            out.append((path, None, f"{type(e).__name__}: {e}"))
+    return out
+
+
+class ParallelHasher:
+    """Hash files in a process pool in the background; collect with results()"""
+
+    def __init__(self, paths: Iterable[str], workers: Optional[int] = None, part_size: int = PART_SIZE,
+                 multipart_threshold: int = MULTIPART_THRESHOLD, files_per_task: int = FILES_PER_TASK):
+        paths = [os.fspath(p) for p in paths]
+        batches = [paths[i:i + files_per_task] for i in range(0, len(paths), files_per_task)]
+        self.workers = workers or os.cpu_count() or 1
+        self._pool = None
+        if self.workers == 1 or len(batches) < 2:
+            self._inline = [_digest_many(batch, part_size, multipart_threshold) for batch in batches]
+            return
+        from concurrent.futures import ProcessPoolExecutor
+
+        self._pool = ProcessPoolExecutor(min(self.workers, len(batches)))
+        self._futures = [self._pool.submit(_digest_many, batch, part_size, multipart_threshold) for batch in batches]
+
+    def results(self) -> Dict[str, Tuple[Optional[FileDigest], str]]:
+        """{path: (digest or None, error)}; blocks until every batch is done"""
+        if self._pool is None:
+            batches = self._inline
+        else:
+            try:
+                batches = [future.result() for future in self._futures]
+            finally:
+                self._pool.shutdown()
+        return {path: (digest, error) for batch in batches for path, digest, error in batch}
+
+
+@dataclass
+class AuditReport:
+    matched: List[str] = field(default_factory=list)
+    missing: List[str] = field(default_factory=list)
+    mismatched: List[Tuple[str, str]] = field(default_factory=list)  # (key, reason)
+    size_only: List[str] = field(default_factory=list)
+    extra: List[str] = field(default_factory=list)
+    unreadable: List[Tuple[str, str]] = field(default_factory=list)  # (path, error)
+    local_files: int = 0
+    remote_objects: int = 0
+    local_bytes: int = 0
+
+    @property
+    def ok(self) -> bool:
+        return not (self.missing or self.mismatched or self.unreadable)
+
+    def summary(self) -> dict:
+        return {
+            "local_files": self.local_files,
+            "local_bytes": self.local_bytes,
+            "remote_objects": self.remote_objects,
+            "matched": len(self.matched),
+            "size_only": len(self.size_only),
+            "missing": len(self.missing),
+            "mismatched": len(self.mismatched),
+            "extra": len(self.extra),
+            "unreadable": len(self.unreadable),
+        }
+
+    def to_dict(self) -> dict:
+        return {
+            **self.summary(),
+            "missing_keys": self.missing,
+            "mismatched_keys": [{"key": key, "reason": reason} for key, reason in self.mismatched],
+            "size_only_keys": self.size_only,
+            "extra_keys": self.extra,
+            "unreadable_files": [{"path": path, "error": error} for path, error in self.unreadable],
+        }
+
+
+def compare(files: List[LocalFile], digests: Dict[str, Tuple[Optional[FileDigest], str]], remote) -> AuditReport:
+    """Sort local files and listed objects into matched/missing/mismatched/size-only/extra"""
+    report = AuditReport(local_files=len(files))
+    objects = {obj.key: obj for obj in remote}
+    report.remote_objects = len(objects)
+    for f in files:
+        obj = objects.pop(f.key, None)
+        digest, error = digests.get(str(f.path), (None, "not hashed"))
+        if digest is None:
+            report.unreadable.append((str(f.path), error))
+            continue
+        report.local_bytes += digest.size
+        if obj is None:
+            report.missing.append(f.key)
+        elif obj.size != digest.size:
+            report.mismatched.append((f.key, f"size {digest.size} local, {obj.size} in R2"))
+        elif not obj.is_multipart:
+            if obj.etag == digest.md5:
+                report.matched.append(f.key)
+            else:
+                report.mismatched.append((f.key, f"md5 {digest.md5} local, ETag {obj.etag}"))
+        elif digest.multipart_etag and obj.etag.rsplit("-", 1)[1] == digest.multipart_etag.rsplit("-", 1)[1]:
+            if obj.etag == digest.multipart_etag:
+                report.matched.append(f.key)
+            else:
+                report.mismatched.append((f.key, f"multipart ETag {digest.multipart_etag} local, {obj.etag}"))
+        else:
+            # Uploaded with a different part size: only the size can be compared
+            report.size_only.append(f.key)
+    report.extra = sorted(objects)
+    return report
+
+
+def run_audit(files: List[LocalFile], config, prefix: str = R2_PREFIX, workers: Optional[int] = None,
+              concurrency: int = 16, timers=None) -> Tuple[AuditReport, list]:
+    """Hash `files` in a process pool while listing `prefix`; returns (report, listed objects)"""
+    from .gc import list_objects
+    from .metrics import phase
+
+    with phase(timers, "hash"):
+        hasher = ParallelHasher((f.path for f in files), workers)
+        with phase(timers, "list"):
+            remote = list_objects(config, prefix, concurrency)
+        digests = hasher.results()
+    for f in files:
+        digest, _ = digests.get(str(f.path), (None, ""))
+        if digest is not None:
+            f.md5 = digest.md5
+    return compare(files, digests, remote), remote
@@ -0,0 +1,413 @@
+"""
+Upload benchmarks against the local S3 stand-in.
+
+  python3 -m r2sync.bench transports --count 2000 --size-kb 30 --concurrency 8 32
+  python3 -m r2sync.bench multipart --size-mb 64 --latency 0.02 --bandwidth-mb 20
+
+`transports` generates a synthetic webp corpus and uploads it with every
+transport the scripts have used, at each concurrency level:
+
+  r2sync    pooled asyncio uploader (this package)
+  curl      one `curl --aws-sigv4 --data-binary @file` process per file
+  boto3     threaded upload_file over one shared client (upload-screenshots-r2.py)
+  wrangler  one `wrangler r2 object put --local` process per file; wrangler
+            cannot target an S3 endpoint, so this measures its per-file
+            process cost against local storage
+
+Each case runs in its own Python process, so CPU time and peak RSS belong to
+that transport alone, and reports files/s, MB/s, p50/p95/p99 latency, CPU
+time and peak RSS. Transports whose tool is not installed are recorded as
+skipped. Results are written as JSON; pass --baseline with an earlier file to
+flag regressions.
+
+`multipart` uploads the same large file through the single-PUT path (read
+the whole file, one request) and through upload_multipart at a few part
+sizes, and reports MB/s and time per upload for each. The stand-in caps
+bandwidth per connection, as a single TCP stream to R2 is in practice, so
+parallel parts show the gain they give on a real link.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Optional
+
+from toolkit.stats import percentile
+
+from .config import R2_PREFIX, R2Config
+from .multipart import PART_CONCURRENCY, upload_multipart
+from .s3 import S3Client
+from .scan import iter_jobs
+from .standin import StandinThread
+
+MIB = 1024 * 1024
+TRANSPORTS = ("r2sync", "curl", "boto3", "wrangler")
+RESULTS_DIR = ".r2sync/bench"
+# A case counts as a regression when its files/s drops by more than this fraction
+REGRESSION_TOLERANCE = 0.10
+
+
+def make_file(directory: Path, size: int, name: str = "bench.bin") -> Path:
+    path = Path(directory) / name
+    with open(path, "wb") as f:
+        remaining = size
+        while remaining:
+            chunk = os.urandom(min(remaining, MIB))
+            f.write(chunk)
+            remaining -= len(chunk)
+    return path
+
+
+def synthetic_webp(size: int, rng: random.Random) -> bytes:
+    """RIFF/WEBP container with one VP8 chunk of random payload, `size` bytes in total"""
+    payload = max(0, size - 20)
+    return b"RIFF" + struct.pack("<I", payload + 12) + b"WEBP" + b"VP8 " + struct.pack("<I", payload) + \
+        rng.randbytes(payload)
+
+
+def make_corpus(directory, count: int, size: int, jitter: float = 0.25, seed: int = 0) -> Path:
+    """`count` thumbnails named like ScreenshotStorage's, sizes uniform within size +/- jitter"""
+    root = Path(directory)
+    root.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed)
+    for i in range(count):
+        n = int(size * rng.uniform(1 - jitter, 1 + jitter))
+        (root / f"bench-site-{i}-com-1700000000000-thumb.webp").write_bytes(synthetic_webp(n, rng))
+    return root
+
+
+# ----------------------------------------------------------------------
+# Transports: (jobs, config, concurrency) -> [(job, ok, latency seconds), ...]
+# ----------------------------------------------------------------------
+def _run_r2sync(jobs, config: R2Config, concurrency: int):
+    from .uploader import Uploader
+
+    results = []
+    uploader = Uploader(config, concurrency, retries=0,
+                        on_result=lambda r, _: results.append((r.job, r.ok, r.latency)))
+    asyncio.run(uploader.run(jobs))
+    return results
+
+
+def _run_threaded(jobs, concurrency: int, put):
+    def timed(job):
+        start = time.perf_counter()
+        ok = put(job)
+        return job, ok, time.perf_counter() - start
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        return list(pool.map(timed, jobs))
+
+
+def _run_curl(jobs, config: R2Config, concurrency: int):
+    def put(job):
+        url = f"{config.endpoint_url}/{config.bucket}/{job.key}"
+        done = subprocess.run(
+            ["curl", "-sS", "-o", "/dev/null", "-w", "%{http_code}", "-X", "PUT",
+             "--aws-sigv4", f"aws:amz:{config.region}:s3",
+             "--user", f"{config.access_key_id}:{config.secret_access_key}",
+             "-H", "Content-Type: image/webp", "--data-binary", f"@{job.path}", url],
+            capture_output=True, text=True)
+        return done.returncode == 0 and done.stdout == "200"
+
+    return _run_threaded(jobs, concurrency, put)
+
+
+def _run_boto3(jobs, config: R2Config, concurrency: int):
+    import boto3
+    from botocore.config import Config
+
+    client = boto3.client(
+        "s3", endpoint_url=config.endpoint_url, region_name=config.region,
+        aws_access_key_id=config.access_key_id, aws_secret_access_key=config.secret_access_key,
+        config=Config(max_pool_connections=concurrency, s3={"addressing_style": "path"}),
+    )
+
+    def put(job):
+        try:
+            client.upload_file(str(job.path), config.bucket, job.key, ExtraArgs={"ContentType": "image/webp"})
+            return True
+        except Exception:
+            return False
+
+    return _run_threaded(jobs, concurrency, put)
+
+
+def _run_wrangler(jobs, config: R2Config, concurrency: int):
+    wrangler = _wrangler_command()
+    persist = tempfile.mkdtemp(prefix="r2sync-wrangler-")
+
+    def put(job):
+        done = subprocess.run(
+            [*wrangler, "r2", "object", "put", f"{config.bucket}/{job.key}", "--file", str(job.path),
+             "--content-type", "image/webp", "--local", "--persist-to", persist],
+            capture_output=True)
+        return done.returncode == 0
+
+    try:
+        return _run_threaded(jobs, concurrency, put)
+    finally:
+        shutil.rmtree(persist, ignore_errors=True)
+
+
+def _wrangler_command() -> Optional[List[str]]:
+    local = Path(__file__).resolve().parents[2] / "node_modules/.bin/wrangler"
+    if local.exists():
+        return [str(local)]
+    found = shutil.which("wrangler")
+    return [found] if found else None
+
+
+def unavailable(transport: str) -> Optional[str]:
+    """Why a transport cannot run here, or None"""
+    if transport == "curl" and not shutil.which("curl"):
+        return "curl not found"
+    if transport == "boto3":
+        try:
+            import boto3  # noqa: F401
+        except ImportError:
+            return "boto3 not installed"
+    if transport == "wrangler" and _wrangler_command() is None:
+        return "wrangler not found (pnpm install)"
+    return None
+
+
+RUNNERS = {"r2sync": _run_r2sync, "curl": _run_curl, "boto3": _run_boto3, "wrangler": _run_wrangler}
+
+
+def run_case(transport: str, corpus, config: R2Config, concurrency: int) -> dict:
+    """Upload the corpus once with one transport and measure it (run in a fresh process)"""
+    jobs = list(iter_jobs(corpus, R2_PREFIX + f"bench/{transport}/"))
+    sizes = {job.key: job.path.stat().st_size for job in jobs}
+    before = resource.getrusage(resource.RUSAGE_SELF), resource.getrusage(resource.RUSAGE_CHILDREN)
+    start = time.perf_counter()
+    results = RUNNERS[transport](jobs, config, concurrency)
+    wall = time.perf_counter() - start
+    after = resource.getrusage(resource.RUSAGE_SELF), resource.getrusage(resource.RUSAGE_CHILDREN)
+
+    cpu = sum(a.ru_utime + a.ru_stime - (b.ru_utime + b.ru_stime) for a, b in zip(after, before))
+    latencies = [latency for _, _, latency in results]
+    ok = sum(1 for _, good, _ in results if good)
+    ok_bytes = sum(sizes[job.key] for job, good, _ in results if good)
+    return {
+        "transport": transport,
+        "concurrency": concurrency,
+        "files": len(jobs),
+        "ok": ok,
+        "failed": len(jobs) - ok,
+        "bytes": sum(sizes.values()),
+        "seconds": wall,
+        "files_per_s": ok / wall if wall else 0.0,
+        "mb_per_s": ok_bytes / MIB / wall if wall else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "cpu_s": cpu,
+        # ru_maxrss is KiB on Linux; children covers curl/wrangler processes
+        "peak_rss_mb": max(after[0].ru_maxrss, after[1].ru_maxrss) / 1024,
+    }
+
+
+def _case_in_subprocess(transport: str, corpus: Path, config: R2Config, concurrency: int) -> dict:
+    env = dict(os.environ, R2_ENDPOINT_URL=config.endpoint_url, R2_ACCESS_KEY_ID=config.access_key_id,
+               R2_SECRET_ACCESS_KEY=config.secret_access_key)
+    done = subprocess.run(
+        [sys.executable, "-m", "r2sync.bench", "case", "--transport", transport,
+         "--concurrency", str(concurrency), "--corpus", str(corpus)],
+        cwd=Path(__file__).resolve().parents[1], env=env, capture_output=True, text=True)
+    if done.returncode != 0:
+        return {"transport": transport, "concurrency": concurrency, "error": done.stderr.strip()[-500:]}
+    return json.loads(done.stdout.strip().splitlines()[-1])
+
+
+def bench_transports(corpus: Path, transports, concurrencies, latency: float = 0.0) -> list:
+    rows = []
+    with StandinThread(latency=latency) as server:
+        config = server.config()
+        for transport in transports:
+            reason = unavailable(transport)
+            if reason:
+                rows.append({"transport": transport, "skipped": reason})
+                continue
+            for concurrency in concurrencies:
+                rows.append(_case_in_subprocess(transport, corpus, config, concurrency))
+                server.buckets.clear()
+    return rows
+
+
+def compare(rows: list, baseline: list, tolerance: float = REGRESSION_TOLERANCE) -> list:
+    """[(transport, concurrency, old files/s, new files/s), ...] for cases that got slower"""
+    old = {(r["transport"], r["concurrency"]): r for r in baseline if "files_per_s" in r}
+    regressions = []
+    for row in rows:
+        before = old.get((row.get("transport"), row.get("concurrency")))
+        if before and "files_per_s" in row and row["files_per_s"] < before["files_per_s"] * (1 - tolerance):
+            regressions.append((row["transport"], row["concurrency"], before["files_per_s"], row["files_per_s"]))
+    return regressions
+
+
+# ----------------------------------------------------------------------
+# Single PUT vs multipart
+# ----------------------------------------------------------------------
+async def _single_put(client: S3Client, path: Path, key: str):
+    await client.put_object(key, path.read_bytes(), "application/octet-stream")
+
+
+async def _multipart(client: S3Client, path: Path, key: str, part_size: int, concurrency: int):
+    await upload_multipart(client, path, key, "application/octet-stream",
+                           part_size=part_size, concurrency=concurrency)
+
+
+def time_uploads(config, upload, repeat: int) -> list:
+    """Seconds per upload for `repeat` runs of `upload(client, key)` over one client"""
+    async def run():
+        timings = []
+        async with S3Client(config) as client:
+            for i in range(repeat):
+                start = time.perf_counter()
+                await upload(client, f"bench/object-{i}")
+                timings.append(time.perf_counter() - start)
+        return timings
+    return asyncio.run(run())
+
+
+def bench_multipart(size: int, part_sizes, concurrency: int = PART_CONCURRENCY,
+                    latency: float = 0.0, bandwidth: float = 0.0, repeat: int = 3) -> list:
+    """[{path, part_size, seconds, mb_per_s}, ...] for single PUT and each part size"""
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp, StandinThread(latency=latency, bandwidth=bandwidth) as server:
+        path = make_file(tmp, size)
+        cases = [("single PUT", None, lambda c, k: _single_put(c, path, k))]
+        for part_size in part_sizes:
+            cases.append(("multipart", part_size,
+                          lambda c, k, p=part_size: _multipart(c, path, k, p, concurrency)))
+        for name, part_size, upload in cases:
+            timings = time_uploads(server.config(), upload, repeat)
+            best = min(timings)
+            rows.append({"path": name, "part_size": part_size, "seconds": best,
+                         "mb_per_s": size / MIB / best})
+            server.buckets.clear()
+    return rows
+
+
+# ----------------------------------------------------------------------
+# CLI
+# ----------------------------------------------------------------------
+def write_results(path: Optional[str], kind: str, params: dict, rows: list) -> Path:
+    path = Path(path or f"{RESULTS_DIR}/{kind}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    document = {
+        "benchmark": kind,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "host": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "params": params,
+        "results": rows,
+    }
+    path.write_text(json.dumps(document, indent=2) + "\n")
+    return path
+
+
+def _transports_command(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = Path(args.corpus) if args.corpus else make_corpus(
+            Path(tmp) / "corpus", args.count, args.size_kb * 1024, seed=args.seed)
+        print(f"📏 {args.count} files of ~{args.size_kb} KB, {args.latency * 1000:.0f}ms per request, "
+              f"concurrency {', '.join(map(str, args.concurrency))}")
+        rows = bench_transports(corpus, args.transports, args.concurrency, args.latency)
+
+    print(f"   {'transport':<10} {'conc':>4} {'files/s':>9} {'MB/s':>7} {'p50':>8} {'p95':>8} {'p99':>8} "
+          f"{'CPU s':>7} {'RSS MB':>7}")
+    for row in rows:
+        if "skipped" in row or "error" in row:
+            print(f"   {row['transport']:<10} ⏭️  {row.get('skipped') or row.get('error')}")
+            continue
+        failed = f"  ❌ {row['failed']} failed" if row["failed"] else ""
+        print(f"   {row['transport']:<10} {row['concurrency']:>4} {row['files_per_s']:>9.1f} {row['mb_per_s']:>7.1f} "
+              f"{row['p50_ms']:>6.1f}ms {row['p95_ms']:>6.1f}ms {row['p99_ms']:>6.1f}ms "
+              f"{row['cpu_s']:>7.2f} {row['peak_rss_mb']:>7.1f}{failed}")
+
+    params = {"count": args.count, "size_kb": args.size_kb, "seed": args.seed, "latency": args.latency,
+              "concurrency": args.concurrency, "corpus": args.corpus}
+    path = write_results(args.output, "transports", params, rows)
+    print(f"📝 Results written to {path}")
+
+    if args.baseline:
+        regressions = compare(rows, json.loads(Path(args.baseline).read_text())["results"])
+        for transport, concurrency, old, new in regressions:
+            print(f"   ⚠️  {transport} @ {concurrency}: {old:.1f} → {new:.1f} files/s")
+        if regressions:
+            sys.exit(1)
+        print("   ✅ No regressions against the baseline")
+
+
+def _multipart_command(args):
+    link = f"{args.bandwidth_mb:g} MB/s per connection" if args.bandwidth_mb else "unlimited bandwidth"
+    print(f"📏 {args.size_mb} MiB file, {args.latency * 1000:.0f}ms per request, {link}, best of {args.repeat}")
+    rows = bench_multipart(args.size_mb * MIB, [p * MIB for p in args.part_mb], args.concurrency,
+                           args.latency, args.bandwidth_mb * MIB, args.repeat)
+    baseline = rows[0]["seconds"]
+    for row in rows:
+        label = row["path"] if row["part_size"] is None else f"{row['path']} {row['part_size'] // MIB} MiB parts"
+        print(f"   {label:<28} {row['seconds'] * 1000:8.1f} ms  {row['mb_per_s']:8.1f} MB/s  "
+              f"x{baseline / row['seconds']:.2f}")
+    if args.output:
+        params = {"size_mb": args.size_mb, "part_mb": args.part_mb, "concurrency": args.concurrency,
+                  "latency": args.latency, "bandwidth_mb": args.bandwidth_mb, "repeat": args.repeat}
+        print(f"📝 Results written to {write_results(args.output, 'multipart', params, rows)}")
+
+
+def _case_command(args):
+    config = R2Config.from_env()
+    print(json.dumps(run_case(args.transport, Path(args.corpus), config, args.concurrency)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark r2sync upload paths against the local stand-in")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    tp = sub.add_parser("transports", help="Every transport and concurrency level over a synthetic corpus")
+    tp.add_argument("--count", type=int, default=1000, help="Files in the synthetic corpus")
+    tp.add_argument("--size-kb", type=int, default=30, help="Mean file size (thumbnails are ~20-40 KB)")
+    tp.add_argument("--seed", type=int, default=0)
+    tp.add_argument("--corpus", help="Use an existing directory instead of a synthetic corpus")
+    tp.add_argument("--transports", nargs="+", choices=TRANSPORTS, default=list(TRANSPORTS))
+    tp.add_argument("--concurrency", type=int, nargs="+", default=[8, 32])
+    tp.add_argument("--latency", type=float, default=0.0, help="Seconds of latency added per request")
+    tp.add_argument("--output", help=f"Results file (default: {RESULTS_DIR}/transports-<time>.json)")
+    tp.add_argument("--baseline", help="Earlier results file; exit 1 if any case is >10%% slower")
+    tp.set_defaults(run=_transports_command)
+
+    mp = sub.add_parser("multipart", help="Single PUT vs parallel multipart for one large file")
+    mp.add_argument("--size-mb", type=int, default=64)
+    mp.add_argument("--part-mb", type=int, nargs="+", default=[5, 8, 16])
+    mp.add_argument("--concurrency", type=int, default=PART_CONCURRENCY)
+    mp.add_argument("--latency", type=float, default=0.02, help="Seconds of latency added per request")
+    mp.add_argument("--bandwidth-mb", type=float, default=20.0,
+                    help="Per-connection bandwidth in MB/s (0 = unlimited loopback)")
+    mp.add_argument("--repeat", type=int, default=3)
+    mp.add_argument("--output", help="Also write the results as JSON to this path")
+    mp.set_defaults(run=_multipart_command)
+
+    case = sub.add_parser("case", help=argparse.SUPPRESS)
+    case.add_argument("--transport", choices=TRANSPORTS, required=True)
+    case.add_argument("--concurrency", type=int, required=True)
+    case.add_argument("--corpus", required=True)
+    case.set_defaults(run=_case_command)
+
+    args = parser.parse_args()
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1429 @@
+"""
+One command line for the screenshot/R2 tooling.
+
+    python3 scripts/r2sync-cli.py upload [--retry-failed] [--fresh] [--recompress] [--priority FEED] [--dry-run]
+    python3 scripts/r2sync-cli.py sync   [--full] [--dry-run]
+    python3 scripts/r2sync-cli.py plan   [--full]
+    python3 scripts/r2sync-cli.py retry
+    python3 scripts/r2sync-cli.py verify [--workers N] [--report PATH]
+    python3 scripts/r2sync-cli.py dedup  [--dry-run] [--mapping PATH]
+    python3 scripts/r2sync-cli.py gc     [--dry-run] [--database | --referenced FILE | --newest-only] [--prune-local]
+    python3 scripts/r2sync-cli.py fanout --workers N {upload,sync,retry} [options]
+    python3 scripts/r2sync-cli.py merge-runs RUN_DIR... --out DIR
+    python3 scripts/r2sync-cli.py warm   (--keys FILE | --events RUN_DIR) [--confirm]
+    python3 scripts/r2sync-cli.py screen [--add-template FILE --label NAME]
+    python3 scripts/r2sync-cli.py variants [--widths 160,240,320,400] [--formats avif,webp] [--dry-run]
+    python3 scripts/r2sync-cli.py watch  [--settle SECONDS] [--once]
+    python3 scripts/r2sync-cli.py reconcile (--database [--fix] | --rows FILE) [--report PATH]
+    python3 scripts/r2sync-cli.py headers [--cache-control VALUE] [--modified-before DATE] [--dry-run]
+    python3 scripts/r2sync-cli.py snapshot [--shard-size MB] [--dry-run]
+    python3 scripts/r2sync-cli.py restore [--snapshot ID] [--dest DIR] [--concurrency N]
+
+The upload-*.py scripts are wrappers around these subcommands.
+
+upload, sync, plan, retry, verify and dedup write per-upload events, phase
+timers and a Prometheus summary to .r2sync/runs/<time>-<command>-<pid>/
+(see metrics.py); --profile adds a sampled CPU profile of the run.
+
+upload, sync and retry take --shard I/N to handle only the keys in shard I
+of N (see shard.py); fanout starts N such workers and merges their runs.
+
+Cron jobs and shell loops start these tools over and over, so startup is
+kept cheap. This module imports only argparse and the lightweight config
+modules. Each subcommand imports what it needs when it runs: asyncio and
+the HTTP client only once something is sent or listed, and the process
+pools and Pillow only for --recompress and dedup. `--help`, `upload
+--dry-run`, and a `plan` the manifest can answer never load the network
+stack.
+"""
+import argparse
+import sys
+from pathlib import Path
+from typing import Optional
+
+from .config import (BAD_TEMPLATES_PATH, CACHE_CONTROL, CDN_URL, FLAGGED_PATH, HEADERS_STATE_PATH, JOURNAL_PATH,
+                     MANIFEST_PATH, MAPPING_PATH, R2_PREFIX, RUNS_DIR, SCREENSHOTS_DIR, SNAPSHOT_PREFIX,
+                     SNAPSHOT_WORK_DIR, VARIANTS_MANIFEST_PATH)
+from .shard import ShardBusy, ShardLock, parse_shard
+
+MB = 1024 * 1024
+
+
+# ----------------------------------------------------------------------
+# Shared options
+# ----------------------------------------------------------------------
+def add_concurrency_arguments(parser, default_max: int = 64):
+    parser.add_argument("--concurrency", type=int, default=None,
+                        help="Fixed number of parallel uploads (disables adaptive control)")
+    parser.add_argument("--max-concurrency", type=int, default=default_max,
+                        help=f"Upper bound for adaptive concurrency (default: {default_max})")
+
+
+def add_journal_arguments(parser):
+    parser.add_argument("--journal", default=JOURNAL_PATH, help=f"Journal path (default: {JOURNAL_PATH})")
+    parser.add_argument("--fresh", action="store_true", help="Upload everything, ignoring keys already done")
+    parser.add_argument("--retry-failed", action="store_true",
+                        help="Only re-drive keys whose last attempt failed, with backoff")
+
+
+def add_recompress_arguments(parser):
+    parser.add_argument("--recompress", action="store_true",
+                        help="Re-encode thumbnails with ScreenshotStorage's size and quality "
+                             "and upload whichever file is smaller (needs Pillow)")
+
+
+def int_list(value: str) -> tuple:
+    """argparse type for 160,240,320"""
+    try:
+        return tuple(sorted({int(part) for part in value.split(",") if part}))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected comma-separated integers, got {value!r}") from None
+
+
+def format_list(value: str) -> list:
+    """argparse type for avif,webp: only the formats variants has a quality setting and srcset slot for"""
+    from .variants import FORMATS
+
+    formats = [part for part in value.split(",") if part]
+    unknown = [fmt for fmt in formats if fmt not in FORMATS]
+    if unknown or not formats:
+        raise argparse.ArgumentTypeError(f"expected a comma-separated subset of {','.join(FORMATS)}, got {value!r}")
+    return formats
+
+
+def add_source_argument(parser):
+    parser.add_argument("--source", default=SCREENSHOTS_DIR, help=f"Thumbnail directory (default: {SCREENSHOTS_DIR})")
+
+
+def add_manifest_arguments(parser):
+    parser.add_argument("--manifest", default=MANIFEST_PATH, help=f"Manifest path (default: {MANIFEST_PATH})")
+    parser.add_argument("--full", action="store_true", help="Ignore the manifest cache and re-list everything")
+    parser.add_argument("--listed-since", type=float, default=None, metavar="EPOCH",
+                        help="Take listing ranges listed into the manifest at or after this Unix time from the "
+                             "manifest instead of R2 (fanout sets it after listing once for its workers)")
+
+
+def add_metrics_arguments(parser):
+    parser.add_argument("--metrics-dir", default=RUNS_DIR,
+                        help=f"Directory for per-run events and metrics (default: {RUNS_DIR})")
+    parser.add_argument("--no-metrics", action="store_true", help="Do not write run metrics")
+    parser.add_argument("--profile", action="store_true",
+                        help="Sample the CPU profile of the run and report signing/hashing/network/IO shares")
+
+
+def add_flagged_arguments(parser):
+    parser.add_argument("--flagged", default=FLAGGED_PATH,
+                        help=f"Thumbnails flagged by `screen`, left out of the run (default: {FLAGGED_PATH})")
+    parser.add_argument("--include-flagged", action="store_true", help="Also handle thumbnails `screen` flagged")
+
+
+def flagged_filter(args):
+    """A FlaggedFilter for the run, or None if nothing is flagged or --include-flagged was given"""
+    if args.include_flagged:
+        return None
+    from .screening import FlaggedFilter, load_flagged
+
+    flagged = load_flagged(args.flagged)
+    return FlaggedFilter(flagged) if flagged else None
+
+
+def print_flagged(flagged):
+    if flagged and flagged.dropped:
+        print(f"   🚩 Left out {flagged.dropped} flagged thumbnails (see `screen`; --include-flagged to upload)")
+
+
+def add_priority_arguments(parser):
+    parser.add_argument("--priority", metavar="FEED",
+                        help="Upload the most valuable sites first: a preprocess-sites output directory, or a JSON/CSV "
+                             "map of domain to score and/or status (live, then by tier; small files first)")
+
+
+def priority_order(args, jobs):
+    """The jobs in priority order if --priority was given, else unchanged"""
+    if not args.priority:
+        return jobs
+    from .priority import describe, load_priorities, prioritize
+
+    try:
+        priorities = load_priorities(args.priority)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"❌ Error: cannot read the priority feed {args.priority}: {e}")
+        raise SystemExit(1)
+    ordered, counts = prioritize(jobs, priorities)
+    print(f"🎯 Priority order ({len(priorities)} domains in {args.priority}): {describe(counts)}")
+    return ordered
+
+
+def add_shard_argument(parser):
+    parser.add_argument("--shard", type=parse_shard, default=None, metavar="I/N",
+                        help="Only handle keys in shard I of N (1-based), e.g. 2/4; see fanout. Shards are spread "
+                             "over every listing range, so N sync workers with a cold or --full manifest list the "
+                             "whole prefix N times; fanout sync lists it once and shares it through the manifest")
+
+
+def add_warm_arguments(parser, flag: bool = True):
+    if flag:
+        parser.add_argument("--warm", action="store_true",
+                            help="Afterwards, request every uploaded key from the CDN to fill its edge cache")
+    parser.add_argument("--cdn-url", default=None,
+                        help=f"Public base URL to warm (default: R2_PUBLIC_URL, else {CDN_URL})")
+    parser.add_argument("--warm-concurrency", type=int, default=64, help="Warm-up requests in flight (default: 64)")
+    parser.add_argument("--warm-method", choices=("GET", "HEAD"), default="GET",
+                        help="GET (default) fills the edge for certain; HEAD skips the body download")
+
+
+def cdn_base_url(args) -> str:
+    import os
+
+    return args.cdn_url or os.environ.get("R2_PUBLIC_URL", "").rstrip("/") or CDN_URL
+
+
+def run_warm(args, keys) -> int:
+    """Warm the CDN for `keys` if --warm was given; returns the number of failed requests"""
+    if not getattr(args, "warm", False) or not keys:
+        return 0
+    from .metrics import phase
+    from .warm import print_warm_report, warm_keys
+
+    base_url = cdn_base_url(args)
+    print()
+    print(f"🔥 Warming {len(keys)} keys at {base_url} ({args.warm_concurrency} in flight)...")
+    with phase(args.metrics, "warm"):
+        report = warm_keys(base_url, keys, concurrency=args.warm_concurrency, method=args.warm_method)
+    print_warm_report(report)
+    if args.metrics:
+        args.metrics.emit("warm", base_url=base_url, **report.summary())
+    return report.summary()["failed"]
+
+
+def start_metrics(args):
+    """RunMetrics for commands that take add_metrics_arguments(), else None"""
+    if not hasattr(args, "no_metrics") or (args.no_metrics and not args.profile):
+        return None
+    from .metrics import RunMetrics
+
+    labels = {"shard": str(args.shard)} if getattr(args, "shard", None) else None
+    return RunMetrics.for_run(args.metrics_dir, args.command, profile=args.profile, labels=labels)
+
+
+def lock_shard(args):
+    """Hold the shard's lock file next to the journal (or manifest) for the whole run"""
+    if getattr(args, "shard", None) is None:
+        return None
+    state = getattr(args, "journal", None) or args.manifest
+    return ShardLock(state, args.shard).acquire()
+
+
+def print_merged(merged: dict):
+    ok, failed = merged["uploads"].get("ok", 0), merged["uploads"].get("failed", 0)
+    seconds = merged["seconds"] or 1e-9
+    print(f"   Runs merged: {merged['runs']}")
+    print(f"   ✅ Uploaded: {ok}  ❌ Failed: {failed}  📦 {merged['bytes'] / MB:.1f} MB")
+    print(f"   🚀 {ok / seconds:.1f} files/second, {merged['bytes'] / MB / seconds:.1f} MB/s "
+          f"over {merged['seconds']:.1f}s (slowest run)")
+
+
+def observed(args, on_result):
+    """on_result, also recording every upload in the run metrics"""
+    return args.metrics.observer(on_result) if args.metrics else on_result
+
+
+def print_failures(failures, limit: int = 10):
+    if not failures:
+        return
+    print()
+    print(f"❌ Failed uploads ({len(failures)}):")
+    for key, error in failures[:limit]:
+        print(f"  - {key}: {error[:100]}")
+    if len(failures) > limit:
+        print(f"  ... and {len(failures) - limit} more")
+
+
+# ----------------------------------------------------------------------
+# Subcommands
+# ----------------------------------------------------------------------
+def cmd_upload(args) -> int:
+    """Journaled upload of the whole thumbnail tree"""
+    from .journal import Journal, journal_jobs, print_journal_summary
+    from .metrics import phase, timed
+    from .scan import iter_jobs
+
+    root = Path(args.source)
+    if not root.exists():
+        print(f"❌ Error: Directory not found: {args.source}")
+        return 1
+    journal = Journal(args.journal, args.shard)
+    scanned = iter_jobs(root) if args.shard is None else args.shard.filter(iter_jobs(root))
+    flagged = flagged_filter(args)
+    if flagged:
+        scanned = flagged(scanned)
+    # The scan is consumed by the upload's producer thread, so it is timed per item
+    jobs = priority_order(args, journal_jobs(journal, args, timed(args.metrics, scanned, "scan")))
+
+    if args.dry_run:
+        count = size = 0
+        for job in jobs:
+            count += 1
+            try:
+                size += job.path.stat().st_size
+            except OSError:
+                pass
+        print(f"📋 Dry run: {count} files ({size / MB:.1f} MB) to upload from {args.source}, "
+              f"{journal.skipped} already uploaded")
+        print_flagged(flagged)
+        journal.close()
+        return 0
+
+    from .concurrency import controller_from_args
+    from .config import R2Config
+    from .recompress import recompress_from_args
+    from .uploader import progress_printer, upload_files
+
+    controller = controller_from_args(args)
+    config = R2Config.from_env()
+    jobs, recompression = recompress_from_args(args, jobs)
+
+    print(f"📤 Uploading screenshots to R2 ({args.concurrency or 'adaptive'} parallel)")
+    print(f"📁 Source: {args.source}")
+    print(f"🪣 Bucket: {config.bucket}")
+    if args.shard:
+        print(f"🧩 Shard: {args.shard}")
+    if journal.recovered:
+        print(f"   ♻️  Resuming {journal.recovered} uploads interrupted in the last run")
+    print()
+
+    uploaded = []
+    report = progress_printer(every=50)
+
+    def on_result(result, stats):
+        if result.ok:
+            uploaded.append(result.job.key)
+        report(result, stats)
+
+    with phase(args.metrics, "upload"):
+        stats = upload_files(jobs, config, args.concurrency, observed(args, on_result),
+                             retries=6 if args.retry_failed else 3, journal=journal,
+                             controller=controller)
+    total = stats.completed
+    if total == 0:
+        nothing = journal.skipped or args.retry_failed
+        print("✅ Nothing to upload" if nothing else "❌ No files found to upload")
+        journal.close()
+        return 0 if nothing else 1
+
+    print()
+    print("✅ Upload complete!")
+    print(f"   Uploaded: {stats.uploaded}/{total}")
+    print(f"   Failed: {stats.failed}/{total}")
+    print(f"   📦 Total size: {stats.bytes / MB:.1f} MB")
+    print(f"   🚀 Rate: {stats.rate:.1f} files/second")
+    print_failures(stats.failures)
+    print()
+    print_journal_summary(journal)
+    print_flagged(flagged)
+    if recompression:
+        print(f"   🗜️  {recompression.summary()}")
+    if controller:
+        print(f"   ⚙️  {controller.summary()}")
+    journal.close()
+    run_warm(args, uploaded)
+    return 0 if stats.failed == 0 else 1
+
+
+def _build_plan(args):
+    from .config import R2Config
+    from .metrics import phase
+    from .planner import Manifest, build_plan, scan_local
+
+    config = R2Config.from_env()
+    manifest = Manifest(args.manifest)
+    with phase(args.metrics, "scan"):
+        files = scan_local(Path(args.source))
+        if getattr(args, "shard", None):
+            files = list(args.shard.filter(files))
+        flagged = flagged_filter(args)
+        if flagged:
+            files = list(flagged(files))
+    shard = f" (shard {args.shard})" if getattr(args, "shard", None) else ""
+    print(f"📤 Checking {len(files)} screenshots against R2{shard}...")
+    print_flagged(flagged)
+    print()
+    with phase(args.metrics, "plan"):
+        plan = build_plan(files, config, manifest, full=args.full, timers=args.metrics,
+                          listed_since=args.listed_since)
+
+    print("📋 Plan")
+    print(f"   Listed ranges: {plan.listed_shards} ({plan.listed_objects} objects)")
+    print(f"   📤 Upload: {len(plan.upload)} files ({plan.upload_bytes / MB:.1f} MB)")
+    print(f"   ⏭️ Skip: {len(plan.skip)} files ({plan.skip_bytes / MB:.1f} MB, {plan.cached_skips} from manifest)")
+    print()
+    return config, manifest, files, plan
+
+
+def cmd_plan(args) -> int:
+    """Diff local files against one R2 listing, without uploading"""
+    _, manifest, _, _ = _build_plan(args)
+    manifest.close()
+    return 0
+
+
+def cmd_sync(args) -> int:
+    """Upload only the files missing or changed in R2"""
+    config, manifest, files, plan = _build_plan(args)
+    if args.dry_run or not plan.upload:
+        manifest.close()
+        return 0
+
+    from .concurrency import controller_from_args
+    from .metrics import phase
+    from .uploader import progress_printer, upload_files
+
+    controller = controller_from_args(args)
+    print("🚀 Uploading missing files...")
+    print()
+    uploaded = []
+    report = progress_printer(len(plan.upload), every=100)
+
+    def on_result(result, stats):
+        if result.ok:
+            uploaded.append((result.job.key, result.size, result.etag))
+        report(result, stats)
+
+    with phase(args.metrics, "upload"):
+        stats = upload_files(priority_order(args, plan.jobs()), config, args.concurrency, observed(args, on_result),
+                             controller=controller)
+    manifest.record_uploaded(uploaded)
+    manifest.close()
+
+    print()
+    print("✅ Complete!")
+    print(f"   Total scanned: {len(files)}")
+    print(f"   ✅ Uploaded: {stats.uploaded}")
+    print(f"   ⏭️ Skipped (already exists): {len(plan.skip)}")
+    print(f"   ❌ Failed: {stats.failed}")
+    if controller:
+        print(f"   ⚙️  {controller.summary()}")
+    print(f"   📊 Success rate: {(stats.uploaded / stats.completed * 100) if stats.completed > 0 else 100:.1f}%")
+    run_warm(args, [key for key, _, _ in uploaded])
+    return 0 if stats.failed == 0 else 1
+
+
+def cmd_retry(args) -> int:
+    """Re-drive only the keys the journal records as failed"""
+    from .journal import Journal, print_journal_summary
+
+    journal = Journal(args.journal, args.shard)
+    failed = journal.counts().get("failed", 0)
+    if failed == 0:
+        print("✅ Nothing to retry: the journal has no failed uploads")
+        journal.close()
+        return 0
+    if args.dry_run:
+        print(f"📋 Dry run: {failed} failed uploads would be retried")
+        journal.close()
+        return 0
+
+    from .concurrency import controller_from_args
+    from .config import R2Config
+    from .metrics import phase
+    from .uploader import progress_printer, upload_files
+
+    controller = controller_from_args(args)
+    config = R2Config.from_env()
+    print(f"📤 Retrying upload of {failed} failed screenshots to R2")
+    print()
+    # Reduced concurrency and more patient backoff
+    with phase(args.metrics, "upload"):
+        stats = upload_files(priority_order(args, journal.failed_jobs()), config, args.concurrency,
+                             observed(args, progress_printer(failed, every=50)),
+                             retries=6, journal=journal, controller=controller)
+
+    print()
+    print("✅ Upload complete!")
+    print(f"   Uploaded: {stats.uploaded}/{stats.completed}")
+    print(f"   Failed: {stats.failed}/{stats.completed}")
+    print_journal_summary(journal)
+    if controller:
+        print(f"   ⚙️  {controller.summary()}")
+    journal.close()
+    return 0 if stats.failed == 0 else 1
+
+
+def cmd_verify(args) -> int:
+    """Audit R2 against the local tree: hash every file and compare with one listing's sizes and ETags"""
+    import json
+
+    from .audit import run_audit
+    from .config import R2Config
+    from .metrics import phase
+    from .planner import Manifest, scan_local
+
+    root = Path(args.source)
+    if not root.exists():
+        print(f"❌ Error: Directory not found: {args.source}")
+        return 1
+    config = R2Config.from_env()
+    with phase(args.metrics, "scan"):
+        files = scan_local(root)
+    print(f"🔍 Auditing {len(files)} screenshots against R2 (hashing locally, no downloads)...")
+    with phase(args.metrics, "verify"):
+        report, remote = run_audit(files, config, workers=args.workers, timers=args.metrics)
+
+    # A full listing and fresh hashes: refresh the manifest so the next sync starts from them
+    manifest = Manifest(args.manifest)
+    manifest.replace_remote_range(R2_PREFIX, None, None, remote)
+    manifest.save_local(f for f in files if f.md5)
+    manifest.close()
+
+    print()
+    print("🔍 Verify")
+    print(f"   ✅ Match: {len(report.matched)}/{len(files)} ({report.local_bytes / MB:.1f} MB hashed)")
+    if report.size_only:
+        print(f"   📏 Size only: {len(report.size_only)} (multipart objects with a different part size)")
+    print(f"   ❓ Missing: {len(report.missing)}")
+    print(f"   ⚠️  Mismatched: {len(report.mismatched)}")
+    print(f"   ➕ Extra in R2: {len(report.extra)}")
+    if report.unreadable:
+        print(f"   ❌ Unreadable: {len(report.unreadable)}")
+    details = {
+        "missing": report.missing,
+        "mismatched": [f"{key} ({reason})" for key, reason in report.mismatched],
+        "extra": report.extra,
+        "unreadable": [f"{path} ({error})" for path, error in report.unreadable],
+    }
+    for label, entries in details.items():
+        for text in entries[:10]:
+            print(f"  - {label}: {text}")
+        if len(entries) > 10:
+            print(f"  ... and {len(entries) - 10} more {label}")
+
+    if args.report:
+        Path(args.report).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.report).write_text(json.dumps(report.to_dict(), indent=2) + "\n")
+        print(f"📝 Report written to {args.report}")
+    return 0 if report.ok else 1
+
+
+def cmd_dedup(args) -> int:
+    """Upload each distinct thumbnail once under its content hash"""
+    import json
+
+    from .config import R2Config
+    from .dedup import build_dedup_plan, build_mapping, scan_thumbnails, write_mapping
+    from .metrics import phase
+
+    config = R2Config.from_env()
+    with phase(args.metrics, "scan"):
+        thumbs = scan_thumbnails(Path(args.source))
+    print(f"🔍 Hashing {len(thumbs)} screenshots...")
+    with phase(args.metrics, "plan"):
+        plan = build_dedup_plan(thumbs, config, workers=args.workers, timers=args.metrics)
+
+    print()
+    print("📋 Dedup plan")
+    print(f"   Files: {len(plan.files)} ({plan.total_bytes / MB:.1f} MB)")
+    print(f"   Distinct images: {len(plan.blobs)} ({plan.duplicates} duplicates, {plan.duplicate_bytes / MB:.1f} MB)")
+    print(f"   Already in R2: {len(plan.existing)}")
+    print(f"   📤 Upload: {len(plan.upload)} blobs ({plan.upload_bytes / MB:.1f} MB)")
+    print(f"   💾 Saved: {plan.requests_saved} requests, {plan.bytes_saved / MB:.1f} MB")
+    print()
+
+    report = plan.summary()
+    failed = set()
+    if plan.upload and not args.dry_run:
+        from .concurrency import controller_from_args
+        from .uploader import progress_printer, upload_files
+
+        controller = controller_from_args(args)
+        print("🚀 Uploading distinct images...")
+        digests = {thumb.key: thumb.sha256 for thumb in plan.upload}
+        printer = progress_printer(len(plan.upload), every=100)
+
+        def on_result(result, stats):
+            if not result.ok:
+                failed.add(digests[result.job.key])
+            printer(result, stats)
+
+        with phase(args.metrics, "upload"):
+            stats = upload_files(plan.jobs(), config, args.concurrency, observed(args, on_result),
+                                 controller=controller)
+        report.update(uploaded=stats.uploaded, failed=stats.failed)
+        print(f"   ✅ Uploaded: {stats.uploaded}  ❌ Failed: {stats.failed}")
+        if controller:
+            print(f"   ⚙️  {controller.summary()}")
+        print()
+
+    if not args.dry_run:
+        mapping = build_mapping(plan.files, config.public_url, failed)
+        write_mapping(mapping, args.mapping)
+        print(f"🗺️  Wrote {len(mapping['domains'])} domains to {args.mapping}")
+
+    if args.report:
+        Path(args.report).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.report).write_text(json.dumps(report, indent=2) + "\n")
+        print(f"📝 Report written to {args.report}")
+    return 0 if not failed else 1
+
+
+def cmd_gc(args) -> int:
+    """Delete superseded thumbnail versions, keeping the newest and any the database references"""
+    import json
+    import os
+
+    from .config import R2Config
+    from .gc import delete_keys, list_objects, load_references, local_copies, plan_gc, query_references
+    from .planner import Manifest
+
+    if not 1 <= args.batch_size <= 1000:
+        print("❌ Error: --batch-size must be between 1 and 1000")
+        return 1
+    config = R2Config.from_env()
+    referenced = set()
+    if args.referenced:
+        referenced |= load_references(args.referenced)
+    if args.database:
+        if not os.environ.get("DATABASE_URL"):
+            print("❌ Error: --database needs DATABASE_URL")
+            return 1
+        try:
+            referenced |= query_references(os.environ["DATABASE_URL"])
+        except RuntimeError as e:
+            print(f"❌ Error: {e}")
+            return 1
+    dry_run = args.dry_run
+    if not (args.referenced or args.database):
+        if args.newest_only:
+            print("⚠️  --newest-only: deleting every version but the newest, even ones the database still uses")
+        elif not dry_run:
+            print("⚠️  No reference source (--database or --referenced): older versions the database still uses "
+                  "would be deleted too. Dry run only; pass --newest-only to delete anyway")
+            dry_run = True
+
+    print(f"🔍 Listing {R2_PREFIX} ...")
+    plan = plan_gc(list_objects(config), referenced)
+    doomed = [obj.key for obj in plan.delete]
+    stale_local = local_copies(args.source, set(doomed))
+
+    print()
+    print("🗑️  GC plan")
+    print(f"   Objects: {len(plan.keep) + len(plan.delete)} across {plan.domains} domains")
+    print(f"   ✅ Keep: {len(plan.keep)} ({plan.keep_bytes / MB:.1f} MB, "
+          f"{plan.referenced_kept} older versions still referenced, {plan.unmatched} other keys)")
+    print(f"   🗑️  Delete: {len(plan.delete)} superseded versions ({plan.delete_bytes / MB:.1f} MB reclaimed)")
+    if stale_local:
+        print(f"   📁 {len(stale_local)} of them also exist under {args.source}")
+    print()
+
+    report = {**plan.summary(), "local_copies": len(stale_local)}
+    if dry_run or not doomed:
+        for key in doomed[:10]:
+            print(f"  - {key}")
+        if len(doomed) > 10:
+            print(f"  ... and {len(doomed) - 10} more")
+        report["delete_keys"] = doomed
+    else:
+        print(f"🚀 Deleting in batches of {args.batch_size}...")
+
+        def on_batch(count, failed):
+            print(f"  Batch: {count - failed}/{count} deleted")
+
+        errors = delete_keys(config, doomed, args.batch_size, args.concurrency, on_batch=on_batch)
+        failed = {key for key, _ in errors}
+        deleted = [key for key in doomed if key not in failed]
+        manifest = Manifest(args.manifest)
+        manifest.forget_remote(deleted)
+        manifest.close()
+
+        pruned = 0
+        if args.prune_local:
+            deleted_set = set(deleted)
+            for path in local_copies(args.source, deleted_set):
+                path.unlink(missing_ok=True)
+                pruned += 1
+        report.update(deleted=len(deleted), failed=len(errors), pruned_local=pruned,
+                      errors=[{"key": key, "error": error} for key, error in errors])
+
+        print()
+        print("✅ GC complete!")
+        print(f"   🗑️  Deleted: {len(deleted)}")
+        print(f"   ❌ Failed: {len(errors)}")
+        for key, error in errors[:10]:
+            print(f"  - {key}: {error[:100]}")
+        if pruned:
+            print(f"   📁 Removed {pruned} local copies")
+        elif stale_local:
+            print(f"   ⚠️  {len(stale_local)} local copies remain and would be uploaded again by sync; "
+                  "re-run with --prune-local to remove them")
+
+    if args.report:
+        Path(args.report).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.report).write_text(json.dumps(report, indent=2) + "\n")
+        print(f"📝 Report written to {args.report}")
+    return 0 if not report.get("failed") else 1
+
+
+def _list_for_workers(worker_args) -> Optional[float]:
+    """List the sync workers' ranges into their manifest once; returns the time to pass as --listed-since"""
+    import time
+
+    from .config import R2Config
+    from .planner import Manifest, prelist, scan_local
+    from .s3 import S3Error, TRANSPORT_ERRORS
+
+    sync_args = build_parser().parse_args(["sync", *worker_args])
+    config = R2Config.from_env()
+    keys = [f.key for f in scan_local(Path(sync_args.source))]
+    since = time.time()
+    manifest = Manifest(sync_args.manifest)
+    try:
+        ranges, objects = prelist(keys, config, manifest, full=sync_args.full)
+    except (S3Error, *TRANSPORT_ERRORS) as e:
+        print(f"⚠️  Listing failed, each worker lists for itself: {e}")
+        return None
+    finally:
+        manifest.close()
+    print(f"🔍 Listed {ranges} ranges ({objects} objects) once for all workers")
+    return since
+
+
+def cmd_fanout(args) -> int:
+    """Run N workers of upload, sync or retry, one per shard, and merge their metrics"""
+    import os
+    import subprocess
+    import time
+
+    from .metrics import merge_runs
+
+    if args.workers < 1:
+        print("❌ Error: --workers must be at least 1")
+        return 1
+    worker_args = args.worker_args[1:] if args.worker_args[:1] == ["--"] else args.worker_args
+    if {"--shard", "--metrics-dir", "--listed-since"} & set(worker_args):
+        print("❌ Error: fanout sets --shard, --metrics-dir and --listed-since for each worker")
+        return 1
+    if args.worker_command == "sync" and args.workers > 1:
+        # Shards are spread over every listing range: list them once here instead of once per worker
+        since = _list_for_workers(worker_args)
+        if since is not None:
+            worker_args = [*worker_args, "--listed-since", repr(since)]
+    run_dir = Path(args.metrics_dir) / f"{time.strftime('%Y%m%dT%H%M%S', time.gmtime())}-fanout-{os.getpid()}"
+    workers_dir = run_dir / "workers"
+    workers_dir.mkdir(parents=True)
+    script = Path(__file__).resolve().parents[1] / "r2sync-cli.py"
+
+    print(f"🧩 Starting {args.workers} {args.worker_command} workers")
+    print(f"📁 Logs and metrics: {run_dir}/")
+    procs = []
+    for i in range(1, args.workers + 1):
+        log = open(run_dir / f"shard-{i}.log", "wb")
+        cmd = [sys.executable, str(script), args.worker_command, *worker_args,
+               "--shard", f"{i}/{args.workers}", "--metrics-dir", str(workers_dir)]
+        procs.append((i, subprocess.Popen(cmd, stdout=log, stderr=subprocess.STDOUT), log))
+    status = 0
+    for i, proc, log in procs:
+        code = proc.wait()
+        log.close()
+        print(f"  {'✅' if code == 0 else '❌'} shard {i}/{args.workers}: exit {code}")
+        status = status or code
+
+    runs = sorted(d for d in workers_dir.iterdir() if (d / "summary.json").exists())
+    if runs:
+        print()
+        print("📈 Merged")
+        print_merged(merge_runs(runs, run_dir / "merged"))
+        print(f"   Metrics: {run_dir / 'merged'}/")
+    return 1 if status else 0
+
+
+def cmd_merge_runs(args) -> int:
+    """Merge the metrics of runs that worked side by side (shards on one or several hosts)"""
+    from .metrics import merge_runs
+
+    runs = []
+    for path in map(Path, args.runs):
+        if (path / "summary.json").exists():
+            runs.append(path)
+        else:
+            runs += sorted(d for d in path.glob("*/") if (d / "summary.json").exists())
+    if not runs:
+        print("❌ Error: no run directories (with summary.json) found")
+        return 1
+    merged = merge_runs(runs, args.out)
+    print(f"📈 Merged {len(runs)} runs into {args.out}/")
+    print_merged(merged)
+    return 0
+
+
+def cmd_warm(args) -> int:
+    """Request keys from the CDN so its edge cache holds them before the first visitor"""
+    import json
+
+    from .gc import key_from_reference
+
+    keys = []
+    if args.keys:
+        with open(args.keys, encoding="utf-8") as f:
+            keys += [key for key in map(key_from_reference, f) if key]
+    for path in map(Path, args.events or ()):
+        events = path / "events.jsonl" if path.is_dir() else path
+        with open(events, encoding="utf-8") as f:
+            for line in f:
+                event = json.loads(line)
+                if event.get("event") == "upload" and event.get("status") == "ok":
+                    keys.append(event["key"])
+    keys = list(dict.fromkeys(keys))
+    if not keys:
+        print("❌ Error: no keys to warm (--keys FILE or --events RUN_DIR)")
+        return 1
+
+    args.warm = True
+    failed = run_warm(args, keys)
+    if args.confirm:
+        from .warm import print_warm_report, warm_keys
+
+        print()
+        print_warm_report(warm_keys(cdn_base_url(args), keys, concurrency=args.warm_concurrency, method="HEAD"),
+                          "Confirm (HEAD)")
+    return 0 if failed == 0 else 1
+
+
+def cmd_variants(args) -> int:
+    """Render missing or stale srcset variants, upload them and write the frontend manifest"""
+    from .dedup import write_mapping
+    from .journal import Journal, print_journal_summary
+    from .metrics import phase
+    from .variants import (VariantState, VariantStats, available_formats, build_variant_manifest, generate_variants,
+                           plan_variants, scan_sources)
+
+    root = Path(args.source)
+    if not root.exists():
+        print(f"❌ Error: Directory not found: {args.source}")
+        return 1
+    formats = available_formats(args.formats)
+    for fmt in args.formats:
+        if fmt not in formats:
+            print(f"⚠️  Pillow cannot encode {fmt} here; skipping it")
+    if not formats:
+        print("❌ Error: variants needs Pillow with webp (and for AVIF, 11.3+ or pillow-avif-plugin)")
+        return 1
+
+    with phase(args.metrics, "scan"):
+        sources = scan_sources(root)
+        flagged = flagged_filter(args)
+        if flagged:
+            sources = list(flagged(sources))
+    print_flagged(flagged)
+    state = VariantState(args.state)
+    plan = plan_variants(sources, state, args.widths, formats)
+    print(f"🖼️  {len(sources)} thumbnails x {len(args.widths)} widths x {', '.join(formats)}")
+    print(f"   🎨 Render: {plan.variants_to_render} variants from {len(plan.render)} thumbnails")
+    print(f"   ⏭️ Up to date: {plan.fresh} variants")
+    if args.dry_run:
+        return 0
+
+    stats = VariantStats()
+    variant_jobs = generate_variants(sources, state, stats, args.widths, formats, workers=args.workers)
+    failed = set()
+    if args.no_upload:
+        with phase(args.metrics, "render"):
+            for _ in variant_jobs:
+                pass
+    else:
+        from .concurrency import controller_from_args
+        from .config import R2Config
+        from .uploader import progress_printer, upload_files
+
+        config = R2Config.from_env()
+        controller = controller_from_args(args)
+        journal = Journal(args.journal)
+        printer = progress_printer(every=100)
+
+        def on_result(result, upload_stats):
+            if not result.ok:
+                failed.add(result.job.key)
+            printer(result, upload_stats)
+
+        if not args.fresh:
+            variant_jobs = journal.skip_done(variant_jobs)
+        print()
+        print("🚀 Rendering and uploading variants...")
+        with phase(args.metrics, "upload"):
+            upload_stats = upload_files(variant_jobs, config, args.concurrency, observed(args, on_result),
+                                        journal=journal, controller=controller)
+        print(f"   ✅ Uploaded: {upload_stats.uploaded}  ❌ Failed: {upload_stats.failed}")
+        print_failures(upload_stats.failures)
+        print_journal_summary(journal)
+        if controller:
+            print(f"   ⚙️  {controller.summary()}")
+        journal.close()
+
+    print(f"   🎨 {stats.summary()}")
+    for path, error in stats.failed_sources[:10]:
+        print(f"  - {path}: {error[:100]}")
+    manifest = build_variant_manifest(sources, state, cdn_base_url(args), failed)
+    write_mapping(manifest, args.out)
+    print(f"🗺️  Wrote srcsets for {len(manifest['domains'])} domains to {args.out}")
+    return 0 if not failed else 1
+
+
+def cmd_screen(args) -> int:
+    """Flag blank and placeholder thumbnails, list their domains for re-capture and keep them out of uploads"""
+    from .metrics import phase
+    from .planner import scan_local
+
+    try:
+        import numpy  # noqa: F401
+        import PIL  # noqa: F401
+    except ImportError:
+        print("❌ Error: screen needs NumPy and Pillow (pip install numpy Pillow)")
+        return 1
+    from .screening import load_templates, save_templates, screen, template_from_image, write_report
+
+    templates = load_templates(args.templates)
+    if args.add_template:
+        if not args.label:
+            print("❌ Error: --add-template needs --label (e.g. cloudflare-challenge, parked-sedo)")
+            return 1
+        for path in args.add_template:
+            try:
+                templates.append(template_from_image(path, args.label))
+            except ValueError as e:
+                print(f"❌ Error: {e}")
+                return 1
+        save_templates(templates, args.templates)
+        print(f"🧩 {len(templates)} templates in {args.templates}")
+        return 0
+
+    root = Path(args.source)
+    if not root.exists():
+        print(f"❌ Error: Directory not found: {args.source}")
+        return 1
+    with phase(args.metrics, "scan"):
+        files = scan_local(root)
+    if not templates:
+        print(f"⚠️  No templates in {args.templates}: only blank frames will be flagged. "
+              "Build it with --add-template FILE --label NAME")
+    print(f"🔍 Screening {len(files)} thumbnails against {len(templates)} templates...")
+    report = screen(files, templates, workers=args.workers, timers=args.metrics)
+    write_report(report, args.flagged, args.recapture)
+
+    print()
+    print(f"📋 Screened {report.files} thumbnails in {report.seconds:.1f}s ({report.decoded} decoded, "
+          f"{report.files - report.decoded} from cache)")
+    print(f"   🚩 Flagged: {len(report.flagged)}")
+    for reason, count in report.reasons().items():
+        print(f"      {reason}: {count}")
+    print(f"   🔁 Re-capture: {len(report.domains())} domains written to {args.recapture}")
+    if report.candidates:
+        print(f"   🧩 {len(report.candidates)} images shared by {min(c['domains'] for c in report.candidates)}+ domains "
+              "look like templates; add them with --add-template FILE --label NAME:")
+        for candidate in report.candidates[:5]:
+            print(f"      {candidate['domains']} domains, e.g. {candidate['examples'][0]}")
+    print(f"📝 Flagged thumbnails written to {args.flagged} (upload, sync and plan leave them out)")
+    return 0
+
+
+def cmd_reconcile(args) -> int:
+    """Join every product's screenshot columns against one R2 listing; report and fix broken references"""
+    import json
+    import os
+
+    from .config import R2Config
+    from .gc import list_objects
+    from .metrics import phase
+    from .reconcile import apply_fixes, load_products, query_products, reconcile, report_json
+
+    if not (args.database or args.rows):
+        print("❌ Error: pass --database (reads DATABASE_URL) or --rows FILE (a CSV export of products)")
+        return 1
+    if args.fix and not args.database:
+        print("❌ Error: --fix writes to the database and needs --database")
+        return 1
+    database_url = os.environ.get("DATABASE_URL")
+    if args.database and not database_url:
+        print("❌ Error: --database needs DATABASE_URL")
+        return 1
+    config = R2Config.from_env()
+
+    print(f"🔍 Listing {R2_PREFIX} ...")
+    with phase(args.metrics, "list"):
+        objects = list_objects(config, concurrency=args.concurrency)
+    print(f"🗄️  Joining {len(objects)} objects against {'the products table' if args.database else args.rows}...")
+    rows = query_products(database_url) if args.database else load_products(args.rows)
+    try:
+        with phase(args.metrics, "join"):
+            report = reconcile(rows, objects)
+    except RuntimeError as e:
+        print(f"❌ Error: {e}")
+        return 1
+    counts = report.fix_counts()
+
+    print()
+    print("🔗 Reconcile")
+    print(f"   Products: {report.rows}  Objects: {report.objects}")
+    print(f"   ✅ Working screenshot: {report.ok}" + (f" ({report.external} served from elsewhere)"
+                                                      if report.external else ""))
+    print(f"   ❓ References to missing objects: {len(report.missing)}")
+    print(f"   🫥 Products without a screenshot: {len(report.without)}")
+    print(f"   👻 Objects no product's domain references: {len(report.orphans)} "
+          f"(+{report.superseded} superseded versions, see `gc`)")
+    print(f"   🛠️  Fixes: {counts['repoint']} repoint to the newest object, {counts['attach']} attach, "
+          f"{counts['recapture']} queue for recapture")
+
+    result = 0 if not report.missing else 1
+    payload = report_json(report)
+    if args.fix and report.fixes:
+        base_url = cdn_base_url(args)
+        print()
+        print(f"🚀 Writing {len(report.fixes)} fixes in batches of {args.batch_size} ({base_url})...")
+
+        def on_batch(count, updated):
+            print(f"  Batch: {updated}/{count} updated")
+
+        with phase(args.metrics, "fix"):
+            updated = apply_fixes(database_url, report.fixes, base_url, args.batch_size, on_batch=on_batch)
+        skipped = len(report.fixes) - updated
+        print(f"   ✅ Updated: {updated}" + (f" ({skipped} rows changed since the read, left alone)"
+                                             if skipped else ""))
+        payload["updated"] = updated
+        result = 0
+    elif report.fixes:
+        print("   Apply them with: --database --fix")
+
+    if args.report:
+        Path(args.report).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.report).write_text(json.dumps(payload, indent=2) + "\n")
+        print(f"   📝 Report: {args.report}")
+    return result
+
+
+def cmd_headers(args) -> int:
+    """Rewrite Content-Type and Cache-Control on existing objects with server-side copies, resumably"""
+    from .config import R2Config
+    from .gc import list_objects
+    from .headers import RewriteState, RewriteStats, failed_keys, pending_objects, rewrite_headers
+    from .metrics import phase
+
+    config = R2Config.from_env()
+    state = RewriteState(args.state)
+    if args.fresh:
+        state.reset()
+    try:
+        print(f"🔍 Listing {args.prefix} ...")
+        with phase(args.metrics, "list"):
+            objects = list_objects(config, args.prefix, concurrency=min(args.concurrency, 16))
+        stats = RewriteStats()
+        todo = list(pending_objects(objects, state, args.cache_control, args.modified_before, stats))
+        print(f"🏷️  Cache-Control: {args.cache_control}")
+        print(f"   Objects: {len(objects)}  Already done: {stats.skipped}  To rewrite: {len(todo)}"
+              + (f" (modified before {args.modified_before})" if args.modified_before else ""))
+        if args.dry_run or not todo:
+            for obj in todo[:10]:
+                print(f"  - {obj.key}")
+            if len(todo) > 10:
+                print(f"  ... and {len(todo) - 10} more")
+            return 0
+
+        print(f"🚀 Copying in place, {args.concurrency} at a time...")
+
+        def on_result(obj, outcome, error, stats):
+            if error:
+                print(f"   ❌ {obj.key}: {error[:100]}")
+            elif stats.completed % 500 == 0:
+                print(f"  Progress: {stats.completed}/{len(todo)} (✓{stats.rewritten} ✗{stats.failed})")
+
+        with phase(args.metrics, "rewrite"):
+            rewrite_headers(config, todo, state, args.cache_control, args.concurrency, on_result=on_result,
+                            stats=stats)
+        print()
+        print(f"   ✅ Rewritten: {stats.rewritten}")
+        if stats.changed:
+            print(f"   🔄 Replaced since the listing, left alone: {stats.changed}")
+        if stats.failed:
+            print(f"   ❌ Failed: {stats.failed} (run again to retry them)")
+            for key, error in failed_keys(state):
+                print(f"      {key}: {(error or '')[:100]}")
+        return 1 if stats.failed else 0
+    finally:
+        state.close()
+
+
+def cmd_snapshot(args) -> int:
+    """Pack the thumbnail tree into a few large tar.gz shards with an offset index, and upload them"""
+    from .config import R2Config
+    from .metrics import phase
+    from .snapshot import SnapshotError, export_snapshot, plan_shards
+
+    if not Path(args.source).is_dir():
+        print(f"❌ Error: Directory not found: {args.source}")
+        return 1
+    shard_size = int(args.shard_size * MB)
+    if args.dry_run:
+        shards = plan_shards(args.source, shard_size)
+        print(f"📦 {sum(map(len, shards))} files in {len(shards)} shards of up to {args.shard_size:g} MB")
+        return 0
+
+    config = R2Config.from_env()
+    print(f"📦 Packing {args.source} into shards of up to {args.shard_size:g} MB...")
+
+    def on_shard(shard, stats):
+        print(f"  ✅ {shard['key']}: {shard['files']} files, {shard['size'] / MB:.1f} MB")
+
+    try:
+        with phase(args.metrics, "snapshot"):
+            index, stats = export_snapshot(config, args.source, shard_size, args.prefix, args.work_dir,
+                                           on_shard=on_shard)
+    except SnapshotError as e:
+        print(f"❌ Error: {e}")
+        return 1
+    print()
+    print(f"📸 Snapshot {index['id']}")
+    print(f"   {stats.files} files, {stats.bytes / MB:.1f} MB in {stats.shards} shards "
+          f"({stats.transferred / MB:.1f} MB uploaded, {stats.seconds:.1f}s)")
+    print(f"   Restore with: python3 scripts/r2sync-cli.py restore --snapshot {index['id']}")
+    return 0
+
+
+def cmd_restore(args) -> int:
+    """Download a snapshot's shards in parallel and extract them while they stream in"""
+    from .config import R2Config
+    from .metrics import phase
+    from .snapshot import SnapshotError, load_index, restore_snapshot
+
+    config = R2Config.from_env()
+    try:
+        index = load_index(config, args.snapshot, args.prefix)
+    except SnapshotError as e:
+        print(f"❌ Error: {e}")
+        return 1
+    print(f"📸 Snapshot {index['id']} ({index['generatedAt']}): {index['files']} files, "
+          f"{index['bytes'] / MB:.1f} MB in {len(index['shards'])} shards")
+    print(f"🚀 Restoring into {args.dest}, {args.concurrency} shards at a time...")
+
+    def on_shard(shard, error, stats):
+        if error:
+            print(f"  ❌ {shard['key']}: {error[:100]}")
+        elif args.verbose:
+            print(f"  ✅ {shard['key']}")
+
+    with phase(args.metrics, "restore"):
+        stats = restore_snapshot(config, index, args.dest, args.concurrency, overwrite=args.overwrite,
+                                 on_shard=on_shard)
+    print()
+    print(f"   ✅ Restored: {stats.files} files, {stats.bytes / MB:.1f} MB "
+          f"({stats.transferred / MB:.1f} MB downloaded, {stats.seconds:.1f}s)")
+    if stats.skipped_files:
+        print(f"   ⏭️  Already present: {stats.skipped_files} files ({stats.skipped_shards} shards not downloaded)")
+    if stats.failed:
+        print(f"   ❌ Failed shards: {len(stats.failed)} (run again to retry them)")
+        return 1
+    return 0
+
+
+def cmd_watch(args) -> int:
+    """Upload new and changed thumbnails as capture writes them, until interrupted"""
+    import signal
+    import time
+
+    from .concurrency import controller_from_args
+    from .config import R2Config
+    from .journal import Journal, print_journal_summary
+    from .watch import WatchDaemon, open_watcher, run_watch
+
+    root = Path(args.source)
+    if not root.exists():
+        print(f"❌ Error: Directory not found: {args.source}")
+        return 1
+    config = R2Config.from_env()
+    controller = controller_from_args(args)
+    journal = Journal(args.journal)
+    flagged = flagged_filter(args)
+
+    def on_batch(kind, count):
+        label = {"retry": "failed or interrupted uploads from the journal",
+                 "catch-up": "files changed since the last run"}.get(kind, "new or changed thumbnails")
+        print(f"   ➕ {count} {label}")
+
+    def on_result(result, stats):
+        if not result.ok:
+            print(f"   ❌ {result.job.key}: {result.error[:100]}")
+        elif stats.uploaded % 50 == 0:
+            print(f"  Progress: ✓{stats.uploaded} ✗{stats.failed} | {stats.bytes / MB:.1f} MB")
+
+    # Watches go in before the catch-up, so nothing written meanwhile is missed
+    watcher = None if args.once else open_watcher(root, args.poll)
+    daemon = WatchDaemon(root, journal, watcher, state_path=args.state, settle=args.settle,
+                         batch_size=args.batch_size, batch_wait=args.batch_wait, keep=flagged, on_batch=on_batch)
+    since = ("the start" if daemon.watermark is None
+             else time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(daemon.watermark / 1e9)))
+    print(f"👀 Watching {args.source} ({'catch-up only' if args.once else type(watcher).__name__})")
+    print(f"🪣 Bucket: {config.bucket}")
+    print(f"   Catching up on changes since {since}")
+    if journal.recovered:
+        print(f"   ♻️  Resuming {journal.recovered} uploads interrupted in the last run")
+    print()
+
+    previous = {sig: signal.signal(sig, lambda *_: daemon.stop()) for sig in (signal.SIGINT, signal.SIGTERM)}
+    try:
+        stats = run_watch(daemon, config, args.concurrency, controller, observed(args, on_result), once=args.once)
+    finally:
+        for sig, handler in previous.items():
+            signal.signal(sig, handler)
+
+    print()
+    print("✅ Watch stopped" if not args.once else "✅ Caught up")
+    print(f"   Uploaded: {stats.uploaded} in {daemon.batches} batches")
+    print(f"   Failed: {stats.failed}")
+    print_journal_summary(journal)
+    print_flagged(flagged)
+    journal.close()
+    # A daemon keeps going past failures; a --once catch-up run is a batch job and reports them
+    return 1 if args.once and stats.failed else 0
+
+
+# ----------------------------------------------------------------------
+# Parser
+# ----------------------------------------------------------------------
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="r2sync", description="Screenshot upload tooling for Cloudflare R2")
+    commands = parser.add_subparsers(dest="command", metavar="command", required=True)
+
+    upload = commands.add_parser("upload", help="Upload the thumbnail tree (journaled, resumable)",
+                                 description=cmd_upload.__doc__)
+    add_source_argument(upload)
+    add_journal_arguments(upload)
+    add_concurrency_arguments(upload)
+    add_recompress_arguments(upload)
+    add_flagged_arguments(upload)
+    add_priority_arguments(upload)
+    add_shard_argument(upload)
+    add_warm_arguments(upload)
+    upload.add_argument("--dry-run", action="store_true", help="Count what would be uploaded without uploading")
+    add_metrics_arguments(upload)
+    upload.set_defaults(handler=cmd_upload)
+
+    sync = commands.add_parser("sync", help="Upload only files missing or changed in R2",
+                               description=cmd_sync.__doc__)
+    add_source_argument(sync)
+    add_manifest_arguments(sync)
+    add_concurrency_arguments(sync)
+    sync.add_argument("--dry-run", action="store_true", help="Print the plan without uploading")
+    add_flagged_arguments(sync)
+    add_priority_arguments(sync)
+    add_shard_argument(sync)
+    add_warm_arguments(sync)
+    add_metrics_arguments(sync)
+    sync.set_defaults(handler=cmd_sync)
+
+    plan = commands.add_parser("plan", help="Show what sync would upload", description=cmd_plan.__doc__)
+    add_source_argument(plan)
+    add_manifest_arguments(plan)
+    add_flagged_arguments(plan)
+    add_metrics_arguments(plan)
+    plan.set_defaults(handler=cmd_plan)
+
+    retry = commands.add_parser("retry", help="Retry the uploads the journal records as failed",
+                                description=cmd_retry.__doc__)
+    retry.add_argument("--journal", default=JOURNAL_PATH, help=f"Journal path (default: {JOURNAL_PATH})")
+    add_concurrency_arguments(retry, default_max=16)  # Reduced for retry
+    retry.add_argument("--dry-run", action="store_true", help="Count the failed uploads without retrying")
+    add_priority_arguments(retry)
+    add_shard_argument(retry)
+    add_metrics_arguments(retry)
+    retry.set_defaults(handler=cmd_retry)
+
+    verify = commands.add_parser("verify", help="Audit local files against R2 sizes and ETags",
+                                description=cmd_verify.__doc__)
+    add_source_argument(verify)
+    verify.add_argument("--manifest", default=MANIFEST_PATH, help=f"Manifest path (default: {MANIFEST_PATH})")
+    verify.add_argument("--workers", type=int, default=None, help="Hashing processes (default: CPU count)")
+    verify.add_argument("--report", help="Write missing, mismatched and extra keys as JSON to this path")
+    add_metrics_arguments(verify)
+    verify.set_defaults(handler=cmd_verify)
+
+    dedup = commands.add_parser("dedup", help="Upload each distinct thumbnail once, keyed by content hash",
+                                description=cmd_dedup.__doc__)
+    add_source_argument(dedup)
+    dedup.add_argument("--dry-run", action="store_true", help="Print the dedup report without uploading")
+    dedup.add_argument("--mapping", default=MAPPING_PATH, help=f"Mapping output (default: {MAPPING_PATH})")
+    dedup.add_argument("--report", help="Also write the run report as JSON to this path")
+    dedup.add_argument("--workers", type=int, default=None, help="Hashing processes (default: CPU count)")
+    add_concurrency_arguments(dedup)
+    add_metrics_arguments(dedup)
+    dedup.set_defaults(handler=cmd_dedup)
+
+    gc = commands.add_parser("gc", help="Delete superseded thumbnail versions from R2", description=cmd_gc.__doc__)
+    add_source_argument(gc)
+    gc.add_argument("--manifest", default=MANIFEST_PATH, help=f"Manifest path (default: {MANIFEST_PATH})")
+    gc.add_argument("--referenced", help="File of keys or URLs the database references, one per line")
+    gc.add_argument("--database", action="store_true",
+                    help="Read referenced keys from the products table at DATABASE_URL (needs psycopg)")
+    gc.add_argument("--newest-only", action="store_true",
+                    help="Delete without --database or --referenced, keeping only the newest version per domain "
+                         "(otherwise gc without a reference source is a dry run)")
+    gc.add_argument("--dry-run", action="store_true", help="Report what would be deleted without deleting")
+    gc.add_argument("--prune-local", action="store_true",
+                    help="Also remove local copies of deleted versions so sync does not upload them again")
+    gc.add_argument("--batch-size", type=int, default=1000, help="Keys per DeleteObjects request (max 1000)")
+    gc.add_argument("--concurrency", type=int, default=4, help="DeleteObjects requests in flight (default: 4)")
+    gc.add_argument("--report", help="Write the GC report as JSON to this path")
+    gc.set_defaults(handler=cmd_gc)
+
+    fanout = commands.add_parser("fanout", help="Run one worker per shard in parallel and merge their metrics",
+                                 description=cmd_fanout.__doc__)
+    fanout.add_argument("--workers", type=int, required=True, help="Number of worker processes (shards)")
+    fanout.add_argument("--metrics-dir", default=RUNS_DIR, help=f"Where runs are written (default: {RUNS_DIR})")
+    fanout.add_argument("worker_command", choices=("upload", "sync", "retry"), help="Command each worker runs")
+    fanout.add_argument("worker_args", nargs=argparse.REMAINDER, help="Options passed to every worker")
+    fanout.set_defaults(handler=cmd_fanout)
+
+    merge = commands.add_parser("merge-runs", help="Merge the metrics of several runs",
+                                description=cmd_merge_runs.__doc__)
+    merge.add_argument("runs", nargs="+", help="Run directories, or directories containing them")
+    merge.add_argument("--out", required=True, help="Directory for the merged events, summary and metrics")
+    merge.set_defaults(handler=cmd_merge_runs)
+
+    warm = commands.add_parser("warm", help="Fill the CDN edge cache for a list of keys", description=cmd_warm.__doc__)
+    warm.add_argument("--keys", help="File of keys or CDN URLs, one per line")
+    warm.add_argument("--events", nargs="+", help="Run directories (or events.jsonl) whose uploaded keys to warm")
+    warm.add_argument("--confirm", action="store_true", help="Re-request every key with HEAD and report the HIT ratio")
+    add_warm_arguments(warm, flag=False)
+    add_metrics_arguments(warm)
+    warm.set_defaults(handler=cmd_warm)
+
+    variants = commands.add_parser("variants", help="Render and upload responsive thumbnail variants for srcset",
+                                   description=cmd_variants.__doc__)
+    add_source_argument(variants)
+    variants.add_argument("--widths", type=int_list, default=(160, 240, 320, 400),
+                          help="Comma-separated widths in pixels (default: 160,240,320,400)")
+    variants.add_argument("--formats", type=format_list, default=("avif", "webp"),
+                          help="Comma-separated formats (default: avif,webp)")
+    variants.add_argument("--workers", type=int, default=None, help="Encoding processes (default: CPU count)")
+    variants.add_argument("--out", default=VARIANTS_MANIFEST_PATH,
+                          help=f"Frontend manifest output (default: {VARIANTS_MANIFEST_PATH})")
+    variants.add_argument("--state", default=".r2sync/variants/state.json",
+                          help="What was rendered from which source (default: .r2sync/variants/state.json)")
+    variants.add_argument("--cdn-url", default=None,
+                          help=f"Base URL for srcset entries (default: R2_PUBLIC_URL, else {CDN_URL})")
+    variants.add_argument("--dry-run", action="store_true", help="Count the variants to render without rendering")
+    variants.add_argument("--no-upload", action="store_true", help="Render and write the manifest without uploading")
+    variants.add_argument("--journal", default=JOURNAL_PATH, help=f"Journal path (default: {JOURNAL_PATH})")
+    variants.add_argument("--fresh", action="store_true", help="Upload every variant, ignoring those already done")
+    add_concurrency_arguments(variants)
+    add_metrics_arguments(variants)
+    add_flagged_arguments(variants)
+    variants.set_defaults(handler=cmd_variants)
+
+    screen = commands.add_parser("screen", help="Flag blank and placeholder thumbnails for re-capture",
+                                 description=cmd_screen.__doc__)
+    add_source_argument(screen)
+    screen.add_argument("--workers", type=int, default=None, help="Decoding processes (default: CPU count)")
+    screen.add_argument("--templates", default=BAD_TEMPLATES_PATH,
+                        help=f"Known bad templates as perceptual hashes (default: {BAD_TEMPLATES_PATH})")
+    screen.add_argument("--add-template", nargs="+", metavar="FILE",
+                        help="Add these example images to the templates under --label, then exit")
+    screen.add_argument("--label", help="Template label for --add-template")
+    screen.add_argument("--flagged", default=FLAGGED_PATH, help=f"Flagged thumbnails output (default: {FLAGGED_PATH})")
+    screen.add_argument("--recapture", default=".r2sync/screen/recapture.txt",
+                        help="Domains to re-capture, one per line (default: .r2sync/screen/recapture.txt)")
+    add_metrics_arguments(screen)
+    screen.set_defaults(handler=cmd_screen)
+
+    reconcile = commands.add_parser("reconcile", help="Find products whose screenshots are missing in R2 and fix them",
+                                    description=cmd_reconcile.__doc__)
+    reconcile.add_argument("--database", action="store_true",
+                           help="Stream products from DATABASE_URL (needs psycopg)")
+    reconcile.add_argument("--rows", help="Read products from a CSV export instead (id, url, screenshot_* columns)")
+    reconcile.add_argument("--fix", action="store_true",
+                           help="Write repoints, attachments and recapture requests back to the database")
+    reconcile.add_argument("--batch-size", type=int, default=1000, help="Rows per UPDATE (default: 1000)")
+    reconcile.add_argument("--concurrency", type=int, default=16, help="Listing requests in flight (default: 16)")
+    reconcile.add_argument("--cdn-url", default=None,
+                           help=f"Base URL for repaired screenshot URLs (default: R2_PUBLIC_URL, else {CDN_URL})")
+    reconcile.add_argument("--report", help="Write the full report as JSON to this path")
+    add_metrics_arguments(reconcile)
+    reconcile.set_defaults(handler=cmd_reconcile)
+
+    headers = commands.add_parser("headers", help="Set Cache-Control on objects already in R2 without re-uploading",
+                                  description=cmd_headers.__doc__)
+    headers.add_argument("--prefix", default=R2_PREFIX, help=f"Prefix to rewrite (default: {R2_PREFIX})")
+    headers.add_argument("--cache-control", default=CACHE_CONTROL,
+                         help=f"Cache-Control to set (default: {CACHE_CONTROL})")
+    headers.add_argument("--modified-before",
+                         help="Only objects last modified before this ISO date (e.g. 2026-10-17); "
+                              "later uploads already carry the header")
+    headers.add_argument("--state", default=HEADERS_STATE_PATH,
+                         help=f"Progress of earlier runs (default: {HEADERS_STATE_PATH})")
+    headers.add_argument("--fresh", action="store_true", help="Rewrite everything, ignoring earlier progress")
+    headers.add_argument("--concurrency", type=int, default=32, help="Copies in flight (default: 32)")
+    headers.add_argument("--dry-run", action="store_true", help="Count and list what would be rewritten")
+    add_metrics_arguments(headers)
+    headers.set_defaults(handler=cmd_headers)
+
+    snapshot = commands.add_parser("snapshot", help="Upload the thumbnail tree as a few packed archive shards",
+                                   description=cmd_snapshot.__doc__)
+    add_source_argument(snapshot)
+    snapshot.add_argument("--shard-size", type=float, default=256,
+                          help="Megabytes of files per shard (default: 256)")
+    snapshot.add_argument("--prefix", default=SNAPSHOT_PREFIX, help=f"Snapshot prefix (default: {SNAPSHOT_PREFIX})")
+    snapshot.add_argument("--work-dir", default=SNAPSHOT_WORK_DIR,
+                          help=f"Where shards are built before upload (default: {SNAPSHOT_WORK_DIR})")
+    snapshot.add_argument("--dry-run", action="store_true", help="Show the shard plan without packing anything")
+    add_metrics_arguments(snapshot)
+    snapshot.set_defaults(handler=cmd_snapshot)
+
+    restore = commands.add_parser("restore", help="Rebuild the thumbnail tree from a snapshot",
+                                  description=cmd_restore.__doc__)
+    restore.add_argument("--dest", default=SCREENSHOTS_DIR,
+                         help=f"Directory to restore into (default: {SCREENSHOTS_DIR})")
+    restore.add_argument("--snapshot", help="Snapshot id (default: the latest)")
+    restore.add_argument("--prefix", default=SNAPSHOT_PREFIX, help=f"Snapshot prefix (default: {SNAPSHOT_PREFIX})")
+    restore.add_argument("--concurrency", type=int, default=4, help="Shards downloaded at once (default: 4)")
+    restore.add_argument("--overwrite", action="store_true",
+                         help="Rewrite files that are already present with the right size")
+    restore.add_argument("--verbose", action="store_true", help="Print every shard as it completes")
+    add_metrics_arguments(restore)
+    restore.set_defaults(handler=cmd_restore)
+
+    watch = commands.add_parser("watch", help="Upload thumbnails seconds after capture writes them (daemon)",
+                                description=cmd_watch.__doc__)
+    add_source_argument(watch)
+    watch.add_argument("--journal", default=JOURNAL_PATH, help=f"Journal path (default: {JOURNAL_PATH})")
+    watch.add_argument("--state", default=".r2sync/watch.json",
+                       help="Watermark of changes already journaled (default: .r2sync/watch.json)")
+    watch.add_argument("--settle", type=float, default=1.0,
+                       help="Seconds a file must go without writes before it is uploaded (default: 1.0)")
+    watch.add_argument("--batch-size", type=int, default=64, help="Most files per micro-batch (default: 64)")
+    watch.add_argument("--batch-wait", type=float, default=0.5,
+                       help="Seconds to gather a micro-batch once a file is ready (default: 0.5)")
+    watch.add_argument("--poll", type=float, default=None, metavar="SECONDS",
+                       help="Poll the tree every SECONDS instead of using inotify (default off Linux: 2)")
+    watch.add_argument("--once", action="store_true",
+                       help="Only catch up on changes since the last run, then exit (for cron)")
+    add_concurrency_arguments(watch, default_max=16)
+    add_flagged_arguments(watch)
+    add_metrics_arguments(watch)
+    watch.set_defaults(handler=cmd_watch)
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        lock = lock_shard(args)
+    except ShardBusy as e:
+        print(f"❌ Error: {e}")
+        return 1
+    args.metrics = start_metrics(args)
+    try:
+        return args.handler(args)
+    finally:
+        if args.metrics:
+            args.metrics.close()
+            args.metrics.print_summary()
+        if lock:
+            lock.release()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
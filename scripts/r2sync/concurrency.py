@@ -0,0 +1,127 @@
+"""
+Adaptive (AIMD) concurrency control for uploads.
+
+Instead of a hand-tuned MAX_WORKERS per script, the uploader starts a pool of
+`maximum` workers but only lets `limit` requests run at once, and the
+controller moves `limit` with what the backend reports:
+
+  - additive increase: +1 after a full window (`limit` successes) whose
+    smoothed latency stays under `tolerance` x the baseline
+  - multiplicative decrease: x`decrease` on a 429/503 throttle, or when
+    smoothed latency climbs past the tolerance (queueing at the backend)
+
+The baseline is a slow moving average of latency (BASELINE_DRIFT per
+response), and latency counts against a window only when most of its
+responses were slow. An all-time minimum as the baseline would be one lucky
+response that ordinary jitter never gets back under, and the limit would
+collapse to `minimum` without a single throttle. Latency is tracked per size
+bucket (powers of 4 bytes), so 8 MiB multipart parts and 20 KB thumbnails in
+the same run are each compared with their own kind.
+
+Decreases are rate-limited by `cooldown` so one burst of concurrent 429s
+counts once. Every change is logged and kept in `history`, so a run shows
+the throughput ceiling the backend actually allowed.
+"""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Callable, Optional
+
+BASELINE_DRIFT = 0.01
+
+
+class AIMDController:
+    def __init__(self, initial: int = 8, minimum: int = 1, maximum: int = 128,
+                 decrease: float = 0.5, tolerance: float = 2.0, cooldown: float = 1.0,
+                 log: Optional[Callable[[str], None]] = print):
+        self.limit = max(minimum, min(initial, maximum))
+        self.minimum = minimum
+        self.maximum = maximum
+        self.decrease = decrease
+        self.tolerance = tolerance
+        self.cooldown = cooldown
+        self.log = log
+
+        self.in_flight = 0
+        self.peak = self.limit
+        self.throttled = 0
+        self.history = []  # (seconds since start, old limit, new limit, reason)
+        self._cond = asyncio.Condition()
+        self._started = time.monotonic()
+        self._window = 0
+        self._slow = 0  # responses in the window with latency past the tolerance
+        self._ewma = None  # of the bucket last reported, for the log
+        self._buckets = {}  # size bucket -> [smoothed latency, baseline]
+        self._last_decrease = 0.0
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one of the `limit` request slots"""
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            async with self._cond:
+                self.in_flight -= 1
+                self._cond.notify_all()
+
+    def _set_limit(self, new: int, reason: str):
+        new = max(self.minimum, min(self.maximum, new))
+        if new == self.limit:
+            return
+        old, self.limit = self.limit, new
+        self.peak = max(self.peak, new)
+        self.history.append((round(time.monotonic() - self._started, 3), old, new, reason))
+        if self.log:
+            latency = f", latency {self._ewma * 1000:.0f}ms" if self._ewma is not None else ""
+            self.log(f"  ⚙️  concurrency {old} → {new} ({reason}{latency})")
+        if new > old:
+            # Wake waiters for the extra slots; decreases simply drain
+            asyncio.ensure_future(self._notify())
+
+    async def _notify(self):
+        async with self._cond:
+            self._cond.notify_all()
+
+    def _backoff(self, reason: str):
+        now = time.monotonic()
+        if now - self._last_decrease < self.cooldown:
+            return
+        self._last_decrease = now
+        self._window = self._slow = 0
+        self._set_limit(int(self.limit * self.decrease), reason)
+
+    def on_success(self, latency: float, size: int = 0):
+        """Count a completed request; `size` is its body size, so latency is compared per size bucket"""
+        bucket = self._buckets.get(size.bit_length() // 2)
+        if bucket is None:
+            bucket = self._buckets[size.bit_length() // 2] = [latency, latency]
+        ewma = bucket[0] = 0.8 * bucket[0] + 0.2 * latency
+        baseline = bucket[1] = bucket[1] + BASELINE_DRIFT * (latency - bucket[1])
+        self._ewma = ewma
+        self._slow += ewma > baseline * self.tolerance and ewma - baseline > 0.005
+        self._window += 1
+        if self._window >= self.limit:
+            # Judge latency over the whole window: a few slow responses are jitter, a slow majority is queueing
+            slow, self._window, self._slow = self._slow, 0, 0
+            if slow * 2 > self.limit:
+                self._backoff("latency rising")
+            else:
+                self._set_limit(self.limit + 1, "window ok")
+
+    def on_throttle(self):
+        self.throttled += 1
+        self._backoff("throttled")
+
+    def summary(self) -> str:
+        settled = self.history[-1][2] if self.history else self.limit
+        return (f"concurrency peak {self.peak}, final {settled}, {len(self.history)} adjustments, "
+                f"{self.throttled} throttled responses")
+
+
+def controller_from_args(args) -> Optional[AIMDController]:
+    if args.concurrency:
+        return None
+    return AIMDController(initial=8, maximum=args.max_concurrency)
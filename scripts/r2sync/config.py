@@ -0,0 +1,90 @@
+"""
+R2 configuration shared by the upload scripts.
+
+Credentials come from the same environment variables the app uses
+(see .env.example). R2_ENDPOINT_URL overrides the account endpoint, which is
+how the scripts are pointed at a local S3-compatible stand-in.
+"""
+import os
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+
+BUCKET_NAME = "dobacklinks"
+SCREENSHOTS_DIR = "public/screenshots/thumbnails"
+R2_PREFIX = "screenshots/thumbnails/"
+MAPPING_PATH = "public/screenshots/thumbnail-map.json"
+# srcset variants per domain, written by `r2sync-cli.py variants`
+VARIANTS_MANIFEST_PATH = "public/screenshots/thumbnail-variants.json"
+# Public URL thumbnails are served from when R2_PUBLIC_URL is not set
+CDN_URL = "https://cdn.dobacklinks.com"
+# Packed snapshots of the thumbnail set (snapshot.py)
+SNAPSHOT_PREFIX = "snapshots/thumbnails/"
+# Every key the tooling writes is versioned ({domain}-{timestamp}-thumb, content hashes, -{w}w variants)
+# and never rewritten in place, so browsers and the CDN may keep it for a year without revalidating
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Local state (gitignored)
+JOURNAL_PATH = ".r2sync/journal.sqlite"
+MANIFEST_PATH = ".r2sync/manifest.sqlite"
+RUNS_DIR = ".r2sync/runs"
+# Progress of `r2sync-cli.py headers`
+HEADERS_STATE_PATH = ".r2sync/headers.sqlite"
+# Where `r2sync-cli.py snapshot` builds shards before uploading them
+SNAPSHOT_WORK_DIR = ".r2sync/snapshot"
+# Thumbnails `r2sync-cli.py screen` flagged as blank or placeholder captures
+FLAGGED_PATH = ".r2sync/screen/flagged.json"
+# Known placeholder pages (challenge pages, parking templates) as perceptual hashes. Not shipped:
+# built with `screen --add-template`, then worth committing
+BAD_TEMPLATES_PATH = "scripts/screenshot-templates.json"
+
+# MIME types
+MIME_TYPES = {
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".gif": "image/gif",
+    ".webp": "image/webp",
+    ".svg": "image/svg+xml",
+    ".avif": "image/avif",
+}
+
+
+def get_mime_type(filepath) -> str:
+    ext = Path(filepath).suffix.lower()
+    return MIME_TYPES.get(ext, "application/octet-stream")
+
+
+@dataclass(frozen=True)
+class R2Config:
+    access_key_id: str
+    secret_access_key: str
+    endpoint_url: str
+    bucket: str = BUCKET_NAME
+    region: str = "auto"
+    public_url: str = ""
+
+    @classmethod
+    def from_env(cls, bucket: str = None) -> "R2Config":
+        """Build a config from R2_* environment variables, exiting if any are missing"""
+        access_key_id = os.environ.get("R2_ACCESS_KEY_ID")
+        secret_access_key = os.environ.get("R2_SECRET_ACCESS_KEY")
+        account_id = os.environ.get("R2_ACCOUNT_ID")
+        endpoint_url = os.environ.get("R2_ENDPOINT_URL")
+
+        if not endpoint_url and account_id:
+            endpoint_url = f"https://{account_id}.r2.cloudflarestorage.com"
+
+        if not all([access_key_id, secret_access_key, endpoint_url]):
+            print("❌ Error: R2 credentials not set!")
+            print("   Please set R2_ACCESS_KEY_ID, R2_SECRET_ACCESS_KEY, and R2_ACCOUNT_ID")
+            print("   (or R2_ENDPOINT_URL to use a local S3-compatible endpoint)")
+            sys.exit(1)
+
+        return cls(
+            access_key_id=access_key_id,
+            secret_access_key=secret_access_key,
+            endpoint_url=endpoint_url.rstrip("/"),
+            bucket=bucket or os.environ.get("R2_BUCKET_NAME") or BUCKET_NAME,
+            public_url=os.environ.get("R2_PUBLIC_URL", "").rstrip("/"),
+        )
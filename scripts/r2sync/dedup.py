@@ -0,0 +1,185 @@
+"""
+Content-addressed dedup of screenshot thumbnails.
+
+Many thumbnails are byte-identical (parked domains, Cloudflare challenge
+pages, blank error pages), yet each one is uploaded under its own
+`{domain}-{ts}-thumb.webp` key. The dedup stage hashes the local files in a
+process pool, uploads each distinct blob once under a key derived from its
+SHA-256 (`screenshots/blobs/ab/abcd....webp`), and writes a domain -> object
+mapping for the app to resolve thumbnails through.
+
+Blob keys are immutable, so blobs already in R2 (from one listing of the
+blob prefix) are never uploaded again. The plan reports the bytes and
+requests saved against uploading every file under its own key.
+"""
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+from .config import MAPPING_PATH, R2Config
+from .jobs import UploadJob
+from .metrics import phase
+from .scan import iter_files, parse_thumbnail_name
+
+BLOB_PREFIX = "screenshots/blobs/"
+HASH_CHUNK = 1024 * 1024
+
+
+def sha256_file(path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(HASH_CHUNK):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def blob_key(digest: str, suffix: str, prefix: str = BLOB_PREFIX) -> str:
+    # Two-character fan-out keeps listings of the blob prefix evenly spread
+    return f"{prefix}{digest[:2]}/{digest}{suffix}"
+
+
+@dataclass
+class Thumbnail:
+    path: Path
+    domain: str
+    timestamp: int
+    size: int
+    sha256: str = ""
+
+    @property
+    def key(self) -> str:
+        return blob_key(self.sha256, self.path.suffix)
+
+
+@dataclass
+class DedupPlan:
+    files: List[Thumbnail] = field(default_factory=list)
+    blobs: Dict[str, Thumbnail] = field(default_factory=dict)  # sha256 -> first file with that content
+    existing: Set[str] = field(default_factory=set)  # sha256 of blobs already in R2
+
+    @property
+    def upload(self) -> List[Thumbnail]:
+        return [thumb for digest, thumb in self.blobs.items() if digest not in self.existing]
+
+    def jobs(self) -> List[UploadJob]:
+        return [UploadJob(thumb.path, thumb.key) for thumb in self.upload]
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(thumb.size for thumb in self.files)
+
+    @property
+    def upload_bytes(self) -> int:
+        return sum(thumb.size for thumb in self.upload)
+
+    @property
+    def duplicates(self) -> int:
+        return len(self.files) - len(self.blobs)
+
+    @property
+    def duplicate_bytes(self) -> int:
+        return self.total_bytes - sum(thumb.size for thumb in self.blobs.values())
+
+    @property
+    def requests_saved(self) -> int:
+        return len(self.files) - len(self.upload)
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.total_bytes - self.upload_bytes
+
+    def summary(self) -> dict:
+        return {
+            "files": len(self.files),
+            "unique_blobs": len(self.blobs),
+            "duplicates": self.duplicates,
+            "duplicate_bytes": self.duplicate_bytes,
+            "already_stored": len(self.existing),
+            "uploads": len(self.upload),
+            "upload_bytes": self.upload_bytes,
+            "requests_saved": self.requests_saved,
+            "bytes_saved": self.bytes_saved,
+        }
+
+
+def scan_thumbnails(root) -> List[Thumbnail]:
+    thumbs = []
+    for entry in iter_files(root):
+        parsed = parse_thumbnail_name(entry.name)
+        # Files not named by ScreenshotStorage map under their own stem
+        domain, timestamp = parsed or (Path(entry.name).stem, 0)
+        thumbs.append(Thumbnail(Path(entry.path), domain, timestamp, entry.stat().st_size))
+    return thumbs
+
+
+def hash_thumbnails(thumbs: List[Thumbnail], workers: Optional[int] = None):
+    """Fill in SHA-256s, hashing in a process pool (workers=1 hashes inline)"""
+    paths = [thumb.path for thumb in thumbs]
+    if workers == 1 or len(paths) < 2:
+        digests = map(sha256_file, paths)
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+
+        workers = workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(workers) as pool:
+            digests = list(pool.map(sha256_file, paths, chunksize=max(1, len(paths) // (workers * 8))))
+    for thumb, digest in zip(thumbs, digests):
+        thumb.sha256 = digest
+
+
+def _list_blobs(config: R2Config, prefix: str, concurrency: int) -> Set[str]:
+    import asyncio
+
+    from .listing import list_prefix
+    from .s3 import S3Client
+
+    async def run():
+        async with S3Client(config, max_connections=concurrency) as client:
+            return await list_prefix(client, prefix, concurrency=concurrency)
+
+    shards = asyncio.run(run())
+    return {Path(obj.key).stem for objects in shards.values() for obj in objects}
+
+
+def build_dedup_plan(thumbs: List[Thumbnail], config: Optional[R2Config], prefix: str = BLOB_PREFIX,
+                     workers: Optional[int] = None, concurrency: int = 16, timers=None) -> DedupPlan:
+    """Hash, group by content and drop blobs already in R2 (config=None skips the listing)"""
+    with phase(timers, "hash"):
+        hash_thumbnails(thumbs, workers)
+    plan = DedupPlan(files=thumbs)
+    for thumb in thumbs:
+        plan.blobs.setdefault(thumb.sha256, thumb)
+    if config is not None and plan.blobs:
+        with phase(timers, "list"):
+            stored = _list_blobs(config, prefix, concurrency)
+        plan.existing = stored & plan.blobs.keys()
+    return plan
+
+
+def build_mapping(thumbs: Iterable[Thumbnail], public_url: str = "", failed: Set[str] = frozenset()) -> dict:
+    """domain -> blob for the newest capture of each domain, leaving out blobs that failed to upload"""
+    domains = {}
+    for thumb in sorted(thumbs, key=lambda t: (t.domain, t.timestamp)):
+        if thumb.sha256 in failed:
+            continue
+        entry = {"key": thumb.key, "sha256": thumb.sha256, "size": thumb.size, "capturedAt": thumb.timestamp}
+        if public_url:
+            entry["url"] = f"{public_url.rstrip('/')}/{thumb.key}"
+        domains[thumb.domain] = entry
+    return {
+        "generatedAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "prefix": BLOB_PREFIX,
+        "domains": dict(sorted(domains.items())),
+    }
+
+
+def write_mapping(mapping: dict, path: str = MAPPING_PATH):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(json.dumps(mapping, indent=2) + "\n")
+    os.replace(tmp, path)
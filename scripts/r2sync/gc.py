@@ -0,0 +1,186 @@
+"""
+Garbage collection of superseded screenshot thumbnails in R2.
+
+ScreenshotStorage.saveScreenshot() writes a new `{domain}-{Date.now()}-thumb.webp`
+key on every recapture and never removes the previous one, so
+screenshots/thumbnails/ accumulates stale versions that every listing and
+sync has to page through.
+
+The GC lists the prefix once (ranges in parallel, see listing.py), groups the
+keys by sanitized domain and keeps, per domain:
+
+  - the newest version. A capture uploads before it updates the product row,
+    so the newest key survives even while the database still points at an
+    older one.
+  - every version the database references (products.screenshot_r2_key and
+    screenshot_thumbnail_url)
+
+Everything else is deleted with DeleteObjects, up to 1000 keys per request,
+a few requests in flight. Keys that do not parse as thumbnail names are
+never touched.
+"""
+import asyncio
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import unquote, urlsplit
+
+from .config import R2_PREFIX, R2Config
+from .listing import list_prefix
+from .retry import RETRYABLE, backoff_delay, classify_error
+from .s3 import TRANSPORT_ERRORS, ObjectInfo, S3Client, S3Error
+from .scan import iter_files, key_for, parse_thumbnail_name
+
+DELETE_BATCH = 1000  # DeleteObjects limit
+DELETE_CONCURRENCY = 4
+REFERENCE_QUERY = """
+    SELECT screenshot_r2_key, screenshot_thumbnail_url FROM products
+    WHERE screenshot_r2_key IS NOT NULL OR screenshot_thumbnail_url IS NOT NULL
+"""
+
+
+def key_from_reference(reference: str, prefix: str = R2_PREFIX) -> Optional[str]:
+    """Object key for an R2 key, a CDN URL or a /screenshots/... path; None if outside prefix"""
+    reference = (reference or "").strip()
+    path = urlsplit(reference).path if "://" in reference else reference
+    key = unquote(path).lstrip("/")
+    return key if key.startswith(prefix) else None
+
+
+def load_references(path, prefix: str = R2_PREFIX) -> Set[str]:
+    """Referenced keys from a file of keys or URLs, one per line (e.g. a psql COPY export)"""
+    with open(path, encoding="utf-8") as f:
+        keys = (key_from_reference(line, prefix) for line in f)
+        return {key for key in keys if key}
+
+
+def database_driver():
+    """psycopg, else psycopg2; RuntimeError if neither is installed"""
+    try:
+        import psycopg as driver
+    except ImportError:
+        try:
+            import psycopg2 as driver
+        except ImportError:
+            raise RuntimeError("reading the database needs psycopg "
+                               "(pip install 'psycopg[binary]'); or pass a file exported with psql") from None
+    return driver
+
+
+def query_references(database_url: str, prefix: str = R2_PREFIX) -> Set[str]:
+    """Referenced keys straight from the products table (needs psycopg or psycopg2)"""
+    driver = database_driver()
+    with driver.connect(database_url) as connection:
+        with connection.cursor() as cursor:
+            cursor.execute(REFERENCE_QUERY)
+            keys = {key_from_reference(value, prefix) for row in cursor for value in row if value}
+    keys.discard(None)
+    return keys
+
+
+@dataclass
+class GCPlan:
+    keep: List[ObjectInfo] = field(default_factory=list)
+    delete: List[ObjectInfo] = field(default_factory=list)
+    domains: int = 0
+    referenced_kept: int = 0  # older versions kept only because the database points at them
+    unmatched: int = 0  # keys that are not thumbnail names, left alone
+
+    @property
+    def delete_bytes(self) -> int:
+        return sum(obj.size for obj in self.delete)
+
+    @property
+    def keep_bytes(self) -> int:
+        return sum(obj.size for obj in self.keep)
+
+    def summary(self) -> dict:
+        return {
+            "objects": len(self.keep) + len(self.delete),
+            "domains": self.domains,
+            "keep": len(self.keep),
+            "keep_bytes": self.keep_bytes,
+            "referenced_kept": self.referenced_kept,
+            "unmatched": self.unmatched,
+            "delete": len(self.delete),
+            "delete_bytes": self.delete_bytes,
+        }
+
+
+def plan_gc(objects: Iterable[ObjectInfo], referenced: Set[str] = frozenset()) -> GCPlan:
+    plan = GCPlan()
+    versions: Dict[str, List[Tuple[int, ObjectInfo]]] = {}
+    for obj in objects:
+        parsed = parse_thumbnail_name(obj.key)
+        if parsed is None:
+            plan.unmatched += 1
+            plan.keep.append(obj)
+            continue
+        domain, timestamp = parsed
+        versions.setdefault(domain, []).append((timestamp, obj))
+
+    plan.domains = len(versions)
+    for entries in versions.values():
+        entries.sort(key=lambda entry: (entry[0], entry[1].key))
+        *older, (_, newest) = entries
+        plan.keep.append(newest)
+        for _, obj in older:
+            if obj.key in referenced:
+                plan.keep.append(obj)
+                plan.referenced_kept += 1
+            else:
+                plan.delete.append(obj)
+    plan.delete.sort(key=lambda obj: obj.key)
+    return plan
+
+
+def list_objects(config: R2Config, prefix: str = R2_PREFIX, concurrency: int = 16) -> List[ObjectInfo]:
+    async def run():
+        async with S3Client(config, max_connections=concurrency) as client:
+            return await list_prefix(client, prefix, concurrency=concurrency)
+
+    shards = asyncio.run(run())
+    return [obj for index in sorted(shards) for obj in shards[index]]
+
+
+async def _delete_batch(client: S3Client, keys: List[str], retries: int) -> List[Tuple[str, str]]:
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            return [(key, f"{code}: {message}") for key, code, message in await client.delete_objects(keys)]
+        except (S3Error, *TRANSPORT_ERRORS) as e:
+            if classify_error(e) in RETRYABLE and attempt <= retries:
+                await asyncio.sleep(backoff_delay(attempt))
+                continue
+            error = str(e) if isinstance(e, S3Error) else f"{type(e).__name__}: {e}"
+            return [(key, error) for key in keys]
+
+
+def delete_keys(config: R2Config, keys: List[str], batch_size: int = DELETE_BATCH,
+                concurrency: int = DELETE_CONCURRENCY, retries: int = 3, on_batch=None) -> List[Tuple[str, str]]:
+    """Delete keys in batches of up to 1000; returns [(key, error)] for those that were not deleted"""
+    batches = [keys[i:i + batch_size] for i in range(0, len(keys), batch_size)]
+
+    async def run():
+        limit = asyncio.Semaphore(concurrency)
+        async with S3Client(config, max_connections=concurrency) as client:
+            async def one(batch):
+                async with limit:
+                    errors = await _delete_batch(client, batch, retries)
+                if on_batch:
+                    on_batch(len(batch), len(errors))
+                return errors
+
+            return [error for errors in await asyncio.gather(*(one(b) for b in batches)) for error in errors]
+
+    return asyncio.run(run()) if batches else []
+
+
+def local_copies(root, keys: Set[str], prefix: str = R2_PREFIX) -> List[Path]:
+    """Local files that would be uploaded under one of `keys` again"""
+    root = os.fspath(root)
+    if not os.path.isdir(root):
+        return []
+    return [Path(entry.path) for entry in iter_files(root) if key_for(root, entry.path, prefix) in keys]
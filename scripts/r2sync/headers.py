@@ -0,0 +1,171 @@
+"""
+Bulk rewrite of the caching headers on objects already in R2.
+
+Thumbnails uploaded before config.CACHE_CONTROL existed were stored with a
+Content-Type only, so the CDN and browsers revalidate keys that can never
+change. Re-uploading them would transfer every byte again. Instead each
+object is copied onto itself (CopyObject with
+x-amz-metadata-directive: REPLACE), which rewrites Content-Type and
+Cache-Control server-side.
+
+The prefix is listed once (listing.py) and a fixed pool of workers issues
+the copies. Each copy is conditional on the ETag from the listing
+(x-amz-copy-source-if-match). If the object was replaced after the listing,
+the copy fails with 412 and the key is recorded as `changed` instead of
+clobbering the new object's headers.
+
+Progress is kept in a SQLite state file (HEADERS_STATE_PATH), committed every
+FLUSH_EVERY keys. A re-run skips keys recorded `done` with the same ETag and
+Cache-Control, so an interrupted rewrite resumes where it stopped. A key that
+was re-uploaded since (new ETag) is rewritten again.
+"""
+import asyncio
+import sqlite3
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, Optional
+
+from .config import CACHE_CONTROL, HEADERS_STATE_PATH, R2Config, get_mime_type
+from .retry import RETRYABLE, backoff_delay, classify_error
+from .s3 import TRANSPORT_ERRORS, ObjectInfo, S3Client, S3Error
+
+FLUSH_EVERY = 500
+
+DONE = "done"
+CHANGED = "changed"  # replaced after the listing; the copy's precondition failed
+FAILED = "failed"
+
+
+@dataclass
+class RewriteStats:
+    rewritten: int = 0
+    changed: int = 0
+    failed: int = 0
+    skipped: int = 0  # already done in an earlier run
+
+    @property
+    def completed(self) -> int:
+        return self.rewritten + self.changed + self.failed
+
+
+class RewriteState:
+    """Per-key outcome of the rewrite, so a re-run only copies what is left"""
+
+    def __init__(self, path: str = HEADERS_STATE_PATH):
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS rewrites (
+                key TEXT PRIMARY KEY,
+                etag TEXT,
+                cache_control TEXT NOT NULL,
+                state TEXT NOT NULL,
+                error TEXT,
+                updated_at REAL
+            )
+        """)
+        self.db.commit()
+        self._buffer = []
+
+    def done(self, cache_control: str) -> dict:
+        """key -> ETag of every key already rewritten with `cache_control`"""
+        rows = self.db.execute("SELECT key, etag FROM rewrites WHERE state = ? AND cache_control = ?",
+                               (DONE, cache_control))
+        return dict(rows)
+
+    def record(self, key: str, etag: Optional[str], cache_control: str, state: str, error: str = None):
+        self._buffer.append((key, etag, cache_control, state, error, time.time()))
+        if len(self._buffer) >= FLUSH_EVERY:
+            self.flush()
+
+    def flush(self):
+        if self._buffer:
+            self.db.executemany("INSERT OR REPLACE INTO rewrites VALUES (?, ?, ?, ?, ?, ?)", self._buffer)
+            self.db.commit()
+            self._buffer.clear()
+
+    def counts(self) -> dict:
+        self.flush()
+        return dict(self.db.execute("SELECT state, COUNT(*) FROM rewrites GROUP BY state"))
+
+    def reset(self):
+        self._buffer.clear()
+        self.db.execute("DELETE FROM rewrites")
+        self.db.commit()
+
+    def close(self):
+        self.flush()
+        self.db.close()
+
+
+def pending_objects(objects: Iterable[ObjectInfo], state: RewriteState, cache_control: str,
+                    modified_before: str = None, stats: RewriteStats = None) -> Iterator[ObjectInfo]:
+    """Objects still to rewrite: not done with their current ETag, and listed as modified before the cutoff"""
+    done = state.done(cache_control)
+    for obj in objects:
+        if modified_before and obj.last_modified and obj.last_modified >= modified_before:
+            continue
+        if done.get(obj.key) == obj.etag:
+            if stats:
+                stats.skipped += 1
+            continue
+        yield obj
+
+
+async def rewrite_one(client: S3Client, obj: ObjectInfo, cache_control: str, retries: int = 3):
+    """Copy obj onto itself with new headers; returns (state, new ETag or None, error or None)"""
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            etag = await client.copy_object(obj.key, obj.key, get_mime_type(obj.key),
+                                            {"Cache-Control": cache_control}, if_match=obj.etag)
+            return DONE, etag, None
+        except (S3Error, *TRANSPORT_ERRORS) as e:
+            if isinstance(e, S3Error) and e.status == 412:
+                return CHANGED, None, None
+            if classify_error(e) in RETRYABLE and attempt <= retries:
+                await asyncio.sleep(backoff_delay(attempt))
+                continue
+            return FAILED, None, str(e) if isinstance(e, S3Error) else f"{type(e).__name__}: {e}"
+
+
+def rewrite_headers(config: R2Config, objects: Iterable[ObjectInfo], state: RewriteState,
+                    cache_control: str = CACHE_CONTROL, concurrency: int = 32, retries: int = 3,
+                    on_result: Callable[[ObjectInfo, str, Optional[str], RewriteStats], None] = None,
+                    stats: RewriteStats = None) -> RewriteStats:
+    """Rewrite Content-Type and Cache-Control of every object in `objects` with server-side copies"""
+    stats = stats or RewriteStats()
+    jobs = iter(objects)
+
+    async def worker(client: S3Client):
+        for obj in jobs:
+            outcome, etag, error = await rewrite_one(client, obj, cache_control, retries)
+            state.record(obj.key, etag, cache_control, outcome, error)
+            if outcome == DONE:
+                stats.rewritten += 1
+            elif outcome == CHANGED:
+                stats.changed += 1
+            else:
+                stats.failed += 1
+            if on_result:
+                on_result(obj, outcome, error, stats)
+
+    async def run():
+        async with S3Client(config, max_connections=concurrency) as client:
+            await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+
+    try:
+        asyncio.run(run())
+    finally:
+        state.flush()
+    return stats
+
+
+def failed_keys(state: RewriteState, limit: int = 10) -> List[tuple]:
+    state.flush()
+    return state.db.execute("SELECT key, error FROM rewrites WHERE state = ? ORDER BY key LIMIT ?",
+                            (FAILED, limit)).fetchall()
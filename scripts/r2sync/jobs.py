@@ -0,0 +1,60 @@
+"""
+Upload jobs, results and run totals.
+
+Kept apart from uploader.py so the scan, journal and planning code (and the
+CLI paths built on them: --help, plan, --dry-run) can use them without
+loading asyncio and the HTTP client.
+"""
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+
+@dataclass
+class UploadJob:
+    path: Path
+    key: str
+    content_type: Optional[str] = None
+    # The file `path` was derived from (e.g. the original of a recompressed thumbnail)
+    source: Optional[Path] = None
+
+
+@dataclass
+class UploadResult:
+    job: UploadJob
+    ok: bool
+    size: int = 0
+    latency: float = 0.0
+    etag: str = ""
+    error: str = ""
+    error_class: str = ""
+    attempts: int = 1
+
+
+@dataclass
+class UploadStats:
+    completed: int = 0
+    uploaded: int = 0
+    failed: int = 0
+    bytes: int = 0
+    started: float = field(default_factory=time.monotonic)
+    finished: float = 0.0
+    failures: list = field(default_factory=list)
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished or time.monotonic()) - self.started
+
+    @property
+    def rate(self) -> float:
+        return self.completed / self.elapsed if self.elapsed > 0 else 0.0
+
+    def record(self, result: UploadResult):
+        self.completed += 1
+        if result.ok:
+            self.uploaded += 1
+            self.bytes += result.size
+        else:
+            self.failed += 1
+            self.failures.append((result.job.key, result.error))
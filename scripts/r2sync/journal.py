@@ -0,0 +1,202 @@
+"""
+Crash-safe upload journal.
+
+Per-key upload state in a SQLite database in WAL mode, so every committed
+transition survives a crash or Ctrl-C:
+
+    pending -> in_flight -> done
+                         -> failed (with error class, see retry.py)
+
+Writes are batched and committed every FLUSH_EVERY transitions or
+FLUSH_INTERVAL seconds. Anything lost between commits is at worst uploaded
+again, which is safe because PUTs are idempotent.
+
+On open, keys left in_flight by an interrupted run go back to pending. A
+resumed run skips keys that are done with the same size and mtime, and
+--retry-failed re-drives only the failed keys.
+
+Sharded workers (shard.py) share one journal file. A journal opened for a
+shard recovers, counts and retries only that shard's keys, so starting one
+worker never resets keys another worker has in flight.
+"""
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+from .config import JOURNAL_PATH
+from .jobs import UploadJob, UploadResult
+from .shard import Shard, shard_index
+
+FLUSH_EVERY = 200
+FLUSH_INTERVAL = 1.0
+
+PENDING = "pending"
+IN_FLIGHT = "in_flight"
+DONE = "done"
+FAILED = "failed"
+
+
+class Journal:
+    def __init__(self, path: str = JOURNAL_PATH, shard: Optional[Shard] = None):
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.shard = shard
+        # Read from the scan thread, written from the event loop; sharded workers
+        # wait up to `timeout` seconds for each other's commits
+        self.db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.db.create_function("shard_index", 2, shard_index, deterministic=True)
+        self.lock = threading.Lock()
+        self._buffer = []
+        self.skipped = 0
+        self._last_flush = time.monotonic()
+        with self.lock:
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("PRAGMA synchronous=NORMAL")
+            self.db.execute("""
+                CREATE TABLE IF NOT EXISTS uploads (
+                    key TEXT PRIMARY KEY,
+                    path TEXT NOT NULL,
+                    size INTEGER,
+                    mtime_ns INTEGER,
+                    state TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    error_class TEXT,
+                    error TEXT,
+                    updated_at REAL
+                )
+            """)
+            self.db.execute("CREATE INDEX IF NOT EXISTS uploads_state ON uploads (state)")
+            recovered = self.db.execute(
+                f"UPDATE uploads SET state = ? WHERE state = ?{self._shard_clause()}", (PENDING, IN_FLIGHT)
+            ).rowcount
+            self.db.commit()
+        self.recovered = recovered
+
+    def _shard_clause(self) -> str:
+        if self.shard is None or self.shard.count == 1:
+            return ""
+        return f" AND shard_index(key, {self.shard.count:d}) = {self.shard.index:d}"
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+    def _write(self, row: tuple):
+        self._buffer.append(row)
+        if len(self._buffer) >= FLUSH_EVERY or time.monotonic() - self._last_flush >= FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            if self._buffer:
+                self.db.executemany("""
+                    INSERT INTO uploads (key, path, size, mtime_ns, state, attempts, error_class, error, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (key) DO UPDATE SET
+                        path = excluded.path,
+                        size = COALESCE(excluded.size, uploads.size),
+                        mtime_ns = COALESCE(excluded.mtime_ns, uploads.mtime_ns),
+                        state = excluded.state,
+                        attempts = uploads.attempts + excluded.attempts,
+                        error_class = excluded.error_class,
+                        error = excluded.error,
+                        updated_at = excluded.updated_at
+                """, self._buffer)
+                self.db.commit()
+                self._buffer.clear()
+        self._last_flush = time.monotonic()
+
+    # Keys are journaled against the original file, so resume and retry see the
+    # same version whether or not a derived file was uploaded in its place
+    def start(self, job: UploadJob):
+        self._write((job.key, str(job.source or job.path), None, None, IN_FLIGHT, 0, None, None, time.time()))
+
+    def finish(self, result: UploadResult):
+        job = result.job
+        path = job.source or job.path
+        size = mtime_ns = None
+        if result.ok:
+            try:
+                st = os.stat(path)
+                size, mtime_ns = st.st_size, st.st_mtime_ns
+            except OSError:
+                pass
+        self._write((
+            job.key, str(path), size, mtime_ns,
+            DONE if result.ok else FAILED, result.attempts,
+            None if result.ok else result.error_class,
+            None if result.ok else result.error[:500],
+            time.time(),
+        ))
+
+    def close(self):
+        self.flush()
+        with self.lock:
+            self.db.close()
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+    def is_done(self, key: str, size: int, mtime_ns: int) -> bool:
+        with self.lock:
+            row = self.db.execute(
+                "SELECT size, mtime_ns FROM uploads WHERE key = ? AND state = ?", (key, DONE)
+            ).fetchone()
+        return row is not None and row[0] == size and row[1] == mtime_ns
+
+    def skip_done(self, jobs: Iterable[UploadJob]) -> Iterator[UploadJob]:
+        """Filter a job stream down to keys not already uploaded from the same file version"""
+        for job in jobs:
+            try:
+                st = os.stat(job.path)
+            except OSError:
+                yield job
+                continue
+            if self.is_done(job.key, st.st_size, st.st_mtime_ns):
+                self.skipped += 1
+                continue
+            yield job
+
+    def failed_jobs(self) -> Iterator[UploadJob]:
+        """Stream jobs for every key whose last attempt failed"""
+        with self.lock:
+            rows = self.db.execute(
+                f"SELECT key, path FROM uploads WHERE state = ?{self._shard_clause()} ORDER BY key", (FAILED,)
+            ).fetchall()
+        for key, path in rows:
+            yield UploadJob(Path(path), key)
+
+    def counts(self) -> dict:
+        with self.lock:
+            return dict(self.db.execute(
+                f"SELECT state, COUNT(*) FROM uploads WHERE 1{self._shard_clause()} GROUP BY state"
+            ).fetchall())
+
+    def failure_classes(self) -> dict:
+        with self.lock:
+            return dict(self.db.execute(
+                f"SELECT error_class, COUNT(*) FROM uploads WHERE state = ?{self._shard_clause()} GROUP BY error_class",
+                (FAILED,)
+            ).fetchall())
+
+
+def journal_jobs(journal: Journal, args, jobs: Iterable[UploadJob]) -> Iterator[UploadJob]:
+    """Pick the job stream for a run: failed keys only, everything, or everything not yet done"""
+    if args.retry_failed:
+        return journal.failed_jobs()
+    if args.fresh:
+        return iter(jobs)
+    return journal.skip_done(jobs)
+
+
+def print_journal_summary(journal: Journal):
+    counts = journal.counts()
+    print(f"   📒 Journal: {counts.get(DONE, 0)} done, {counts.get(FAILED, 0)} failed, "
+          f"{journal.skipped} skipped as already uploaded")
+    classes = journal.failure_classes()
+    if classes:
+        print("   Failures by class: " + ", ".join(f"{cls}={n}" for cls, n in sorted(classes.items())))
+        print("   Re-drive them with: --retry-failed")
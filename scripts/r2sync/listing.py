@@ -0,0 +1,67 @@
+"""
+Parallel ListObjectsV2 over a key prefix.
+
+ListObjectsV2 pages are chained by continuation token, so a single listing is
+strictly sequential. To fetch pages in parallel the keyspace under the prefix
+is split into ranges at fixed boundary keys, and each range is paged on its
+own using StartAfter:
+
+    range 0:  key <= b1
+    range i:  b_i < key <= b_(i+1)
+    range k:  key > b_k
+
+Sanitized screenshot domains only use [a-z0-9-], so one boundary per leading
+character spreads the work evenly.
+"""
+import bisect
+from typing import TYPE_CHECKING, Iterable, List, Optional
+
+if TYPE_CHECKING:
+    from .s3 import ObjectInfo, S3Client
+
+SHARD_CHARS = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+
+def shard_boundaries(prefix: str, chars: str = SHARD_CHARS) -> List[str]:
+    return [prefix + c for c in chars[1:]]
+
+
+def shard_of(key: str, boundaries: List[str]) -> int:
+    """Index of the listing range a key falls into"""
+    return bisect.bisect_left(boundaries, key)
+
+
+async def list_range(client: "S3Client", prefix: str, start_after: Optional[str],
+                     upper: Optional[str]) -> List["ObjectInfo"]:
+    """Page through one range, stopping once keys pass `upper` (inclusive)"""
+    objects = []
+    token = None
+    while True:
+        page, token = await client.list_objects_v2(prefix, start_after=start_after, continuation_token=token)
+        for obj in page:
+            if upper is not None and obj.key > upper:
+                return objects
+            objects.append(obj)
+        if token is None:
+            return objects
+
+
+async def list_prefix(client: "S3Client", prefix: str, shards: Iterable[int] = None,
+                      chars: str = SHARD_CHARS, concurrency: int = 16) -> dict:
+    """
+    List the prefix with ranges fetched concurrently.
+    Returns {shard index: [ObjectInfo, ...]} for the requested shards (all by default).
+    """
+    import asyncio  # deferred: the planner imports this module for shard_of() alone
+
+    boundaries = shard_boundaries(prefix, chars)
+    wanted = sorted(set(range(len(boundaries) + 1) if shards is None else shards))
+    limit = asyncio.Semaphore(concurrency)
+
+    async def fetch(index: int):
+        start_after = boundaries[index - 1] if index > 0 else None
+        upper = boundaries[index] if index < len(boundaries) else None
+        async with limit:
+            return index, await list_range(client, prefix, start_after, upper)
+
+    return dict(await asyncio.gather(*(fetch(i) for i in wanted)))
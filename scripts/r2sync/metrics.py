@@ -0,0 +1,388 @@
+"""
+Per-run metrics for the upload commands.
+
+Every run writes a directory under .r2sync/runs/ containing:
+
+  events.jsonl    one JSON object per line: run start/end, one "upload"
+                  event per key (key, bytes, latency, attempts, status,
+                  error class) and one "phase" event per timed phase
+  metrics.prom    summary in Prometheus text format: upload latency
+                  histograms by status, totals, and phase wall/CPU time
+  summary.json    the same numbers as JSON, which merge_runs() adds up
+                  across the workers of a sharded run (shard.py)
+  profile.folded  with --profile only: sampled stacks in collapsed
+                  format (flamegraph.pl, speedscope)
+
+Phases are timed independently and may nest or overlap. "plan" includes
+its own "hash" and "list" time, and "scan" is the time spent walking the
+tree from the producer thread while uploads are already running.
+
+The profiler samples every thread's stack with sys._current_frames() a few
+hundred times a second. That costs far less than cProfile's per-call
+tracing and does not distort the hot path. Each sample is attributed to
+signing, hashing, network, file I/O, imports, idle (event loop waiting) or
+other, which answers where the CPU went without reading a flame graph.
+Hashing done in process-pool workers (dedup) is not sampled.
+"""
+import bisect
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+# Upload latency buckets, seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SAMPLE_INTERVAL = 0.005
+
+
+def phase(timers, name: str):
+    """timers.phase(name) for PhaseTimers or RunMetrics; a no-op when timers is None"""
+    return timers.phase(name) if timers is not None else nullcontext()
+
+
+def timed(timers, items: Iterable, name: str) -> Iterable:
+    """timers.timed(items, name); items unchanged when timers is None"""
+    return timers.timed(items, name) if timers is not None else items
+
+
+class PhaseTimers:
+    def __init__(self, on_phase=None):
+        self.wall: Dict[str, float] = Counter()
+        self.cpu: Dict[str, float] = Counter()
+        self.on_phase = on_phase
+
+    @contextmanager
+    def phase(self, name: str):
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - wall, time.process_time() - cpu)
+
+    def add(self, name: str, wall: float, cpu: float = 0.0):
+        self.wall[name] += wall
+        self.cpu[name] += cpu
+        if self.on_phase:
+            self.on_phase(name, wall, cpu)
+
+    def timed(self, items: Iterable, name: str) -> Iterator:
+        """Yield from items, adding the time spent producing each one to phase `name`"""
+        iterator = iter(items)
+        total = 0.0
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    total += time.perf_counter() - start
+                yield item
+        finally:
+            # Process-wide CPU time is meaningless for a thread running alongside uploads
+            self.add(name, total)
+
+
+class Histogram:
+    """Cumulative Prometheus-style histogram"""
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def lines(self, name: str, labels: str = "") -> list:
+        sep = "," if labels else ""
+        out, cumulative = [], 0
+        for bound, count in zip((*self.buckets, float("inf")), self.counts):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else f"{bound:g}"
+            out.append(f'{name}_bucket{{{labels}{sep}le="{le}"}} {cumulative}')
+        braces = f"{{{labels}}}" if labels else ""
+        out.append(f"{name}_sum{braces} {self.sum:.6f}")
+        out.append(f"{name}_count{braces} {self.count}")
+        return out
+
+    def to_dict(self) -> dict:
+        return {"buckets": list(self.buckets), "counts": self.counts, "sum": self.sum, "count": self.count}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Histogram":
+        histogram = cls(data["buckets"])
+        histogram.counts = list(data["counts"])
+        histogram.sum = data["sum"]
+        histogram.count = data["count"]
+        return histogram
+
+    def merge(self, other: "Histogram"):
+        if other.buckets != self.buckets:
+            raise ValueError("cannot merge histograms with different buckets")
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.sum += other.sum
+        self.count += other.count
+
+
+# ----------------------------------------------------------------------
+# Sampling profiler
+# ----------------------------------------------------------------------
+# (category, test on a frame's file name and function name), checked from the innermost frame outwards
+CATEGORIES = (
+    ("signing", lambda file, func: file.endswith(("sigv4.py", "hmac.py"))),
+    ("hashing", lambda file, func: func in ("md5_file", "sha256_file", "hash_local") or file.endswith("hashlib.py")),
+    ("idle", lambda file, func: file.endswith("selectors.py") and func == "select"),
+    ("network", lambda file, func: file.endswith(("httpclient.py", "ssl.py", "streams.py", "selector_events.py"))),
+    ("file-io", lambda file, func: func in ("read_bytes", "getsize", "stat", "scandir", "iter_files", "mmap")),
+    ("import", lambda file, func: file.startswith("<frozen importlib")),
+)
+
+
+def categorize(stack) -> str:
+    for file, func in reversed(stack):
+        for category, test in CATEGORIES:
+            if test(file, func):
+                return category
+    return "other"
+
+
+class SamplingProfiler:
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        self.interval = interval
+        self.stacks = Counter()
+        self.categories = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="r2sync-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append((frame.f_code.co_filename, frame.f_code.co_name))
+                    frame = frame.f_back
+                stack.reverse()
+                if stack and stack[-1][1] == "wait" and stack[-1][0].endswith("threading.py"):
+                    continue  # parked worker threads
+                self.stacks[tuple(stack)] += 1
+                self.categories[categorize(stack)] += 1
+                self.samples += 1
+
+    def write_folded(self, path):
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                frames = ";".join(f"{func} ({os.path.basename(file)})" for file, func in stack)
+                f.write(f"{frames} {count}\n")
+
+    def top(self, limit: int = 15) -> list:
+        """[(function, self samples, inclusive samples)] by self samples"""
+        own, inclusive = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            own[stack[-1]] += count
+            for frame in set(stack):
+                inclusive[frame] += count
+        return [(f"{func} ({os.path.basename(file)})", count, inclusive[(file, func)])
+                for (file, func), count in own.most_common(limit)]
+
+
+# ----------------------------------------------------------------------
+# Run metrics
+# ----------------------------------------------------------------------
+class RunMetrics:
+    """Event stream, phase timers and latency histograms for one command run"""
+
+    def __init__(self, directory, command: str, profile: bool = False, labels: Optional[dict] = None):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.command = command
+        self.labels = labels or {}
+        self._events = open(self.directory / "events.jsonl", "w", buffering=1024 * 1024)
+        self._lock = threading.Lock()
+        self.timers = PhaseTimers(on_phase=lambda name, wall, cpu: self.emit(
+            "phase", phase=name, seconds=round(wall, 6), cpu_seconds=round(cpu, 6)))
+        self.latency = {"ok": Histogram(), "failed": Histogram()}
+        self.uploads = Counter()
+        self.error_classes = Counter()
+        self.bytes = 0
+        self.attempts = 0
+        self.started = time.perf_counter()
+        self.profiler = SamplingProfiler().start() if profile else None
+        self.emit("run_start", command=command, pid=os.getpid(), **self.labels)
+
+    @classmethod
+    def for_run(cls, runs_dir: str, command: str, profile: bool = False,
+                labels: Optional[dict] = None) -> "RunMetrics":
+        stamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime())
+        return cls(Path(runs_dir) / f"{stamp}-{command}-{os.getpid()}", command, profile, labels)
+
+    def emit(self, event: str, **fields):
+        line = json.dumps({"ts": round(time.time(), 6), "event": event, **fields}, separators=(",", ":"))
+        with self._lock:
+            self._events.write(line + "\n")
+
+    def phase(self, name: str):
+        return self.timers.phase(name)
+
+    def timed(self, items: Iterable, name: str) -> Iterator:
+        return self.timers.timed(items, name)
+
+    def record(self, result):
+        """Record one UploadResult"""
+        status = "ok" if result.ok else "failed"
+        self.latency[status].observe(result.latency)
+        self.uploads[status] += 1
+        self.attempts += result.attempts
+        if result.ok:
+            self.bytes += result.size
+        else:
+            self.error_classes[result.error_class or "unknown"] += 1
+        self.emit("upload", key=result.job.key, bytes=result.size, latency=round(result.latency, 6),
+                  attempt=result.attempts, status=status, error_class=result.error_class or None,
+                  error=result.error[:200] or None)
+
+    def observer(self, callback=None):
+        """on_result callback for upload_files() that records, then calls `callback`"""
+        def on_result(result, stats):
+            self.record(result)
+            if callback:
+                callback(result, stats)
+        return on_result
+
+    def summary(self) -> dict:
+        return {
+            "command": self.command,
+            "labels": self.labels,
+            "runs": 1,
+            "seconds": time.perf_counter() - self.started,
+            "uploads": {status: self.uploads[status] for status in ("ok", "failed")},
+            "error_classes": dict(self.error_classes),
+            "bytes": self.bytes,
+            "attempts": self.attempts,
+            "latency": {status: histogram.to_dict() for status, histogram in self.latency.items()},
+            "phases": dict(self.timers.wall),
+            "phase_cpu": dict(self.timers.cpu),
+        }
+
+    def prometheus(self) -> str:
+        return render_prometheus(self.summary())
+
+    def close(self):
+        if self.profiler:
+            self.profiler.stop()
+            self.profiler.write_folded(self.directory / "profile.folded")
+            self.emit("profile", samples=self.profiler.samples, categories=dict(self.profiler.categories))
+        self.emit("run_end", seconds=round(time.perf_counter() - self.started, 6), uploads=dict(self.uploads),
+                  bytes=self.bytes, phases={name: round(s, 6) for name, s in self.timers.wall.items()})
+        self._events.close()
+        summary = self.summary()
+        (self.directory / "summary.json").write_text(json.dumps(summary, indent=2) + "\n")
+        (self.directory / "metrics.prom").write_text(render_prometheus(summary))
+
+    def print_summary(self):
+        if self.timers.wall:
+            print("   ⏱️  Phases: " + ", ".join(f"{name} {seconds:.2f}s"
+                                              for name, seconds in self.timers.wall.items()))
+        if self.profiler and self.profiler.samples:
+            total = self.profiler.samples
+            print("   🔬 Profile: " + ", ".join(f"{cat} {n / total * 100:.0f}%"
+                                             for cat, n in self.profiler.categories.most_common()))
+            for name, own, inclusive in self.profiler.top(8):
+                print(f"      {own / total * 100:5.1f}% self {inclusive / total * 100:5.1f}% total  {name}")
+        print(f"   📈 Metrics: {self.directory}/")
+
+
+def render_prometheus(summary: dict) -> str:
+    """Prometheus text exposition of a RunMetrics.summary() or merge_summaries() result"""
+    lines = [
+        "# HELP r2sync_upload_latency_seconds Latency of the final attempt of each upload.",
+        "# TYPE r2sync_upload_latency_seconds histogram",
+    ]
+    for status, data in summary["latency"].items():
+        lines += Histogram.from_dict(data).lines("r2sync_upload_latency_seconds", f'status="{status}"')
+    lines += ["# HELP r2sync_uploads_total Uploads by final status.", "# TYPE r2sync_uploads_total counter"]
+    lines += [f'r2sync_uploads_total{{status="{status}"}} {n}' for status, n in summary["uploads"].items()]
+    lines += ["# HELP r2sync_upload_failures_total Failed uploads by error class.",
+              "# TYPE r2sync_upload_failures_total counter"]
+    lines += [f'r2sync_upload_failures_total{{class="{cls}"}} {n}' for cls, n in sorted(summary["error_classes"].items())]
+    lines += ["# HELP r2sync_upload_bytes_total Bytes uploaded.", "# TYPE r2sync_upload_bytes_total counter",
+              f"r2sync_upload_bytes_total {summary['bytes']}",
+              "# HELP r2sync_upload_attempts_total Requests sent, including retries.",
+              "# TYPE r2sync_upload_attempts_total counter",
+              f"r2sync_upload_attempts_total {summary['attempts']}",
+              "# HELP r2sync_phase_seconds Wall-clock time per phase, summed over merged runs.",
+              "# TYPE r2sync_phase_seconds gauge"]
+    lines += [f'r2sync_phase_seconds{{phase="{name}"}} {seconds:.6f}' for name, seconds in summary["phases"].items()]
+    lines += ["# HELP r2sync_phase_cpu_seconds Process CPU time per phase.", "# TYPE r2sync_phase_cpu_seconds gauge"]
+    lines += [f'r2sync_phase_cpu_seconds{{phase="{name}"}} {seconds:.6f}'
+              for name, seconds in summary["phase_cpu"].items()]
+    lines += ["# HELP r2sync_run_seconds Wall-clock time of the run (the slowest, for merged runs).",
+              "# TYPE r2sync_run_seconds gauge",
+              f"r2sync_run_seconds {summary['seconds']:.6f}",
+              "# HELP r2sync_runs Runs merged into this summary.", "# TYPE r2sync_runs gauge",
+              f"r2sync_runs {summary['runs']}"]
+    return "\n".join(lines) + "\n"
+
+
+def merge_summaries(summaries: List[dict]) -> dict:
+    """Add up the summaries of runs that worked side by side (e.g. the shards of one upload)"""
+    merged = {"command": ",".join(sorted({s["command"] for s in summaries})), "labels": {}, "runs": 0,
+              "seconds": 0.0, "uploads": Counter(), "error_classes": Counter(), "bytes": 0, "attempts": 0,
+              "latency": {}, "phases": Counter(), "phase_cpu": Counter()}
+    histograms: Dict[str, Histogram] = {}
+    for summary in summaries:
+        merged["runs"] += summary["runs"]
+        merged["seconds"] = max(merged["seconds"], summary["seconds"])
+        merged["bytes"] += summary["bytes"]
+        merged["attempts"] += summary["attempts"]
+        for name in ("uploads", "error_classes", "phases", "phase_cpu"):
+            merged[name].update(summary[name])
+        for status, data in summary["latency"].items():
+            histogram = Histogram.from_dict(data)
+            if status in histograms:
+                histograms[status].merge(histogram)
+            else:
+                histograms[status] = histogram
+    merged["latency"] = {status: histogram.to_dict() for status, histogram in histograms.items()}
+    for name in ("uploads", "error_classes", "phases", "phase_cpu"):
+        merged[name] = dict(merged[name])
+    return merged
+
+
+def merge_runs(run_dirs: Iterable, out_dir) -> dict:
+    """Merge the summary.json and events.jsonl of several run directories into out_dir"""
+    run_dirs = [Path(d) for d in run_dirs]
+    merged = merge_summaries([json.loads((d / "summary.json").read_text()) for d in run_dirs])
+    merged["labels"] = {"merged": [d.name for d in run_dirs]}
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    with open(out_dir / "events.jsonl", "w") as out:
+        for d in run_dirs:
+            with open(d / "events.jsonl") as f:
+                for line in f:
+                    # Tag each event with the run it came from
+                    out.write(f'{{"run":{json.dumps(d.name)},{line[1:]}')
+    (out_dir / "summary.json").write_text(json.dumps(merged, indent=2) + "\n")
+    (out_dir / "metrics.prom").write_text(render_prometheus(merged))
+    return merged
@@ -0,0 +1,90 @@
+"""
+Parallel multipart upload for large objects.
+
+Files at or above MULTIPART_THRESHOLD (full-size screenshots, OG images,
+archive bundles) are mmap'd once and split into PART_SIZE parts. Each part is
+a memoryview slice of the mapping, so nothing is copied in Python before it
+reaches the socket. Parts upload concurrently and are retried individually;
+only when a part exhausts its retries is the whole upload aborted.
+"""
+import asyncio
+import mmap
+import os
+import time
+from contextlib import nullcontext
+from pathlib import Path
+
+from .retry import RETRYABLE, THROTTLED, backoff_delay, classify_error
+from .s3 import S3Client, S3Error, TRANSPORT_ERRORS
+
+MULTIPART_THRESHOLD = 16 * 1024 * 1024
+# R2 requires every part except the last to be the same size, at least 5 MiB
+PART_SIZE = 8 * 1024 * 1024
+PART_CONCURRENCY = 8
+
+
+def part_ranges(size: int, part_size: int = PART_SIZE):
+    """[(part number, offset, length), ...] covering `size` bytes"""
+    return [(i + 1, offset, min(part_size, size - offset)) for i, offset in enumerate(range(0, size, part_size))]
+
+
+async def upload_multipart(client: S3Client, path: Path, key: str, content_type: str,
+                           part_size: int = PART_SIZE, concurrency: int = PART_CONCURRENCY,
+                           retries: int = 3, controller=None, extra_headers: dict = None) -> str:
+    """Upload one file in parts, returning the completed object's ETag"""
+    limit = asyncio.Semaphore(concurrency)
+
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mapping)
+    parts = [(number, view[offset:offset + length]) for number, offset, length in part_ranges(size, part_size)]
+
+    async def send(number: int, body: memoryview):
+        attempt = 0
+        async with limit:
+            while True:
+                attempt += 1
+                try:
+                    async with controller.slot() if controller else nullcontext():
+                        start = time.monotonic()
+                        etag = await client.upload_part(key, upload_id, number, body)
+                        latency = time.monotonic() - start
+                    if controller:
+                        controller.on_success(latency, len(body))
+                    return number, etag
+                except (S3Error, *TRANSPORT_ERRORS) as e:
+                    error_class = classify_error(e)
+                    if controller and error_class == THROTTLED:
+                        controller.on_throttle()
+                    if error_class in RETRYABLE and attempt <= retries:
+                        await asyncio.sleep(backoff_delay(attempt))
+                        continue
+                    raise
+
+    try:
+        upload_id = await client.create_multipart_upload(key, content_type, extra_headers)
+        tasks = [asyncio.ensure_future(send(number, body)) for number, body in parts]
+        try:
+            etags = await asyncio.gather(*tasks)
+            return await client.complete_multipart_upload(key, upload_id, etags)
+        except BaseException:
+            # Stop the other parts before aborting so none are left writing from the mapping
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            try:
+                await client.abort_multipart_upload(key, upload_id)
+            except (S3Error, *TRANSPORT_ERRORS):
+                pass
+            raise
+    finally:
+        # Every slice holds an export on the mapping; release them before closing it
+        for _, body in parts:
+            body.release()
+        view.release()
+        try:
+            mapping.close()
+        except BufferError:
+            # A dropped connection may still reference a part; the mapping closes when it is collected
+            pass
@@ -0,0 +1,281 @@
+"""
+Upload planning: diff the local thumbnail tree against one R2 listing.
+
+Instead of probing every key with a GET, the planner lists the prefix once
+(ranges in parallel, see listing.py), compares keys, sizes and ETags with the
+local files, and returns an upload/skip plan with byte totals.
+
+Results are cached in a SQLite manifest:
+  - local: path -> (size, mtime_ns, md5), so unchanged files are not re-hashed
+  - remote: key -> (size, etag) as last listed or uploaded
+  - listings: when each listing range was last listed
+
+A local file whose size and MD5 match the manifest's remote entry is skipped
+without listing. Only listing ranges that contain at least one unconfirmed
+file are re-listed, so a re-run after a small capture batch lists a handful
+of ranges instead of the whole prefix.
+
+Sharded workers (--shard) hash keys across every range, so each one would
+list nearly every range: N workers, N listings of the prefix. `fanout sync`
+lists the ranges its workers will need once, into the shared manifest,
+before starting them and passes --listed-since, so ranges listed after that
+time are read from the manifest, not R2.
+"""
+import hashlib
+import os
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+from .config import MANIFEST_PATH, R2_PREFIX, R2Config
+from .jobs import UploadJob
+from .listing import shard_boundaries, shard_of
+from .metrics import phase
+from .scan import SUFFIXES, iter_files, key_for
+
+HASH_CHUNK = 1024 * 1024
+
+
+def md5_file(path: Path) -> str:
+    digest = hashlib.md5()
+    with open(path, "rb") as f:
+        while chunk := f.read(HASH_CHUNK):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@dataclass
+class LocalFile:
+    path: Path
+    key: str
+    size: int
+    mtime_ns: int
+    md5: str = ""
+
+
+@dataclass
+class PlanEntry:
+    file: LocalFile
+    reason: str  # missing | changed | unchanged
+
+    def job(self) -> UploadJob:
+        return UploadJob(self.file.path, self.file.key)
+
+
+@dataclass
+class Plan:
+    upload: List[PlanEntry] = field(default_factory=list)
+    skip: List[PlanEntry] = field(default_factory=list)
+    listed_shards: int = 0
+    listed_objects: int = 0
+    cached_skips: int = 0
+
+    @property
+    def upload_bytes(self) -> int:
+        return sum(entry.file.size for entry in self.upload)
+
+    @property
+    def skip_bytes(self) -> int:
+        return sum(entry.file.size for entry in self.skip)
+
+    def jobs(self) -> List[UploadJob]:
+        return [entry.job() for entry in self.upload]
+
+
+class Manifest:
+    """SQLite cache of local hashes and last-known remote state"""
+
+    def __init__(self, path: str = MANIFEST_PATH):
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(path, timeout=30)  # shared by sharded sync workers
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS local (
+                path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, md5 TEXT
+            );
+            CREATE TABLE IF NOT EXISTS remote (
+                key TEXT PRIMARY KEY, size INTEGER, etag TEXT, seen_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS listings (
+                prefix TEXT, lower TEXT, upper TEXT, listed_at REAL, PRIMARY KEY (prefix, lower, upper)
+            );
+        """)
+
+    def close(self):
+        self.db.commit()
+        self.db.close()
+
+    def local_hashes(self) -> dict:
+        return {row[0]: row[1:] for row in self.db.execute("SELECT path, size, mtime_ns, md5 FROM local")}
+
+    def save_local(self, files: Iterable[LocalFile]):
+        self.db.executemany(
+            "INSERT OR REPLACE INTO local (path, size, mtime_ns, md5) VALUES (?, ?, ?, ?)",
+            ((str(f.path), f.size, f.mtime_ns, f.md5) for f in files),
+        )
+        self.db.commit()
+
+    def remote_state(self) -> dict:
+        return {row[0]: (row[1], row[2]) for row in self.db.execute("SELECT key, size, etag FROM remote")}
+
+    def replace_remote_range(self, prefix: str, lower: Optional[str], upper: Optional[str], objects):
+        """Replace cached remote rows under prefix in (lower, upper] with a fresh listing of that range"""
+        clauses, params = ["key >= ?", "key < ?"], [prefix, prefix + "\U0010ffff"]
+        if lower is not None:
+            clauses.append("key > ?")
+            params.append(lower)
+        if upper is not None:
+            clauses.append("key <= ?")
+            params.append(upper)
+        where = " AND ".join(clauses)
+        self.db.execute(f"DELETE FROM remote WHERE {where}", params)
+        now = time.time()
+        self.db.executemany(
+            "INSERT OR REPLACE INTO remote (key, size, etag, seen_at) VALUES (?, ?, ?, ?)",
+            ((o.key, o.size, o.etag, now) for o in objects),
+        )
+        self.db.execute("INSERT OR REPLACE INTO listings (prefix, lower, upper, listed_at) VALUES (?, ?, ?, ?)",
+                        (prefix, lower or "", upper or "", now))
+        self.db.commit()
+
+    def listed_since(self, prefix: str, since: float) -> set:
+        """(lower, upper) of the ranges under prefix listed at or after `since`"""
+        rows = self.db.execute("SELECT lower, upper FROM listings WHERE prefix = ? AND listed_at >= ?", (prefix, since))
+        return {(lower or None, upper or None) for lower, upper in rows}
+
+    def forget_remote(self, keys: Iterable[str]):
+        """Drop cached remote rows for objects deleted from R2"""
+        self.db.executemany("DELETE FROM remote WHERE key = ?", ((key,) for key in keys))
+        self.db.commit()
+
+    def record_uploaded(self, entries: Iterable[tuple]):
+        """Record (key, size, etag) for objects this run uploaded"""
+        now = time.time()
+        self.db.executemany(
+            "INSERT OR REPLACE INTO remote (key, size, etag, seen_at) VALUES (?, ?, ?, ?)",
+            ((key, size, etag, now) for key, size, etag in entries),
+        )
+        self.db.commit()
+
+
+def scan_local(root: Path, prefix: str = R2_PREFIX, suffixes=SUFFIXES) -> List[LocalFile]:
+    root = os.fspath(root)
+    files = []
+    for entry in iter_files(root, suffixes):
+        st = entry.stat()
+        files.append(LocalFile(Path(entry.path), key_for(root, entry.path, prefix), st.st_size, st.st_mtime_ns))
+    return files
+
+
+def hash_local(files: List[LocalFile], manifest: Manifest):
+    """Fill in MD5s, reusing cached hashes for files whose size and mtime are unchanged"""
+    cached = manifest.local_hashes()
+    fresh = []
+    for f in files:
+        hit = cached.get(str(f.path))
+        if hit and hit[0] == f.size and hit[1] == f.mtime_ns:
+            f.md5 = hit[2]
+        else:
+            f.md5 = md5_file(f.path)
+            fresh.append(f)
+    manifest.save_local(fresh)
+
+
+def _matches(f: LocalFile, size: int, etag: str) -> bool:
+    if size != f.size:
+        return False
+    # Multipart ETags are not a body MD5; fall back to the size check
+    return "-" in etag or etag == f.md5
+
+
+def _list_shards(config: R2Config, prefix: str, shards, concurrency: int) -> dict:
+    # The client stack is loaded only when something actually has to be listed,
+    # so a plan answered entirely from the manifest stays cheap to start
+    import asyncio
+
+    from .listing import list_prefix
+    from .s3 import S3Client
+
+    async def run():
+        async with S3Client(config, max_connections=concurrency) as client:
+            return await list_prefix(client, prefix, shards, concurrency=concurrency)
+
+    return asyncio.run(run())
+
+
+def _range_bounds(index: int, boundaries: List[str]):
+    return (boundaries[index - 1] if index > 0 else None,
+            boundaries[index] if index < len(boundaries) else None)
+
+
+def _store_listing(manifest: Manifest, prefix: str, boundaries: List[str], listed: dict) -> int:
+    """Write fresh range listings to the manifest, returning the number of objects"""
+    count = 0
+    for index, objects in listed.items():
+        manifest.replace_remote_range(prefix, *_range_bounds(index, boundaries), objects)
+        count += len(objects)
+    return count
+
+
+def prelist(keys: Iterable[str], config: R2Config, manifest: Manifest, prefix: str = R2_PREFIX,
+            full: bool = False, concurrency: int = 16):
+    """
+    List into the manifest every range holding a key it has no remote entry for (every key's, with full=True).
+    Returns (ranges, objects) listed.
+    """
+    known = {} if full else manifest.remote_state()
+    boundaries = shard_boundaries(prefix)
+    shards = sorted({shard_of(key, boundaries) for key in keys if key not in known})
+    listed = _list_shards(config, prefix, shards, concurrency) if shards else {}
+    return len(listed), _store_listing(manifest, prefix, boundaries, listed)
+
+
+def build_plan(files: List[LocalFile], config: R2Config, manifest: Manifest, prefix: str = R2_PREFIX,
+               full: bool = False, concurrency: int = 16, timers=None, listed_since: float = None) -> Plan:
+    """
+    Diff local files against R2.
+    With full=True the manifest's remote cache is ignored and every range is re-listed,
+    except ranges listed at or after `listed_since`, which the manifest answers.
+    `timers` (see metrics.py) receives the "hash" and "list" phases.
+    """
+    with phase(timers, "hash"):
+        hash_local(files, manifest)
+    plan = Plan()
+    boundaries = shard_boundaries(prefix)
+
+    known = {} if full else manifest.remote_state()
+    pending = []
+    for f in files:
+        hit = known.get(f.key)
+        if hit and _matches(f, *hit):
+            plan.skip.append(PlanEntry(f, "unchanged"))
+            plan.cached_skips += 1
+        else:
+            pending.append(f)
+
+    fresh = manifest.listed_since(prefix, listed_since) if listed_since is not None else set()
+    shards = sorted(index for index in {shard_of(f.key, boundaries) for f in pending}
+                    if _range_bounds(index, boundaries) not in fresh)
+    with phase(timers, "list"):
+        listed = _list_shards(config, prefix, shards, concurrency) if shards else {}
+    plan.listed_shards = len(listed)
+    plan.listed_objects = _store_listing(manifest, prefix, boundaries, listed)
+
+    # Ranges just listed, plus those another worker listed after `listed_since`
+    if fresh:
+        remote = manifest.remote_state()
+    else:
+        remote = {obj.key: (obj.size, obj.etag) for objects in listed.values() for obj in objects}
+
+    for f in pending:
+        hit = remote.get(f.key)
+        if hit is None:
+            plan.upload.append(PlanEntry(f, "missing"))
+        elif _matches(f, *hit):
+            plan.skip.append(PlanEntry(f, "unchanged"))
+        else:
+            plan.upload.append(PlanEntry(f, "changed"))
+    return plan
@@ -0,0 +1,157 @@
+"""
+Upload order by site value.
+
+A scan hands files over in directory order, so an interrupted or throttled
+run has uploaded an arbitrary slice of the tree. With a priority feed the
+queue is ordered instead:
+
+  1. by priority class: live sites first (the top-ranked sites importSites
+     publishes, which are the pages users actually view), then the
+     quality-scorer.ts tiers (premium >= 70, high >= 50, medium >= 30, low),
+     then feed domains with neither, then domains the feed does not know
+  2. within a class, smallest files first, so the most thumbnails go live
+     soonest
+  3. by key, so runs are reproducible
+
+A feed maps domains (or product URLs) to a score, a status, or both:
+
+  - a preprocess-sites.py output directory (manifest.json + batch files),
+    read one batch file at a time
+  - JSON: {"example.com": 82, "other.io": "live", "x.dev": {"score": 40, "status": "pending_review"}}
+  - CSV with a header row: a `domain` or `url` column plus `score` and/or
+    `status`, e.g. psql "\\copy (SELECT url, status FROM products) TO 'status.csv' CSV HEADER"
+
+Domains are matched by the sanitized name ScreenshotStorage gives their
+thumbnails (reconcile.thumbnail_domain). So "https://www.example.com/" and
+"example.com" both rank example-com-<timestamp>-thumb.webp.
+
+Ordering needs the whole queue. The scan is collected and each file's size
+read before the first upload starts, which takes about a second per 50k files.
+"""
+import csv
+import json
+import os
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .jobs import UploadJob
+from .reconcile import thumbnail_domain
+from .scan import parse_thumbnail_name
+
+LIVE = "live"
+# quality-scorer.ts getQualityTier()
+TIERS = ((70, "premium"), (50, "high"), (30, "medium"), (0, "low"))
+CLASSES = (LIVE, *(name for _, name in TIERS), "unscored", "unknown")
+UNSCORED = len(CLASSES) - 2
+UNKNOWN = len(CLASSES) - 1
+
+Priority = Tuple[Optional[str], Optional[int]]  # (status, score)
+
+
+def priority_class(status: Optional[str], score: Optional[int]) -> int:
+    """Index into CLASSES; lower uploads first"""
+    if status == LIVE:
+        return 0
+    if score is None:
+        return UNSCORED
+    for index, (minimum, _) in enumerate(TIERS, start=1):
+        if score >= minimum:
+            return index
+    return len(TIERS)
+
+
+def _domain(value: str) -> str:
+    value = value.strip()
+    return thumbnail_domain(value if "://" in value else f"https://{value}")
+
+
+def _score(value) -> Optional[int]:
+    if value is None or value == "":
+        return None
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def _merge(priorities: Dict[str, Priority], domain: str, status: Optional[str], score: Optional[int]):
+    """A domain listed twice keeps the better status and the higher score"""
+    if not domain:
+        return
+    old_status, old_score = priorities.get(domain, (None, None))
+    status = LIVE if LIVE in (status, old_status) else status or old_status
+    if old_score is not None and (score is None or old_score > score):
+        score = old_score
+    priorities[domain] = (status, score)
+
+
+def _scored_dir(path: Path, priorities: Dict[str, Priority]):
+    manifest = json.loads((path / "manifest.json").read_text())
+    for batch in manifest["batches"]:
+        with open(path / batch["file"], encoding="utf-8") as f:
+            for record in json.load(f):
+                domain = (record.get("site") or {}).get("domain")
+                if domain:
+                    _merge(priorities, _domain(domain), record.get("status"),
+                           _score((record.get("quality") or {}).get("score")))
+
+
+def _json(path: Path, priorities: Dict[str, Priority]):
+    with open(path, encoding="utf-8") as f:
+        feed = json.load(f)
+    if not isinstance(feed, dict):
+        raise ValueError(f"{path}: expected a JSON object of domain -> score, status or {{score, status}}")
+    for key, value in feed.items():
+        if isinstance(value, dict):
+            _merge(priorities, _domain(key), value.get("status"), _score(value.get("score")))
+        elif isinstance(value, str) and _score(value) is None:
+            _merge(priorities, _domain(key), value, None)
+        else:
+            _merge(priorities, _domain(key), None, _score(value))
+
+
+def _csv(path: Path, priorities: Dict[str, Priority]):
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        columns = set(reader.fieldnames or ())
+        column = "domain" if "domain" in columns else "url" if "url" in columns else None
+        if column is None or not columns & {"score", "status"}:
+            raise ValueError(f"{path}: expected a domain or url column and a score and/or status column")
+        for row in reader:
+            if row.get(column):
+                _merge(priorities, _domain(row[column]), row.get("status") or None, _score(row.get("score")))
+
+
+def load_priorities(path) -> Dict[str, Priority]:
+    """Sanitized thumbnail domain -> (status, score) from a scored directory, JSON or CSV feed"""
+    path = Path(path)
+    priorities: Dict[str, Priority] = {}
+    if path.is_dir():
+        _scored_dir(path, priorities)
+    elif path.suffix.lower() == ".csv":
+        _csv(path, priorities)
+    else:
+        _json(path, priorities)
+    return priorities
+
+
+def prioritize(jobs: Iterable[UploadJob], priorities: Dict[str, Priority]) -> Tuple[List[UploadJob], Counter]:
+    """Jobs ordered by priority class, then size, then key; plus the number of jobs per class name"""
+    ranked = []
+    for job in jobs:
+        parsed = parse_thumbnail_name(job.key)
+        entry = priorities.get(parsed[0]) if parsed else None
+        rank = UNKNOWN if entry is None else priority_class(*entry)
+        try:
+            size = os.path.getsize(job.path)
+        except OSError:
+            size = 0
+        ranked.append((rank, size, job.key, job))
+    ranked.sort(key=lambda item: item[:3])
+    counts = Counter(CLASSES[rank] for rank, _, _, _ in ranked)
+    return [job for _, _, _, job in ranked], counts
+
+
+def describe(counts: Counter) -> str:
+    return ", ".join(f"{name} {counts[name]}" for name in CLASSES if counts[name])
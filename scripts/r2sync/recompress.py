@@ -0,0 +1,162 @@
+"""
+Recompression of oversized thumbnails ahead of upload.
+
+Older captures (batch-capture-screenshots.js and friends) were written at
+other sizes and encoder settings than ScreenshotStorage uses today. This
+stage re-encodes each thumbnail in a process pool with ScreenshotStorage's
+settings: 400x300, cover-fit from the top, webp at quality 80 - 10.
+
+The re-encoded file is written under .r2sync/recompressed/<key> and uploaded
+in place of the original only when it is smaller. The originals in
+public/screenshots are never modified.
+
+recompress_jobs() wraps the job stream. The uploader's producer thread pulls
+from it, so encoding overlaps with uploads already in flight instead of
+running as a pass of its own.
+
+Needs Pillow with webp support (pip install Pillow).
+"""
+import os
+from dataclasses import dataclass, replace
+from io import BytesIO
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+from .jobs import UploadJob
+
+RECOMPRESS_DIR = ".r2sync/recompressed"
+# ScreenshotStorage: SCREENSHOT_THUMBNAIL_WIDTH/HEIGHT, SCREENSHOT_QUALITY - 10
+TARGET_WIDTH = 400
+TARGET_HEIGHT = 300
+QUALITY = 70
+
+KEPT = "recompressed"
+ORIGINAL = "original"
+FAILED = "failed"
+
+
+def pillow_available() -> bool:
+    try:
+        from PIL import features
+    except ImportError:
+        return False
+    return bool(features.check("webp"))
+
+
+def recompress_file(src: str, dst: str, width: int = TARGET_WIDTH, height: int = TARGET_HEIGHT,
+                    quality: int = QUALITY) -> tuple:
+    """Re-encode src; write dst only if smaller. Returns (status, bytes before, bytes after)"""
+    from PIL import Image, ImageOps
+
+    before = os.path.getsize(src)
+    try:
+        with Image.open(src) as image:
+            image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+            # sharp resize(width, height, {fit: "cover", position: "top"})
+            image = ImageOps.fit(image, (width, height), Image.LANCZOS, centering=(0.5, 0.0))
+            buffer = BytesIO()
+            image.save(buffer, "WEBP", quality=quality, method=4)
+    except (OSError, ValueError):
+        return FAILED, before, before
+
+    data = buffer.getvalue()
+    if len(data) >= before:
+        if os.path.exists(dst):
+            os.remove(dst)  # stale output from an earlier version of the file
+        return ORIGINAL, before, before
+    Path(dst).parent.mkdir(parents=True, exist_ok=True)
+    tmp = f"{dst}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, dst)
+    return KEPT, before, len(data)
+
+
+@dataclass
+class RecompressStats:
+    files: int = 0
+    recompressed: int = 0
+    kept_original: int = 0
+    failed: int = 0
+    bytes_before: int = 0
+    bytes_after: int = 0
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.bytes_before - self.bytes_after
+
+    def summary(self) -> str:
+        mb = 1024 * 1024
+        pct = self.bytes_saved / self.bytes_before * 100 if self.bytes_before else 0.0
+        return (f"{self.recompressed}/{self.files} thumbnails recompressed, "
+                f"{self.bytes_saved / mb:.1f} MB saved ({pct:.0f}%), "
+                f"{self.kept_original} already smaller, {self.failed} undecodable")
+
+
+def recompress_jobs(jobs: Iterable[UploadJob], stats: RecompressStats, out_dir: str = RECOMPRESS_DIR,
+                    workers: Optional[int] = None, quality: int = QUALITY) -> Iterator[UploadJob]:
+    """
+    Yield jobs pointing at the smaller of original and re-encoded file, in completion order.
+    At most 4 x workers files are being encoded at once, so memory stays bounded.
+    """
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+    workers = workers or os.cpu_count() or 1
+    pool = ProcessPoolExecutor(workers)
+    pending = {}
+
+    def finished() -> Iterator[UploadJob]:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            job, dst = pending.pop(future)
+            try:
+                status, before, after = future.result()
+            except OSError:
+                # Original vanished; let the uploader report it
+                yield job
+                continue
+            stats.files += 1
+            stats.bytes_before += before
+            stats.bytes_after += after
+            if status == KEPT:
+                stats.recompressed += 1
+                yield replace(job, path=Path(dst), source=job.path)
+            else:
+                stats.kept_original += status == ORIGINAL
+                stats.failed += status == FAILED
+                yield job
+
+    try:
+        for job in jobs:
+            dst = os.path.join(out_dir, job.key)
+            try:
+                # Reuse an earlier run's output while the original is unchanged
+                reuse = os.path.getmtime(dst) >= os.path.getmtime(job.path)
+            except OSError:
+                reuse = False
+            if reuse:
+                before, after = os.path.getsize(job.path), os.path.getsize(dst)
+                stats.files += 1
+                stats.recompressed += 1
+                stats.bytes_before += before
+                stats.bytes_after += after
+                yield replace(job, path=Path(dst), source=job.path)
+                continue
+            pending[pool.submit(recompress_file, str(job.path), dst, quality=quality)] = (job, dst)
+            if len(pending) >= workers * 4:
+                yield from finished()
+        while pending:
+            yield from finished()
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def recompress_from_args(args, jobs: Iterable[UploadJob]):
+    """(job stream, stats or None) for the upload scripts' --recompress flag"""
+    if not args.recompress:
+        return jobs, None
+    if not pillow_available():
+        print("❌ Error: --recompress needs Pillow with webp support (pip install Pillow)")
+        raise SystemExit(1)
+    stats = RecompressStats()
+    return recompress_jobs(jobs, stats), stats
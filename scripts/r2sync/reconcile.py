@@ -0,0 +1,241 @@
+"""
+Database <-> R2 reconciliation of product screenshots.
+
+Answers "which products have a working screenshot" for the whole table at
+once, instead of one query or HEAD per product:
+
+  1. one streaming read of every product's screenshot columns (a
+     server-side cursor, so rows arrive in pages of ROW_PAGE and are never
+     all in memory), or the same columns from a psql CSV export
+  2. one parallel listing of screenshots/thumbnails/ (listing.py)
+  3. a hash-join of the two: the listing becomes a dict by key (plus the
+     newest version per sanitized domain), and each row is probed against
+     it as it streams past
+
+It reports:
+
+  missing     rows whose screenshot_r2_key / screenshot_thumbnail_url point
+              at an object that is not in the bucket
+  without     products with no screenshot reference at all
+  orphans     objects for a domain no product has (superseded versions of a
+              product's domain are counted separately; `gc` deletes those)
+
+Fixes are planned per product: `repoint` a missing reference (or `attach`
+a product without one) to the newest object for its domain, or queue a
+`recapture` (clear the references, status pending) when the bucket has
+nothing for it. --fix writes them back in batched UPDATE ... FROM unnest()
+statements, BATCH_SIZE rows each. Each update only applies if the row still
+has the references that were read, so a capture landing mid-run is never
+overwritten.
+"""
+import csv
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from .config import R2_PREFIX
+from .gc import database_driver, key_from_reference
+from .scan import parse_thumbnail_name
+
+ROW_PAGE = 5000
+BATCH_SIZE = 1000
+COLUMNS = ("id", "url", "screenshot_r2_key", "screenshot_thumbnail_url", "screenshot_full_url", "screenshot_status")
+PRODUCTS_QUERY = f"SELECT {', '.join(COLUMNS)} FROM products"
+
+REPOINT = "repoint"
+ATTACH = "attach"
+RECAPTURE = "recapture"
+
+# One statement per batch. The IS NOT DISTINCT FROM guards skip rows whose references changed since the read.
+FIX_STATEMENT = """
+    UPDATE products AS p SET
+        screenshot_r2_key = v.new_key,
+        screenshot_thumbnail_url = v.new_url,
+        screenshot_full_url = v.new_url,
+        screenshot_status = CASE WHEN v.new_key IS NULL THEN 'pending' ELSE 'captured' END,
+        screenshot_next_capture_at = CASE WHEN v.new_key IS NULL THEN NOW() ELSE p.screenshot_next_capture_at END,
+        updated_at = NOW()
+    FROM unnest(%s::text[], %s::text[], %s::text[], %s::text[], %s::text[])
+        AS v(id, old_key, old_url, new_key, new_url)
+    WHERE p.id = v.id::uuid
+      AND p.screenshot_r2_key IS NOT DISTINCT FROM v.old_key
+      AND p.screenshot_thumbnail_url IS NOT DISTINCT FROM v.old_url
+"""
+
+
+@dataclass
+class ProductRow:
+    id: str
+    url: str
+    r2_key: Optional[str] = None
+    thumbnail_url: Optional[str] = None
+    full_url: Optional[str] = None
+    status: Optional[str] = None
+
+
+@dataclass
+class Fix:
+    product_id: str
+    action: str
+    old_key: Optional[str]
+    old_url: Optional[str]
+    key: Optional[str] = None  # None for a recapture
+
+
+@dataclass
+class ReconcileReport:
+    rows: int = 0
+    objects: int = 0
+    ok: int = 0
+    external: int = 0  # thumbnail URLs outside the bucket prefix (e.g. favicons), left alone
+    missing: List[Tuple[str, str]] = field(default_factory=list)  # (product id, missing key)
+    without: List[str] = field(default_factory=list)  # product ids
+    orphans: List[str] = field(default_factory=list)
+    superseded: int = 0
+    fixes: List[Fix] = field(default_factory=list)
+
+    def fix_counts(self) -> dict:
+        counts = dict.fromkeys((REPOINT, ATTACH, RECAPTURE), 0)
+        for fix in self.fixes:
+            counts[fix.action] += 1
+        return counts
+
+    def summary(self) -> dict:
+        return {
+            "rows": self.rows,
+            "objects": self.objects,
+            "ok": self.ok,
+            "external": self.external,
+            "missing": len(self.missing),
+            "without": len(self.without),
+            "orphans": len(self.orphans),
+            "superseded": self.superseded,
+            "fixes": self.fix_counts(),
+        }
+
+
+def thumbnail_domain(url: str) -> str:
+    """The sanitized domain ScreenshotStorage names a product's thumbnails by (extractDomain + sanitizeDomain)"""
+    try:
+        host = urlsplit(url).hostname
+    except ValueError:
+        host = None
+    if host:
+        domain = host.replace("www.", "", 1)
+    else:
+        domain = re.sub(r"^https?://(www\.)?", "", url or "").split("/")[0]
+    domain = re.sub(r"^https?://(www\.)?", "", domain)
+    domain = re.sub(r"-+", "-", re.sub(r"[^a-z0-9]", "-", domain, flags=re.I))
+    return domain.strip("-").lower()[:50]
+
+
+def query_products(database_url: str, page: int = ROW_PAGE) -> Iterator[ProductRow]:
+    """Stream every product's screenshot columns through a server-side cursor"""
+    driver = database_driver()
+    with driver.connect(database_url) as connection:
+        with connection.cursor(name="r2sync_reconcile") as cursor:
+            cursor.itersize = page
+            cursor.execute(PRODUCTS_QUERY)
+            for row in cursor:
+                yield ProductRow(str(row[0]), *row[1:])
+
+
+def load_products(path) -> Iterator[ProductRow]:
+    """Rows from a CSV export with a header, e.g.
+    psql -c "\\copy (SELECT id, url, screenshot_r2_key, ... FROM products) TO 'products.csv' CSV HEADER"
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        for record in csv.DictReader(f):
+            values = [record.get(column) or None for column in COLUMNS]
+            yield ProductRow(values[0], values[1] or "", *values[2:])
+
+
+def public_url_for(base_url: str, key: str) -> str:
+    return f"{base_url.rstrip('/')}/{key}"
+
+
+def reconcile(rows: Iterable[ProductRow], objects: Iterable, prefix: str = R2_PREFIX) -> ReconcileReport:
+    """Hash-join streamed product rows against a bucket listing"""
+    report = ReconcileReport()
+    present: Dict[str, object] = {}
+    newest: Dict[str, Tuple[int, str]] = {}
+    for obj in objects:
+        present[obj.key] = obj
+        parsed = parse_thumbnail_name(obj.key)
+        if parsed:
+            domain, timestamp = parsed
+            if domain not in newest or (timestamp, obj.key) > newest[domain]:
+                newest[domain] = (timestamp, obj.key)
+    report.objects = len(present)
+
+    referenced = set()
+    product_domains = set()
+    for row in rows:
+        report.rows += 1
+        domain = thumbnail_domain(row.url)
+        product_domains.add(domain)
+        refs = [key for key in (row.r2_key and key_from_reference(row.r2_key, prefix),
+                                row.thumbnail_url and key_from_reference(row.thumbnail_url, prefix)) if key]
+        refs = list(dict.fromkeys(refs))
+        candidate = newest.get(domain, (0, None))[1]
+        if not refs:
+            if row.thumbnail_url:
+                report.external += 1
+                continue
+            report.without.append(row.id)
+            if candidate:
+                report.fixes.append(Fix(row.id, ATTACH, row.r2_key, row.thumbnail_url, candidate))
+                referenced.add(candidate)
+            continue
+        missing = [key for key in refs if key not in present]
+        referenced.update(key for key in refs if key in present)
+        if not missing:
+            report.ok += 1
+            continue
+        report.missing.extend((row.id, key) for key in missing)
+        if candidate:
+            report.fixes.append(Fix(row.id, REPOINT, row.r2_key, row.thumbnail_url, candidate))
+            referenced.add(candidate)
+        else:
+            report.fixes.append(Fix(row.id, RECAPTURE, row.r2_key, row.thumbnail_url))
+
+    for key in sorted(present.keys() - referenced):
+        parsed = parse_thumbnail_name(key)
+        if parsed and parsed[0] in product_domains:
+            report.superseded += 1
+        else:
+            report.orphans.append(key)
+    return report
+
+
+def apply_fixes(database_url: str, fixes: List[Fix], public_url: str, batch_size: int = BATCH_SIZE,
+                on_batch=None) -> int:
+    """Write fixes back in batched UPDATEs, one transaction per batch; returns the rows updated"""
+    driver = database_driver()
+    updated = 0
+    with driver.connect(database_url) as connection:
+        for start in range(0, len(fixes), batch_size):
+            batch = fixes[start:start + batch_size]
+            columns = ([f.product_id for f in batch], [f.old_key for f in batch], [f.old_url for f in batch],
+                       [f.key for f in batch], [f.key and public_url_for(public_url, f.key) for f in batch])
+            with connection.cursor() as cursor:
+                cursor.execute(FIX_STATEMENT, columns)
+                count = cursor.rowcount
+            connection.commit()
+            updated += count
+            if on_batch:
+                on_batch(len(batch), count)
+    return updated
+
+
+def report_json(report: ReconcileReport, limit: Optional[int] = None) -> dict:
+    """The report as JSON; `limit` caps each list (the summary always has the full counts)"""
+    cap = (lambda items: items[:limit]) if limit else (lambda items: items)
+    return {
+        **report.summary(),
+        "missingKeys": [{"productId": pid, "key": key} for pid, key in cap(report.missing)],
+        "withoutScreenshot": cap(report.without),
+        "orphanKeys": cap(report.orphans),
+        "plannedFixes": [{"productId": f.product_id, "action": f.action, "key": f.key} for f in cap(report.fixes)],
+    }
@@ -0,0 +1,39 @@
+"""
+Error classification and backoff for upload retries.
+"""
+import asyncio
+
+from toolkit.backoff import backoff_delay  # noqa: F401  (re-exported for the upload paths)
+from toolkit.httpclient import HTTPError
+
+from .s3 import S3Error
+
+# Error classes recorded in the journal
+THROTTLED = "throttled"
+SERVER = "server"
+CLIENT = "client"
+AUTH = "auth"
+NETWORK = "network"
+TIMEOUT = "timeout"
+LOCAL = "local"
+
+RETRYABLE = {THROTTLED, SERVER, NETWORK, TIMEOUT}
+
+
+def classify_error(error: BaseException) -> str:
+    if isinstance(error, S3Error):
+        if error.status in (429, 503) or error.code == "SlowDown":
+            return THROTTLED
+        if error.status >= 500 or error.status == 408:
+            return SERVER
+        if error.status in (401, 403):
+            return AUTH
+        return CLIENT
+    if isinstance(error, asyncio.TimeoutError):
+        return TIMEOUT
+    if isinstance(error, (FileNotFoundError, IsADirectoryError, PermissionError)):
+        return LOCAL
+    if isinstance(error, (ConnectionError, asyncio.IncompleteReadError, HTTPError, OSError)):
+        return NETWORK
+    return CLIENT
+
@@ -0,0 +1,247 @@
+"""
+Async S3 client for R2, built on the pooled HTTP client and SigV4 signer.
+"""
+import asyncio
+import base64
+import hashlib
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from urllib.parse import quote
+from xml.sax.saxutils import escape
+
+from toolkit.httpclient import ConnectionPool, HTTPError
+
+from .config import R2Config
+from .sigv4 import EMPTY_SHA256, UNSIGNED_PAYLOAD, Signer, canonical_query
+
+# Status codes worth retrying: throttling and transient server errors
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+class S3Error(Exception):
+    """Non-2xx response from the S3 API"""
+
+    def __init__(self, status: int, code: str = "", message: str = "", key: str = ""):
+        self.status = status
+        self.code = code
+        self.message = message
+        self.key = key
+        super().__init__(f"HTTP {status} {code}: {message}".strip() + (f" ({key})" if key else ""))
+
+    @property
+    def retryable(self) -> bool:
+        return self.status in RETRYABLE_STATUS or self.code == "SlowDown"
+
+
+@dataclass(frozen=True)
+class ObjectInfo:
+    key: str
+    size: int
+    etag: str
+    last_modified: str = ""
+
+    @property
+    def is_multipart(self) -> bool:
+        """Multipart ETags are not an MD5 of the body ("<md5>-<parts>")"""
+        return "-" in self.etag
+
+
+# Exceptions that mean the request may not have reached R2 and can be re-sent
+TRANSPORT_ERRORS = (ConnectionError, OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, HTTPError)
+
+
+def _error_from_response(response, key: str = "") -> S3Error:
+    code, message = "", response.reason
+    if response.body:
+        try:
+            root = ET.fromstring(response.body)
+            code = root.findtext("Code") or ""
+            message = root.findtext("Message") or message
+        except ET.ParseError:
+            message = response.body[:200].decode("utf-8", "replace")
+    return S3Error(response.status, code, message, key)
+
+
+def _children(element, name: str):
+    """Child elements by local name, ignoring the S3 XML namespace"""
+    return [child for child in element if child.tag.rsplit("}", 1)[-1] == name]
+
+
+def _text(element, name: str, default: str = "") -> str:
+    found = _children(element, name)
+    return found[0].text or default if found else default
+
+
+class S3Client:
+    """
+    Path-style S3 client for a single bucket.
+
+    One client owns one connection pool; share it across all concurrent
+    uploads in a run so connections (and their TLS sessions) are reused.
+    """
+
+    def __init__(self, config: R2Config, max_connections: int = 64, timeout: float = 30.0):
+        self.config = config
+        self.bucket = config.bucket
+        self.pool = ConnectionPool(config.endpoint_url, max_size=max_connections, timeout=timeout)
+        self.signer = Signer(config.access_key_id, config.secret_access_key, config.region)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def close(self):
+        await self.pool.close()
+
+    def _path(self, key: str = "") -> str:
+        path = f"/{quote(self.bucket, safe='')}"
+        if key:
+            path += "/" + quote(key, safe="/-_.~")
+        return path
+
+    async def request(self, method: str, key: str = "", query: dict = None, headers: dict = None,
+                      body=b"", payload_hash: str = None, idempotent: bool = None):
+        """Sign and send a request, raising S3Error on a non-2xx response"""
+        path = self._path(key)
+        query = query or {}
+        if payload_hash is None:
+            payload_hash = UNSIGNED_PAYLOAD if body else EMPTY_SHA256
+        signed = self.signer.sign(method, self.pool.host, path, query, headers or {}, payload_hash)
+        qs = canonical_query(query)
+        target = f"{path}?{qs}" if qs else path
+
+        response = await self.pool.request(method, target, signed, body, idempotent)
+        if not response.ok:
+            raise _error_from_response(response, key)
+        return response
+
+    async def put_object(self, key: str, body, content_type: str = "application/octet-stream",
+                         extra_headers: dict = None) -> str:
+        """Upload an object in a single PUT, returning its ETag"""
+        headers = {"Content-Type": content_type}
+        if extra_headers:
+            headers.update(extra_headers)
+        response = await self.request("PUT", key, headers=headers, body=body)
+        return response.headers.get("etag", "").strip('"')
+
+    async def copy_object(self, key: str, source_key: str, content_type: str = None, extra_headers: dict = None,
+                          if_match: str = None) -> str:
+        """Server-side copy of source_key (same bucket) to key, returning the new ETag. With content_type the
+        metadata is replaced (content_type plus extra_headers), otherwise copied; if_match makes it conditional
+        on the source's ETag"""
+        headers = {"x-amz-copy-source": self._path(source_key)}
+        if content_type is not None:
+            headers.update({"x-amz-metadata-directive": "REPLACE", "Content-Type": content_type})
+            if extra_headers:
+                headers.update(extra_headers)
+        if if_match:
+            headers["x-amz-copy-source-if-match"] = f'"{if_match}"'
+        response = await self.request("PUT", key, headers=headers)
+        root = ET.fromstring(response.body)
+        if root.tag.rsplit("}", 1)[-1] == "Error":
+            # Like CompleteMultipartUpload, a copy can fail inside a 200 response
+            raise S3Error(response.status, _text(root, "Code"), _text(root, "Message"), key)
+        return _text(root, "ETag").strip('"')
+
+    async def head_object(self, key: str):
+        """Return the object's response headers, or None if it does not exist"""
+        try:
+            response = await self.request("HEAD", key)
+        except S3Error as e:
+            if e.status == 404:
+                return None
+            raise
+        return response.headers
+
+    async def get_object(self, key: str) -> bytes:
+        response = await self.request("GET", key)
+        return response.body
+
+    async def get_object_range(self, key: str, start: int, end: int) -> bytes:
+        """Bytes start..end (inclusive) of an object, in one ranged GET"""
+        response = await self.request("GET", key, headers={"Range": f"bytes={start}-{end}"})
+        return response.body
+
+    async def delete_object(self, key: str):
+        await self.request("DELETE", key)
+
+    async def delete_objects(self, keys) -> list:
+        """
+        Delete up to 1000 keys in one DeleteObjects request (quiet mode).
+        Returns [(key, code, message), ...] for the keys that could not be deleted.
+        """
+        body = ("<Delete><Quiet>true</Quiet>"
+                + "".join(f"<Object><Key>{escape(key)}</Key></Object>" for key in keys)
+                + "</Delete>").encode()
+        headers = {
+            "Content-Type": "application/xml",
+            "Content-MD5": base64.b64encode(hashlib.md5(body).digest()).decode(),
+        }
+        # Deleting the same keys twice is harmless, so a stale connection may resend it
+        response = await self.request("POST", query={"delete": ""}, headers=headers, body=body,
+                                      payload_hash=hashlib.sha256(body).hexdigest(), idempotent=True)
+        root = ET.fromstring(response.body)
+        return [(_text(item, "Key"), _text(item, "Code"), _text(item, "Message"))
+                for item in _children(root, "Error")]
+
+    async def list_objects_v2(self, prefix: str = "", start_after: str = None,
+                              continuation_token: str = None, max_keys: int = 1000):
+        """
+        Fetch one ListObjectsV2 page.
+        Returns (objects, next_continuation_token); the token is None on the last page.
+        """
+        query = {"list-type": "2", "max-keys": str(max_keys)}
+        if prefix:
+            query["prefix"] = prefix
+        if start_after:
+            query["start-after"] = start_after
+        if continuation_token:
+            query["continuation-token"] = continuation_token
+
+        response = await self.request("GET", query=query)
+        root = ET.fromstring(response.body)
+        objects = [
+            ObjectInfo(
+                key=_text(item, "Key"),
+                size=int(_text(item, "Size", "0")),
+                etag=_text(item, "ETag").strip('"'),
+                last_modified=_text(item, "LastModified"),
+            )
+            for item in _children(root, "Contents")
+        ]
+        truncated = _text(root, "IsTruncated").lower() == "true"
+        return objects, (_text(root, "NextContinuationToken") or None) if truncated else None
+
+    async def create_multipart_upload(self, key: str, content_type: str = "application/octet-stream",
+                                      extra_headers: dict = None) -> str:
+        headers = {"Content-Type": content_type}
+        if extra_headers:
+            headers.update(extra_headers)
+        response = await self.request("POST", key, query={"uploads": ""}, headers=headers)
+        return _text(ET.fromstring(response.body), "UploadId")
+
+    async def upload_part(self, key: str, upload_id: str, part_number: int, body) -> str:
+        response = await self.request(
+            "PUT", key, query={"partNumber": str(part_number), "uploadId": upload_id}, body=body
+        )
+        return response.headers.get("etag", "").strip('"')
+
+    async def complete_multipart_upload(self, key: str, upload_id: str, parts) -> str:
+        """Complete an upload from [(part_number, etag), ...], returning the object's ETag"""
+        body = "".join(
+            f"<Part><PartNumber>{number}</PartNumber><ETag>\"{etag}\"</ETag></Part>"
+            for number, etag in sorted(parts)
+        )
+        body = f"<CompleteMultipartUpload>{body}</CompleteMultipartUpload>".encode("utf-8")
+        response = await self.request("POST", key, query={"uploadId": upload_id}, body=body,
+                                      headers={"Content-Type": "application/xml"})
+        root = ET.fromstring(response.body)
+        if root.tag.rsplit("}", 1)[-1] == "Error":
+            # S3 can report a failed completion inside a 200 response
+            raise S3Error(response.status, _text(root, "Code"), _text(root, "Message"), key)
+        return _text(root, "ETag").strip('"')
+
+    async def abort_multipart_upload(self, key: str, upload_id: str):
+        await self.request("DELETE", key, query={"uploadId": upload_id})
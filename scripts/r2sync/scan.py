@@ -0,0 +1,57 @@
+"""
+Streaming directory scan.
+
+os.scandir-based generators that yield files as the walk discovers them, so
+uploads can start on the first file and memory does not grow with the size
+of the tree (unlike list(Path.glob("**/*.webp"))).
+"""
+import os
+import re
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+
+from .config import R2_PREFIX
+from .jobs import UploadJob
+
+SUFFIXES = (".webp",)
+# ScreenshotStorage names thumbnails `${sanitizedDomain}-${Date.now()}-thumb.${format}`
+THUMBNAIL_NAME = re.compile(r"^(?P<domain>.+)-(?P<timestamp>\d{10,})-thumb\.(?P<format>\w+)$")
+
+
+def iter_files(root, suffixes: Tuple[str, ...] = SUFFIXES) -> Iterator[os.DirEntry]:
+    """Yield DirEntry objects for matching files under root, depth-first"""
+    stack = [os.fspath(root)]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.name.endswith(suffixes) and entry.is_file():
+                        yield entry
+        except FileNotFoundError:
+            # Directory removed mid-walk (e.g. cleanup running alongside capture)
+            continue
+
+
+def parse_thumbnail_name(name: str) -> Optional[Tuple[str, int]]:
+    """(sanitized domain, timestamp ms) for a thumbnail file name or key, else None"""
+    match = THUMBNAIL_NAME.match(name.rsplit("/", 1)[-1])
+    if not match:
+        return None
+    return match["domain"], int(match["timestamp"])
+
+
+def key_for(root: str, path: str, prefix: str = R2_PREFIX) -> str:
+    rel = os.path.relpath(path, root)
+    if os.sep != "/":
+        rel = rel.replace(os.sep, "/")
+    return prefix + rel
+
+
+def iter_jobs(root, prefix: str = R2_PREFIX, suffixes: Tuple[str, ...] = SUFFIXES) -> Iterator[UploadJob]:
+    """Stream UploadJobs for every matching file under root"""
+    root = os.fspath(root)
+    for entry in iter_files(root, suffixes):
+        yield UploadJob(Path(entry.path), key_for(root, entry.path, prefix))
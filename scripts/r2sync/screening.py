@@ -0,0 +1,419 @@
+"""
+Screening for broken and placeholder screenshots before they reach R2.
+
+Many captures are useless: Cloudflare "checking your browser" interstitials,
+parked-domain templates, blank white or black frames. This stage finds them
+without anyone looking at the thumbnails.
+
+Workers in a process pool decode each thumbnail once to a 32x24 RGB sample.
+For their whole batch at once they compute, as NumPy arrays:
+
+- a 64-bit dHash (row gradients of a 9x8 grey image) and aHash (8x8 grey
+  image above its mean), which stay stable under re-encoding and small
+  rendering differences;
+- the grey level's mean and standard deviation;
+- the dominant colour (RGB quantised to 3 bits per channel) and the share
+  of the image it covers.
+
+An image is flagged if it is blank (almost no variance, or one colour covers
+nearly all of it), or if both hashes are within a few bits of a known bad
+template. The Hamming distances to all templates are computed as one N x T
+array. Templates are labelled hashes in BAD_TEMPLATES_PATH; add one from an
+example image with `screen --add-template FILE --label NAME`. Hashes shared
+exactly by many different domains are reported as candidate templates.
+
+Results are cached per file (size, mtime) in .r2sync/screen/hashes.npz, so a
+re-run decodes only new captures. The flagged files go to FLAGGED_PATH, and
+upload, sync and plan leave them out unless --include-flagged is given. The
+flagged domains go to a re-capture list.
+
+Needs NumPy and Pillow.
+"""
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from .config import BAD_TEMPLATES_PATH, FLAGGED_PATH
+from .scan import parse_thumbnail_name
+
+CACHE_PATH = ".r2sync/screen/hashes.npz"
+RECAPTURE_PATH = ".r2sync/screen/recapture.txt"
+SAMPLE_SIZE = (32, 24)  # 4:3, like the thumbnails
+FILES_PER_TASK = 512
+# Flagging thresholds (grey levels are 0-255; distances are bits out of 64)
+BLANK_STD = 6.0
+FLAT_SHARE = 0.97
+TEMPLATE_DISTANCE = 8
+CANDIDATE_DOMAINS = 5
+
+BLANK = "blank"
+UNDECODABLE = "undecodable"
+
+
+# ----------------------------------------------------------------------
+# Vectorised features
+# ----------------------------------------------------------------------
+def _pack_bits(bits):
+    """(N, 64) booleans -> (N,) uint64, first bit most significant"""
+    import numpy as np
+
+    return np.packbits(bits.reshape(len(bits), 64), axis=1).view(">u8").ravel().astype(np.uint64)
+
+
+def _resample(grey, height: int, width: int):
+    """Area-average (N, H, W) grey samples down to (N, height, width)"""
+    import numpy as np
+
+    n, h, w = grey.shape
+    rows = np.linspace(0, h, height + 1).astype(int)
+    cols = np.linspace(0, w, width + 1).astype(int)
+    # Sum over row bands, then column bands (reduceat handles uneven bands)
+    return np.add.reduceat(np.add.reduceat(grey, rows[:-1], axis=1), cols[:-1], axis=2) / (
+        np.diff(rows)[None, :, None] * np.diff(cols)[None, None, :])
+
+
+def grey_levels(rgb):
+    """(N, H, W, 3) uint8 -> (N, H, W) float32 luma (ITU-R 601, as Pillow's "L")"""
+    import numpy as np
+
+    return rgb.astype(np.float32) @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+
+def dhash(grey):
+    """64-bit difference hash of each (H, W) grey sample"""
+    small = _resample(grey, 8, 9)
+    return _pack_bits(small[:, :, 1:] > small[:, :, :-1])
+
+
+def ahash(grey):
+    """64-bit average hash of each (H, W) grey sample"""
+    small = _resample(grey, 8, 8)
+    return _pack_bits(small > small.mean(axis=(1, 2), keepdims=True))
+
+
+def dominant_colours(rgb):
+    """(dominant RGB (N, 3) uint8, share of pixels (N,)) with channels quantised to 3 bits"""
+    import numpy as np
+
+    n = len(rgb)
+    q = (rgb >> 5).astype(np.int64)
+    codes = (q[..., 0] << 6 | q[..., 1] << 3 | q[..., 2]).reshape(n, -1)
+    # One bincount for the whole batch: offset each image's codes into its own 512 bins
+    counts = np.bincount((codes + np.arange(n)[:, None] * 512).ravel(), minlength=n * 512).reshape(n, 512)
+    top = counts.argmax(axis=1)
+    centre = np.stack([top >> 6, (top >> 3) & 7, top & 7], axis=1) * 32 + 16
+    return centre.astype(np.uint8), counts[np.arange(n), top] / codes.shape[1]
+
+
+_POPCOUNT = None
+
+
+def hamming(a, b):
+    """(N,) x (T,) uint64 hashes -> (N, T) bit distances"""
+    import numpy as np
+
+    global _POPCOUNT
+    if _POPCOUNT is None:
+        _POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+    x = np.bitwise_xor(a[:, None], b[None, :])
+    return _POPCOUNT[x.view(np.uint8)].reshape(*x.shape, 8).sum(axis=-1, dtype=np.uint8)
+
+
+def features(rgb) -> dict:
+    """Every per-image feature for an (N, H, W, 3) batch, as arrays"""
+    grey = grey_levels(rgb)
+    dominant, share = dominant_colours(rgb)
+    return {"dhash": dhash(grey), "ahash": ahash(grey), "mean": grey.mean(axis=(1, 2)),
+            "std": grey.std(axis=(1, 2)), "dominant": dominant, "share": share}
+
+
+# ----------------------------------------------------------------------
+# Decoding (runs in the worker processes)
+# ----------------------------------------------------------------------
+def _decode(path: str):
+    from PIL import Image
+
+    with Image.open(path) as image:
+        image.draft("RGB", (SAMPLE_SIZE[0] * 2, SAMPLE_SIZE[1] * 2))  # JPEG decodes at reduced scale
+        return image.convert("RGB").resize(SAMPLE_SIZE, Image.BOX).tobytes()
+
+
+def _screen_many(paths: List[str]) -> dict:
+    """Worker task: decode a batch and compute its features in one go"""
+    import numpy as np
+
+    samples, ok = [], []
+    for path in paths:
+        try:
+            samples.append(_decode(path))
+            ok.append(True)
+        except (OSError, ValueError, SyntaxError):
+            samples.append(bytes(SAMPLE_SIZE[0] * SAMPLE_SIZE[1] * 3))
+            ok.append(False)
+    rgb = np.frombuffer(b"".join(samples), dtype=np.uint8).reshape(len(paths), SAMPLE_SIZE[1], SAMPLE_SIZE[0], 3)
+    return {"path": paths, "ok": np.array(ok), **features(rgb)}
+
+
+# ----------------------------------------------------------------------
+# Cache and templates
+# ----------------------------------------------------------------------
+COLUMNS = ("ok", "dhash", "ahash", "mean", "std", "dominant", "share")
+
+
+def _empty():
+    import numpy as np
+
+    return {"path": [], "size": np.zeros(0, np.int64), "mtime": np.zeros(0, np.int64), "ok": np.zeros(0, bool),
+            "dhash": np.zeros(0, np.uint64), "ahash": np.zeros(0, np.uint64), "mean": np.zeros(0, np.float32),
+            "std": np.zeros(0, np.float32), "dominant": np.zeros((0, 3), np.uint8), "share": np.zeros(0)}
+
+
+def load_cache(path: str = CACHE_PATH) -> dict:
+    """Features from the last run, or an empty cache if there is none (or it is unreadable)"""
+    from zipfile import BadZipFile
+
+    import numpy as np
+
+    try:
+        with np.load(path) as data:
+            cache = {name: data[name] for name in ("path", "size", "mtime", *COLUMNS)}
+    except (OSError, ValueError, KeyError, BadZipFile):
+        return _empty()
+    cache["path"] = cache["path"].tolist()
+    return cache
+
+
+def save_cache(feats: dict, path: str = CACHE_PATH):
+    import numpy as np
+
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    tmp = f"{path}.tmp.npz"
+    np.savez(tmp, **{**feats, "path": np.array(feats["path"], dtype=str)})
+    os.replace(tmp, path)
+
+
+@dataclass
+class Template:
+    label: str
+    dhash: int
+    ahash: int
+    source: str = ""
+
+
+def load_templates(path: str = BAD_TEMPLATES_PATH) -> List[Template]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return []
+    return [Template(t["label"], int(t["dhash"], 16), int(t["ahash"], 16), t.get("source", ""))
+            for t in data["templates"]]
+
+
+def save_templates(templates: List[Template], path: str = BAD_TEMPLATES_PATH):
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    data = {"templates": [{"label": t.label, "dhash": f"{t.dhash:016x}", "ahash": f"{t.ahash:016x}",
+                           "source": t.source} for t in templates]}
+    Path(path).write_text(json.dumps(data, indent=2) + "\n")
+
+
+def template_from_image(path: str, label: str) -> Template:
+    result = _screen_many([os.fspath(path)])
+    if not result["ok"][0]:
+        raise ValueError(f"cannot decode {path}")
+    return Template(label, int(result["dhash"][0]), int(result["ahash"][0]), os.path.basename(path))
+
+
+# ----------------------------------------------------------------------
+# Screening
+# ----------------------------------------------------------------------
+def compute_features(files, cache: dict, workers: Optional[int] = None,
+                     files_per_task: int = FILES_PER_TASK) -> dict:
+    """Features for `files` (LocalFiles) in order, decoding only those not cached with the same size and mtime"""
+    import numpy as np
+
+    index = {path: i for i, path in enumerate(cache["path"])}
+    take = np.full(len(files), -1, dtype=np.int64)
+    todo = []
+    for i, f in enumerate(files):
+        j = index.get(str(f.path), -1)
+        if j >= 0 and cache["size"][j] == f.size and cache["mtime"][j] == f.mtime_ns:
+            take[i] = j
+        else:
+            todo.append(i)
+
+    paths = [str(files[i].path) for i in todo]
+    batches = [paths[i:i + files_per_task] for i in range(0, len(paths), files_per_task)]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(batches) < 2:
+        results = [_screen_many(batch) for batch in batches]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(min(workers, len(batches))) as pool:
+            results = list(pool.map(_screen_many, batches))
+
+    out = {"path": [str(f.path) for f in files],
+           "size": np.array([f.size for f in files], dtype=np.int64),
+           "mtime": np.array([f.mtime_ns for f in files], dtype=np.int64)}
+    cached = take >= 0
+    for name in COLUMNS:
+        column = np.zeros((len(files),) + cache[name].shape[1:], dtype=cache[name].dtype)
+        column[cached] = cache[name][take[cached]]
+        if results:
+            column[np.array(todo, dtype=np.int64)] = np.concatenate([r[name] for r in results])
+        out[name] = column
+    out["decoded"] = len(todo)
+    return out
+
+
+@dataclass
+class ScreenReport:
+    files: int = 0
+    decoded: int = 0
+    seconds: float = 0.0
+    flagged: Dict[str, dict] = field(default_factory=dict)  # key -> {path, size, mtimeNs, domain, reason}
+    candidates: List[dict] = field(default_factory=list)
+
+    def reasons(self) -> dict:
+        counts: Dict[str, int] = {}
+        for entry in self.flagged.values():
+            counts[entry["reason"]] = counts.get(entry["reason"], 0) + 1
+        return dict(sorted(counts.items(), key=lambda item: -item[1]))
+
+    def domains(self) -> List[str]:
+        return sorted({entry["domain"] for entry in self.flagged.values()})
+
+    def to_dict(self) -> dict:
+        return {
+            "generatedAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "files": self.files,
+            "decoded": self.decoded,
+            "seconds": round(self.seconds, 3),
+            "reasons": self.reasons(),
+            "flagged": dict(sorted(self.flagged.items())),
+            "candidateTemplates": self.candidates,
+        }
+
+
+def classify(feats: dict, templates: List[Template], distance: int = TEMPLATE_DISTANCE,
+             blank_std: float = BLANK_STD, flat_share: float = FLAT_SHARE) -> List[str]:
+    """Per image: "" if it looks fine, else undecodable, blank, or template:<label>"""
+    import numpy as np
+
+    n = len(feats["path"])
+    reason = np.full(n, "", dtype=object)
+    if templates:
+        d = hamming(feats["dhash"], np.array([t.dhash for t in templates], dtype=np.uint64))
+        a = hamming(feats["ahash"], np.array([t.ahash for t in templates], dtype=np.uint64))
+        worst = np.maximum(d, a)  # both hashes must agree
+        best = worst.argmin(axis=1)
+        hit = worst[np.arange(n), best] <= distance
+        labels = np.array([f"template:{t.label}" for t in templates], dtype=object)
+        reason[hit] = labels[best[hit]]
+    reason[(feats["std"] < blank_std) | (feats["share"] >= flat_share)] = BLANK
+    reason[~feats["ok"]] = UNDECODABLE
+    return reason.tolist()
+
+
+def candidate_templates(feats: dict, reasons: List[str], min_domains: int = CANDIDATE_DOMAINS) -> List[dict]:
+    """Unflagged dHashes shared by at least `min_domains` domains: likely templates not yet known"""
+    import numpy as np
+
+    keep = np.array([not r for r in reasons], dtype=bool) & feats["ok"]
+    if not keep.any():
+        return []
+    hashes = feats["dhash"][keep]
+    paths = [p for p, k in zip(feats["path"], keep) if k]
+    unique, inverse, counts = np.unique(hashes, return_inverse=True, return_counts=True)
+    out = []
+    for u in np.flatnonzero(counts >= min_domains):
+        members = np.flatnonzero(inverse == u)
+        domains = {_domain(paths[i]) for i in members}
+        if len(domains) >= min_domains:
+            out.append({"dhash": f"{int(unique[u]):016x}", "files": len(members), "domains": len(domains),
+                        "examples": [paths[i] for i in members[:5]]})
+    return sorted(out, key=lambda c: -c["domains"])
+
+
+def _domain(path: str) -> str:
+    name = os.path.basename(path)
+    parsed = parse_thumbnail_name(name)
+    return parsed[0] if parsed else Path(name).stem
+
+
+def screen(files, templates: List[Template], workers: Optional[int] = None, cache_path: str = CACHE_PATH,
+           timers=None) -> ScreenReport:
+    """Decode (or reuse), classify and cluster `files`; updates the feature cache"""
+    from .metrics import phase
+
+    start = time.perf_counter()
+    with phase(timers, "hash"):
+        feats = compute_features(files, load_cache(cache_path), workers)
+    save_cache({name: value for name, value in feats.items() if name != "decoded"}, cache_path)
+    with phase(timers, "plan"):
+        reasons = classify(feats, templates)
+        report = ScreenReport(len(files), feats["decoded"])
+        for f, reason in zip(files, reasons):
+            if reason:
+                report.flagged[f.key] = {"path": str(f.path), "size": f.size, "mtimeNs": f.mtime_ns,
+                                         "domain": _domain(str(f.path)), "reason": reason}
+        report.candidates = candidate_templates(feats, reasons)
+    report.seconds = time.perf_counter() - start
+    return report
+
+
+def write_report(report: ScreenReport, flagged_path: str = FLAGGED_PATH, recapture_path: str = RECAPTURE_PATH):
+    Path(flagged_path).parent.mkdir(parents=True, exist_ok=True)
+    tmp = f"{flagged_path}.tmp"
+    Path(tmp).write_text(json.dumps(report.to_dict(), indent=2) + "\n")
+    os.replace(tmp, flagged_path)
+    Path(recapture_path).parent.mkdir(parents=True, exist_ok=True)
+    Path(recapture_path).write_text("".join(f"{domain}\n" for domain in report.domains()))
+
+
+# ----------------------------------------------------------------------
+# Keeping flagged files out of uploads (stdlib only: used by the CLI's light paths)
+# ----------------------------------------------------------------------
+def load_flagged(path: str = FLAGGED_PATH) -> Dict[str, tuple]:
+    """key -> (size, mtime_ns) of each flagged file; empty if never screened"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            flagged = json.load(f)["flagged"]
+    except FileNotFoundError:
+        return {}
+    return {key: (entry["size"], entry["mtimeNs"]) for key, entry in flagged.items()}
+
+
+class FlaggedFilter:
+    """Drops flagged files, as long as they are unchanged since they were screened"""
+
+    def __init__(self, flagged: Dict[str, tuple]):
+        self.flagged = flagged
+        self.dropped = 0
+
+    def _is_flagged(self, item) -> bool:
+        stat = self.flagged.get(item.key)
+        if stat is None:
+            return False
+        size = getattr(item, "size", None)
+        if size is None:
+            try:
+                st = os.stat(item.path)
+            except OSError:
+                return False
+            size, mtime_ns = st.st_size, st.st_mtime_ns
+        else:
+            mtime_ns = item.mtime_ns
+        return (size, mtime_ns) == tuple(stat)
+
+    def __call__(self, items: Iterable) -> Iterable:
+        """Lazily keep the items (UploadJobs, LocalFiles, Sources) that are not flagged"""
+        for item in items:
+            if self._is_flagged(item):
+                self.dropped += 1
+            else:
+                yield item
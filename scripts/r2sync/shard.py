@@ -0,0 +1,114 @@
+"""
+Sharded uploads: split one run across processes or hosts by key.
+
+`--shard I/N` (1-based) makes a worker handle only the keys that hash into
+shard I of N. Keys are placed with jump consistent hashing over a BLAKE2b
+hash of the R2 key (Lamping & Veach, 2014). The hash does not depend on the
+process, the host or the scan order. Going from N to N+1 shards moves only
+about 1/(N+1) of the keys.
+
+On one host, workers share the journal (SQLite in WAL mode, with writes
+serialized by its lock) and the manifest. Every worker also takes an
+exclusive lock file, <journal>.shard-I-of-N.lock, so the same shard cannot
+run twice. Because shards are disjoint, workers never write the same row. A
+worker recovers, counts and retries only its own keys. An unsharded `retry`
+on the same journal covers every shard.
+
+On several hosts, give each host its own shard numbers; the per-run
+metrics directories (metrics.py) are merged afterwards with
+`r2sync-cli.py merge-runs`. `r2sync-cli.py fanout --workers N <command> ...`
+starts N local workers with --shard 1/N .. N/N, waits for them and merges
+their runs.
+"""
+import argparse
+import os
+from dataclasses import dataclass
+
+
+def key_hash(key: str) -> int:
+    # hashlib loads OpenSSL; the CLI imports this module for --shard parsing alone
+    from hashlib import blake2b
+
+    return int.from_bytes(blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+def jump_hash(value: int, buckets: int) -> int:
+    """Jump consistent hash of a 64-bit value into [0, buckets)"""
+    b, j = -1, 0
+    while j < buckets:
+        b = j
+        value = (value * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        j = int((b + 1) * (float(1 << 31) / float((value >> 33) + 1)))
+    return b
+
+
+def shard_index(key: str, count: int) -> int:
+    """0-based shard a key belongs to"""
+    return jump_hash(key_hash(key), count)
+
+
+@dataclass(frozen=True)
+class Shard:
+    index: int  # 0-based
+    count: int
+
+    def __str__(self):
+        return f"{self.index + 1}/{self.count}"
+
+    def owns(self, key: str) -> bool:
+        return self.count == 1 or shard_index(key, self.count) == self.index
+
+    def filter(self, items, key=lambda item: item.key):
+        """Lazily keep the items (UploadJobs, LocalFiles) whose key this shard owns"""
+        return (item for item in items if self.owns(key(item)))
+
+
+def parse_shard(value: str) -> Shard:
+    """argparse type for I/N, 1 <= I <= N"""
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected I/N (e.g. 2/4), got {value!r}") from None
+    if not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"shard {value!r} out of range: need 1 <= I <= N")
+    return Shard(index - 1, count)
+
+
+class ShardBusy(RuntimeError):
+    pass
+
+
+class ShardLock:
+    """Exclusive flock on <journal>.shard-I-of-N.lock for the lifetime of a worker"""
+
+    def __init__(self, journal_path: str, shard: Shard):
+        self.path = f"{journal_path}.shard-{shard.index + 1}-of-{shard.count}.lock"
+        self._fd = None
+
+    def acquire(self) -> "ShardLock":
+        import fcntl
+        import socket
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            holder = os.read(fd, 200).decode(errors="replace").strip() or "another process"
+            os.close(fd)
+            raise ShardBusy(f"shard is already running ({holder}); lock: {self.path}") from None
+        os.ftruncate(fd, 0)
+        os.write(fd, f"pid {os.getpid()} on {socket.gethostname()}\n".encode())
+        self._fd = fd
+        return self
+
+    def release(self):
+        if self._fd is not None:
+            os.close(self._fd)  # closing drops the flock; the file is left for the next run
+            self._fd = None
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, *exc):
+        self.release()
@@ -0,0 +1,395 @@
+"""
+Packed snapshots of the thumbnail set.
+
+Seeding a dev machine or rebuilding public/screenshots/thumbnails object by
+object means tens of thousands of small GETs. A snapshot packs the whole tree
+into a few tar.gz shards of about SHARD_SIZE bytes each, plus an index:
+
+    snapshots/thumbnails/<id>/shard-00001.tar.gz
+    snapshots/thumbnails/<id>/index.json    every file: shard, offset, size, mtime, crc32
+    snapshots/thumbnails/latest.json        {"id": ...}, written last
+
+Export builds one shard in SNAPSHOT_WORK_DIR (in a thread) while the previous
+one uploads through the Uploader, so shards of MULTIPART_THRESHOLD or more go
+up in parallel parts. Each shard is removed once uploaded, so at most two are
+on disk at a time.
+
+Restore fetches shards in parallel. Each shard is read in RANGE_SIZE ranged
+GETs, PREFETCH of them in flight, and the ranges are fed in order into a
+streaming tar reader that writes the files into place. No copy of a shard
+lands on disk, and memory stays at about concurrency * PREFETCH * RANGE_SIZE.
+Index offsets are positions in the uncompressed tar stream. Every member is
+checked against the index (offset, size, CRC-32), so a truncated or corrupt
+shard fails instead of restoring bad files. Shards whose files are all
+present with the right size are not downloaded, so a re-run after an
+interruption only fetches what is left.
+"""
+import asyncio
+import concurrent.futures
+import io
+import json
+import os
+import tarfile
+import time
+import zlib
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path, PurePosixPath
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .config import CACHE_CONTROL, MIME_TYPES, SNAPSHOT_PREFIX, SNAPSHOT_WORK_DIR, R2Config
+from .jobs import UploadJob
+from .multipart import MULTIPART_THRESHOLD, PART_SIZE
+from .retry import RETRYABLE, backoff_delay, classify_error
+from .s3 import TRANSPORT_ERRORS, S3Client, S3Error
+from .scan import iter_files
+from .uploader import Uploader
+
+SHARD_SIZE = 256 * 1024 * 1024
+RANGE_SIZE = 8 * 1024 * 1024
+PREFETCH = 4
+RESTORE_CONCURRENCY = 4
+# Thumbnails are already webp/avif; gzip at level 1 still squeezes the tar headers and any PNGs
+COMPRESS_LEVEL = 1
+COPY_BUFFER = 256 * 1024
+COLUMNS = ("name", "shard", "offset", "size", "mtime", "crc32")
+SUFFIXES = tuple(MIME_TYPES)
+
+
+class SnapshotError(Exception):
+    """A snapshot that is missing, or a shard that does not match its index"""
+
+
+@dataclass
+class SnapshotStats:
+    files: int = 0
+    bytes: int = 0  # file bytes packed or restored
+    shards: int = 0
+    transferred: int = 0  # shard bytes uploaded or downloaded
+    skipped_files: int = 0  # restore: already present
+    skipped_shards: int = 0
+    failed: List[Tuple[str, str]] = field(default_factory=list)  # (shard key, error)
+    seconds: float = 0.0
+
+
+def snapshot_id(now: float = None) -> str:
+    return time.strftime("%Y%m%dT%H%M%SZ", time.gmtime(now))
+
+
+def shard_name(number: int) -> str:
+    return f"shard-{number:05d}.tar.gz"
+
+
+def plan_shards(root, shard_size: int = SHARD_SIZE) -> List[List[str]]:
+    """Relative names of the files under root in name order, split into shards of about shard_size bytes"""
+    root = os.fspath(root)
+    files = sorted((os.path.relpath(entry.path, root).replace(os.sep, "/"), entry.stat().st_size)
+                   for entry in iter_files(root, SUFFIXES))
+    shards, current, size = [], [], 0
+    for name, file_size in files:
+        if current and size + file_size > shard_size:
+            shards.append(current)
+            current, size = [], 0
+        current.append(name)
+        size += file_size
+    if current:
+        shards.append(current)
+    return shards
+
+
+class _CRCReader:
+    """File wrapper that keeps a CRC-32 of what tarfile reads through it"""
+
+    def __init__(self, f):
+        self.f = f
+        self.crc = 0
+
+    def read(self, size=-1) -> bytes:
+        data = self.f.read(size)
+        self.crc = zlib.crc32(data, self.crc)
+        return data
+
+
+def _padded(size: int) -> int:
+    return -(-size // tarfile.BLOCKSIZE) * tarfile.BLOCKSIZE
+
+
+def write_shard(path: Path, root, names: List[str], shard: int) -> List[list]:
+    """Pack `names` into a tar.gz at path; returns their index entries"""
+    entries = []
+    with tarfile.open(path, "w:gz", compresslevel=COMPRESS_LEVEL) as tar:
+        for name in names:
+            try:
+                f = open(os.path.join(root, name), "rb")
+            except FileNotFoundError:
+                continue  # Removed since the scan (e.g. gc running alongside)
+            with f:
+                st = os.fstat(f.fileno())
+                info = tarfile.TarInfo(name)
+                info.size, info.mtime, info.mode = st.st_size, int(st.st_mtime), 0o644
+                reader = _CRCReader(f)
+                tar.addfile(info, reader)
+            entries.append([name, shard, tar.offset - _padded(info.size), info.size, info.mtime, reader.crc])
+    return entries
+
+
+def export_snapshot(config: R2Config, root, shard_size: int = SHARD_SIZE, prefix: str = SNAPSHOT_PREFIX,
+                    work_dir: str = SNAPSHOT_WORK_DIR, snapshot: str = None,
+                    multipart_threshold: int = MULTIPART_THRESHOLD, part_size: int = PART_SIZE,
+                    on_shard: Callable[[dict, SnapshotStats], None] = None) -> Tuple[dict, SnapshotStats]:
+    """Pack root into shards, upload them and the index, then point latest.json at the snapshot"""
+    started = time.perf_counter()
+    ident = snapshot or snapshot_id()
+    base = f"{prefix}{ident}/"
+    plan = plan_shards(root, shard_size)
+    if not plan:
+        raise SnapshotError(f"no files to snapshot under {root}")
+    work = Path(work_dir) / ident
+    work.mkdir(parents=True, exist_ok=True)
+    uploader = Uploader(config, multipart_threshold=multipart_threshold, part_size=part_size)
+    stats = SnapshotStats()
+    shards, entries = [], []
+
+    async def upload(client: S3Client, path: Path, key: str, files: List[list]):
+        result = await uploader.upload_one(client, UploadJob(path, key, "application/gzip"))
+        if not result.ok:
+            raise SnapshotError(f"{key}: {result.error}")
+        path.unlink()
+        shard = {"key": key, "files": len(files), "bytes": sum(e[3] for e in files), "size": result.size,
+                 "etag": result.etag}
+        shards.append(shard)
+        stats.shards += 1
+        stats.files += shard["files"]
+        stats.bytes += shard["bytes"]
+        stats.transferred += result.size
+        if on_shard:
+            on_shard(shard, stats)
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        async with S3Client(config) as client:
+            uploading = None
+            try:
+                for number, names in enumerate(plan, start=1):
+                    path = work / shard_name(number)
+                    # Pack this shard while the previous one uploads
+                    files = await loop.run_in_executor(None, write_shard, path, root, names, number - 1)
+                    if uploading:
+                        await uploading
+                    entries.extend(files)
+                    uploading = asyncio.ensure_future(upload(client, path, base + shard_name(number), files))
+                await uploading
+            except BaseException:
+                if uploading and not uploading.done():
+                    uploading.cancel()
+                    await asyncio.gather(uploading, return_exceptions=True)
+                raise
+
+            index = {
+                "id": ident,
+                "generatedAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                "source": os.fspath(root),
+                "compression": "gzip",
+                "files": len(entries),
+                "bytes": sum(e[3] for e in entries),
+                "shards": shards,
+                "columns": list(COLUMNS),
+                "entries": entries,
+            }
+            body = json.dumps(index, separators=(",", ":")).encode()
+            await client.put_object(base + "index.json", body, "application/json", {"Cache-Control": CACHE_CONTROL})
+            # The pointer is rewritten by every export, so it must not be cached
+            await client.put_object(prefix + "latest.json", json.dumps({"id": ident}).encode(), "application/json",
+                                    {"Cache-Control": "no-cache"})
+            return index
+
+    try:
+        index = asyncio.run(run())
+    finally:
+        for leftover in work.glob("*"):
+            leftover.unlink()
+        work.rmdir()
+    stats.seconds = time.perf_counter() - started
+    return index, stats
+
+
+def load_index(config: R2Config, snapshot: str = None, prefix: str = SNAPSHOT_PREFIX) -> dict:
+    """The index of `snapshot`, or of the latest one"""
+    async def run():
+        async with S3Client(config, max_connections=2) as client:
+            ident = snapshot
+            if ident is None:
+                ident = json.loads(await client.get_object(prefix + "latest.json"))["id"]
+            return json.loads(await client.get_object(f"{prefix}{ident}/index.json"))
+
+    try:
+        index = asyncio.run(run())
+    except S3Error as e:
+        if e.status == 404:
+            raise SnapshotError(f"no snapshot {snapshot or 'latest'} under {prefix}") from None
+        raise
+    for entry in index["entries"]:
+        parts = PurePosixPath(entry[0]).parts
+        if not parts or PurePosixPath(entry[0]).is_absolute() or ".." in parts:
+            raise SnapshotError(f"unsafe path in the index: {entry[0]!r}")
+    return index
+
+
+class RangeReader(io.RawIOBase):
+    """
+    Sequential file object over one object, for a worker thread. Ranged GETs
+    run on the event loop, `prefetch` ahead of the reader.
+    """
+
+    def __init__(self, client: S3Client, loop, key: str, size: int, range_size: int = RANGE_SIZE,
+                 prefetch: int = PREFETCH, retries: int = 3):
+        super().__init__()
+        self.client, self.loop, self.key = client, loop, key
+        self.ranges = deque((start, min(start + range_size, size) - 1) for start in range(0, size, range_size))
+        self.prefetch = prefetch
+        self.retries = retries
+        self.pending = deque()
+        self.buffer = memoryview(b"")
+        self.transferred = 0
+
+    async def _fetch(self, start: int, end: int) -> bytes:
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                data = await self.client.get_object_range(self.key, start, end)
+                if len(data) != end - start + 1:
+                    raise SnapshotError(f"{self.key}: short range {start}-{end} ({len(data)} bytes)")
+                return data
+            except (S3Error, *TRANSPORT_ERRORS) as e:
+                if classify_error(e) in RETRYABLE and attempt <= self.retries:
+                    await asyncio.sleep(backoff_delay(attempt))
+                    continue
+                raise
+
+    def _fill(self):
+        while self.ranges and len(self.pending) < self.prefetch:
+            start, end = self.ranges.popleft()
+            self.pending.append(asyncio.run_coroutine_threadsafe(self._fetch(start, end), self.loop))
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        if not self.buffer:
+            self._fill()
+            if not self.pending:
+                return 0
+            self.buffer = memoryview(self.pending.popleft().result())
+            self._fill()
+        n = min(len(b), len(self.buffer))
+        b[:n] = self.buffer[:n]
+        self.buffer = self.buffer[n:]
+        self.transferred += n
+        return n
+
+    def close(self):
+        for future in self.pending:
+            future.cancel()
+        self.pending.clear()
+        super().close()
+
+
+def extract_shard(reader, key: str, expected: Dict[str, list], skip: set, dest: Path) -> Tuple[int, int]:
+    """Stream a shard into dest, checking every member against its index entry; returns (files, bytes)"""
+    files = written = 0
+    with tarfile.open(fileobj=reader, mode="r|gz") as tar:
+        for member in tar:
+            entry = expected.pop(member.name, None)
+            if entry is None or not member.isfile() or (member.offset_data, member.size) != (entry[2], entry[3]):
+                raise SnapshotError(f"{key}: {member.name} does not match the index")
+            if member.name in skip:
+                continue
+            target = dest / member.name
+            target.parent.mkdir(parents=True, exist_ok=True)
+            partial = target.with_name(target.name + ".part")
+            source = tar.extractfile(member)
+            crc = 0
+            try:
+                with open(partial, "wb") as out:
+                    while True:
+                        chunk = source.read(COPY_BUFFER)
+                        if not chunk:
+                            break
+                        crc = zlib.crc32(chunk, crc)
+                        out.write(chunk)
+                if crc != entry[5]:
+                    raise SnapshotError(f"{key}: {member.name} is corrupt (CRC-32 mismatch)")
+            except BaseException:
+                partial.unlink(missing_ok=True)
+                raise
+            os.utime(partial, (member.mtime, member.mtime))
+            os.replace(partial, target)
+            files += 1
+            written += member.size
+    if expected:
+        raise SnapshotError(f"{key}: {len(expected)} indexed files missing from the shard")
+    return files, written
+
+
+def _present(dest: Path, entry: list) -> bool:
+    try:
+        return (dest / entry[0]).stat().st_size == entry[3]
+    except OSError:
+        return False
+
+
+def restore_snapshot(config: R2Config, index: dict, dest, concurrency: int = RESTORE_CONCURRENCY,
+                     range_size: int = RANGE_SIZE, prefetch: int = PREFETCH, overwrite: bool = False,
+                     on_shard: Callable[[dict, Optional[str], SnapshotStats], None] = None) -> SnapshotStats:
+    """Fetch and extract the snapshot's shards into dest, `concurrency` shards at a time"""
+    started = time.perf_counter()
+    dest = Path(dest)
+    dest.mkdir(parents=True, exist_ok=True)
+    stats = SnapshotStats()
+    by_shard: Dict[int, Dict[str, list]] = {}
+    for entry in index["entries"]:
+        by_shard.setdefault(entry[1], {})[entry[0]] = entry
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        limit = asyncio.Semaphore(concurrency)
+        pool = concurrent.futures.ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="restore")
+        async with S3Client(config, max_connections=concurrency * prefetch) as client:
+            async def one(number: int, shard: dict):
+                expected = by_shard.get(number, {})
+                skip = set() if overwrite else {name for name, entry in expected.items() if _present(dest, entry)}
+                if len(skip) == len(expected):
+                    stats.skipped_shards += 1
+                    stats.skipped_files += len(skip)
+                    if on_shard:
+                        on_shard(shard, None, stats)
+                    return
+                async with limit:
+                    reader = RangeReader(client, loop, shard["key"], shard["size"], range_size, prefetch)
+                    error = None
+                    try:
+                        files, written = await loop.run_in_executor(pool, extract_shard, reader, shard["key"],
+                                                                    expected, skip, dest)
+                        stats.files += files
+                        stats.bytes += written
+                        stats.skipped_files += len(skip)
+                        stats.shards += 1
+                    except (SnapshotError, S3Error, tarfile.TarError, EOFError, zlib.error, OSError,
+                            *TRANSPORT_ERRORS) as e:
+                        error = str(e) if isinstance(e, (SnapshotError, S3Error)) else f"{type(e).__name__}: {e}"
+                        stats.failed.append((shard["key"], error))
+                    finally:
+                        reader.close()
+                        stats.transferred += reader.transferred
+                if on_shard:
+                    on_shard(shard, error, stats)
+
+            try:
+                await asyncio.gather(*(one(number, shard) for number, shard in enumerate(index["shards"])))
+            finally:
+                pool.shutdown(wait=True)
+
+    asyncio.run(run())
+    stats.seconds = time.perf_counter() - started
+    return stats
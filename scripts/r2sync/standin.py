@@ -0,0 +1,499 @@
+"""
+Local S3-compatible stand-in for R2.
+
+An in-memory, single-bucket-per-name object store speaking enough of the S3
+REST API for the upload tooling, with SigV4 verification against fixed
+credentials. Used by the tests and for dry runs without touching R2.
+
+StandinCDN plays the public CDN in front of the bucket: unsigned GET/HEAD
+of /<key>, a MISS (plus origin latency) the first time a key version is
+requested and a HIT afterwards, reported in cf-cache-status like Cloudflare.
+
+Usage:
+    python3 -m r2sync.standin --port 9000 [--cdn-port 9001]     (from scripts/)
+    R2_ENDPOINT_URL=http://127.0.0.1:9000 R2_ACCESS_KEY_ID=standin \\
+        R2_SECRET_ACCESS_KEY=standin-secret python3 scripts/upload-screenshots.py
+"""
+import argparse
+import asyncio
+import base64
+import bisect
+import hashlib
+import re
+import threading
+import time
+import uuid
+import xml.etree.ElementTree as ET
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from email.utils import formatdate
+from urllib.parse import parse_qsl, unquote, urlsplit
+from xml.sax.saxutils import escape
+
+from .config import R2Config
+from .sigv4 import Signer
+
+ACCESS_KEY_ID = "standin"
+SECRET_ACCESS_KEY = "standin-secret"
+# Request headers kept with an object and returned on GET/HEAD, besides x-amz-meta-*
+STORED_HEADERS = ("cache-control", "content-disposition", "content-encoding", "content-language", "expires")
+
+
+@dataclass
+class StoredObject:
+    data: bytes
+    etag: str
+    content_type: str = "application/octet-stream"
+    metadata: dict = field(default_factory=dict)
+    last_modified: float = field(default_factory=time.time)
+
+
+def _stored_headers(headers: dict) -> dict:
+    return {k: v for k, v in headers.items() if k.startswith("x-amz-meta-") or k in STORED_HEADERS}
+
+
+class Request:
+    __slots__ = ("method", "raw_path", "path", "query", "headers", "body")
+
+    def __init__(self, method, raw_path, query, headers, body):
+        self.method = method
+        self.raw_path = raw_path
+        self.path = unquote(raw_path)
+        self.query = query
+        self.headers = headers
+        self.body = body
+
+
+class StandinS3:
+    """In-memory S3 endpoint served over asyncio"""
+
+    def __init__(self, access_key_id: str = ACCESS_KEY_ID, secret_access_key: str = SECRET_ACCESS_KEY,
+                 latency: float = 0.0, verify_signatures: bool = True, bandwidth: float = 0.0):
+        self.signer = Signer(access_key_id, secret_access_key)
+        self.latency = latency
+        # Bytes/s per connection for request bodies (0 = unlimited), like a single TCP stream over a WAN
+        self.bandwidth = bandwidth
+        self.verify_signatures = verify_signatures
+        self.buckets = {}
+        self._sorted_keys = {}
+        self.multipart = {}  # upload id -> (bucket, key, content type, {part number: bytes}, stored headers)
+        self.requests = Counter()
+        self.copies = 0
+        self.connections = 0
+        self.active = 0
+        # Optional fault injection: fault(request) -> HTTP status to fail with, or None
+        self.fault = None
+        self._server = None
+
+    # ------------------------------------------------------------------
+    # Server lifecycle
+    # ------------------------------------------------------------------
+    async def start(self, host: str = "127.0.0.1", port: int = 0):
+        self._server = await asyncio.start_server(self._handle_connection, host, port, limit=65536)
+        self.host, self.port = self._server.sockets[0].getsockname()[:2]
+        return self
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def config(self, bucket: str = "dobacklinks") -> R2Config:
+        return R2Config(
+            access_key_id=self.signer.access_key_id,
+            secret_access_key=self.signer.secret_access_key,
+            endpoint_url=self.url,
+            bucket=bucket,
+        )
+
+    def objects(self, bucket: str = "dobacklinks") -> dict:
+        """The bucket's objects; callers may edit them, so the listing cache is dropped"""
+        self._sorted_keys.pop(bucket, None)
+        return self.buckets.setdefault(bucket, {})
+
+    # ------------------------------------------------------------------
+    # HTTP plumbing
+    # ------------------------------------------------------------------
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                self.active += 1
+                try:
+                    delay = self._delay(request)
+                    if delay:
+                        await asyncio.sleep(delay)
+                    status, headers, body = self._dispatch(request)
+                finally:
+                    self.active -= 1
+                self._write_response(writer, request.method, status, headers, body)
+                await writer.drain()
+                if request.headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def _delay(self, request: Request) -> float:
+        return self.latency + (len(request.body) / self.bandwidth if self.bandwidth else 0.0)
+
+    async def _read_request(self, reader: asyncio.StreamReader):
+        line = await reader.readline()
+        if not line:
+            return None
+        method, target, _ = line.decode("latin-1").split(" ", 2)
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b";", 1)[0].strip(), 16)
+                if size == 0:
+                    await reader.readline()
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readexactly(2)
+            body = b"".join(chunks)
+        else:
+            body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+        parts = urlsplit(target)
+        query = dict(parse_qsl(parts.query, keep_blank_values=True))
+        return Request(method.upper(), parts.path, query, headers, body)
+
+    def _write_response(self, writer, method: str, status: int, headers: dict, body: bytes):
+        reasons = {200: "OK", 204: "No Content", 206: "Partial Content", 400: "Bad Request", 403: "Forbidden",
+                   404: "Not Found", 405: "Method Not Allowed", 412: "Precondition Failed",
+                   416: "Range Not Satisfiable", 429: "Too Many Requests",
+                   500: "Internal Server Error", 503: "Service Unavailable"}
+        lines = [f"HTTP/1.1 {status} {reasons.get(status, 'Unknown')}"]
+        headers = dict(headers)
+        headers.setdefault("Content-Length", str(len(body)))
+        headers.setdefault("Date", formatdate(usegmt=True))
+        for name, value in headers.items():
+            lines.append(f"{name}: {value}")
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+        if body and method != "HEAD":
+            writer.write(body)
+
+    # ------------------------------------------------------------------
+    # S3 semantics
+    # ------------------------------------------------------------------
+    def _error(self, status: int, code: str, message: str):
+        body = (f'<?xml version="1.0" encoding="UTF-8"?>\n'
+                f"<Error><Code>{code}</Code><Message>{escape(message)}</Message></Error>").encode()
+        return status, {"Content-Type": "application/xml"}, body
+
+    def _check_signature(self, request: Request) -> bool:
+        auth = request.headers.get("authorization", "")
+        if not auth.startswith("AWS4-HMAC-SHA256 "):
+            return False
+        fields = dict(part.strip().split("=", 1) for part in auth[len("AWS4-HMAC-SHA256 "):].split(","))
+        credential = fields.get("Credential", "")
+        if not credential.startswith(self.signer.access_key_id + "/"):
+            return False
+        names = fields.get("SignedHeaders", "").split(";")
+        skip = {"host", "x-amz-date", "x-amz-content-sha256"}
+        headers = {name: request.headers.get(name, "") for name in names if name not in skip}
+        now = datetime.strptime(request.headers.get("x-amz-date", ""), "%Y%m%dT%H%M%SZ").replace(tzinfo=timezone.utc)
+        # Clients that do not send x-amz-content-sha256 (curl --aws-sigv4) sign the body hash
+        content_sha256 = "x-amz-content-sha256" in names
+        payload_hash = (request.headers.get("x-amz-content-sha256", "") if content_sha256
+                        else hashlib.sha256(request.body).hexdigest())
+        expected = self.signer.sign(request.method, request.headers.get("host", ""), request.raw_path,
+                                    request.query, headers, payload_hash, now, content_sha256)
+        return expected["Authorization"] == auth
+
+    def _dispatch(self, request: Request):
+        self.requests[request.method] += 1
+        if self.verify_signatures and not self._check_signature(request):
+            return self._error(403, "SignatureDoesNotMatch", "The request signature we calculated does not match")
+        if self.fault:
+            status = self.fault(request)
+            if status:
+                code = {429: "TooManyRequests", 503: "SlowDown"}.get(status, "InternalError")
+                return self._error(status, code, "Injected fault")
+
+        bucket, _, key = request.path.lstrip("/").partition("/")
+        if not bucket:
+            return self._error(400, "InvalidBucketName", "Bucket name is required")
+        objects = self.buckets.setdefault(bucket, {})
+
+        if not key:
+            if request.method == "GET" and request.query.get("list-type") == "2":
+                return self._list_objects_v2(bucket, objects, request.query)
+            if request.method == "POST" and "delete" in request.query:
+                self._sorted_keys.pop(bucket, None)
+                return self._delete_objects(request, objects)
+            return self._error(405, "MethodNotAllowed", f"{request.method} on bucket is not supported")
+
+        if request.method in ("PUT", "DELETE"):
+            self._sorted_keys.pop(bucket, None)
+
+        if "uploads" in request.query or "uploadId" in request.query:
+            return self._multipart(request, bucket, key, objects)
+
+        if request.method == "PUT" and "x-amz-copy-source" in request.headers:
+            return self._copy(request, key, objects)
+
+        if request.method == "PUT":
+            data = request.body
+            etag = hashlib.md5(data).hexdigest()
+            objects[key] = StoredObject(data, etag, request.headers.get("content-type", "application/octet-stream"),
+                                        _stored_headers(request.headers))
+            return 200, {"ETag": f'"{etag}"'}, b""
+
+        obj = objects.get(key)
+        if request.method in ("GET", "HEAD"):
+            if obj is None:
+                return self._error(404, "NoSuchKey", "The specified key does not exist.")
+            headers = {
+                "ETag": f'"{obj.etag}"',
+                "Content-Type": obj.content_type,
+                "Last-Modified": formatdate(obj.last_modified, usegmt=True),
+                "Content-Length": str(len(obj.data)),
+            }
+            headers.update(obj.metadata)
+            match = re.fullmatch(r"bytes=(\d+)-(\d*)", request.headers.get("range", ""))
+            if match and request.method == "GET":
+                start = int(match[1])
+                end = min(int(match[2]) if match[2] else len(obj.data) - 1, len(obj.data) - 1)
+                if start >= len(obj.data):
+                    return self._error(416, "InvalidRange", "The requested range is not satisfiable")
+                headers["Content-Range"] = f"bytes {start}-{end}/{len(obj.data)}"
+                headers["Content-Length"] = str(end - start + 1)
+                return 206, headers, obj.data[start:end + 1]
+            return 200, headers, obj.data
+        if request.method == "DELETE":
+            objects.pop(key, None)
+            return 204, {}, b""
+
+        return self._error(405, "MethodNotAllowed", f"{request.method} is not supported")
+
+    def _copy(self, request: Request, key: str, objects: dict):
+        """CopyObject, including a copy onto itself with x-amz-metadata-directive: REPLACE"""
+        source_bucket, _, source_key = unquote(request.headers["x-amz-copy-source"]).lstrip("/").partition("/")
+        source = self.buckets.get(source_bucket, {}).get(source_key)
+        if source is None:
+            return self._error(404, "NoSuchKey", "The specified key does not exist.")
+        if_match = request.headers.get("x-amz-copy-source-if-match")
+        if if_match and if_match.strip('"') != source.etag:
+            return self._error(412, "PreconditionFailed",
+                               "At least one of the pre-conditions you specified did not hold")
+        replace = request.headers.get("x-amz-metadata-directive", "COPY").upper() == "REPLACE"
+        if source_key == key and source_bucket == request.path.lstrip("/").partition("/")[0] and not replace:
+            return self._error(400, "InvalidRequest", "This copy request is illegal because it is trying to copy an "
+                                                      "object to itself without changing the object's metadata")
+        etag = hashlib.md5(source.data).hexdigest()
+        if replace:
+            content_type = request.headers.get("content-type", "application/octet-stream")
+            metadata = _stored_headers(request.headers)
+        else:
+            content_type, metadata = source.content_type, dict(source.metadata)
+        objects[key] = StoredObject(source.data, etag, content_type, metadata)
+        self.copies += 1
+        body = (f'<CopyObjectResult><ETag>"{etag}"</ETag>'
+                f"<LastModified>{formatdate(usegmt=True)}</LastModified></CopyObjectResult>").encode()
+        return 200, {"Content-Type": "application/xml"}, body
+
+    def _multipart(self, request: Request, bucket: str, key: str, objects: dict):
+        if request.method == "POST" and "uploads" in request.query:
+            upload_id = uuid.uuid4().hex
+            self.multipart[upload_id] = (bucket, key, request.headers.get("content-type", "application/octet-stream"),
+                                         {}, _stored_headers(request.headers))
+            body = (f"<InitiateMultipartUploadResult><Bucket>{escape(bucket)}</Bucket><Key>{escape(key)}</Key>"
+                    f"<UploadId>{upload_id}</UploadId></InitiateMultipartUploadResult>").encode()
+            return 200, {"Content-Type": "application/xml"}, body
+
+        upload = self.multipart.get(request.query.get("uploadId"))
+        if upload is None or upload[:2] != (bucket, key):
+            return self._error(404, "NoSuchUpload", "The specified multipart upload does not exist.")
+        _, _, content_type, parts, metadata = upload
+
+        if request.method == "PUT":
+            number = int(request.query.get("partNumber", 0))
+            parts[number] = request.body
+            return 200, {"ETag": f'"{hashlib.md5(request.body).hexdigest()}"'}, b""
+
+        if request.method == "DELETE":
+            del self.multipart[request.query["uploadId"]]
+            return 204, {}, b""
+
+        if request.method == "POST":
+            root = ET.fromstring(request.body)
+            numbers = [int(part.findtext("PartNumber")) for part in root.iter("Part")]
+            if not numbers or numbers != sorted(numbers) or any(n not in parts for n in numbers):
+                return self._error(400, "InvalidPart", "One or more of the specified parts could not be found.")
+            data = b"".join(parts[n] for n in numbers)
+            digests = b"".join(hashlib.md5(parts[n]).digest() for n in numbers)
+            etag = f"{hashlib.md5(digests).hexdigest()}-{len(numbers)}"
+            objects[key] = StoredObject(data, etag, content_type, metadata)
+            self._sorted_keys.pop(bucket, None)
+            del self.multipart[request.query["uploadId"]]
+            body = (f"<CompleteMultipartUploadResult><Key>{escape(key)}</Key>"
+                    f"<ETag>&quot;{etag}&quot;</ETag></CompleteMultipartUploadResult>").encode()
+            return 200, {"Content-Type": "application/xml"}, body
+
+        return self._error(405, "MethodNotAllowed", f"{request.method} is not supported")
+
+    def _delete_objects(self, request: Request, objects: dict):
+        md5 = base64.b64encode(hashlib.md5(request.body).digest()).decode()
+        if request.headers.get("content-md5") != md5:
+            return self._error(400, "InvalidDigest", "The Content-MD5 you specified was invalid.")
+        try:
+            root = ET.fromstring(request.body)
+        except ET.ParseError:
+            return self._error(400, "MalformedXML", "The XML you provided was not well-formed.")
+        keys = [element.text or "" for element in root.iter() if element.tag.rsplit("}", 1)[-1] == "Key"]
+        if len(keys) > 1000:
+            return self._error(400, "MalformedXML", "DeleteObjects accepts at most 1000 keys.")
+        for key in keys:
+            objects.pop(key, None)
+        self.requests["DeleteObjects"] += 1
+        return 200, {"Content-Type": "application/xml"}, b"<DeleteResult></DeleteResult>"
+
+    def _list_objects_v2(self, bucket: str, objects: dict, query: dict):
+        keys = self._sorted_keys.get(bucket)
+        if keys is None:
+            keys = self._sorted_keys[bucket] = sorted(objects)
+
+        prefix = query.get("prefix", "")
+        max_keys = min(int(query.get("max-keys", 1000)), 1000)
+        after = query.get("continuation-token") or query.get("start-after") or ""
+        start = max(bisect.bisect_right(keys, after), bisect.bisect_left(keys, prefix))
+
+        page = []
+        index = start
+        while index < len(keys) and len(page) < max_keys:
+            key = keys[index]
+            if not key.startswith(prefix):
+                break
+            page.append(key)
+            index += 1
+        truncated = index < len(keys) and keys[index].startswith(prefix)
+
+        parts = [
+            '<?xml version="1.0" encoding="UTF-8"?>',
+            '<ListBucketResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/">',
+            f"<Name>{escape(bucket)}</Name><Prefix>{escape(prefix)}</Prefix>",
+            f"<KeyCount>{len(page)}</KeyCount><MaxKeys>{max_keys}</MaxKeys>",
+            f"<IsTruncated>{'true' if truncated else 'false'}</IsTruncated>",
+        ]
+        for key in page:
+            obj = objects[key]
+            modified = datetime.fromtimestamp(obj.last_modified, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+            parts.append(
+                f"<Contents><Key>{escape(key)}</Key><LastModified>{modified}</LastModified>"
+                f"<ETag>&quot;{obj.etag}&quot;</ETag><Size>{len(obj.data)}</Size>"
+                f"<StorageClass>STANDARD</StorageClass></Contents>"
+            )
+        if truncated:
+            parts.append(f"<NextContinuationToken>{escape(page[-1])}</NextContinuationToken>")
+        parts.append("</ListBucketResult>")
+        return 200, {"Content-Type": "application/xml"}, "".join(parts).encode("utf-8")
+
+
+class StandinCDN(StandinS3):
+    """Public CDN in front of a StandinS3 bucket, with an edge cache keyed by key and ETag"""
+
+    def __init__(self, origin: StandinS3, bucket: str = "dobacklinks", latency: float = 0.0,
+                 origin_latency: float = 0.0):
+        super().__init__(latency=latency, verify_signatures=False)
+        self.origin = origin
+        self.bucket = bucket
+        self.origin_latency = origin_latency
+        self.cache = set()  # (key, etag) held at the edge
+        self.cache_status = Counter()
+
+    def _delay(self, request: Request) -> float:
+        obj = self.origin.buckets.get(self.bucket, {}).get(request.path.lstrip("/"))
+        missed = obj is not None and (request.path.lstrip("/"), obj.etag) not in self.cache
+        return self.latency + (self.origin_latency if missed else 0.0)
+
+    def _dispatch(self, request: Request):
+        self.requests[request.method] += 1
+        if request.method not in ("GET", "HEAD"):
+            return 405, {}, b""
+        key = request.path.lstrip("/")
+        obj = self.origin.buckets.get(self.bucket, {}).get(key)
+        if obj is None:
+            self.cache_status["MISS"] += 1
+            return 404, {"cf-cache-status": "MISS"}, b""
+        status = "HIT" if (key, obj.etag) in self.cache else "MISS"
+        self.cache.add((key, obj.etag))
+        self.cache_status[status] += 1
+        headers = {
+            "ETag": f'"{obj.etag}"',
+            "Content-Type": obj.content_type,
+            "Content-Length": str(len(obj.data)),
+            "cf-cache-status": status,
+        }
+        return 200, headers, obj.data
+
+
+class StandinThread:
+    """Run a StandinS3 (or `server`, e.g. a StandinCDN) on a background event loop; usable as a context manager"""
+
+    def __init__(self, server: StandinS3 = None, **kwargs):
+        self.server = server or StandinS3(**kwargs)
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+
+    def __enter__(self) -> StandinS3:
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self.server.start(), self._loop).result()
+        return self.server
+
+    def __exit__(self, *exc):
+        asyncio.run_coroutine_threadsafe(self.server.stop(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local S3-compatible stand-in for R2")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds of latency added per request")
+    parser.add_argument("--bandwidth-mb", type=float, default=0.0,
+                        help="Per-connection upload bandwidth in MB/s (default: unlimited)")
+    parser.add_argument("--cdn-port", type=int, default=0, help="Also serve a CDN stand-in on this port")
+    parser.add_argument("--origin-latency", type=float, default=0.05,
+                        help="Seconds the CDN stand-in adds to a cache MISS (default: 0.05)")
+    args = parser.parse_args()
+
+    async def serve():
+        server = await StandinS3(latency=args.latency, bandwidth=args.bandwidth_mb * 1024 * 1024).start(
+            args.host, args.port)
+        print(f"🪣 S3 stand-in listening on {server.url}")
+        print(f"   R2_ACCESS_KEY_ID={ACCESS_KEY_ID} R2_SECRET_ACCESS_KEY={SECRET_ACCESS_KEY}")
+        if args.cdn_port:
+            cdn = await StandinCDN(server, origin_latency=args.origin_latency).start(args.host, args.cdn_port)
+            print(f"🌐 CDN stand-in listening on {cdn.url}")
+            print(f"   R2_PUBLIC_URL={cdn.url}")
+        await asyncio.Event().wait()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
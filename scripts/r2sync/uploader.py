@@ -0,0 +1,178 @@
+"""
+Pooled async uploader.
+
+A producer thread drains the job iterator (usually a streaming directory
+scan, see scan.py) into a bounded queue, and a fixed set of worker coroutines
+PUT jobs from it through a shared S3Client. Uploads start as soon as the first
+file is found, at most `concurrency` requests are in flight, and at most
+`2 * concurrency` jobs are buffered, whatever the size of the tree.
+
+Throttling, 5xx and network errors are retried with exponential backoff and
+full jitter. Files of MULTIPART_THRESHOLD or more go up in parallel parts
+(multipart.py). With an AIMDController (concurrency.py) the number of requests
+in flight adapts to latency and throttling instead of staying fixed. With a
+Journal attached every key's state is recorded so an
+interrupted run can resume (see journal.py). Objects are written with
+Cache-Control: config.CACHE_CONTROL unless told otherwise.
+"""
+import asyncio
+import concurrent.futures
+import os
+import threading
+import time
+from contextlib import nullcontext
+from typing import Callable, Iterable, Optional
+
+from .config import CACHE_CONTROL, R2Config, get_mime_type
+from .jobs import UploadJob, UploadResult, UploadStats
+from .multipart import MULTIPART_THRESHOLD, PART_SIZE, upload_multipart
+from .retry import RETRYABLE, THROTTLED, backoff_delay, classify_error
+from .s3 import S3Client, S3Error, TRANSPORT_ERRORS
+
+
+class Uploader:
+    """Upload jobs concurrently over one pooled S3 client"""
+
+    def __init__(self, config: R2Config, concurrency: int = 32, timeout: float = 30.0,
+                 on_result: Callable[[UploadResult, UploadStats], None] = None,
+                 retries: int = 3, journal=None, controller=None,
+                 multipart_threshold: int = MULTIPART_THRESHOLD, part_size: int = PART_SIZE,
+                 cache_control: Optional[str] = CACHE_CONTROL):
+        self.config = config
+        # With a controller, run enough workers for its upper bound and let it gate them
+        self.concurrency = controller.maximum if controller else concurrency
+        self.controller = controller
+        self.timeout = timeout
+        self.on_result = on_result
+        self.retries = retries
+        self.journal = journal
+        self.multipart_threshold = multipart_threshold
+        self.part_size = part_size
+        self.headers = {"Cache-Control": cache_control} if cache_control else None
+
+    async def upload_large(self, client: S3Client, job: UploadJob, size: int) -> UploadResult:
+        """Multipart path: parts are retried individually, so the file as a whole is tried once"""
+        start = time.monotonic()
+        try:
+            etag = await upload_multipart(client, job.path, job.key, job.content_type or get_mime_type(job.path),
+                                          part_size=self.part_size, retries=self.retries,
+                                          controller=self.controller, extra_headers=self.headers)
+            return UploadResult(job, True, size, time.monotonic() - start, etag)
+        except (S3Error, *TRANSPORT_ERRORS) as e:
+            error = str(e) if isinstance(e, S3Error) else f"{type(e).__name__}: {e}"
+            return UploadResult(job, False, latency=time.monotonic() - start, error=error,
+                                error_class=classify_error(e))
+
+    async def upload_one(self, client: S3Client, job: UploadJob) -> UploadResult:
+        try:
+            size = os.path.getsize(job.path)
+        except OSError as e:
+            return UploadResult(job, False, error=f"{type(e).__name__}: {e}", error_class=classify_error(e))
+        if size and size >= self.multipart_threshold:
+            return await self.upload_large(client, job, size)
+        try:
+            # Off the event loop, so a slow disk doesn't stall every other upload in flight
+            data = await asyncio.get_running_loop().run_in_executor(None, job.path.read_bytes)
+        except OSError as e:
+            return UploadResult(job, False, error=f"{type(e).__name__}: {e}", error_class=classify_error(e))
+
+        attempt = 0
+        while True:
+            attempt += 1
+            latency = 0.0
+            try:
+                async with self.controller.slot() if self.controller else nullcontext():
+                    start = time.monotonic()
+                    try:
+                        etag = await client.put_object(job.key, data, job.content_type or get_mime_type(job.path),
+                                                       self.headers)
+                    finally:
+                        latency = time.monotonic() - start
+                if self.controller:
+                    self.controller.on_success(latency, len(data))
+                return UploadResult(job, True, len(data), latency, etag, attempts=attempt)
+            except (S3Error, *TRANSPORT_ERRORS) as e:
+                error_class = classify_error(e)
+                if self.controller and error_class == THROTTLED:
+                    self.controller.on_throttle()
+                if error_class in RETRYABLE and attempt <= self.retries:
+                    await asyncio.sleep(backoff_delay(attempt))
+                    continue
+                error = str(e) if isinstance(e, S3Error) else f"{type(e).__name__}: {e}"
+                return UploadResult(job, False, latency=latency, error=error,
+                                    error_class=error_class, attempts=attempt)
+
+    async def run(self, jobs: Iterable[UploadJob]) -> UploadStats:
+        stats = UploadStats()
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        stop = threading.Event()
+
+        def put(item) -> bool:
+            future = asyncio.run_coroutine_threadsafe(queue.put(item), loop)
+            while True:
+                try:
+                    future.result(timeout=0.5)
+                    return True
+                except concurrent.futures.TimeoutError:
+                    if stop.is_set():
+                        future.cancel()
+                        return False
+
+        def produce():
+            # Runs in a thread so a slow directory walk never stalls the event loop
+            try:
+                for job in jobs:
+                    if stop.is_set() or not put(job):
+                        return
+            finally:
+                for _ in range(self.concurrency):
+                    if not put(None):
+                        break
+
+        async with S3Client(self.config, max_connections=self.concurrency, timeout=self.timeout) as client:
+            async def worker():
+                while (job := await queue.get()) is not None:
+                    if self.journal:
+                        self.journal.start(job)
+                    result = await self.upload_one(client, job)
+                    if self.journal:
+                        self.journal.finish(result)
+                    stats.record(result)
+                    if self.on_result:
+                        self.on_result(result, stats)
+
+            producer = loop.run_in_executor(None, produce)
+            try:
+                await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+            finally:
+                stop.set()
+                await producer
+                if self.journal:
+                    self.journal.flush()
+
+        stats.finished = time.monotonic()
+        return stats
+
+
+def progress_printer(total: Optional[int] = None, every: int = 50) -> Callable[[UploadResult, UploadStats], None]:
+    """on_result callback that prints the scripts' usual progress line (total is unknown while streaming)"""
+    def report(result: UploadResult, stats: UploadStats):
+        if stats.completed % every == 0:
+            mb = stats.bytes / (1024 * 1024)
+            done = f"{stats.completed}/{total}" if total is not None else f"{stats.completed}"
+            print(f"  Progress: {done} (✓{stats.uploaded} ✗{stats.failed}) "
+                  f"| {mb:.1f} MB | {stats.rate:.1f}/s")
+    return report
+
+
+def upload_files(jobs: Iterable[UploadJob], config: R2Config, concurrency: int = 32,
+                 on_result: Callable[[UploadResult, UploadStats], None] = None,
+                 retries: int = 3, journal=None, controller=None,
+                 multipart_threshold: int = MULTIPART_THRESHOLD, part_size: int = PART_SIZE,
+                 cache_control: Optional[str] = CACHE_CONTROL) -> UploadStats:
+    """Synchronous entry point for the scripts"""
+    uploader = Uploader(config, concurrency, on_result=on_result, retries=retries, journal=journal,
+                        controller=controller, multipart_threshold=multipart_threshold, part_size=part_size,
+                        cache_control=cache_control)
+    return asyncio.run(uploader.run(jobs))
@@ -0,0 +1,308 @@
+"""
+Responsive thumbnail variants: several widths in webp and AVIF, for srcset.
+
+ScreenshotStorage writes one 400x300 webp per site, so a 2-column mobile grid
+downloads twice the pixels it shows. This stage renders each thumbnail at a
+few smaller widths, in webp and (when Pillow can encode it) AVIF, in a
+process pool. The crop is the same as the thumbnail pipeline's (4:3, cover-fit
+from the top), so every variant of a source has the same framing. Widths
+above the source's own width are never produced.
+
+    screenshots/variants/{domain}-{ts}-thumb-{width}w.{format}
+
+Variants are rendered under .r2sync/variants/<key> and uploaded through the
+same journaled uploader as the thumbnails. A state file records, per source,
+the size and mtime it was rendered from and the quality of each variant. A
+variant is re-rendered only if it is missing, its source changed, or its
+quality setting changed. Adding a width renders just that width.
+
+The frontend manifest (public/screenshots/thumbnail-variants.json) maps each
+domain's newest capture to its variants and ready-made srcset strings per
+format. Variants that failed to upload are left out.
+
+Needs Pillow with webp support; AVIF needs Pillow 11.3+ or pillow-avif-plugin.
+"""
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from .config import CDN_URL, R2_PREFIX
+from .jobs import UploadJob
+from .scan import iter_files, key_for, parse_thumbnail_name
+
+VARIANT_PREFIX = "screenshots/variants/"
+VARIANTS_DIR = ".r2sync/variants"
+STATE_PATH = ".r2sync/variants/state.json"
+WIDTHS = (160, 240, 320, 400)
+FORMATS = ("avif", "webp")  # srcset order: the browser takes the first <source> it supports
+QUALITY = {"webp": 70, "avif": 50}  # AVIF reaches webp q70 quality at a lower setting
+ASPECT = (4, 3)  # ScreenshotStorage's 400x300
+
+
+def variant_key(thumbnail_key: str, width: int, fmt: str, prefix: str = VARIANT_PREFIX) -> str:
+    stem = thumbnail_key.rsplit("/", 1)[-1].rsplit(".", 1)[0]
+    return f"{prefix}{stem}-{width}w.{fmt}"
+
+
+def variant_height(width: int) -> int:
+    return round(width * ASPECT[1] / ASPECT[0])
+
+
+def _register_avif():
+    try:
+        import pillow_avif  # noqa: F401 (registers the AVIF codec on Pillow < 11.3)
+    except ImportError:
+        pass
+
+
+def available_formats(formats: Iterable[str] = FORMATS) -> List[str]:
+    """The formats this Pillow can encode"""
+    try:
+        from PIL import Image
+    except ImportError:
+        return []
+    _register_avif()
+    Image.init()
+    encoders = set(Image.SAVE)
+    return [fmt for fmt in formats if fmt.upper() in encoders]
+
+
+# ----------------------------------------------------------------------
+# Rendering (runs in the worker processes)
+# ----------------------------------------------------------------------
+def render_variants(src: str, outputs: List[Tuple[str, int, str]], quality: Dict[str, int]) -> dict:
+    """
+    Decode src once and write each (format, width, path) variant.
+    Returns {"width": source width, "variants": [(format, width, bytes)], "error": ""}.
+    Widths wider than the source are skipped.
+    """
+    from io import BytesIO
+
+    from PIL import Image, ImageOps
+
+    _register_avif()
+    try:
+        with Image.open(src) as image:
+            image.load()
+            source_width = image.width
+            image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+    except (OSError, ValueError) as e:
+        return {"width": 0, "variants": [], "error": f"{type(e).__name__}: {e}"}
+
+    written = []
+    resized = {}
+    for fmt, width, dst in outputs:
+        if width > source_width:
+            continue
+        if width not in resized:
+            # sharp resize(width, height, {fit: "cover", position: "top"}), as in recompress.py
+            resized[width] = ImageOps.fit(image, (width, variant_height(width)), Image.LANCZOS, centering=(0.5, 0.0))
+        buffer = BytesIO()
+        resized[width].save(buffer, fmt.upper(), quality=quality[fmt])
+        Path(dst).parent.mkdir(parents=True, exist_ok=True)
+        tmp = f"{dst}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(buffer.getbuffer())
+        os.replace(tmp, dst)
+        written.append((fmt, width, buffer.tell()))
+    return {"width": source_width, "variants": written, "error": ""}
+
+
+# ----------------------------------------------------------------------
+# Planning
+# ----------------------------------------------------------------------
+@dataclass
+class Source:
+    path: Path
+    key: str  # the thumbnail's own key
+    domain: str
+    timestamp: int
+    size: int
+    mtime_ns: int
+
+
+def scan_sources(root, prefix: str = R2_PREFIX) -> List[Source]:
+    root = os.fspath(root)
+    sources = []
+    for entry in iter_files(root):
+        parsed = parse_thumbnail_name(entry.name)
+        domain, timestamp = parsed or (Path(entry.name).stem, 0)
+        st = entry.stat()
+        sources.append(Source(Path(entry.path), key_for(root, entry.path, prefix), domain, timestamp,
+                              st.st_size, st.st_mtime_ns))
+    return sources
+
+
+class VariantState:
+    """Per-source record of what was rendered: {path: {size, mtimeNs, width, variants: {fmt/width: {...}}}}"""
+
+    def __init__(self, path: str = STATE_PATH):
+        self.path = Path(path)
+        try:
+            self.sources = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            self.sources = {}
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.sources, separators=(",", ":")))
+        os.replace(tmp, self.path)
+
+    def entry(self, source: Source) -> dict:
+        """The source's record, reset if the file changed since it was rendered"""
+        entry = self.sources.get(str(source.path))
+        if not entry or entry["size"] != source.size or entry["mtimeNs"] != source.mtime_ns:
+            entry = {"size": source.size, "mtimeNs": source.mtime_ns, "width": 0, "variants": {}}
+            self.sources[str(source.path)] = entry
+        return entry
+
+
+@dataclass
+class VariantPlan:
+    # source -> [(format, width, local path)] still to render
+    render: List[Tuple[Source, List[Tuple[str, int, str]]]] = field(default_factory=list)
+    fresh: int = 0
+    sources: int = 0
+
+    @property
+    def variants_to_render(self) -> int:
+        return sum(len(outputs) for _, outputs in self.render)
+
+
+def plan_variants(sources: List[Source], state: VariantState, widths=WIDTHS, formats=FORMATS,
+                  quality: Dict[str, int] = QUALITY, out_dir: str = VARIANTS_DIR) -> VariantPlan:
+    plan = VariantPlan(sources=len(sources))
+    for source in sources:
+        entry = state.entry(source)
+        outputs = []
+        for fmt in formats:
+            for width in widths:
+                if entry["width"] and width > entry["width"]:
+                    continue  # known to be wider than the source
+                key = variant_key(source.key, width, fmt)
+                dst = os.path.join(out_dir, key)
+                done = entry["variants"].get(f"{fmt}/{width}")
+                if done and done["quality"] == quality[fmt] and os.path.exists(dst):
+                    plan.fresh += 1
+                else:
+                    outputs.append((fmt, width, dst))
+        if outputs:
+            plan.render.append((source, outputs))
+    return plan
+
+
+def _variant_jobs(source: Source, entry: dict, out_dir: str) -> List[UploadJob]:
+    jobs = []
+    for name in entry["variants"]:
+        fmt, width = name.split("/")
+        key = variant_key(source.key, int(width), fmt)
+        jobs.append(UploadJob(Path(out_dir, key), key))
+    return jobs
+
+
+@dataclass
+class VariantStats:
+    rendered: int = 0
+    reused: int = 0
+    failed_sources: List[Tuple[str, str]] = field(default_factory=list)
+    bytes: Dict[str, int] = field(default_factory=dict)  # per format, of every variant
+
+    def summary(self) -> str:
+        sizes = ", ".join(f"{fmt} {n / 1024 / 1024:.1f} MB" for fmt, n in sorted(self.bytes.items()))
+        return (f"{self.rendered} variants rendered, {self.reused} up to date, "
+                f"{len(self.failed_sources)} undecodable sources ({sizes})")
+
+
+def generate_variants(sources: List[Source], state: VariantState, stats: VariantStats, widths=WIDTHS,
+                      formats=FORMATS, quality: Dict[str, int] = QUALITY, out_dir: str = VARIANTS_DIR,
+                      workers: Optional[int] = None) -> Iterator[UploadJob]:
+    """
+    Yield an UploadJob for every variant of every source, rendering missing or stale ones in a process pool.
+    Up-to-date variants are yielded first, the rest as their source finishes rendering; the caller's
+    journal skips those already uploaded.
+    """
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+    plan = plan_variants(sources, state, widths, formats, quality, out_dir)
+    stats.reused += plan.fresh
+    pending_sources = {id(source) for source, _ in plan.render}
+    for source in sources:
+        if id(source) not in pending_sources:
+            yield from _variant_jobs(source, state.entry(source), out_dir)
+
+    workers = workers or os.cpu_count() or 1
+    pool = ProcessPoolExecutor(workers)
+    pending = {}
+
+    def finished() -> Iterator[UploadJob]:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            source = pending.pop(future)
+            result = future.result()
+            entry = state.entry(source)
+            if result["error"]:
+                stats.failed_sources.append((str(source.path), result["error"]))
+                continue
+            entry["width"] = result["width"]
+            for fmt, width, size in result["variants"]:
+                entry["variants"][f"{fmt}/{width}"] = {"quality": quality[fmt], "bytes": size}
+                stats.rendered += 1
+            yield from _variant_jobs(source, entry, out_dir)
+
+    try:
+        for source, outputs in plan.render:
+            pending[pool.submit(render_variants, str(source.path), outputs, quality)] = source
+            if len(pending) >= workers * 4:
+                yield from finished()
+        while pending:
+            yield from finished()
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+        for entry in state.sources.values():
+            for name, variant in entry["variants"].items():
+                fmt = name.split("/")[0]
+                stats.bytes[fmt] = stats.bytes.get(fmt, 0) + variant["bytes"]
+        state.save()
+
+
+# ----------------------------------------------------------------------
+# Frontend manifest
+# ----------------------------------------------------------------------
+def build_variant_manifest(sources: Iterable[Source], state: VariantState, public_url: str = CDN_URL,
+                           failed: Set[str] = frozenset()) -> dict:
+    """domain -> variants of its newest capture, with a srcset string per format"""
+    base = public_url.rstrip("/")
+    domains = {}
+    for source in sorted(sources, key=lambda s: (s.domain, s.timestamp)):
+        entry = state.sources.get(str(source.path))
+        if not entry or not entry["variants"]:
+            continue
+        formats: Dict[str, list] = {}
+        for name, variant in entry["variants"].items():
+            fmt, width = name.split("/")
+            key = variant_key(source.key, int(width), fmt)
+            if key in failed:
+                continue
+            formats.setdefault(fmt, []).append({"width": int(width), "height": variant_height(int(width)),
+                                                "key": key, "size": variant["bytes"]})
+        if not formats:
+            continue
+        for variants in formats.values():
+            variants.sort(key=lambda v: v["width"])
+        domains[source.domain] = {
+            "thumbnail": source.key,
+            "capturedAt": source.timestamp,
+            "formats": {fmt: {"srcset": ", ".join(f"{base}/{v['key']} {v['width']}w" for v in variants),
+                              "variants": variants}
+                        for fmt, variants in sorted(formats.items(), key=lambda item: FORMATS.index(item[0]))},
+        }
+    return {
+        "generatedAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "prefix": VARIANT_PREFIX,
+        "baseUrl": base,
+        "domains": dict(sorted(domains.items())),
+    }
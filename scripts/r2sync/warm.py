@@ -0,0 +1,147 @@
+"""
+CDN edge warm-up for freshly uploaded thumbnails.
+
+Thumbnails are served from the public bucket URL (https://cdn.dobacklinks.com,
+see lib/services/screenshot-storage.ts). The first visitor to a new
+/sites/[slug] page otherwise pays the edge's origin fetch for every image. After
+a sync or upload, `--warm` requests exactly the keys that run uploaded from
+the CDN, so the edge fills its cache before a visitor arrives.
+
+Requests go out over a keep-alive pool to the CDN origin. A fixed number of
+workers pulls keys from the list, so at most `concurrency` requests are in
+flight. A 100k-key warm-up neither opens 100k sockets nor creates 100k tasks.
+Each response's cache status (cf-cache-status, or X-Cache behind other CDNs)
+and latency are recorded. The report breaks the results down by cache status
+and gives latency percentiles. A second --confirm pass shows how many keys
+the edge now answers as HIT.
+"""
+import asyncio
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, List, Optional
+from urllib.parse import quote, urlsplit
+
+from toolkit.httpclient import ConnectionPool, HTTPError
+from toolkit.stats import percentile
+
+WARM_CONCURRENCY = 64
+CACHE_HEADERS = ("cf-cache-status", "x-cache", "x-cache-status")
+
+
+def cache_status(headers: dict) -> str:
+    """HIT, MISS, EXPIRED, DYNAMIC, ... from the CDN's cache header; "NONE" if absent"""
+    for name in CACHE_HEADERS:
+        value = headers.get(name)
+        if value:
+            # X-Cache looks like "Hit from cloudfront" or "HIT, MISS" (edge, shield)
+            return value.split(",")[0].split()[0].upper()
+    return "NONE"
+
+
+@dataclass
+class WarmResult:
+    key: str
+    status: int = 0  # HTTP status, 0 on a transport error
+    cache: str = ""
+    latency: float = 0.0
+    bytes: int = 0
+    error: str = ""
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status < 300
+
+
+@dataclass
+class WarmReport:
+    results: List[WarmResult] = field(default_factory=list)
+    seconds: float = 0.0
+
+    def summary(self) -> dict:
+        latencies = [r.latency for r in self.results if r.status]
+        ok = sum(r.ok for r in self.results)
+        return {
+            "requests": len(self.results),
+            "ok": ok,
+            "failed": len(self.results) - ok,
+            "cache": dict(Counter(r.cache for r in self.results if r.ok).most_common()),
+            "statuses": dict(Counter(r.status for r in self.results).most_common()),
+            "bytes": sum(r.bytes for r in self.results),
+            "seconds": round(self.seconds, 3),
+            "rate": round(len(self.results) / self.seconds, 1) if self.seconds else 0.0,
+            "latency_ms": {
+                "p50": round(percentile(latencies, 50) * 1000, 1),
+                "p95": round(percentile(latencies, 95) * 1000, 1),
+                "p99": round(percentile(latencies, 99) * 1000, 1),
+                "max": round(max(latencies, default=0.0) * 1000, 1),
+            },
+        }
+
+    def failures(self) -> List[WarmResult]:
+        return [r for r in self.results if not r.ok]
+
+
+async def warm(base_url: str, keys: Iterable[str], concurrency: int = WARM_CONCURRENCY, method: str = "GET",
+               timeout: float = 15.0, retries: int = 1,
+               on_result: Optional[Callable[[WarmResult], None]] = None) -> WarmReport:
+    """Request every key from the CDN with at most `concurrency` requests in flight"""
+    base_path = urlsplit(base_url).path.rstrip("/")
+    pool = ConnectionPool(base_url, max_size=concurrency, timeout=timeout)
+    keys = iter(keys)
+    report = WarmReport()
+    headers = {"Accept": "image/avif,image/webp,image/*", "User-Agent": "r2sync-warm/1"}
+
+    async def fetch(key: str) -> WarmResult:
+        target = f"{base_path}/{quote(key)}"
+        attempt = 0
+        while True:
+            attempt += 1
+            start = time.perf_counter()
+            try:
+                response = await pool.request(method, target, headers)
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, HTTPError) as e:
+                if attempt <= retries:
+                    continue
+                return WarmResult(key, latency=time.perf_counter() - start, error=f"{type(e).__name__}: {e}")
+            latency = time.perf_counter() - start
+            if response.status >= 500 and attempt <= retries:
+                continue
+            return WarmResult(key, response.status, cache_status(response.headers), latency,
+                              len(response.body) or int(response.headers.get("content-length", 0) or 0))
+
+    async def worker():
+        for key in keys:  # shared iterator: each key goes to exactly one worker
+            result = await fetch(key)
+            report.results.append(result)
+            if on_result:
+                on_result(result)
+
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    finally:
+        await pool.close()
+    report.seconds = time.perf_counter() - start
+    return report
+
+
+def warm_keys(base_url: str, keys: Iterable[str], **kwargs) -> WarmReport:
+    """Synchronous entry point for the CLI"""
+    return asyncio.run(warm(base_url, keys, **kwargs))
+
+
+def print_warm_report(report: WarmReport, label: str = "Warm-up"):
+    summary = report.summary()
+    latency = summary["latency_ms"]
+    print(f"🔥 {label}: {summary['ok']}/{summary['requests']} ok in {summary['seconds']:.1f}s "
+          f"({summary['rate']:.0f} req/s)")
+    if summary["cache"]:
+        print("   Cache: " + ", ".join(f"{status} {n}" for status, n in summary["cache"].items()))
+    print(f"   Latency: p50 {latency['p50']:.0f}ms, p95 {latency['p95']:.0f}ms, "
+          f"p99 {latency['p99']:.0f}ms, max {latency['max']:.0f}ms")
+    failures = report.failures()
+    for result in failures[:10]:
+        print(f"  - {result.key}: {result.error or f'HTTP {result.status}'}")
+    if len(failures) > 10:
+        print(f"  ... and {len(failures) - 10} more")
@@ -0,0 +1,399 @@
+"""
+Watch mode: upload thumbnails seconds after capture writes them.
+
+Instead of rescanning public/screenshots/thumbnails on every run, the
+daemon subscribes to inotify events on the tree (one watch per directory,
+added as directories appear). It never reads the whole tree again while
+running.
+
+    event ──> Debouncer ──(quiet for `settle` s)──> batch ──(full, or `batch_wait` s)──> Uploader
+
+A file counts as written once it has had no events for `settle` seconds,
+so the half-written file of an in-progress capture is never uploaded. If a
+writer pauses longer than that, the upload is only early: the next write
+changes the file's mtime, and the file is journaled and uploaded again.
+Ready files go to the pooled Uploader in micro-batches. The uploader takes
+one long-lived job stream, so every batch reuses the same keep-alive
+connections.
+
+Restarts reconcile from the journal and a watermark in STATE_PATH. The
+watermark is the time up to which every change is known to be journaled.
+It only moves forward while the daemon is idle: nothing settling, batched
+or in flight. On start the daemon first re-drives the journal's failed and
+interrupted keys. Then it uploads the files modified since the watermark,
+checked with one stat per directory entry and no hashing. Watches are in
+place before this catch-up starts, so nothing written during it is missed.
+Without a watermark (the first start) the catch-up is a journaled upload
+of the whole tree. An inotify queue overflow triggers the same catch-up.
+
+inotify is Linux-only. Elsewhere (e.g. macOS) PollingWatcher diffs
+directory listings every `interval` seconds instead: a stat per file, but
+still no hashing and no journal lookups for unchanged files.
+"""
+import ctypes
+import ctypes.util
+import errno
+import json
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from .config import R2_PREFIX
+from .jobs import UploadJob, UploadResult, UploadStats
+from .scan import SUFFIXES, iter_files, key_for
+
+STATE_PATH = ".r2sync/watch.json"
+SETTLE = 1.0
+BATCH_SIZE = 64
+BATCH_WAIT = 0.5
+# mtimes are compared against wall-clock time; allow for coarse timestamps and clock steps
+WATERMARK_SLACK_NS = 2_000_000_000
+SAVE_EVERY = 5.0
+
+CHANGED = "changed"
+REMOVED = "removed"
+OVERFLOW = "overflow"
+
+# <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = (IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+              | IN_DELETE_SELF)
+EVENT = struct.Struct("iIII")
+
+
+class InotifyWatcher:
+    """Recursive inotify watch on a directory tree; read() returns (kind, path) events"""
+
+    def __init__(self, root):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), os.strerror(ctypes.get_errno()))
+        self.dirs: Dict[int, str] = {}
+        self.root = os.fspath(root)
+        self.watch_tree(self.root)
+
+    def watch_tree(self, top: str) -> List[str]:
+        """Watch `top` and every directory below it; returns the directories added"""
+        added, stack = [], [top]
+        while stack:
+            directory = stack.pop()
+            wd = self._add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+            if wd < 0:
+                if ctypes.get_errno() in (errno.ENOENT, errno.ENOTDIR):
+                    continue  # Removed before we got to it
+                raise OSError(ctypes.get_errno(), f"inotify_add_watch {directory}: "
+                                                  f"{os.strerror(ctypes.get_errno())}")
+            self.dirs[wd] = directory
+            added.append(directory)
+            try:
+                with os.scandir(directory) as entries:
+                    stack.extend(e.path for e in entries if e.is_dir(follow_symlinks=False))
+            except FileNotFoundError:
+                continue
+        return added
+
+    def read(self, timeout: float) -> List[Tuple[str, str]]:
+        if not select.select([self.fd], [], [], max(timeout, 0))[0]:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events, offset = [], 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT.unpack_from(data, offset)
+            name = data[offset + EVENT.size:offset + EVENT.size + length].rstrip(b"\0")
+            offset += EVENT.size + length
+            if mask & IN_Q_OVERFLOW:
+                events.append((OVERFLOW, self.root))
+                continue
+            directory = self.dirs.get(wd)
+            if mask & IN_IGNORED:
+                self.dirs.pop(wd, None)
+                continue
+            if directory is None or not name:
+                continue
+            path = os.path.join(directory, os.fsdecode(name))
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    # Files written before the watch landed are only visible in a listing
+                    self.watch_tree(path)
+                    events.extend((CHANGED, entry.path) for entry in iter_files(path))
+            elif mask & (IN_DELETE | IN_MOVED_FROM):
+                events.append((REMOVED, path))
+            else:
+                events.append((CHANGED, path))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Fallback for platforms without inotify: diff the tree's (size, mtime) every `interval` seconds"""
+
+    def __init__(self, root, interval: float = 2.0, suffixes: Tuple[str, ...] = SUFFIXES):
+        self.root, self.interval, self.suffixes = os.fspath(root), interval, suffixes
+        self.seen = self._snapshot()
+        self._next = time.monotonic() + interval
+
+    def _snapshot(self) -> dict:
+        snapshot = {}
+        for entry in iter_files(self.root, self.suffixes):
+            try:
+                st = entry.stat()
+            except FileNotFoundError:
+                continue
+            snapshot[entry.path] = (st.st_size, st.st_mtime_ns)
+        return snapshot
+
+    def read(self, timeout: float) -> List[Tuple[str, str]]:
+        wait = self._next - time.monotonic()
+        if wait > timeout:
+            time.sleep(max(timeout, 0))
+            return []
+        time.sleep(max(wait, 0))
+        self._next = time.monotonic() + self.interval
+        current = self._snapshot()
+        events = [(CHANGED, path) for path, stat in current.items() if self.seen.get(path) != stat]
+        events.extend((REMOVED, path) for path in self.seen.keys() - current.keys())
+        self.seen = current
+        return events
+
+    def close(self):
+        pass
+
+
+def open_watcher(root, poll_interval: Optional[float] = None):
+    """inotify on Linux, else (or with poll_interval) a PollingWatcher"""
+    if poll_interval is None and sys.platform.startswith("linux"):
+        return InotifyWatcher(root)
+    return PollingWatcher(root, poll_interval or 2.0)
+
+
+class Debouncer:
+    """Paths that have been quiet for `settle` seconds since their last event"""
+
+    def __init__(self, settle: float = SETTLE, clock: Callable[[], float] = time.monotonic):
+        self.settle = settle
+        self.clock = clock
+        self.last: Dict[str, float] = {}
+
+    def touch(self, path: str):
+        self.last[path] = self.clock()
+
+    def discard(self, path: str):
+        self.last.pop(path, None)
+
+    def ready(self) -> List[str]:
+        now = self.clock()
+        done = [path for path, seen in self.last.items() if now - seen >= self.settle]
+        for path in done:
+            del self.last[path]
+        return sorted(done)
+
+    def next_due(self) -> Optional[float]:
+        """Seconds until the next path settles, None if nothing is pending"""
+        if not self.last:
+            return None
+        return max(0.0, min(self.last.values()) + self.settle - self.clock())
+
+    def __len__(self) -> int:
+        return len(self.last)
+
+
+def load_watermark(path: str) -> Optional[int]:
+    try:
+        return json.loads(Path(path).read_text())["watermarkNs"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def save_watermark(path: str, watermark_ns: int):
+    target = Path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(target.name + ".tmp")
+    tmp.write_text(json.dumps({
+        "watermarkNs": watermark_ns,
+        "watermark": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(watermark_ns / 1e9)),
+    }) + "\n")
+    os.replace(tmp, target)
+
+
+def changed_since(root, watermark_ns: Optional[int], prefix: str = R2_PREFIX,
+                  suffixes: Tuple[str, ...] = SUFFIXES) -> Iterator[UploadJob]:
+    """Jobs for files modified at or after the watermark (all files without one)"""
+    root = os.fspath(root)
+    for entry in iter_files(root, suffixes):
+        if watermark_ns is not None:
+            try:
+                if entry.stat().st_mtime_ns < watermark_ns - WATERMARK_SLACK_NS:
+                    continue
+            except FileNotFoundError:
+                continue
+        yield UploadJob(Path(entry.path), key_for(root, entry.path, prefix))
+
+
+class WatchDaemon:
+    """Turns filesystem events into a never-ending, journal-filtered job stream for Uploader.run()"""
+
+    def __init__(self, root, journal, watcher=None, state_path: str = STATE_PATH, settle: float = SETTLE,
+                 batch_size: int = BATCH_SIZE, batch_wait: float = BATCH_WAIT, prefix: str = R2_PREFIX,
+                 keep: Optional[Callable] = None, on_batch: Optional[Callable[[str, int], None]] = None,
+                 suffixes: Tuple[str, ...] = SUFFIXES):
+        self.root = os.fspath(root)
+        self.journal = journal
+        self.watcher = watcher
+        self.state_path = state_path
+        self.debouncer = Debouncer(settle)
+        self.batch_size, self.batch_wait = batch_size, batch_wait
+        self.prefix, self.suffixes = prefix, suffixes
+        self.keep = keep
+        self.on_batch = on_batch
+        self.stopping = threading.Event()
+        # yielded is written by the uploader's producer thread, completed by its event loop
+        self.yielded = 0
+        self.completed = 0
+        self.batches = 0
+        self.watermark = load_watermark(state_path)
+        self._saved_at = 0.0
+        self._quiet_ns: Optional[int] = None
+
+    def stop(self):
+        self.stopping.set()
+
+    @property
+    def idle(self) -> bool:
+        return not len(self.debouncer) and self.completed >= self.yielded
+
+    def on_result(self, result: UploadResult, stats: UploadStats):
+        """Uploader callback: count completions and commit the journal whenever a batch is through"""
+        # Commit before counting, so idle never covers an upload the journal has not recorded
+        if self.completed + 1 >= self.yielded:
+            self.journal.flush()
+        self.completed += 1
+
+    def _emit(self, kind: str, jobs) -> Iterator[UploadJob]:
+        if self.keep:
+            jobs = self.keep(jobs)
+        count = 0
+        for job in self.journal.skip_done(jobs):
+            count += 1
+            self.yielded += 1
+            yield job
+        if count:
+            self.batches += 1
+            if self.on_batch:
+                self.on_batch(kind, count)
+
+    def catch_up(self) -> Iterator[UploadJob]:
+        """The journal's failed and interrupted keys, then files changed since the watermark"""
+        retried = set()
+        for job in self._emit("retry", self.journal.failed_jobs()):
+            retried.add(job.key)
+            yield job
+        # Still in flight, so the journal would not skip them yet
+        changed = changed_since(self.root, self.watermark, self.prefix, self.suffixes)
+        yield from self._emit("catch-up", (job for job in changed if job.key not in retried))
+
+    def once(self) -> Iterator[UploadJob]:
+        """Only the catch-up (e.g. from cron); afterwards the watermark moves to when it started"""
+        started_ns = time.time_ns()
+        yield from self.catch_up()
+        self._quiet_ns = started_ns
+
+    def _job(self, path: str) -> Optional[UploadJob]:
+        if not path.endswith(self.suffixes) or not os.path.isfile(path):
+            return None
+        return UploadJob(Path(path), key_for(self.root, path, self.prefix))
+
+    def _advance_watermark(self, observed_ns: int, force: bool = False):
+        now = time.monotonic()
+        if force or now - self._saved_at >= SAVE_EVERY:
+            self.watermark = observed_ns
+            save_watermark(self.state_path, observed_ns)
+            self._saved_at = now
+
+    def jobs(self) -> Iterator[UploadJob]:
+        """Catch-up, then live micro-batches until stop()"""
+        yield from self.catch_up()
+        batch: List[str] = []
+        batch_started = 0.0
+        while not self.stopping.is_set():
+            due = self.debouncer.next_due()
+            timeout = 0.5 if due is None else min(due, 0.5)
+            if batch:
+                timeout = min(timeout, max(0.0, batch_started + self.batch_wait - time.monotonic()))
+            observed_ns = time.time_ns()
+            for kind, path in self.watcher.read(timeout):
+                if kind == OVERFLOW:
+                    # Events were dropped: anything since the last watermark may be missing
+                    yield from self._emit("catch-up", changed_since(self.root, self.watermark, self.prefix,
+                                                                    self.suffixes))
+                elif kind == REMOVED:
+                    self.debouncer.discard(path)
+                elif path.endswith(self.suffixes):
+                    self.debouncer.touch(path)
+            ready = self.debouncer.ready()
+            if ready and not batch:
+                batch_started = time.monotonic()
+            batch.extend(ready)
+            if batch and (len(batch) >= self.batch_size or time.monotonic() - batch_started >= self.batch_wait
+                          or self.stopping.is_set()):
+                paths, batch = list(dict.fromkeys(batch)), []
+                yield from self._emit("batch", filter(None, map(self._job, paths)))
+            elif not batch and not len(self.debouncer):
+                # Every event up to this read is batched; once the uploads are through, it is journaled
+                self._quiet_ns = observed_ns
+                if self.idle:
+                    self._advance_watermark(observed_ns)
+
+    def finish(self):
+        """After the uploader drained: keep the last quiet point if everything before it was journaled"""
+        if self._quiet_ns is not None and self.completed >= self.yielded:
+            self._advance_watermark(self._quiet_ns, force=True)
+
+    def close(self):
+        if self.watcher:
+            self.watcher.close()
+
+
+def run_watch(daemon: WatchDaemon, config, concurrency: Optional[int] = None, controller=None,
+              on_result: Optional[Callable[[UploadResult, UploadStats], None]] = None,
+              once: bool = False) -> UploadStats:
+    """Feed the daemon's job stream to one long-lived pooled Uploader until daemon.stop() (or the catch-up ends)"""
+    import asyncio
+
+    from .uploader import Uploader
+
+    def report(result, stats):
+        daemon.on_result(result, stats)
+        if on_result:
+            on_result(result, stats)
+
+    uploader = Uploader(config, concurrency or 32, on_result=report, journal=daemon.journal, controller=controller)
+    try:
+        stats = asyncio.run(uploader.run(daemon.once() if once else daemon.jobs()))
+        daemon.finish()
+        return stats
+    finally:
+        daemon.close()
@@ -0,0 +1,11 @@
+"""
+Streaming pre-processor for the scraper dump that lib/import/import-sites.ts imports.
+
+The dump is read incrementally, scored with the rules of
+lib/import/quality-scorer.ts (in NumPy column batches where available),
+and written as ranked batch files that lib/import/import-scored-sites.ts
+ingests one at a time.
+
+Usage (from the repository root):
+    python3 scripts/preprocess-sites.py [SOURCE] [--out DIR]
+"""
@@ -0,0 +1,18 @@
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+# Make `siteimport` importable the same way the scripts do (scripts/ on sys.path)
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+
+@pytest.fixture
+def utc(monkeypatch):
+    """Run under TZ=UTC, as the golden cases were generated"""
+    monkeypatch.setenv("TZ", "UTC")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
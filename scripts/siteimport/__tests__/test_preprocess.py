@@ -0,0 +1,84 @@
+import gzip
+import io
+import json
+
+import pytest
+
+from siteimport.jsonstream import JSONStreamError, iter_items
+from siteimport.preprocess import main, preprocess
+from siteimport.scoring import quality_score
+
+
+def _site(i, **data):
+    return {"domain": f"site-{i}.com", "siteId": str(i), "success": True, "data": data, "error": None,
+            "timestamp": "2024-01-01T00:00:00Z"}
+
+
+def _dump(n=60):
+    sites = []
+    for i in range(n):
+        data = {"spamScore": f"{i % 40}%", "googleNews": "Yes" if i % 3 == 0 else "No",
+                "maxLinks": str(i % 4), "ahrefsDR": str(i * 2), "sampleUrls": ["u"] * (i % 2)}
+        sites.append(_site(i, **data))
+    sites.append({**_site(900, spamScore="0%"), "success": False})
+    sites.append({**_site(901), "data": None})
+    return sites
+
+
+def test_items_stream_across_chunk_edges():
+    values = [{"a": "x" * 50, "b": [1, 2.5, None]}, 12345678, "str, with ] brackets", True, [], {}]
+    text = " [ " + " ,\n".join(json.dumps(v) for v in values) + " ] \n"
+    for chunk in (1, 2, 7, 64, 1 << 20):
+        assert list(iter_items(io.StringIO(text), chunk)) == values
+    jsonl = "\n".join(json.dumps(v) for v in values) + "\n"
+    assert list(iter_items(io.StringIO(jsonl), 3)) == values
+    assert list(iter_items(io.StringIO("  [ ]  "), 1)) == []
+
+    for broken in ('[{"a": 1}, {"a": ', '[1 2]', '[1] 2'):
+        with pytest.raises(JSONStreamError, match="at character"):
+            list(iter_items(io.StringIO(broken), 4))
+
+
+def test_batches_are_ranked_like_score_all_sites(tmp_path, utc):
+    sites = _dump()
+    source = tmp_path / "dump.json"
+    source.write_text(json.dumps(sites))
+
+    manifest = preprocess(str(source), str(tmp_path / "out"), batch_size=25, column_batch=7,
+                          live_threshold=50, top_live_count=10, vectorized=False)
+
+    records = [r for b in manifest["batches"] for r in json.loads((tmp_path / "out" / b["file"]).read_text())]
+    successful = [s for s in sites if s["success"] and s["data"]]
+    # Array.prototype.sort is stable: descending score, dump order within a score
+    expected = sorted(successful, key=lambda s: -quality_score(s)[0])
+    assert [r["site"] for r in records] == expected
+    assert [r["rank"] for r in records] == list(range(1, 61))
+    assert all(r["quality"] == dict(zip(("score", "tier"), quality_score(r["site"]))) for r in records)
+    live = [r["rank"] for r in records if r["status"] == "live"]
+    assert live == [r["rank"] for r in records[:10] if r["quality"]["score"] >= 50]
+
+    assert [b["sites"] for b in manifest["batches"]] == [25, 25, 10]
+    assert manifest["batches"][1]["firstRank"] == 26
+    assert (manifest["loaded"], manifest["sites"], manifest["live"]) == (62, 60, len(live))
+    assert sum(manifest["tiers"].values()) == 60
+    assert json.loads((tmp_path / "out" / "manifest.json").read_text()) == manifest
+    assert not (tmp_path / "out" / ".spill").exists()
+
+
+def test_cli_reads_gzipped_json_lines(tmp_path, capsys):
+    source = tmp_path / "dump.jsonl.gz"
+    with gzip.open(source, "wt", encoding="utf-8") as f:
+        f.writelines(json.dumps(site) + "\n" for site in _dump(30))
+    out = tmp_path / "scored"
+
+    assert main([str(source), "--out", str(out), "--batch-size", "8", "--scorer", "python"]) == 0
+    assert "Total sites: 30" in capsys.readouterr().out
+    assert sorted(p.name for p in out.iterdir()) == [*(f"batch-{i:05d}.json" for i in range(1, 5)), "manifest.json"]
+
+
+def test_cli_reports_bad_input(tmp_path, capsys):
+    source = tmp_path / "dump.json"
+    source.write_text('[{"success": true, "data": {}}, oops]')
+    assert main([str(source), "--out", str(tmp_path / "out"), "--scorer", "python"]) == 1
+    assert "invalid JSON" in capsys.readouterr().out
+    assert main([str(tmp_path / "missing.json")]) == 1
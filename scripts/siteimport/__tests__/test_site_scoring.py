@@ -0,0 +1,60 @@
+import json
+import subprocess
+import time
+from pathlib import Path
+
+import pytest
+
+from siteimport.jscompat import full_year, parse_int
+from siteimport.scoring import quality_score, score_sites
+
+# Generated by running lib/import/quality-scorer.ts under node with TZ=UTC
+CASES = json.loads((Path(__file__).parent / "quality_parity_cases.json").read_text())
+ROOT = Path(__file__).resolve().parents[3]
+
+
+def test_reference_scorer_matches_the_typescript(utc):
+    got = [quality_score({"data": case["data"]}) for case in CASES]
+    assert got == [(case["score"], case["tier"]) for case in CASES]
+
+
+def test_js_semantics_the_rules_depend_on(utc):
+    assert [parse_int(s) for s in (" 12%", "0x1A", "5.9", "-3", "1e3")] == [12, 26, 5, -3, 1]
+    assert parse_int("abc") != parse_int("abc")  # NaN
+    assert full_year("2021-03-15") == 2021 and full_year("2021.03.15") == 2021
+    assert full_year("Jan 15") == 2001  # V8 fills in the year
+    assert full_year("15.03.2020") != full_year("15.03.2020")
+
+
+def test_column_batches_score_like_the_reference(utc):
+    pytest.importorskip("numpy")
+    sites = [{"data": case["data"]} for case in CASES] + [{"data": None}, {}, {"data": {"maxLinks": [2]}}]
+    # Trailing NULs are part of the JS string; one huge value must not widen the whole column
+    sites += [{"data": {"googleNews": "yes", "spamScore": "\x00"}}, {"data": {"spamScore": "5\x00"}},
+              {"data": {"googleNews": "yes\x00", "ahrefsDR": "80\x00\x00"}},
+              {"data": {"approvedDate": "2020-01-01" + " " * 100_000, "spamScore": "4" + "0" * 100_000}}]
+
+    scores, tiers = score_sites(sites, vectorized=True)
+
+    assert list(zip(scores, tiers)) == [quality_score(site) for site in sites]
+
+
+TSX = ROOT / "node_modules/.bin/tsx"
+
+
+@pytest.mark.skipif(not TSX.exists(), reason="needs node_modules (pnpm install)")
+@pytest.mark.parametrize("tz", ["UTC", "America/New_York", "Asia/Tokyo"])
+def test_live_parity_with_quality_scorer_ts(tz, tmp_path, monkeypatch):
+    cases = tmp_path / "cases.json"
+    cases.write_text(json.dumps([case["data"] for case in CASES]))
+    script = ("import fs from 'fs'; import { calculateQualityScore } from './lib/import/quality-scorer';"
+              f"const cases = JSON.parse(fs.readFileSync({json.dumps(str(cases))}, 'utf-8'));"
+              "console.log(JSON.stringify(cases.map((data) => calculateQualityScore({ data }).score)));")
+    monkeypatch.setenv("TZ", tz)
+    time.tzset()
+    try:
+        out = subprocess.run([str(TSX), "-e", script], cwd=ROOT, capture_output=True, text=True, check=True)
+        assert json.loads(out.stdout) == [quality_score({"data": case["data"]})[0] for case in CASES]
+    finally:
+        monkeypatch.undo()
+        time.tzset()
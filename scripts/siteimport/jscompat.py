@@ -0,0 +1,568 @@
+"""
+The JavaScript semantics lib/import/quality-scorer.ts depends on.
+
+The scorer's results turn on details of the JS built-ins, so they are
+reproduced here rather than approximated:
+
+- parseInt(): leading JS whitespace, an optional sign, a "0x" prefix,
+  then the longest run of digits. NaN if there are none ("%5" is NaN, and
+  "5%" is 5).
+- String(value) for values that are not strings (a number in maxLinks)
+  and JS truthiness for the `value || "default"` fallbacks.
+- new Date(string).getFullYear(): V8's date parser. This covers the ES5
+  ISO form, where a date-only string is UTC and a date-time is local. It
+  also covers the legacy form, where "Jan 15" is in 2001, "15.03.2020" is
+  invalid and "2021.03.15" is not. The year is taken in the process's
+  local time zone, as Node does, so run with the importer's TZ.
+
+The date parser follows V8's src/date/dateparser (tokenizer, ES5 pass,
+legacy pass, day/time/zone composers) step for step.
+"""
+import math
+import re
+import time
+
+NAN = float("nan")
+
+# ECMAScript WhiteSpace and LineTerminator code points
+JS_WHITESPACE = frozenset("\t\n\v\f\r \u00a0\u1680\u2000\u2001\u2002\u2003\u2004\u2005\u2006\u2007\u2008"
+                          "\u2009\u200a\u2028\u2029\u202f\u205f\u3000\ufeff")
+
+
+def truthy(value) -> bool:
+    """JS ToBoolean for a JSON value (an empty list or object is truthy)"""
+    if value is None or value is False:
+        return False
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value != 0 and not math.isnan(value)
+    if isinstance(value, str):
+        return value != ""
+    return True
+
+
+def number_to_string(value: float) -> str:
+    """JS Number::toString for the values a JSON dump can hold"""
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "Infinity" if value > 0 else "-Infinity"
+    if value == int(value) and abs(value) < 1e21:
+        return str(int(value))
+    text = repr(float(value))
+    if "e" in text:
+        mantissa, exponent = text.split("e")
+        sign = "-" if exponent.startswith("-") else "+"
+        text = f"{mantissa.removesuffix('.0')}e{sign}{int(exponent.lstrip('+-'))}"
+    return text
+
+
+def to_string(value) -> str:
+    """JS ToString for a JSON value"""
+    if isinstance(value, str):
+        return value
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return number_to_string(float(value))
+    if isinstance(value, list):
+        return ",".join("" if item is None else to_string(item) for item in value)
+    return "[object Object]"
+
+
+_HEX = re.compile(r"[0-9a-fA-F]+")
+_DEC = re.compile(r"[0-9]+")
+
+
+def parse_int(value) -> float:
+    """parseInt(value) with no radix; NaN as float("nan")"""
+    s = to_string(value)
+    i, n = 0, len(s)
+    while i < n and s[i] in JS_WHITESPACE:
+        i += 1
+    sign = 1
+    if i < n and s[i] in "+-":
+        sign = -1 if s[i] == "-" else 1
+        i += 1
+    pattern, base = _DEC, 10
+    if s[i:i + 2] in ("0x", "0X"):
+        pattern, base = _HEX, 16
+        i += 2
+    match = pattern.match(s, i)
+    if not match:
+        return NAN
+    digits = match.group().lstrip("0")
+    if len(digits) > 400:  # Past any double in either base, and past int()'s digit limit
+        return sign * float("inf")
+    try:
+        return float(sign * int(digits or "0", base))
+    except OverflowError:
+        return sign * float("inf")
+
+
+# ----------------------------------------------------------------------
+# new Date(string): V8's DateParser
+# ----------------------------------------------------------------------
+NONE = None
+MAX_SIGNIFICANT_DIGITS = 9
+MS_PER_DAY = 86400000
+MAX_TIME_MS = 864 * 10 ** 13
+MAX_TIME_BEFORE_UTC_MS = MAX_TIME_MS + 30 * MS_PER_DAY
+
+# Token kinds
+END, NUMBER, SYMBOL, WHITESPACE, KEYWORD, UNKNOWN, INVALID = range(7)
+# Keyword types
+MONTH_NAME, AM_PM, TIME_ZONE_NAME, TIME_SEPARATOR, INVALID_WORD = range(5)
+
+KEYWORDS = [
+    ("jan", MONTH_NAME, 1), ("feb", MONTH_NAME, 2), ("mar", MONTH_NAME, 3), ("apr", MONTH_NAME, 4),
+    ("may", MONTH_NAME, 5), ("jun", MONTH_NAME, 6), ("jul", MONTH_NAME, 7), ("aug", MONTH_NAME, 8),
+    ("sep", MONTH_NAME, 9), ("oct", MONTH_NAME, 10), ("nov", MONTH_NAME, 11), ("dec", MONTH_NAME, 12),
+    ("am", AM_PM, 0), ("pm", AM_PM, 12),
+    ("ut", TIME_ZONE_NAME, 0), ("utc", TIME_ZONE_NAME, 0), ("z", TIME_ZONE_NAME, 0), ("gmt", TIME_ZONE_NAME, 0),
+    ("cdt", TIME_ZONE_NAME, -5), ("cst", TIME_ZONE_NAME, -6), ("edt", TIME_ZONE_NAME, -4),
+    ("est", TIME_ZONE_NAME, -5), ("mdt", TIME_ZONE_NAME, -6), ("mst", TIME_ZONE_NAME, -7),
+    ("pdt", TIME_ZONE_NAME, -7), ("pst", TIME_ZONE_NAME, -8),
+    ("t", TIME_SEPARATOR, 0),
+]
+
+
+def _between(x, lo, hi) -> bool:
+    return x is not None and lo <= x <= hi
+
+
+def _is_month(x):
+    return _between(x, 1, 12)
+
+
+def _is_day(x):
+    return _between(x, 1, 31)
+
+
+def _is_hour(x):
+    return _between(x, 0, 23)
+
+
+def _is_minute(x):
+    return _between(x, 0, 59)
+
+
+class _Token:
+    __slots__ = ("kind", "value", "length", "keyword_type")
+
+    def __init__(self, kind, value=0, length=0, keyword_type=None):
+        self.kind, self.value, self.length, self.keyword_type = kind, value, length, keyword_type
+
+    def is_number(self):
+        return self.kind == NUMBER
+
+    def is_fixed_length_number(self, length):
+        return self.kind == NUMBER and self.length == length
+
+    def is_symbol(self, c):
+        return self.kind == SYMBOL and self.value == c
+
+    def is_ascii_sign(self):
+        return self.kind == SYMBOL and self.value in "+-"
+
+    def ascii_sign(self):
+        return 1 if self.value == "+" else -1
+
+    def is_keyword_type(self, kind):
+        return self.kind == KEYWORD and self.keyword_type == kind
+
+    def is_keyword_z(self):
+        return self.kind == KEYWORD and self.keyword_type == TIME_ZONE_NAME and self.length == 1 and self.value == 0
+
+
+def _lookup(prefix: str, length: int):
+    for word, kind, value in KEYWORDS:
+        if prefix == word and (length <= 3 or kind == MONTH_NAME):
+            return kind, value
+    return INVALID_WORD, 0
+
+
+class _Tokenizer:
+    def __init__(self, s: str):
+        self.s, self.i = s, 0
+        self.next_token = self._scan()
+
+    def _ch(self):
+        return self.s[self.i] if self.i < len(self.s) else ""
+
+    def _scan(self) -> _Token:
+        s, start = self.s, self.i
+        if self.i >= len(s):
+            return _Token(END)
+        c = s[self.i]
+        if "0" <= c <= "9":
+            while self._ch() == "0":
+                self.i += 1
+            n = digits = 0
+            while "0" <= self._ch() <= "9":
+                if digits < MAX_SIGNIFICANT_DIGITS:
+                    n = n * 10 + ord(self._ch()) - 48
+                digits += 1
+                self.i += 1
+            return _Token(NUMBER, n, self.i - start)
+        if c in ":-+.)":
+            self.i += 1
+            return _Token(SYMBOL, c)
+        if c >= "A" and c not in JS_WHITESPACE:
+            prefix = []
+            while self._ch() >= "A" and self._ch() not in JS_WHITESPACE:
+                if len(prefix) < 3:
+                    prefix.append(chr(ord(self._ch()) | 0x20))
+                self.i += 1
+            length = self.i - start
+            kind, value = _lookup("".join(prefix), length)
+            return _Token(KEYWORD, value, length, kind)
+        if c in JS_WHITESPACE:
+            self.i += 1
+            return _Token(WHITESPACE, length=1)
+        if c == "(":
+            balance = 0
+            while True:
+                c = self._ch()
+                if c == ")":
+                    balance -= 1
+                elif c == "(":
+                    balance += 1
+                self.i += 1
+                if not (balance > 0 and self.i < len(s)):
+                    break
+            return _Token(UNKNOWN)
+        self.i += 1
+        return _Token(UNKNOWN)
+
+    def next(self) -> _Token:
+        token, self.next_token = self.next_token, self._scan()
+        return token
+
+    def peek(self) -> _Token:
+        return self.next_token
+
+    def skip_symbol(self, c) -> bool:
+        if self.next_token.is_symbol(c):
+            self.next()
+            return True
+        return False
+
+
+class _Day:
+    def __init__(self):
+        self.comp, self.named_month, self.iso = [], NONE, False
+
+    def add(self, n) -> bool:
+        if len(self.comp) == 3:
+            return False
+        self.comp.append(n)
+        return True
+
+    def write(self):
+        if not self.comp:
+            return None
+        comp = self.comp + [1] * (3 - len(self.comp))
+        year = 0  # (=> 2000) for KJS compatibility
+        if self.named_month is NONE:
+            if self.iso or not _is_day(comp[0]):
+                year, month, day = comp
+            else:
+                month, day, year = comp
+        else:
+            month = self.named_month
+            if not _is_day(comp[0]):
+                year, day = comp[0], comp[1]
+            else:
+                day, year = comp[0], comp[1]
+        if not self.iso:
+            if _between(year, 0, 49):
+                year += 2000
+            elif _between(year, 50, 99):
+                year += 1900
+        if not _is_month(month) or not _is_day(day):
+            return None
+        return year, month - 1, day
+
+
+class _Time:
+    def __init__(self):
+        self.comp, self.hour_offset = [], NONE
+
+    def is_empty(self):
+        return not self.comp
+
+    def is_expecting(self, n):
+        index = len(self.comp)
+        return ((index == 1 and _is_minute(n)) or (index == 2 and _between(n, 0, 59))
+                or (index == 3 and _between(n, 0, 999)))
+
+    def add(self, n) -> bool:
+        if len(self.comp) == 4:
+            return False
+        self.comp.append(n)
+        return True
+
+    def add_final(self, n) -> bool:
+        if not self.add(n):
+            return False
+        self.comp += [0] * (4 - len(self.comp))
+        return True
+
+    def write(self):
+        hour, minute, second, ms = self.comp + [0] * (4 - len(self.comp))
+        if self.hour_offset is not NONE:
+            if not _between(hour, 0, 12):
+                return None
+            hour = hour % 12 + self.hour_offset
+        if not (_is_hour(hour) and _is_minute(minute) and _between(second, 0, 59) and _between(ms, 0, 999)):
+            if hour != 24 or minute != 0 or second != 0 or ms != 0:
+                return None
+        return hour, minute, second, ms
+
+
+class _Zone:
+    def __init__(self):
+        self.sign = self.hour = self.minute = NONE
+
+    def set(self, offset_hours):
+        self.sign = -1 if offset_hours < 0 else 1
+        self.hour, self.minute = offset_hours * self.sign, 0
+
+    def is_expecting(self, n):
+        return self.hour is not NONE and self.minute is NONE and _is_minute(n)
+
+    def is_utc(self):
+        return self.hour == 0 and self.minute == 0
+
+    def is_empty(self):
+        return self.hour is NONE
+
+    def write(self):
+        """UTC offset in seconds, or None for local time"""
+        if self.sign is NONE:
+            return None
+        total = (self.hour or 0) * 3600 + (self.minute or 0) * 60
+        return -total if self.sign < 0 else total
+
+
+def _read_milliseconds(token: _Token) -> int:
+    number, length = token.value, token.length
+    if length == 1:
+        number *= 100
+    elif length == 2:
+        number *= 10
+    elif length > 3:
+        number //= 10 ** (min(length, MAX_SIGNIFICANT_DIGITS) - 3)
+    return number
+
+
+_INVALID = _Token(INVALID)
+
+
+def _parse_es5(scanner: _Tokenizer, day: _Day, tm: _Time, tz: _Zone) -> _Token:
+    """ES5 ISO date-time; returns the first token it could not handle (END if it parsed everything)"""
+    if scanner.peek().is_ascii_sign():
+        sign_token = scanner.next()
+        if not scanner.peek().is_fixed_length_number(6):
+            return sign_token
+        sign = sign_token.ascii_sign()
+        year = scanner.next().value
+        if sign < 0 and year == 0:
+            return sign_token
+        day.add(sign * year)
+    elif scanner.peek().is_fixed_length_number(4):
+        day.add(scanner.next().value)
+    else:
+        return scanner.next()
+    if scanner.skip_symbol("-"):
+        if not scanner.peek().is_fixed_length_number(2) or not _is_month(scanner.peek().value):
+            return scanner.next()
+        day.add(scanner.next().value)
+        if scanner.skip_symbol("-"):
+            if not scanner.peek().is_fixed_length_number(2) or not _is_day(scanner.peek().value):
+                return scanner.next()
+            day.add(scanner.next().value)
+    if not scanner.peek().is_keyword_type(TIME_SEPARATOR):
+        if scanner.peek().kind != END:
+            return scanner.next()
+    else:
+        scanner.next()
+        if not scanner.peek().is_fixed_length_number(2) or not _between(scanner.peek().value, 0, 24):
+            return _INVALID
+        hour_is_24 = scanner.peek().value == 24
+        tm.add(scanner.next().value)
+        if not scanner.skip_symbol(":"):
+            return _INVALID
+        if (not scanner.peek().is_fixed_length_number(2) or not _is_minute(scanner.peek().value)
+                or (hour_is_24 and scanner.peek().value > 0)):
+            return _INVALID
+        tm.add(scanner.next().value)
+        if scanner.skip_symbol(":"):
+            if (not scanner.peek().is_fixed_length_number(2) or not _between(scanner.peek().value, 0, 59)
+                    or (hour_is_24 and scanner.peek().value > 0)):
+                return _INVALID
+            tm.add(scanner.next().value)
+            if scanner.skip_symbol("."):
+                if not scanner.peek().is_number() or (hour_is_24 and scanner.peek().value > 0):
+                    return _INVALID
+                tm.add(_read_milliseconds(scanner.next()))
+        if scanner.peek().is_keyword_z():
+            scanner.next()
+            tz.set(0)
+        elif scanner.peek().is_symbol("+") or scanner.peek().is_symbol("-"):
+            tz.sign = 1 if scanner.next().value == "+" else -1
+            if scanner.peek().is_fixed_length_number(4):
+                hourmin = scanner.next().value
+                hour, minute = divmod(hourmin, 100)
+                if not _is_hour(hour) or not _is_minute(minute):
+                    return _INVALID
+                tz.hour, tz.minute = hour, minute
+            else:
+                if not scanner.peek().is_fixed_length_number(2) or not _is_hour(scanner.peek().value):
+                    return _INVALID
+                tz.hour = scanner.next().value
+                if not scanner.skip_symbol(":"):
+                    return _INVALID
+                if not scanner.peek().is_fixed_length_number(2) or not _is_minute(scanner.peek().value):
+                    return _INVALID
+                tz.minute = scanner.next().value
+        if scanner.peek().kind != END:
+            return _INVALID
+    # Date-only forms are UTC, date-time forms without an offset are local
+    if tz.is_empty() and tm.is_empty():
+        tz.set(0)
+    day.iso = True
+    return _Token(END)
+
+
+def _parse(s: str):
+    """(year, month0, day, hour, minute, second, ms, utc offset seconds or None), or None if invalid"""
+    scanner = _Tokenizer(s)
+    day, tm, tz = _Day(), _Time(), _Zone()
+    token = _parse_es5(scanner, day, tm, tz)
+    if token.kind == INVALID:
+        return None
+    has_read_number = bool(day.comp)
+    while token.kind != END:
+        if token.is_number():
+            has_read_number = True
+            n = token.value
+            if scanner.skip_symbol(":"):
+                if scanner.skip_symbol(":"):
+                    if not tm.is_empty():
+                        return None
+                    tm.add(n)
+                    tm.add(0)
+                else:
+                    if not tm.add(n):
+                        return None
+                    if scanner.peek().is_symbol("."):
+                        scanner.next()
+            elif scanner.skip_symbol(".") and tm.is_expecting(n):
+                tm.add(n)
+                if not scanner.peek().is_number():
+                    return None
+                ms = _read_milliseconds(scanner.next())
+                if ms < 0:
+                    return None
+                tm.add_final(ms)
+            elif tz.is_expecting(n):
+                tz.minute = n
+            elif tm.is_expecting(n):
+                tm.add_final(n)
+                peek = scanner.peek()
+                if not (peek.kind in (END, WHITESPACE) or peek.is_keyword_z() or peek.is_ascii_sign()):
+                    return None
+            else:
+                if not day.add(n):
+                    return None
+                scanner.skip_symbol("-")
+        elif token.kind == KEYWORD:
+            if token.keyword_type == AM_PM and not tm.is_empty():
+                tm.hour_offset = token.value
+            elif token.keyword_type == MONTH_NAME:
+                day.named_month = token.value
+                scanner.skip_symbol("-")
+            elif token.keyword_type == TIME_ZONE_NAME and has_read_number:
+                tz.set(token.value)
+            else:
+                # Garbage words are illegal once a number has been read, and must be separated from one
+                if has_read_number or scanner.peek().is_number():
+                    return None
+        elif token.is_ascii_sign() and (tz.is_utc() or not tm.is_empty()):
+            tz.sign = token.ascii_sign()
+            n = length = 0
+            if scanner.peek().is_number():
+                number = scanner.next()
+                n, length = number.value, number.length
+            has_read_number = True
+            if scanner.peek().is_symbol(":"):
+                tz.hour, tz.minute = n, NONE
+            elif length in (1, 2):
+                tz.hour, tz.minute = n, 0
+            elif length in (3, 4):
+                tz.hour, tz.minute = n // 100, n % 100
+            else:
+                return None
+        elif (token.is_ascii_sign() or token.is_symbol(")")) and has_read_number:
+            return None
+        token = scanner.next()
+
+    ymd, hms = day.write(), tm.write()
+    if ymd is None or hms is None:
+        return None
+    return (*ymd, *hms, tz.write())
+
+
+def _days_from_civil(year: int, month0: int, day: int) -> int:
+    """MakeDay: days since 1970-01-01, months outside 0..11 rolling into the year"""
+    year += month0 // 12
+    month = month0 % 12 + 1
+    y = year - (month <= 2)
+    era = y // 400
+    yoe = y - era * 400
+    doy = (153 * (month + (-3 if month > 2 else 9)) + 2) // 5 + day - 1
+    doe = yoe * 365 + yoe // 4 - yoe // 100 + doy
+    return era * 146097 + doe - 719468
+
+
+def _civil_year(days: int) -> int:
+    z = days + 719468
+    era = z // 146097
+    doe = z - era * 146097
+    yoe = (doe - doe // 1460 + doe // 36524 - doe // 146096) // 365
+    doy = doe - (365 * yoe + yoe // 4 - yoe // 100)
+    mp = (5 * doy + 2) // 153
+    return yoe + era * 400 + (mp >= 10)
+
+
+def _local_year(ms: float) -> float:
+    """getFullYear() of a time value, in the local time zone"""
+    try:
+        return float(time.localtime(math.floor(ms / 1000)).tm_year)
+    except (OverflowError, OSError, ValueError):
+        return float(_civil_year(math.floor(ms / MS_PER_DAY)))
+
+
+def full_year(value) -> float:
+    """new Date(value).getFullYear(), NaN for an invalid date"""
+    if isinstance(value, (int, float)):  # a time value (true is 1)
+        ms = float(value)
+    else:
+        parsed = _parse(to_string(value))
+        if parsed is None:
+            return NAN
+        year, month0, day, hour, minute, second, ms_part, offset = parsed
+        days = _days_from_civil(year, month0, day)
+        ms = float(days * MS_PER_DAY + ((hour * 60 + minute) * 60 + second) * 1000 + ms_part)
+        if offset is None:
+            if abs(ms) > MAX_TIME_BEFORE_UTC_MS:
+                return NAN
+            # Local wall-clock time: its year is the (normalised) civil year, barring DST at midnight Jan 1
+            return float(_civil_year(math.floor(ms / MS_PER_DAY))) if abs(ms) <= MAX_TIME_MS else NAN
+        ms -= offset * 1000
+    if math.isnan(ms) or abs(ms) > MAX_TIME_MS:
+        return NAN
+    return _local_year(ms)
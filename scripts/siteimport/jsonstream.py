@@ -0,0 +1,94 @@
+"""
+Incremental JSON reading for scraper dumps larger than memory.
+
+iter_items() yields the elements of a top-level JSON array one at a time.
+It also accepts JSON Lines or concatenated values, and .gz files. It reads
+fixed-size chunks and decodes each element with the C-accelerated
+json.JSONDecoder.raw_decode, so memory stays at about one chunk plus one
+element, whatever the size of the file.
+"""
+import gzip
+import json
+from typing import Iterator
+
+CHUNK_CHARS = 1 << 20
+WHITESPACE = " \t\n\r"
+
+
+class JSONStreamError(ValueError):
+    pass
+
+
+def open_text(path: str):
+    if str(path).endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    return open(path, encoding="utf-8")
+
+
+def iter_items(f, chunk_chars: int = CHUNK_CHARS) -> Iterator:
+    """Elements of the top-level array in text file `f` (or each value of a JSON Lines file)"""
+    decoder = json.JSONDecoder()
+    buf, pos, offset, eof = "", 0, 0, False
+
+    def fill() -> bool:
+        nonlocal buf, pos, offset, eof
+        chunk = f.read(max(chunk_chars, len(buf) - pos))  # grow for elements longer than a chunk
+        if not chunk:
+            eof = True
+            return False
+        offset += pos
+        buf, pos = buf[pos:] + chunk, 0
+        return True
+
+    def skip_whitespace() -> str:
+        """The next significant character (reading more as needed), "" at end of input"""
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in WHITESPACE:
+                pos += 1
+            if pos < len(buf):
+                return buf[pos]
+            if not fill():
+                return ""
+
+    def fail(message: str):
+        raise JSONStreamError(f"{message} at character {offset + pos}")
+
+    first = skip_whitespace()
+    in_array = first == "["
+    if in_array:
+        pos += 1
+        if skip_whitespace() == "]":
+            return
+    while True:
+        c = skip_whitespace()
+        if not c:
+            if in_array:
+                fail("unterminated array")
+            return
+        while True:
+            try:
+                value, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError as e:
+                if eof:
+                    fail(f"invalid JSON ({e.msg})")
+                fill()
+                continue
+            # A number or literal cut at the chunk edge decodes "successfully"; make sure it is complete
+            if end == len(buf) and not eof and not isinstance(value, (dict, list, str)):
+                fill()
+                continue
+            break
+        pos = end
+        yield value
+        if in_array:
+            c = skip_whitespace()
+            if c == ",":
+                pos += 1
+            elif c == "]":
+                pos += 1
+                if skip_whitespace():
+                    fail("unexpected data after the array")
+                return
+            else:
+                fail("expected ',' or ']'")
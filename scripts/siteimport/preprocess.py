@@ -0,0 +1,224 @@
+"""
+Scrape dump -> scored, ranked batch files for the importer.
+
+The dump is read one element at a time (jsonstream.py). Successful scrapes
+(`success && data`, as importSites filters them) are scored in column
+batches (scoring.py). Each site is appended as one JSON line to a spill
+file for its score, 0 to 100. Reading the spill files from 100 down to 0
+then gives scoreAllSites()'s order: descending score, input order within
+a score (JS sort is stable). That is a counting sort on disk, so sorting
+never holds the dump in memory.
+
+The ranked sites are written as batch-00001.json, batch-00002.json, ...
+Each file is a JSON array of {site, quality: {score, tier}, status, rank}
+records. status applies importSites' rule: live for the first
+`top_live_count` ranks with a score of at least `live_threshold`, otherwise
+pending_review. manifest.json lists the batches and the run's totals.
+lib/import/import-scored-sites.ts reads the directory one batch file at a
+time (`SCORED_DIR=... pnpm tsx scripts/import-sites.ts`).
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+
+from .jscompat import truthy
+from .jsonstream import JSONStreamError, iter_items, open_text
+from .scoring import numpy_available, score_sites, tier_for
+
+SCORED_DIR = ".import/scored-sites"
+# scripts/import-sites.ts: the scraper's default output path
+SOURCE_PATH = "/Volumes/SSD/dev/links/dobacklinks/scraper/active-sites-complete.json"
+FILE_BATCH = 5000
+COLUMN_BATCH = 20000
+LIVE_THRESHOLD = 70
+TOP_LIVE_COUNT = 500
+
+
+class ScoreSpill:
+    """One append-only file of JSON lines per score"""
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        directory.mkdir(parents=True, exist_ok=True)
+        self.files = {}
+        self.counts = [0] * 101
+
+    def add(self, score: int, line: str):
+        f = self.files.get(score)
+        if f is None:
+            f = self.files[score] = open(self.directory / f"{score:03d}.jsonl", "w", encoding="utf-8")
+        f.write(line)
+        f.write("\n")
+        self.counts[score] += 1
+
+    def ranked(self):
+        """(score, JSON line) from the highest score down, input order within a score"""
+        for f in self.files.values():
+            f.close()
+        for score in range(100, -1, -1):
+            if not self.counts[score]:
+                continue
+            with open(self.directory / f"{score:03d}.jsonl", encoding="utf-8") as f:
+                for line in f:
+                    yield score, line.rstrip("\n")
+
+    def remove(self):
+        for f in self.files.values():
+            f.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+class BatchWriter:
+    def __init__(self, out_dir: Path, batch_size: int):
+        self.out_dir, self.batch_size = out_dir, batch_size
+        self.batches = []
+        self._f = None
+
+    def add(self, record: str, rank: int, score: int):
+        if self._f is None:
+            name = f"batch-{len(self.batches) + 1:05d}.json"
+            self._f = open(self.out_dir / f"{name}.tmp", "w", encoding="utf-8")
+            self._f.write("[\n")
+            self.batches.append({"file": name, "sites": 0, "firstRank": rank, "maxScore": score, "minScore": score})
+        batch = self.batches[-1]
+        if batch["sites"]:
+            self._f.write(",\n")
+        self._f.write(record)
+        batch["sites"] += 1
+        batch["minScore"] = score
+        if batch["sites"] == self.batch_size:
+            self._close()
+
+    def _close(self):
+        if self._f is not None:
+            self._f.write("\n]\n")
+            self._f.close()
+            name = self.batches[-1]["file"]
+            os.replace(self.out_dir / f"{name}.tmp", self.out_dir / name)
+            self._f = None
+
+    def close(self):
+        self._close()
+
+
+def preprocess(source: str, out_dir: str = SCORED_DIR, batch_size: int = FILE_BATCH,
+               column_batch: int = COLUMN_BATCH, live_threshold: int = LIVE_THRESHOLD,
+               top_live_count: int = TOP_LIVE_COUNT, vectorized: Optional[bool] = None) -> dict:
+    """Score and rank every successful scrape in `source`; returns the manifest written to out_dir"""
+    if vectorized is None:
+        vectorized = numpy_available()
+    started = time.perf_counter()
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    for old in out.glob("batch-*.json"):
+        old.unlink()
+    spill = ScoreSpill(out / ".spill")
+    loaded = 0
+    pending = []
+
+    def flush():
+        scores, _ = score_sites(pending, vectorized)
+        for site, score in zip(pending, scores):
+            spill.add(score, json.dumps(site, ensure_ascii=False, separators=(",", ":")))
+        pending.clear()
+
+    try:
+        with open_text(source) as f:
+            for site in iter_items(f):
+                loaded += 1
+                if isinstance(site, dict) and truthy(site.get("success")) and truthy(site.get("data")):
+                    pending.append(site)
+                    if len(pending) >= column_batch:
+                        flush()
+        flush()
+
+        writer = BatchWriter(out, batch_size)
+        live = total = score_sum = 0
+        tiers = dict.fromkeys(("premium", "high", "medium", "low"), 0)
+        for rank, (score, line) in enumerate(spill.ranked(), start=1):
+            tier = tier_for(score)
+            status = "live" if rank <= top_live_count and score >= live_threshold else "pending_review"
+            writer.add(f'{{"site":{line},"quality":{{"score":{score},"tier":"{tier}"}},'
+                       f'"status":"{status}","rank":{rank}}}', rank, score)
+            total += 1
+            score_sum += score
+            live += status == "live"
+            tiers[tier] += 1
+        writer.close()
+    finally:
+        spill.remove()
+
+    manifest = {
+        "generatedAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "source": str(source),
+        "loaded": loaded,
+        "sites": total,
+        "live": live,
+        "pending": total - live,
+        "averageScore": round(score_sum / total, 1) if total else 0,
+        "tiers": tiers,
+        "liveThreshold": live_threshold,
+        "topLiveCount": top_live_count,
+        "batchSize": batch_size,
+        "scorer": "numpy" if vectorized else "python",
+        "seconds": round(time.perf_counter() - started, 3),
+        "batches": writer.batches,
+    }
+    tmp = out / "manifest.json.tmp"
+    tmp.write_text(json.dumps(manifest, indent=2) + "\n")
+    os.replace(tmp, out / "manifest.json")
+    return manifest
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="preprocess-sites", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("source", nargs="?", default=os.environ.get("SOURCE_PATH", SOURCE_PATH),
+                        help="Scraper dump: JSON array or JSON Lines, optionally .gz (default: $SOURCE_PATH)")
+    parser.add_argument("--out", default=SCORED_DIR, help=f"Output directory (default: {SCORED_DIR})")
+    parser.add_argument("--batch-size", type=int, default=FILE_BATCH,
+                        help=f"Sites per batch file (default: {FILE_BATCH})")
+    parser.add_argument("--live-threshold", type=int, default=LIVE_THRESHOLD,
+                        help=f"Minimum score for live status (default: {LIVE_THRESHOLD})")
+    parser.add_argument("--top-live", type=int, default=TOP_LIVE_COUNT,
+                        help=f"Ranks eligible for live status (default: {TOP_LIVE_COUNT})")
+    parser.add_argument("--scorer", choices=("auto", "numpy", "python"), default="auto",
+                        help="numpy (column batches), python (reference, site by site), or auto")
+    args = parser.parse_args(argv)
+
+    if not Path(args.source).exists():
+        print(f"❌ Error: File not found: {args.source}")
+        return 1
+    if args.scorer == "numpy" and not numpy_available():
+        print("❌ Error: --scorer numpy needs NumPy (pip install numpy)")
+        return 1
+    vectorized = None if args.scorer == "auto" else args.scorer == "numpy"
+
+    print(f"📖 Reading data from: {args.source}")
+    try:
+        manifest = preprocess(args.source, args.out, args.batch_size, live_threshold=args.live_threshold,
+                              top_live_count=args.top_live, vectorized=vectorized)
+    except JSONStreamError as e:
+        print(f"❌ Error: {e}")
+        return 1
+    print(f"✓ Loaded {manifest['loaded']} sites, {manifest['sites']} successful scrapes "
+          f"({manifest['scorer']} scorer, {manifest['seconds']:.1f}s)")
+    print()
+    print("📈 Import Summary:")
+    print(f"   Total sites: {manifest['sites']}")
+    print(f"   Live: {manifest['live']}")
+    print(f"   Pending: {manifest['pending']}")
+    print(f"   Average score: {manifest['averageScore']}")
+    print("   Tiers: " + ", ".join(f"{tier} {n}" for tier, n in manifest["tiers"].items()))
+    print()
+    print(f"📦 Wrote {len(manifest['batches'])} batch files to {args.out}")
+    print(f"   Import with: SCORED_DIR={args.out} pnpm tsx scripts/import-sites.ts")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
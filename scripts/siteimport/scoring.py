@@ -0,0 +1,157 @@
+"""
+calculateQualityScore() from lib/import/quality-scorer.ts, in Python.
+
+quality_score() is the reference port: one site at a time, line for line
+with the TS. score_batch() scores a column batch of sites with NumPy and
+gives the same results. It parses each distinct raw value once (interned in
+a dict: spam scores, link counts, DRs and approval dates repeat across
+thousands of sites), then applies the rules as whole-array arithmetic. The
+strings stay Python objects: a fixed-width NumPy string array would drop
+trailing NULs and size every cell to the longest value in the column.
+
+Where the TS would throw (a spamScore or googleNews that is not a string),
+the value is read as its JS string form instead.
+
+The rules, as in the TS:
+    Google News "yes"                  +30
+    spam score <= 5 / <= 15 / > 30     +25 / +15 / -20   (missing: 100)
+    at least one sample URL            +15
+    maxLinks >= 2                      +10
+    approved in 2001..2021             +10
+    Ahrefs DR >= 70                    +10
+    clamped to 0..100; premium >= 70, high >= 50, medium >= 30, else low
+"""
+from typing import List, Sequence, Tuple
+
+from .jscompat import full_year, parse_int, to_string, truthy
+
+TIERS = ("premium", "high", "medium", "low")
+
+
+def _field(site, name: str):
+    data = site.get("data") if isinstance(site, dict) else None
+    return data.get(name) if isinstance(data, dict) else None
+
+
+def google_news(value) -> bool:
+    """site.data.googleNews?.toLowerCase() === "yes\""""
+    return value is not None and to_string(value).lower() == "yes"
+
+
+def spam_score(value) -> float:
+    """parseInt(site.data.spamScore?.replace("%", "") || "100")"""
+    text = to_string(value).replace("%", "", 1) if value is not None else ""
+    return parse_int(text or "100")
+
+
+def has_sample_urls(value) -> bool:
+    """site.data.sampleUrls && site.data.sampleUrls.length > 0"""
+    return isinstance(value, (list, str)) and len(value) > 0
+
+
+def max_links(value) -> float:
+    """parseInt(site.data.maxLinks || "1")"""
+    return parse_int(value if truthy(value) else "1")
+
+
+def approved_year(value) -> float:
+    """new Date(site.data.approvedDate).getFullYear() if approvedDate is set, else NaN"""
+    return full_year(value) if truthy(value) else float("nan")
+
+
+def ahrefs_dr(value) -> float:
+    """parseInt(site.data.ahrefsDR || "0")"""
+    return parse_int(value if truthy(value) else "0")
+
+
+def tier_for(score: int) -> str:
+    if score >= 70:
+        return "premium"
+    if score >= 50:
+        return "high"
+    if score >= 30:
+        return "medium"
+    return "low"
+
+
+def quality_score(site) -> Tuple[int, str]:
+    """(score, tier) for one scraped site"""
+    score = 0
+    if google_news(_field(site, "googleNews")):
+        score += 30
+    spam = spam_score(_field(site, "spamScore"))
+    if spam <= 5:
+        score += 25
+    elif spam <= 15:
+        score += 15
+    elif spam > 30:
+        score -= 20
+    if has_sample_urls(_field(site, "sampleUrls")):
+        score += 15
+    if max_links(_field(site, "maxLinks")) >= 2:
+        score += 10
+    year = approved_year(_field(site, "approvedDate"))
+    if 2000 < year < 2022:
+        score += 10
+    if ahrefs_dr(_field(site, "ahrefsDR")) >= 70:
+        score += 10
+    score = min(100, max(0, score))
+    return score, tier_for(score)
+
+
+# ----------------------------------------------------------------------
+# Column batches
+# ----------------------------------------------------------------------
+def _parsed_column(values: list, parse, dtype):
+    """parse() applied to a column, once per distinct string; other JSON types go one by one"""
+    import numpy as np
+
+    distinct = {}
+    codes = np.fromiter((distinct.setdefault(v if isinstance(v, str) else "", len(distinct)) for v in values),
+                        dtype=np.intp, count=len(values))
+    out = np.array([parse(key) for key in distinct], dtype=dtype)[codes]
+    for i, value in enumerate(values):
+        if value is not None and not isinstance(value, str):
+            out[i] = parse(value)
+    return out
+
+
+def score_batch(sites: Sequence) -> Tuple[List[int], List[str]]:
+    """(scores, tiers) for a batch of scraped sites, computed column-wise with NumPy"""
+    import numpy as np
+
+    columns = {name: [_field(site, name) for site in sites]
+               for name in ("googleNews", "spamScore", "sampleUrls", "maxLinks", "approvedDate", "ahrefsDR")}
+    news = _parsed_column(columns["googleNews"], google_news, bool)
+    spam = _parsed_column(columns["spamScore"], spam_score, float)
+    samples = np.fromiter((has_sample_urls(v) for v in columns["sampleUrls"]), dtype=bool, count=len(sites))
+    links = _parsed_column(columns["maxLinks"], max_links, float)
+    year = _parsed_column(columns["approvedDate"], approved_year, float)
+    dr = _parsed_column(columns["ahrefsDR"], ahrefs_dr, float)
+
+    with np.errstate(invalid="ignore"):  # NaN compares false, as in JS
+        score = (30 * news
+                 + np.select([spam <= 5, spam <= 15, spam > 30], [25, 15, -20], 0)
+                 + 15 * samples
+                 + 10 * (links >= 2)
+                 + 10 * ((year > 2000) & (year < 2022))
+                 + 10 * (dr >= 70))
+    score = np.clip(score, 0, 100)
+    tier = np.select([score >= 70, score >= 50, score >= 30], list(TIERS[:3]), TIERS[3])
+    return score.tolist(), tier.tolist()
+
+
+def numpy_available() -> bool:
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def score_sites(sites: Sequence, vectorized: bool = True) -> Tuple[List[int], List[str]]:
+    """score_batch() with NumPy, else the reference scorer site by site"""
+    if vectorized:
+        return score_batch(sites)
+    results = [quality_score(site) for site in sites]
+    return [score for score, _ in results], [tier for _, tier in results]
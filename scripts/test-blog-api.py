@@ -1,6 +1,6 @@
 #!/usr/bin/env python3
 """
-Test script for /api/blogs endpoint (Python version)
+Test script for /api/blog endpoint (Python version)
 
 Usage:
     python scripts/test-blog-api.py
@@ -14,10 +14,13 @@ import os
 import sys
 import json
 import time
-import hmac
-import hashlib
 import requests
 from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from blogapi.hmac_auth import generate_hmac_signature
 
 # Configuration
 API_URL = os.getenv("API_URL", "http://localhost:3000")
@@ -29,24 +32,11 @@ if not CRON_SECRET:
     sys.exit(1)
 
 
-def generate_hmac_signature(method: str, path: str, timestamp: int, body: str, secret: str) -> str:
-    """
-    Generate HMAC signature for API request
-    """
-    canonical_string = f"{method.upper()}|{path}|{timestamp}|{body}"
-    signature = hmac.new(
-        secret.encode('utf-8'),
-        canonical_string.encode('utf-8'),
-        hashlib.sha256
-    ).hexdigest()
-    return signature
-
-
 def create_blog_post(post_data: dict) -> dict:
     """
     Create a blog post via API
     """
-    path = "/api/blogs"
+    path = "/api/blog"
     url = f"{API_URL}{path}"
     timestamp = int(time.time() * 1000)  # Unix timestamp in milliseconds
     body = json.dumps(post_data)
@@ -88,7 +78,7 @@ def create_blog_post(post_data: dict) -> dict:
 
 
 def main():
-    print("🚀 Testing /api/blogs endpoint\n")
+    print("🚀 Testing /api/blog endpoint\n")
 
     # Test data
     test_post = {
@@ -0,0 +1,7 @@
+"""
+Helpers shared by the script packages (r2sync, blogapi) that belong to
+neither: the asyncio HTTP/1.1 connection pool, retry backoff and latency
+percentiles.
+
+Like the packages that use it, it is imported with scripts/ on sys.path.
+"""
@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+
+from toolkit.httpclient import ConnectionPool, StaleConnection
+
+
+async def _serve(received):
+    """Answers the first request on each connection, then drops the connection after reading the next one"""
+    async def handle(reader, writer):
+        served = 0
+        while True:
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = next((int(line.split(b":")[1]) for line in head.split(b"\r\n")
+                           if line.lower().startswith(b"content-length:")), 0)
+            await reader.readexactly(length)
+            received.append(head.split(b" ", 1)[0].decode())
+            if served:
+                writer.close()
+                return
+            served += 1
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\nok")
+            await writer.drain()
+
+    return await asyncio.start_server(handle, "127.0.0.1", 0)
+
+
+def _run(method, idempotent=None):
+    async def run():
+        received = []
+        server = await _serve(received)
+        pool = ConnectionPool(f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}", timeout=5)
+        try:
+            await pool.request("GET", "/")
+            try:
+                response = await pool.request(method, "/", body=b"{}", idempotent=idempotent)
+                return response.status, received
+            except StaleConnection:
+                return None, received
+        finally:
+            await pool.close()
+            server.close()
+
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("method", ["GET", "PUT", "DELETE"])
+def test_idempotent_requests_retry_on_a_fresh_connection(method):
+    status, received = _run(method)
+    assert status == 200
+    assert received == ["GET", method, method]
+
+
+def test_post_on_a_dropped_connection_is_not_sent_twice():
+    status, received = _run("POST")
+    assert status is None
+    assert received == ["GET", "POST"]
+
+    status, received = _run("POST", idempotent=True)
+    assert status == 200
+    assert received == ["GET", "POST", "POST"]
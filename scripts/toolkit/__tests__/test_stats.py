@@ -0,0 +1,24 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from toolkit.stats import percentile
+
+SCRIPTS = Path(__file__).resolve().parents[2]
+
+
+def test_percentile_interpolates():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == pytest.approx(50.5)
+    assert percentile(values, 99) == pytest.approx(99.01)
+    assert percentile([3.0], 95) == 3.0
+    assert percentile([], 50) == 0.0
+
+
+def test_blogapi_does_not_load_r2sync():
+    code = f"import sys; sys.path.insert(0, {str(SCRIPTS)!r}); import blogapi.loadgen, blogapi.publisher; " \
+           "print(sorted(m for m in sys.modules if m.split('.')[0] == 'r2sync'))"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "[]"
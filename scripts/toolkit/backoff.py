@@ -0,0 +1,9 @@
+"""
+Retry backoff.
+"""
+import random
+
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 30.0) -> float:
+    """Exponential backoff with full jitter: uniform(0, min(cap, base * 2^(attempt-1)))"""
+    return random.uniform(0, min(cap, base * (2 ** (attempt - 1))))
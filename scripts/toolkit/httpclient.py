@@ -0,0 +1,194 @@
+"""
+Minimal asyncio HTTP/1.1 client with a keep-alive connection pool.
+
+Only what the S3 API needs: one origin, Content-Length or chunked bodies,
+connection reuse, and a transparent retry when a pooled connection turns out
+to have been closed by the server while idle.
+
+That retry only happens when the reused connection failed before a single
+response byte arrived, and only for idempotent methods. A POST the server may
+already have acted on is never sent twice unless the caller says it is safe.
+"""
+import asyncio
+import ssl
+from collections import deque
+from urllib.parse import urlsplit
+
+MAX_LINE = 65536
+IDEMPOTENT = frozenset(("GET", "HEAD", "PUT", "DELETE", "OPTIONS"))
+
+
+class HTTPError(Exception):
+    """Raised for malformed responses or broken connections"""
+
+
+class StaleConnection(HTTPError):
+    """A reused connection failed before any response bytes were read"""
+
+
+class Response:
+    __slots__ = ("status", "reason", "headers", "body")
+
+    def __init__(self, status: int, reason: str, headers: dict, body: bytes):
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.body = body
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status < 300
+
+
+class _Connection:
+    __slots__ = ("reader", "writer", "requests")
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.requests = 0
+
+    def close(self):
+        try:
+            self.writer.close()
+        except Exception:
+            pass
+
+
+class ConnectionPool:
+    """
+    Pool of keep-alive connections to a single origin.
+
+    At most `max_size` connections are open at once; callers beyond that wait
+    for a connection to be released.
+    """
+
+    def __init__(self, base_url: str, max_size: int = 64, timeout: float = 30.0):
+        parts = urlsplit(base_url)
+        self.scheme = parts.scheme or "https"
+        self.hostname = parts.hostname
+        self.port = parts.port or (443 if self.scheme == "https" else 80)
+        default_port = (self.scheme == "https" and self.port == 443) or (self.scheme == "http" and self.port == 80)
+        self.host = self.hostname if default_port else f"{self.hostname}:{self.port}"
+        self.max_size = max_size
+        self.timeout = timeout
+        self._ssl = ssl.create_default_context() if self.scheme == "https" else None
+        self._idle = deque()
+        self._slots = asyncio.Semaphore(max_size)
+        self.connections_opened = 0
+
+    async def _open(self) -> _Connection:
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(self.hostname, self.port, ssl=self._ssl, limit=MAX_LINE),
+            self.timeout,
+        )
+        self.connections_opened += 1
+        return _Connection(reader, writer)
+
+    async def request(self, method: str, target: str, headers: dict = None, body=b"",
+                      idempotent: bool = None) -> Response:
+        """
+        Send one request and read the full response body.
+        `idempotent` overrides the method's default for retrying on a fresh connection.
+        """
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT
+        await self._slots.acquire()
+        try:
+            while self._idle:
+                conn = self._idle.pop()
+                try:
+                    return await self._exchange(conn, method, target, headers, body)
+                except StaleConnection:
+                    # Closed by the server while idle; the request may still have arrived
+                    if not idempotent:
+                        raise
+                    continue
+            conn = await self._open()
+            return await self._exchange(conn, method, target, headers, body)
+        finally:
+            self._slots.release()
+
+    async def _exchange(self, conn: _Connection, method: str, target: str, headers: dict, body) -> Response:
+        body = body or b""
+        lines = [f"{method} {target} HTTP/1.1", f"Host: {self.host}"]
+        for name, value in (headers or {}).items():
+            lines.append(f"{name}: {value}")
+        lines.append(f"Content-Length: {len(body)}")
+        head = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+        status_line = b""
+        try:
+            try:
+                conn.writer.write(head)
+                if body:
+                    conn.writer.write(body)
+                await asyncio.wait_for(conn.writer.drain(), self.timeout)
+                status_line = await asyncio.wait_for(conn.reader.readline(), self.timeout)
+                if not status_line:
+                    raise HTTPError("connection closed before response")
+            except (ConnectionError, HTTPError) as e:
+                if conn.requests and not status_line:
+                    raise StaleConnection(f"{type(e).__name__}: {e}") from e
+                raise
+            response = await asyncio.wait_for(self._read_response(conn.reader, method, status_line), self.timeout)
+        except BaseException:
+            conn.close()
+            raise
+
+        conn.requests += 1
+        if response.headers.get("connection", "").lower() == "close":
+            conn.close()
+        else:
+            self._idle.append(conn)
+        return response
+
+    async def _read_response(self, reader: asyncio.StreamReader, method: str, status_line: bytes) -> Response:
+        parts = status_line.decode("latin-1").rstrip("\r\n").split(" ", 2)
+        if len(parts) < 2 or not parts[0].startswith("HTTP/"):
+            raise HTTPError(f"bad status line: {status_line!r}")
+        status = int(parts[1])
+        reason = parts[2] if len(parts) > 2 else ""
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n"):
+                break
+            if not line:
+                raise HTTPError("connection closed in headers")
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if method == "HEAD" or status in (204, 304) or 100 <= status < 200:
+            body = b""
+        elif headers.get("transfer-encoding", "").lower() == "chunked":
+            body = await self._read_chunked(reader)
+        elif "content-length" in headers:
+            body = await reader.readexactly(int(headers["content-length"]))
+        else:
+            body = await reader.read()
+            headers["connection"] = "close"
+        return Response(status, reason, headers, body)
+
+    async def _read_chunked(self, reader: asyncio.StreamReader) -> bytes:
+        chunks = []
+        while True:
+            size_line = await reader.readline()
+            size = int(size_line.split(b";", 1)[0].strip(), 16)
+            if size == 0:
+                # Trailers end with an empty line
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                return b"".join(chunks)
+            chunks.append(await reader.readexactly(size))
+            await reader.readexactly(2)
+
+    async def close(self):
+        while self._idle:
+            conn = self._idle.pop()
+            conn.close()
+            try:
+                await conn.writer.wait_closed()
+            except Exception:
+                pass
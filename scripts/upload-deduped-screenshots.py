@@ -0,0 +1,20 @@
+#!/usr/bin/env python3
+"""
+Upload screenshots to R2 once per distinct image (content-addressed)
+Usage: python3 scripts/upload-deduped-screenshots.py [--dry-run] [--mapping PATH]
+
+Identical thumbnails (parked domains, challenge pages, blank error pages)
+are uploaded once under screenshots/blobs/<sha256>.webp, and a
+domain -> object mapping is written for the app (default:
+public/screenshots/thumbnail-map.json).
+Same as `python3 scripts/r2sync-cli.py dedup`.
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from r2sync.cli import main
+
+if __name__ == "__main__":
+    sys.exit(main(["dedup", *sys.argv[1:]]))
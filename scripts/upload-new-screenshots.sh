@@ -3,6 +3,7 @@
 
 ACCOUNT_ID="9cb8d6ec0f6094cf4f0cd6b3ee5a17a3"
 BUCKET="dobacklinks"
+source "$(dirname "$0")/r2-cache-control.sh"
 COUNT=0
 FAILED=0
 
@@ -29,7 +30,7 @@ find screenshots/thumbnails -type f -name "*-thumb.webp" -mtime -1 | while read
   COUNT=$((COUNT + 1))
   KEY="$file"
 
-  if npx wrangler r2 object put "$BUCKET/$KEY" --file="$file" --content-type="image/webp" 2>/dev/null; then
+  if npx wrangler r2 object put "$BUCKET/$KEY" --file="$file" --content-type="image/webp" --cache-control="$IMMUTABLE_CACHE_CONTROL" 2>/dev/null; then
     echo "✅ [$COUNT] $KEY"
   else
     echo "❌ [$COUNT] Failed: $KEY"
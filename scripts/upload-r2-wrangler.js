@@ -19,6 +19,7 @@
 const fs = require("fs");
 const path = require("path");
 const { execSync } = require("child_process");
+const { cacheControlFlag } = require("./r2-cache-control");
 
 // Configuration from .env.local
 const envPath = path.join(__dirname, "..", ".env.local");
@@ -119,9 +120,10 @@ function uploadFile(filePath, r2Key) {
   }
 
   try {
-    execSync(`wrangler r2 object put "${fullKey}" --file="${filePath}" --remote`, {
-      stdio: "pipe",
-    });
+    execSync(
+      `wrangler r2 object put "${fullKey}" --file="${filePath}"${cacheControlFlag(r2Key)} --remote`,
+      { stdio: "pipe" },
+    );
     return { success: true, key: r2Key };
   } catch (e) {
     return { success: false, key: r2Key, error: e.message };
@@ -6,6 +6,7 @@ set -e
 BUCKET_NAME="dobacklinks"
 SCREENSHOTS_DIR="public/screenshots/thumbnails"
 PARALLEL_JOBS=10  # Number of parallel uploads
+source "$(dirname "$0")/r2-cache-control.sh"
 TEMP_DIR=$(mktemp -d)
 
 echo "📤 Uploading screenshots to R2 ($PARALLEL_JOBS parallel jobs)"
@@ -13,7 +14,7 @@ echo "📁 Source: $SCREENSHOTS_DIR"
 echo ""
 
 # Count total files
-TOTAL=$(find "$SCREENSHOTS_DIR" -type f 2>/dev/null | wc -l | tr -d ' ')
+TOTAL=$(find "$SCREENSHOTS_DIR" -type f -name '*.webp' 2>/dev/null | wc -l | tr -d ' ')
 echo "📊 Total files: $TOTAL"
 echo ""
 
@@ -23,25 +24,26 @@ upload_file() {
     local rel_path="${file#$SCREENSHOTS_DIR/}"
     local r2_key="screenshots/thumbnails/$rel_path"
 
-    if npx wrangler r2 object put "$BUCKET_NAME/$r2_key" --file="$file" > /dev/null 2>&1; then
+    if npx wrangler r2 object put "$BUCKET_NAME/$r2_key" --file="$file" --content-type="image/webp" --cache-control="$IMMUTABLE_CACHE_CONTROL" > /dev/null 2>&1; then
         echo "✓" > "$TEMP_DIR/success_$(basename "$file" | tr -cd '0-9').txt"
     else
         echo "✗ $rel_path" >> "$TEMP_DIR/failed.txt"
     fi
 }
 export -f upload_file
-export BUCKET_NAME SCREENSHOTS_DIR TEMP_DIR
+export BUCKET_NAME SCREENSHOTS_DIR TEMP_DIR IMMUTABLE_CACHE_CONTROL
 
 # Export variables for GNU parallel or xargs
-export BUCKET_NAME SCREENSHOTS_DIR
+export BUCKET_NAME SCREENSHOTS_DIR IMMUTABLE_CACHE_CONTROL
 
 # Use xargs for parallel processing (faster than sequential)
-find "$SCREENSHOTS_DIR" -type f -print0 | xargs -0 -P $PARALLEL_JOBS -I {} bash -c '
+# Only .webp: every put below is sent as image/webp
+find "$SCREENSHOTS_DIR" -type f -name '*.webp' -print0 | xargs -0 -P $PARALLEL_JOBS -I {} bash -c '
     file="$1"
-    rel_path="${file#'/$SCREENSHOTS_DIR/}"
-    r2_key="screenshots/thumbnails/${rel_path#/}"
+    rel_path="${file#"$SCREENSHOTS_DIR"/}"
+    r2_key="screenshots/thumbnails/$rel_path"
 
-    if npx wrangler r2 object put "$BUCKET_NAME/$r2_key" --file="$file" > /dev/null 2>&1; then
+    if npx wrangler r2 object put "$BUCKET_NAME/$r2_key" --file="$file" --content-type="image/webp" --cache-control="$IMMUTABLE_CACHE_CONTROL" > /dev/null 2>&1; then
         echo "✓"
     else
         echo "✗ $r2_key" >&2
@@ -53,11 +55,11 @@ echo "📤 Starting upload..."
 COUNT=0
 SUCCESS=0
 
-find "$SCREENSHOTS_DIR" -type f | while read -r file; do
+find "$SCREENSHOTS_DIR" -type f -name '*.webp' | while read -r file; do
     rel_path="${file#$SCREENSHOTS_DIR/}"
     r2_key="screenshots/thumbnails/$rel_path"
 
-    if npx wrangler r2 object put "$BUCKET_NAME/$r2_key" --file="$file" > /dev/null 2>&1; then
+    if npx wrangler r2 object put "$BUCKET_NAME/$r2_key" --file="$file" --content-type="image/webp" --cache-control="$IMMUTABLE_CACHE_CONTROL" > /dev/null 2>&1; then
         SUCCESS=$((SUCCESS + 1))
     fi
 
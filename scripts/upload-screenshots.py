@@ -1,62 +1,21 @@
 #!/usr/bin/env python3
 """
-Upload screenshots to R2 using wrangler (parallel processing)
-Usage: python3 scripts/upload-screenshots.py
-"""
-import os
-import subprocess
-from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor, as_completed
-
-BUCKET_NAME = "dobacklinks"
-SCREENSHOTS_DIR = "public/screenshots/thumbnails"
-MAX_WORKERS = 20
-
-screenshots_path = Path(SCREENSHOTS_DIR)
-files = list(screenshots_path.glob("**/*.webp"))
-total = len(files)
-
-print(f"📤 Uploading {total} screenshots to R2 ({MAX_WORKERS} parallel)")
-print()
-
-
-def upload_file(file_path: Path):
-    """Upload a single file using wrangler"""
-    rel_path = file_path.relative_to(screenshots_path)
-    r2_key = f"screenshots/thumbnails/{rel_path}"
+Upload screenshots to R2 (in-process, pooled keep-alive connections)
+Usage: python3 scripts/upload-screenshots.py [--retry-failed] [--fresh] [--recompress] [--dry-run]
 
-    cmd = [
-        "npx", "wrangler", "r2", "object", "put",
-        f"{BUCKET_NAME}/{r2_key}",
-        f"--file={file_path}"
-    ]
+Requires R2_ACCESS_KEY_ID, R2_SECRET_ACCESS_KEY and R2_ACCOUNT_ID
+(or R2_ENDPOINT_URL for a local S3-compatible endpoint).
 
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    return result.returncode == 0, str(file_path.name)
-
-
-# Upload with progress tracking
-success_count = 0
-failed_count = 0
-completed = 0
-
-with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-    futures = {executor.submit(upload_file, f): f for f in files}
-
-    for future in as_completed(futures):
-        completed += 1
-        success, filename = future.result()
+Progress is journaled in .r2sync/journal.sqlite: an interrupted run picks up
+where it stopped, and --retry-failed re-drives only the keys that failed.
+Same as `python3 scripts/r2sync-cli.py upload`.
+"""
+import sys
+from pathlib import Path
 
-        if success:
-            success_count += 1
-        else:
-            failed_count += 1
+sys.path.insert(0, str(Path(__file__).resolve().parent))
 
-        # Progress every 50 files
-        if completed % 50 == 0:
-            print(f"  Progress: {completed}/{total} (✓{success_count} ✗{failed_count})")
+from r2sync.cli import main
 
-print()
-print("✅ Upload complete!")
-print(f"   Uploaded: {success_count}/{total}")
-print(f"   Failed: {failed_count}/{total}")
+if __name__ == "__main__":
+    sys.exit(main(["upload", *sys.argv[1:]]))